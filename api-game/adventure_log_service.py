@@ -1,43 +1,105 @@
 # Copyright (C) 2025 Matthew Davey
 # SPDX-License-Identifier: GPL-3.0-or-later
+import base64
+import json
+import threading
 import time
 from datetime import datetime, timezone
 from typing import List, Dict, Optional
-from pymongo import MongoClient
+from bson import ObjectId
 from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
 from config.settings import get_settings
+from metrics import metrics
+from mongo_client import get_database
 import logging
 
 logger = logging.getLogger()
 CONFIG = get_settings()
 
+# Per-room cap: readers only ever see the newest MAX_LOGS_PER_ROOM entries.
+MAX_LOGS_PER_ROOM = 200
+# Inserts between physical trims. Storage may run up to this many entries
+# over the cap in between; every read is windowed to the cap, so the
+# overshoot is never observable.
+TRIM_EVERY_N_INSERTS = 25
+# Write-behind: accepted entries reach Mongo in one insert_many per flush.
+FLUSH_INTERVAL_S = CONFIG.get('ADVENTURE_LOG_FLUSH_INTERVAL_MS') / 1000
+FLUSH_MAX_ENTRIES = CONFIG.get('ADVENTURE_LOG_FLUSH_MAX_ENTRIES')
+# Mongo duplicate-key error: a retried batch whose first attempt partly landed
+DUPLICATE_KEY_ERROR = 11000
+
+
+def encode_log_cursor(log_id: int, remaining: int) -> str:
+    """Opaque `before` cursor: page strictly older than log_id, with
+    `remaining` entries of the capped window still unread."""
+    payload = json.dumps({"log_id": log_id, "remaining": remaining}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_log_cursor(cursor: str) -> tuple:
+    """(log_id, remaining) from encode_log_cursor; ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        log_id, remaining = int(payload["log_id"]), int(payload["remaining"])
+    except Exception as e:
+        raise ValueError(f"Invalid log cursor: {cursor!r}") from e
+    return log_id, min(remaining, MAX_LOGS_PER_ROOM)
+
+
 class AdventureLogService:
     """
-    Service for managing adventure logs with per-room limits using MongoDB aggregation pipelines
+    Service for managing adventure logs with per-room limits.
+
+    Trimming is amortized: instead of an aggregation + $nin delete on every
+    insert, each room trims once per TRIM_EVERY_N_INSERTS inserts with two
+    index-only queries (find the cap's cutoff log_id, range-delete below
+    it). Reads window to the newest MAX_LOGS_PER_ROOM, so the cap looks
+    exactly as it did when every insert trimmed.
+
+    Writes are buffered: add_log_entry only stamps the entry (log_id,
+    timestamp, _id) and queues it, and a background thread writes the
+    queue with insert_many every FLUSH_INTERVAL_S (sooner once
+    FLUSH_MAX_ENTRIES are waiting). Reads merge the unflushed entries in,
+    and removals reach into the queue too, so callers still see their own
+    writes. flush() forces a durable write (session end); close() drains
+    the buffer and stops the thread (lifespan shutdown).
+
+    History pages by keyset, not skip: each page is "the newest `limit`
+    entries older than the cursor's log_id", one index range scan however
+    far back the client has scrolled. The cursor also carries how much of
+    the capped window is left, so paging stops at MAX_LOGS_PER_ROOM just
+    as skip did. Per-room counts are kept in memory, seeded by one
+    count_documents and then adjusted on every insert, removal and trim.
     """
     
     def __init__(self):
-        self.adventure_logs: Collection = self._get_adventure_logs()
-        
-        # Create indexes for optimal performance
-        self._ensure_indexes()
-
-
-    def _get_adventure_logs(self):
-        "returns the adventure logs collection"
-        username = CONFIG.get('MONGO_USER',"")
-        password = CONFIG.get('MONGO_PASS',"")
-        try: 
-            conn = MongoClient('mongodb://%s:%s@mongo' % (username, password))
-            db = conn.rollplay
-            collection = db.adventure_logs
-            logger.info("Connected successfully to mongo DB") 
-        except Exception:   
-            logger.error("Could not connect to MongoDB")
-        return collection
-    
-    def _ensure_indexes(self):
-        """Create necessary indexes for efficient querying"""
+        # Borrowed from the shared pooled client — no connection is opened
+        # here; indexes are created by ensure_indexes() at app startup.
+        self.adventure_logs: Collection = get_database().adventure_logs
+        # room_id -> inserts since that room's last trim. Process-local (one
+        # uvicorn worker); a restart only delays the next trim.
+        self._inserts_since_trim: Dict[str, int] = {}
+        self._trim_lock = threading.Lock()
+
+        # Accepted, not yet written entries, oldest first.
+        self._pending: List[Dict] = []
+        self._buffer_lock = threading.Condition()
+        # Held from taking a batch until its insert_many returns. Readers
+        # hold it too, so an entry is always in exactly one of _pending or
+        # the collection from their point of view.
+        self._flush_lock = threading.RLock()
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = False
+        self._last_log_id = 0
+        # room_id -> entries stored + buffered (uncapped), once seeded.
+        # Every collection write happens under _flush_lock, which keeps
+        # these exact.
+        self._room_counts: Dict[str, int] = {}
+
+    def ensure_indexes(self):
+        """Create necessary indexes for efficient querying (lifespan startup)"""
         try:
             # Compound index for room-based queries (most important)
             self.adventure_logs.create_index([("room_id", 1), ("log_id", -1)])
@@ -52,22 +114,31 @@ class AdventureLogService:
         except Exception as e:
             print(f"Warning: Could not create indexes: {e}")
 
-    # ADD this method to your adventure_log_service.py class:
-
     def clear_system_messages(self, room_id: str) -> int:
         """
         Clear all system messages for a room
         Returns the number of deleted messages
         """
-        try:           
-            # Delete all system-type messages for this room
-            result = self.adventure_logs.delete_many({
-                "room_id": room_id,
-                "type": "system"
-            })
+        try:
+            with self._flush_lock:
+                dropped = self._drop_unflushed(
+                    lambda entry: entry["room_id"] == room_id and entry["type"] == "system"
+                )
+
+                # Trim first: entries past the cap must not resurface once
+                # the system lines stop filling the window.
+                self._trim_pending(room_id)
+
+                # Delete all system-type messages for this room
+                result = self.adventure_logs.delete_many({
+                    "room_id": room_id,
+                    "type": "system"
+                })
+                self._adjust_count(room_id, -result.deleted_count)
             
-            print(f"🗑️ Deleted {result.deleted_count} system messages for room {room_id}")
-            return result.deleted_count
+            deleted_count = dropped + result.deleted_count
+            print(f"🗑️ Deleted {deleted_count} system messages for room {room_id}")
+            return deleted_count
             
         except Exception as e:
             print(f"❌ Error clearing system messages: {e}")
@@ -78,14 +149,20 @@ class AdventureLogService:
         Clear all adventure log messages for a room
         Returns the number of deleted messages
         """
-        try:           
-            # Delete all messages for this room
-            result = self.adventure_logs.delete_many({
-                "room_id": room_id
-            })
+        try:
+            with self._flush_lock:
+                dropped = self._drop_unflushed(lambda entry: entry["room_id"] == room_id)
+
+                # Delete all messages for this room
+                result = self.adventure_logs.delete_many({
+                    "room_id": room_id
+                })
+                self._reset_trim_counter(room_id)
+                self._set_count(room_id, 0)
             
-            print(f"🗑️ Deleted {result.deleted_count} total messages for room {room_id}")
-            return result.deleted_count
+            deleted_count = dropped + result.deleted_count
+            print(f"🗑️ Deleted {deleted_count} total messages for room {room_id}")
+            return deleted_count
             
         except Exception as e:
             print(f"❌ Error clearing all messages: {e}")
@@ -103,13 +180,25 @@ class AdventureLogService:
             int: Number of deleted documents
         """
         try:
-            result = self.adventure_logs.delete_one({
-                "room_id": room_id,
-                "prompt_id": prompt_id
-            })
+            with self._flush_lock:
+                # A prompt cleared right after it was posted is usually
+                # still buffered — then it never reaches Mongo at all.
+                if self._drop_unflushed(
+                    lambda entry: entry["room_id"] == room_id and entry.get("prompt_id") == prompt_id,
+                    limit=1
+                ):
+                    deleted_count = 1
+                else:
+                    # Trim first (see clear_system_messages)
+                    self._trim_pending(room_id)
+                    deleted_count = self.adventure_logs.delete_one({
+                        "room_id": room_id,
+                        "prompt_id": prompt_id
+                    }).deleted_count
+                    self._adjust_count(room_id, -deleted_count)
             
             print(f"🗑️ Removed log entry with prompt_id {prompt_id} from room {room_id}")
-            return result.deleted_count
+            return deleted_count
             
         except Exception as e:
             print(f"❌ Error removing log by prompt_id: {e}")
@@ -121,122 +210,240 @@ class AdventureLogService:
         message: str, 
         log_type, 
         from_player: Optional[str] = None, 
-        max_logs: int = 200,
         prompt_id: Optional[str] = None
     ) -> Dict:
         """
-        Add a log entry and maintain max_logs limit per room using aggregation pipeline
+        Accept a log entry into the write-behind buffer (no round-trip)
         
         Args:
             room_id: The room/session ID
             message: The log message content
             log_type: Type of log (LogType enum or string)
             from_player: Name of the player sending the message (optional)
-            max_logs: Maximum number of logs to keep per room (default: 200)
             prompt_id: Unique prompt ID for linking (optional)
             
         Returns:
-            Dict: The inserted log document
+            Dict: The log document as it will be stored (_id pre-assigned)
         """
         
         # Handle LogType enum conversion internally
         log_type_value = log_type.value if hasattr(log_type, 'value') else log_type
         
-        # Generate sequential log ID for ordering
-        log_id = int(time.time() * 1000000)  # Microsecond precision for better ordering
-        
-        # Create new log entry
+        # Create new log entry. _id is assigned here rather than by the
+        # driver so a retried flush can't write the same entry twice.
         new_log = {
+            "_id": ObjectId(),
             "room_id": room_id,
             "message": message,
             "type": log_type_value,
             "timestamp": datetime.utcnow(),
             "from_player": from_player,
-            "log_id": log_id
         }
         
         # Add prompt_id if provided
         if prompt_id:
             new_log["prompt_id"] = prompt_id
         
+        with self._buffer_lock:
+            # Sequential log ID for ordering — microseconds, nudged forward so
+            # two entries accepted in the same tick still order strictly
+            log_id = max(int(time.time() * 1000000), self._last_log_id + 1)
+            self._last_log_id = log_id
+            new_log["log_id"] = log_id
+
+            self._pending.append(new_log)
+            self._adjust_count(room_id, 1)
+            # After close() there is no flush thread left — write through
+            write_through = self._closed
+            if not write_through:
+                self._ensure_flusher()
+                if len(self._pending) >= FLUSH_MAX_ENTRIES:
+                    self._buffer_lock.notify()
+
+        if write_through:
+            self.flush()
+        return new_log
+
+    def flush(self) -> int:
+        """
+        Write every buffered entry now; returns how many were written.
+
+        On failure the batch goes back to the front of the buffer (order
+        kept) and the error propagates — nothing accepted is dropped.
+        """
+        with self._flush_lock:
+            with self._buffer_lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                self._insert_batch(batch)
+            except Exception:
+                with self._buffer_lock:
+                    self._pending[:0] = batch
+                raise
+            metrics.observe("adventure_log.flush_seconds", time.perf_counter() - started)
+            metrics.increment("adventure_log.flushed_entries", len(batch))
+
+            # Physical trim once every TRIM_EVERY_N_INSERTS inserts per room
+            inserted_by_room: Dict[str, int] = {}
+            for entry in batch:
+                inserted_by_room[entry["room_id"]] = inserted_by_room.get(entry["room_id"], 0) + 1
+            for room_id, inserted in inserted_by_room.items():
+                if self._count_insert(room_id, inserted):
+                    self._trim_room(room_id, MAX_LOGS_PER_ROOM)
+        return len(batch)
+
+    def close(self):
+        """Lifespan shutdown: stop the flush thread and drain the buffer.
+        Entries accepted afterwards are written through synchronously."""
+        with self._buffer_lock:
+            self._closed = True
+            self._buffer_lock.notify_all()
+            flusher = self._flusher
+        if flusher is not None:
+            flusher.join()
         try:
-            # Insert the new log entry
-            result = self.adventure_logs.insert_one(new_log)
-            new_log["_id"] = result.inserted_id
-            
-            # Use aggregation pipeline to efficiently maintain log limit
-            self._cleanup_old_logs_pipeline(room_id, max_logs)
-            
-            return new_log
-            
+            self.flush()
         except Exception as e:
-            print(f"Error adding log entry: {e}")
-            raise
-    
-    def _cleanup_old_logs_pipeline(self, room_id: str, max_logs: int):
+            print(f"❌ Error flushing adventure logs on shutdown: {e}")
+
+    def _insert_batch(self, batch: List[Dict]):
+        try:
+            self.adventure_logs.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Duplicate _ids are entries an earlier, failed-looking attempt
+            # already wrote — those count as written.
+            write_errors = e.details.get("writeErrors", [])
+            if e.details.get("writeConcernErrors") or any(
+                error.get("code") != DUPLICATE_KEY_ERROR for error in write_errors
+            ):
+                raise
+
+    def _ensure_flusher(self):
+        """Start the flush thread if it isn't running (caller holds _buffer_lock)."""
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="adventure-log-flush", daemon=True
+            )
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            with self._buffer_lock:
+                while not self._pending and not self._closed:
+                    self._buffer_lock.wait()
+                # Give the batch the interval to fill, unless it's already
+                # big enough or we're shutting down (close() drains the rest)
+                deadline = time.monotonic() + FLUSH_INTERVAL_S
+                while len(self._pending) < FLUSH_MAX_ENTRIES and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._buffer_lock.wait(remaining)
+                if self._closed:
+                    return
+
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Error flushing adventure logs (will retry): {e}")
+                time.sleep(FLUSH_INTERVAL_S)
+
+    def _unflushed(self, room_id: str) -> List[Dict]:
+        """A room's buffered entries, newest first, shaped like a read
+        (no _id). Caller holds _flush_lock."""
+        with self._buffer_lock:
+            entries = [entry for entry in self._pending if entry["room_id"] == room_id]
+        return [
+            {key: value for key, value in entry.items() if key != "_id"}
+            for entry in reversed(entries)
+        ]
+
+    def _drop_unflushed(self, matches, limit: Optional[int] = None) -> int:
+        """Remove buffered entries matching a predicate (newest first, at
+        most limit); returns how many. Caller holds _flush_lock."""
+        with self._buffer_lock:
+            dropped = 0
+            kept = []
+            for entry in reversed(self._pending):
+                if (limit is None or dropped < limit) and matches(entry):
+                    dropped += 1
+                    self._adjust_count(entry["room_id"], -1)
+                else:
+                    kept.append(entry)
+            kept.reverse()
+            self._pending = kept
+            return dropped
+
+    def _adjust_count(self, room_id: str, delta: int):
+        """Apply a write to a seeded room count (unseeded rooms seed on read)."""
+        with self._buffer_lock:
+            if room_id in self._room_counts:
+                self._room_counts[room_id] += delta
+
+    def _set_count(self, room_id: str, count: Optional[int]):
+        """Pin a room's count after a wholesale write; None forgets it."""
+        with self._buffer_lock:
+            if count is None:
+                self._room_counts.pop(room_id, None)
+            else:
+                self._room_counts[room_id] = count
+
+    def _count_insert(self, room_id: str, inserted: int = 1) -> bool:
+        """Count flushed inserts; True when the room is due a trim."""
+        with self._trim_lock:
+            inserts = self._inserts_since_trim.get(room_id, 0) + inserted
+            if inserts >= TRIM_EVERY_N_INSERTS:
+                self._inserts_since_trim.pop(room_id, None)
+                return True
+            self._inserts_since_trim[room_id] = inserts
+            return False
+
+    def _reset_trim_counter(self, room_id: str) -> bool:
+        """Forget a room's untrimmed inserts; True if there were any."""
+        with self._trim_lock:
+            return self._inserts_since_trim.pop(room_id, None) is not None
+
+    def _trim_pending(self, room_id: str):
+        """Trim now if the room has inserts since its last trim — the only
+        way it can be holding entries past the cap."""
+        if self._reset_trim_counter(room_id):
+            self._trim_room(room_id, MAX_LOGS_PER_ROOM)
+
+    def _trim_room(self, room_id: str, max_logs: int) -> int:
         """
-        Use aggregation pipeline to efficiently clean up old logs for a room
-        
-        This is more efficient than the count + delete approach because:
-        1. Single database operation
-        2. Uses indexes effectively
-        3. Atomic operation
+        Delete everything older than a room's newest max_logs entries.
+
+        Both queries ride the (room_id, log_id) index: the cutoff lookup is
+        a covered skip, and the delete is a range scan — no aggregation and
+        no $nin list of kept ids.
         """
-        
         try:
-            # Aggregation pipeline to find logs to keep
-            pipeline = [
-                # Stage 1: Match logs for this room only
-                {
-                    "$match": {
-                        "room_id": room_id
-                    }
-                },
-                # Stage 2: Sort by log_id descending (newest first)
-                {
-                    "$sort": {
-                        "log_id": -1
-                    }
-                },
-                # Stage 3: Limit to max_logs (keep only newest entries)
-                {
-                    "$limit": max_logs
-                },
-                # Stage 4: Group and collect IDs of logs to keep
-                {
-                    "$group": {
-                        "_id": None,
-                        "keep_ids": {
-                            "$push": "$_id"
-                        },
-                        "count": {
-                            "$sum": 1
-                        }
-                    }
-                }
-            ]
-            
-            # Execute aggregation
-            result = list(self.adventure_logs.aggregate(pipeline))
-            
-            if result and len(result) > 0:
-                keep_ids = result[0]["keep_ids"]
-                kept_count = result[0]["count"]
-                
-                # Only delete if we have more than max_logs
-                if kept_count == max_logs:
-                    # Delete all logs for this room that aren't in the keep list
-                    delete_result = self.adventure_logs.delete_many({
-                        "room_id": room_id,
-                        "_id": {"$nin": keep_ids}
-                    })
-                    
-                    if delete_result.deleted_count > 0:
-                        print(f"Cleaned up {delete_result.deleted_count} old logs for room {room_id}")
-            
+            cutoff = list(
+                self.adventure_logs.find({"room_id": room_id}, {"_id": 0, "log_id": 1})
+                .sort("log_id", -1)
+                .skip(max_logs - 1)
+                .limit(1)
+            )
+            if not cutoff:
+                return 0
+
+            delete_result = self.adventure_logs.delete_many({
+                "room_id": room_id,
+                "log_id": {"$lt": cutoff[0]["log_id"]}
+            })
+            self._adjust_count(room_id, -delete_result.deleted_count)
+            if delete_result.deleted_count > 0:
+                print(f"Cleaned up {delete_result.deleted_count} old logs for room {room_id}")
+            return delete_result.deleted_count
+
         except Exception as e:
             print(f"Error during log cleanup for room {room_id}: {e}")
             # Don't raise here - log cleanup failure shouldn't break log insertion
+            return 0
     
     def restore_room_logs(self, room_id: str, entries: List[Dict]) -> int:
         """
@@ -262,8 +469,6 @@ class AdventureLogService:
         if not entries:
             return 0
 
-        self.delete_room_logs(room_id)
-
         docs = []
         for entry in entries:
             entry_timestamp = entry.get("timestamp")
@@ -286,50 +491,95 @@ class AdventureLogService:
             docs.append(doc)
 
         try:
-            self.adventure_logs.insert_many(docs)
+            with self._flush_lock:
+                self.delete_room_logs(room_id)
+                self.adventure_logs.insert_many(docs)
+                self._set_count(room_id, len(docs))
             return len(docs)
         except Exception as e:
+            # Count unknown after a partial insert — re-seed on next read
+            self._set_count(room_id, None)
             print(f"Error restoring logs for room {room_id}: {e}")
             raise
 
-    def get_room_logs(
+    def get_room_log_page(
         self,
         room_id: str,
         limit: int = 50,
-        skip: int = 0
-    ) -> List[Dict]:
+        before: Optional[str] = None
+    ) -> Dict:
         """
-        Get recent logs for a room with pagination
+        One page of a room's logs, newest first, by keyset
         
         Args:
             room_id: The room ID to get logs for
             limit: Maximum number of logs to return
-            skip: Number of logs to skip (for pagination)
+            before: next_cursor from the previous page (None: newest page)
             
         Returns:
-            List of log documents, newest first
+            {"logs": [...], "next_cursor": str | None} — next_cursor is None
+            once the newest MAX_LOGS_PER_ROOM have all been served (entries
+            awaiting a trim stay hidden)
+
+        Raises:
+            ValueError: before is not a cursor this service issued
         """
-        
+        before_log_id, remaining = decode_log_cursor(before) if before else (None, MAX_LOGS_PER_ROOM)
+        limit = min(limit, remaining)
+        if limit <= 0:
+            return {"logs": [], "next_cursor": None}
+
+        query = {"room_id": room_id}
+        if before_log_id is not None:
+            query["log_id"] = {"$lt": before_log_id}
+
         try:
-            logs = list(
-                self.adventure_logs.find(
-                    {"room_id": room_id},
-                    {"_id": 0}  # Exclude MongoDB _id from results
-                ).sort("log_id", -1)  # Newest first
-                .skip(skip)
-                .limit(limit)
-            )
-            
-            return logs
-            
+            with self._flush_lock:
+                # Merge the room's buffered entries with one index range scan
+                unflushed = [
+                    entry for entry in self._unflushed(room_id)
+                    if before_log_id is None or entry["log_id"] < before_log_id
+                ][:limit]
+                stored = list(
+                    self.adventure_logs.find(
+                        query,
+                        {"_id": 0}  # Exclude MongoDB _id from results
+                    ).sort("log_id", -1)  # Newest first
+                    .limit(limit)
+                )
+            logs = sorted(unflushed + stored, key=lambda log: log["log_id"], reverse=True)[:limit]
+
         except Exception as e:
             print(f"Error retrieving logs for room {room_id}: {e}")
-            return []
+            return {"logs": [], "next_cursor": None}
+
+        remaining -= len(logs)
+        next_cursor = None
+        if len(logs) == limit and remaining > 0:
+            next_cursor = encode_log_cursor(logs[-1]["log_id"], remaining)
+        return {"logs": logs, "next_cursor": next_cursor}
+
+    def get_room_logs(self, room_id: str, limit: int = 50) -> List[Dict]:
+        """The newest `limit` logs for a room (first page of get_room_log_page)"""
+        return self.get_room_log_page(room_id, limit)["logs"]
     
     def get_room_log_count(self, room_id: str) -> int:
-        """Get total number of logs for a room"""
+        """Get total number of logs for a room, buffered ones included
+        (capped, like the reads) — from the in-memory count once seeded"""
+        with self._buffer_lock:
+            count = self._room_counts.get(room_id)
+        if count is not None:
+            return min(count, MAX_LOGS_PER_ROOM)
+
         try:
-            return self.adventure_logs.count_documents({"room_id": room_id})
+            # Seed: no write can land between the stored count and the
+            # buffered one while _flush_lock is held
+            with self._flush_lock:
+                stored = self.adventure_logs.count_documents({"room_id": room_id})
+                with self._buffer_lock:
+                    count = stored + sum(1 for entry in self._pending if entry["room_id"] == room_id)
+                    self._room_counts[room_id] = count
+            return min(count, MAX_LOGS_PER_ROOM)
         except Exception as e:
             print(f"Error counting logs for room {room_id}: {e}")
             return 0
@@ -342,20 +592,27 @@ class AdventureLogService:
             Number of logs deleted
         """
         try:
-            result = self.adventure_logs.delete_many({"room_id": room_id})
-            print(f"Deleted {result.deleted_count} logs for room {room_id}")
-            return result.deleted_count
+            with self._flush_lock:
+                dropped = self._drop_unflushed(lambda entry: entry["room_id"] == room_id)
+                result = self.adventure_logs.delete_many({"room_id": room_id})
+                self._reset_trim_counter(room_id)
+                self._set_count(room_id, None)
+            deleted_count = dropped + result.deleted_count
+            print(f"Deleted {deleted_count} logs for room {room_id}")
+            return deleted_count
         except Exception as e:
             print(f"Error deleting logs for room {room_id}: {e}")
             return 0
     
-    def bulk_cleanup_all_rooms(self, max_logs: int = 200):
+    def bulk_cleanup_all_rooms(self, max_logs: int = MAX_LOGS_PER_ROOM):
         """
         Perform cleanup for all rooms (useful for maintenance)
         Uses aggregation to efficiently process all rooms
         """
         
         try:
+            self.flush()
+
             # Get all unique room IDs
             room_ids = self.adventure_logs.distinct("room_id")
             
@@ -363,13 +620,7 @@ class AdventureLogService:
             
             total_cleaned = 0
             for room_id in room_ids:
-                initial_count = self.get_room_log_count(room_id)
-                self._cleanup_old_logs_pipeline(room_id, max_logs)
-                final_count = self.get_room_log_count(room_id)
-                
-                cleaned = initial_count - final_count
-                if cleaned > 0:
-                    total_cleaned += cleaned
+                total_cleaned += self._trim_room(room_id, max_logs)
             
             print(f"Bulk cleanup completed. Total logs cleaned: {total_cleaned}")
             
@@ -380,9 +631,15 @@ class AdventureLogService:
         """Get statistics for a room's logs"""
         
         try:
+            # Stats aggregate in Mongo, so write the buffer out first
+            self.flush()
+
             # Use aggregation to get comprehensive stats
             pipeline = [
                 {"$match": {"room_id": room_id}},
+                # Same window the reads see
+                {"$sort": {"log_id": -1}},
+                {"$limit": MAX_LOGS_PER_ROOM},
                 {
                     "$group": {
                         "_id": None,
@@ -414,3 +671,8 @@ class AdventureLogService:
         except Exception as e:
             print(f"Error getting stats for room {room_id}: {e}")
             return {}
+
+
+# Shared instance: app.py, the WebSocket routes and the event handlers all
+# import this one rather than constructing their own.
+adventure_log = AdventureLogService()
@@ -2,7 +2,7 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 from fastapi import FastAPI, Response, Request, Query
 import logging
-import time
+from contextlib import asynccontextmanager
 from typing import Optional
 
 from fastapi import HTTPException
@@ -12,32 +12,63 @@ from fastapi.middleware.cors import CORSMiddleware
 from sentry_config import init_sentry
 init_sentry()
 
+import db_executor
+import mongo_client
+from db_executor import run_db
 from gameservice import GameService, GameSettings
-from adventure_log_service import AdventureLogService
-from mapservice import MapService, MapSettings
-from imageservice import ImageService, ImageSettings
+from adventure_log_service import adventure_log
+from fog_masks import is_mask_hash
+from mapservice import map_service
+from imageservice import image_service
 from message_templates import format_message, MESSAGE_TEMPLATES
 from models.log_type import LogType
 from websocket_handlers.connection_manager import manager as connection_manager
-from websocket_handlers.websocket_events import grid_resnap_fragment, send_map_token_fragment
+from websocket_handlers.room_actor import room_actors
+from metrics import metrics
+from websocket_handlers.websocket_events import (
+    grid_resnap_fragment,
+    map_token_holds,
+    release_room_drag_state,
+    send_map_token_fragment,
+)
+from websocket_handlers.room_affinity import room_affinity
 from shared_contracts.session import (
-    LogEntry,
     SessionStartPayload,
     SessionStartResponse,
-    SessionEndFinalState,
     SessionEndResponse,
-    PlayerState,
-    SessionStats,
 )
-from pydantic import ValidationError
-from shared_contracts.map import MapConfig
-from shared_contracts.map_token import MapToken
-from shared_contracts.image import ImageConfig
 from schemas.session_schemas import SessionEndRequest
-from datetime import datetime, timezone
+from session_bootstrap import SessionAlreadyExists, bootstrap_session, build_session_bootstrap
+from session_snapshot import build_final_state, read_session_snapshot
 
 logger = logging.getLogger()
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared Mongo pool, ensure indexes and migrate rooms still
+    stored as one doc (see room_partitions) once per process, then join
+    the WebSocket backplane and the room-affinity ring; on shutdown hand
+    off owned rooms, leave the backplane, flush buffered adventure logs,
+    drain the db executor, then the pool."""
+    await run_db(mongo_client.connect)
+    await run_db(adventure_log.ensure_indexes)
+    await run_db(map_service.ensure_indexes)
+    await run_db(image_service.ensure_indexes)
+    await run_db(GameService.ensure_indexes)
+    await run_db(GameService.migrate_legacy_rooms)
+    await connection_manager.start()
+    await room_affinity.start(hand_off_room, is_room_active, GameService.invalidate_room_cache)
+    yield
+    await room_affinity.stop()
+    await connection_manager.stop()
+    await map_token_holds.close()
+    await run_db(adventure_log.close)
+    db_executor.shutdown()
+    mongo_client.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,13 +79,9 @@ app.add_middleware(
 )
 
 
-adventure_log = AdventureLogService()
-map_service = MapService()
-image_service = ImageService()
-
 
-def build_role_change_payload(room_id: str, action: str, target_user_id: str, changed_by: str, message: str) -> dict:
-    room = GameService.get_room(id=room_id) or {}
+async def build_role_change_payload(room_id: str, action: str, target_user_id: str, changed_by: str, message: str) -> dict:
+    room = await run_db(GameService.get_room_core, id=room_id) or {}
     return {
         "event_type": "role_change",
         "data": {
@@ -68,18 +95,28 @@ def build_role_change_payload(room_id: str, action: str, target_user_id: str, ch
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """In-process runtime metrics (room actor queues, etc.) as JSON."""
+    return metrics.snapshot()
+
+
 @app.get("/game/{room_id}/logs")
-async def get_room_logs(room_id: str, limit: int = 100, skip: int = 0):
-    """Get adventure logs for a room"""
+async def get_room_logs(room_id: str, limit: int = 100, before: Optional[str] = None):
+    """Get adventure logs for a room, newest first. Pass the previous
+    response's next_cursor as `before` to page further back."""
     try:
-        logs = adventure_log.get_room_logs(room_id, limit, skip)
-        count = adventure_log.get_room_log_count(room_id)
+        page = await run_db(adventure_log.get_room_log_page, room_id, limit, before)
+        count = await run_db(adventure_log.get_room_log_count, room_id)
         
         return {
-            "logs": logs,
+            "logs": page["logs"],
             "total_count": count,
-            "returned_count": len(logs)
+            "returned_count": len(page["logs"]),
+            "next_cursor": page["next_cursor"]
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -87,7 +124,7 @@ async def get_room_logs(room_id: str, limit: int = 100, skip: int = 0):
 async def get_room_log_stats(room_id: str):
     """Get log statistics for a room"""
     try:
-        stats = adventure_log.get_room_stats(room_id)
+        stats = await run_db(adventure_log.get_room_stats, room_id)
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -96,7 +133,7 @@ async def get_room_log_stats(room_id: str):
 async def get_active_map(room_id: str):
     """Get the currently active map for a room"""
     try:
-        active_map = map_service.get_active_map(room_id)
+        active_map = await run_db(map_service.get_active_map, room_id)
         
         if active_map:
             mc = active_map.get('map_config', {})
@@ -110,12 +147,26 @@ async def get_active_map(room_id: str):
         logger.error(f"Error getting active map for room {room_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/game/fog-masks/{mask_hash}")
+async def get_fog_mask(mask_hash: str):
+    """A stored fog mask PNG by content hash. Immutable, so cached forever."""
+    if not is_mask_hash(mask_hash):
+        raise HTTPException(status_code=404, detail="Fog mask not found")
+    png_bytes = await run_db(map_service.get_fog_mask, mask_hash)
+    if png_bytes is None:
+        raise HTTPException(status_code=404, detail="Fog mask not found")
+    return Response(
+        content=png_bytes,
+        media_type="image/png",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
 @app.get("/game/{room_id}/active-image")
 async def get_active_image(room_id: str):
     """Get the currently active image for a room"""
     try:
-        active_image = image_service.get_active_image(room_id)
-        active_display = image_service.get_active_display(room_id)
+        active_image = await run_db(image_service.get_active_image, room_id)
+        active_display = await run_db(image_service.get_active_display, room_id)
 
         if active_image:
             logger.info(f"HTTP endpoint returning active image for room {room_id}: {active_image.get('image_config', {}).get('filename')}")
@@ -147,7 +198,7 @@ async def update_map(room_id: str, request: dict):
         #
         # Guarded on filename so a map *switch* through this endpoint never
         # re-snaps: old and new would be different boards entirely.
-        pre_update_map_config = (map_service.get_active_map(room_id) or {}).get("map_config", {})
+        pre_update_map_config = (await run_db(map_service.get_active_map, room_id) or {}).get("map_config", {})
         old_grid_config = None
         map_asset_id = None
         if pre_update_map_config.get("filename") == filename:
@@ -156,11 +207,11 @@ async def update_map(room_id: str, request: dict):
 
         # Replace entire map in database (atomic)
         logger.info(f"HTTP: Updating complete map for room {room_id}, filename {filename} by {updated_by}")
-        success = map_service.update_complete_map(room_id, updated_map)
+        success = await run_db(map_service.update_complete_map, room_id, updated_map)
 
         if success:
             # Get the updated map to broadcast via WebSocket
-            updated_map_result = map_service.get_active_map(room_id)
+            updated_map_result = await run_db(map_service.get_active_map, room_id)
 
             if updated_map_result:
                 result_mc = updated_map_result.get("map_config", {})
@@ -189,11 +240,12 @@ async def update_map(room_id: str, request: dict):
                 # through this same endpoint costs one dict comparison.
                 # Per-recipient delivery: a raw room broadcast would hand
                 # players every hidden token's position (decision 17).
-                resnap_fragment = grid_resnap_fragment(
+                resnap_fragment = await grid_resnap_fragment(
                     room_id, map_asset_id, updated_by,
                     old_grid_config, result_mc.get("grid_config"),
                 )
                 if resnap_fragment:
+                    await room_affinity.publish_room_change(room_id)
                     await send_map_token_fragment(connection_manager, room_id, resnap_fragment)
                     logger.info(
                         f"HTTP: Re-snapped {len(resnap_fragment['data']['tokens'])} tokens for room {room_id}")
@@ -214,7 +266,7 @@ async def update_map(room_id: str, request: dict):
 async def update_seat_count(room_id: str, request: dict):
     """Update the maximum number of seats for a game room and handle displaced players"""
     try:
-        check_room = GameService.get_room(id=room_id)
+        check_room = await run_db(GameService.get_room_core, id=room_id)
         max_players = request.get("max_players")
         updated_by = request.get("updated_by")
         displaced_players = request.get("displaced_players", [])
@@ -224,7 +276,8 @@ async def update_seat_count(room_id: str, request: dict):
             raise HTTPException(status_code=400, detail="Seat count must be between 1 and 8")
         
         # Update seat count in database
-        GameService.update_seat_count(room_id, max_players)
+        await run_db(GameService.update_seat_count, room_id, max_players)
+        await room_affinity.publish_room_change(room_id)
         
         # Handle displaced players - move them back to lobby
         for displaced_player in displaced_players:
@@ -264,7 +317,7 @@ async def update_seat_count(room_id: str, request: dict):
         # Get current seat layout from database after displacement
         try:
             # Get updated room data to get actual seat layout
-            updated_room = GameService.get_room(id=room_id)
+            updated_room = await run_db(GameService.get_room_core, id=room_id)
             current_seats = updated_room.get("seat_layout", [])
             
             # Create new_seats array matching the new max_players count
@@ -336,7 +389,7 @@ def gameservice_get(room_id):
 def get_player_roles(room_id: str, userId: str):
     """Check user's roles (moderator, DM) in a room"""
     try:
-        check_room = GameService.get_room(id=room_id)
+        check_room = GameService.get_room_core(id=room_id)
         if not check_room:
             raise HTTPException(status_code=404, detail=f"Room {room_id} not found")
 
@@ -356,7 +409,7 @@ def get_player_roles(room_id: str, userId: str):
 async def add_moderator(room_id: str, request: dict):
     """Add a user as moderator — proxies to api-site for domain validation."""
     try:
-        check_room = GameService.get_room(id=room_id)
+        check_room = await run_db(GameService.get_room_core, id=room_id)
         if not check_room:
             raise HTTPException(status_code=404, detail=f"Room {room_id} not found")
 
@@ -376,9 +429,10 @@ async def add_moderator(room_id: str, request: dict):
         await site_client.request_role_change(campaign_id, requesting_user_id, user_id, "mod")
 
         # api-site approved — update hot state
-        GameService.update_player_role(room_id, user_id, "mod")
+        await run_db(GameService.update_player_role, room_id, user_id, "mod")
+        await room_affinity.publish_room_change(room_id)
 
-        role_change_message = build_role_change_payload(
+        role_change_message = await build_role_change_payload(
             room_id, "add_moderator", user_id, requesting_user_id,
             f"Added as moderator",
         )
@@ -397,7 +451,7 @@ async def add_moderator(room_id: str, request: dict):
 async def remove_moderator(room_id: str, request: dict):
     """Remove a user from moderators — proxies to api-site for domain validation."""
     try:
-        check_room = GameService.get_room(id=room_id)
+        check_room = await run_db(GameService.get_room_core, id=room_id)
         if not check_room:
             raise HTTPException(status_code=404, detail=f"Room {room_id} not found")
 
@@ -412,9 +466,10 @@ async def remove_moderator(room_id: str, request: dict):
         await site_client.request_role_change(campaign_id, requesting_user_id, user_id, "spectator")
 
         # api-site approved — update hot state
-        GameService.update_player_role(room_id, user_id, "spectator")
+        await run_db(GameService.update_player_role, room_id, user_id, "spectator")
+        await room_affinity.publish_room_change(room_id)
 
-        role_change_message = build_role_change_payload(
+        role_change_message = await build_role_change_payload(
             room_id, "remove_moderator", user_id, requesting_user_id,
             f"Removed from moderators",
         )
@@ -433,7 +488,7 @@ async def remove_moderator(room_id: str, request: dict):
 async def set_dm(room_id: str, request: dict):
     """Set a user as dungeon master"""
     try:
-        check_room = GameService.get_room(id=room_id)
+        check_room = await run_db(GameService.get_room_core, id=room_id)
         if not check_room:
             raise HTTPException(status_code=404, detail=f"Room {room_id} not found")
 
@@ -446,9 +501,10 @@ async def set_dm(room_id: str, request: dict):
         meta = player_metadata.get(user_id, {}) if isinstance(player_metadata, dict) else {}
         player_name = request.get("player_name") or meta.get("player_name", "")
 
-        success = GameService.set_dm(room_id, user_id, player_name)
+        success = await run_db(GameService.set_dm, room_id, user_id, player_name)
         if success:
-            role_change_message = build_role_change_payload(
+            await room_affinity.publish_room_change(room_id)
+            role_change_message = await build_role_change_payload(
                 room_id,
                 "set_dm",
                 user_id,
@@ -468,17 +524,18 @@ async def set_dm(room_id: str, request: dict):
 async def unset_dm(room_id: str):
     """Remove the current dungeon master"""
     try:
-        check_room = GameService.get_room(id=room_id)
+        check_room = await run_db(GameService.get_room_core, id=room_id)
         if not check_room:
             raise HTTPException(status_code=404, detail=f"Room {room_id} not found")
         
         # Get current DM user_id before removing
         current_dm = check_room.get("dungeon_master", {}).get("user_id", "")
 
-        success = GameService.unset_dm(room_id)
+        success = await run_db(GameService.unset_dm, room_id)
         if success:
+            await room_affinity.publish_room_change(room_id)
             # Broadcast role change event to all clients in the room
-            role_change_message = build_role_change_payload(
+            role_change_message = await build_role_change_payload(
                 room_id,
                 "unset_dm",
                 current_dm,
@@ -529,118 +586,25 @@ async def create_session(request: SessionStartPayload):
     """
     try:
         # Check if game already exists for this session
-        existing = GameService.get_room(request.session_id)
+        existing = await run_db(GameService.get_room_core, request.session_id)
         if existing:
             raise HTTPException(
                 status_code=409,
                 detail="Game already exists for this session"
             )
 
-        # Convert assets to dict format for MongoDB storage
-        available_assets = [asset.model_dump() for asset in request.assets] if request.assets else []
-
-        # Key player_metadata by user_id — campaign_role lives on each entry
-        player_metadata = {}
-        if request.session_users:
-            for session_user in request.session_users:
-                # Flatten: top-level identity + character fields (if present)
-                entry = {
-                    "user_id": session_user.user_id,
-                    "player_name": session_user.player_name,
-                    "campaign_role": session_user.campaign_role,
-                }
-                if session_user.character:
-                    entry.update(session_user.character.model_dump())
-                player_metadata[session_user.user_id] = entry
-
-        # Restore the DM's Spotify BGM block from the previous session. The SpotifyState
-        # contract supplies defaults for anything unset (notably channel_level = -12 dB),
-        # so the room document always stores a complete, explicit block. The live anchor
-        # (started_at) is stale after a pause, so present it as paused/resumable — the DM
-        # continues via the "Resume where you left off" gesture (autoplay needs a user click).
-        spotify_restore = request.spotify_state.model_dump()
-        if spotify_restore.get("track_uri"):
-            spotify_restore["playback_state"] = "paused"
-            spotify_restore["is_playing"] = False
-
-        # Restore per-map token boards (cold → hot). api-site already pruned
-        # orphan boards for deleted maps; contract validation happened at the
-        # payload boundary, so this is a straight re-shape to stored dicts.
-        restored_map_token_state = {}
-        for board_asset_id, board_tokens in request.map_token_state.items():
-            restored_map_token_state[board_asset_id] = [
-                board_token.model_dump() for board_token in board_tokens
-            ]
-
-        # Create minimal session
-        settings = GameSettings(
-            max_players=request.max_players,
-            seat_layout=["empty"] * request.max_players,
-            created_at=datetime.utcnow(),
-            dungeon_master=request.dungeon_master.model_dump(),
-            available_assets=available_assets,
-            campaign_id=request.campaign_id,
-            player_metadata=player_metadata,
-            audio_state={k: v.model_dump() for k, v in request.audio_config.items()} if request.audio_config else {},
-            audio_track_config={k: v.model_dump() for k, v in request.audio_track_config.items()} if request.audio_track_config else {},
-            spotify=spotify_restore,
-            map_token_state=restored_map_token_state,
-            token_images={image_id: image_ref.model_dump() for image_id, image_ref in request.token_images.items()},
-            urls_expire_at=request.urls_expire_at or ""
-        )
-
-        # Use session_id as MongoDB _id (back-reference to PostgreSQL session)
-        game_id = GameService.create_room(settings, room_id=request.session_id)
+        # Restores run concurrently; the room insert commits the start
+        bootstrap = build_session_bootstrap(request)
+        try:
+            game_id = await bootstrap_session(bootstrap)
+        except SessionAlreadyExists:
+            raise HTTPException(
+                status_code=409,
+                detail="Game already exists for this session"
+            )
 
         logger.info(f"Created game {game_id} for session {request.session_id} with {len(request.joined_user_ids)} joined players")
 
-        # Restore map from previous session if available
-        if request.map_config and request.map_config.filename:
-            try:
-                map_config = request.map_config
-                restored_map = MapSettings(
-                    room_id=request.session_id,
-                    uploaded_by="system",
-                    map_config=map_config,
-                )
-                map_service.set_active_map(request.session_id, restored_map)
-                logger.info(f"Restored map '{map_config.filename}' for session {request.session_id}")
-            except Exception as e:
-                logger.warning(f"Map restoration failed (non-fatal): {e}")
-
-        # Restore image from previous session if available
-        if request.image_config and request.image_config.filename:
-            try:
-                image_config = request.image_config
-                restored_image = ImageSettings(
-                    room_id=request.session_id,
-                    loaded_by="system",
-                    image_config=image_config,
-                )
-                image_service.set_active_image(request.session_id, restored_image)
-                logger.info(f"Restored image '{image_config.filename}' for session {request.session_id}")
-            except Exception as e:
-                logger.warning(f"Image restoration failed (non-fatal): {e}")
-
-        # Restore active_display from previous session
-        if request.active_display:
-            try:
-                GameService.set_active_display(request.session_id, request.active_display)
-                logger.info(f"Restored active_display '{request.active_display}' for session {request.session_id}")
-            except Exception as e:
-                logger.warning(f"active_display restoration failed (non-fatal): {e}")
-
-        # Restore adventure log from previous session (timestamps/log_ids preserved)
-        if request.adventure_log:
-            try:
-                restored_count = adventure_log.restore_room_logs(
-                    request.session_id,
-                    [entry.model_dump() for entry in request.adventure_log],
-                )
-                logger.info(f"Restored {restored_count} adventure log entries for session {request.session_id}")
-            except Exception as e:
-                logger.warning(f"Adventure log restoration failed (non-fatal): {e}")
-
         return SessionStartResponse(
             success=True,
             session_id=game_id,  # Return MongoDB document ID as session_id for api-site
@@ -667,6 +631,9 @@ async def end_session(request: SessionEndRequest, validate_only: bool = False):
     2. Write to PostgreSQL
     3. Delete game (DELETE endpoint)
 
+    The state is read as one snapshot — one read per collection, issued
+    concurrently (session_snapshot) — and serialized once.
+
     Request:
     {
         "session_id": "550e8400-e29b-41d4-a716-446655440000"
@@ -682,149 +649,28 @@ async def end_session(request: SessionEndRequest, validate_only: bool = False):
     }
     """
     try:
-        # Get game room from MongoDB using session_id (which maps to MongoDB _id)
-        room = GameService.get_room(request.session_id)
-        if not room:
+        # One read per collection, issued together (see session_snapshot)
+        snapshot = await read_session_snapshot(request.session_id)
+        if snapshot is None:
             raise HTTPException(status_code=404, detail="Game not found for session")
 
-        # Extract player data from player_metadata — ALL known players round-trip
-        # (not just the seated ones) so character-owned state (color) syncs cold
-        # for everyone. Seat position is looked up from the layout where present.
-        player_metadata = room.get("player_metadata", {})
-        seat_index_by_user = {
-            seat: idx for idx, seat in enumerate(room.get("seat_layout", [])) if seat != "empty"
-        }
-        players = []
-        if isinstance(player_metadata, dict):
-            for metadata_user_id, meta in player_metadata.items():
-                # Display name from metadata only — never fall back to the user_id (a UUID = PII)
-                players.append(PlayerState(
-                    user_id=metadata_user_id,
-                    player_name=meta.get("player_name") or "Unknown Adventurer",
-                    seat_position=seat_index_by_user.get(metadata_user_id),
-                    character_id=meta.get("character_id"),
-                    color=meta.get("color"),
-                ))
-
-        # Calculate session duration
-        created_at = room.get("created_at")
-        duration_minutes = 0
-        if created_at:
-            # Handle datetime object directly from MongoDB
-            if isinstance(created_at, datetime):
-                duration = datetime.utcnow() - created_at
-                duration_minutes = int(duration.total_seconds() / 60)
-
-        # Get adventure log count
-        log_count = adventure_log.get_room_log_count(request.session_id)
-
-        # Full adventure log for cold storage, chronological (oldest first).
-        # Bounded by the service's 200-per-room cap; timestamps go out as
-        # ISO-8601 with explicit UTC offset (stored naive-UTC in Mongo).
-        raw_logs = adventure_log.get_room_logs(request.session_id, limit=200)
-        log_entries = []
-        for log_doc in sorted(raw_logs, key=lambda log_doc: log_doc.get("log_id") or 0):
-            log_timestamp = log_doc.get("timestamp")
-            if isinstance(log_timestamp, datetime):
-                log_timestamp = log_timestamp.replace(tzinfo=timezone.utc).isoformat()
-            log_entries.append(LogEntry(
-                message=log_doc.get("message", ""),
-                type=log_doc.get("type", "system"),
-                timestamp=log_timestamp or "",
-                from_player=log_doc.get("from_player"),
-                log_id=log_doc.get("log_id") or 0,
-                prompt_id=log_doc.get("prompt_id"),
-            ))
-
-        # Token boards for cold storage — salvage per token: a malformed dict
-        # (e.g. old-shape data sitting hot across a contract change) is
-        # dropped with a warning rather than failing the whole pause and
-        # stranding the session ACTIVE. Adventure-log extraction is lenient
-        # for the same reason. Boards left empty after salvage (or by the
-        # last $pull) are culled so key clutter never accumulates cold.
-        raw_token_boards = room.get("map_token_state", {}) or {}
-        token_boards = {}
-        if isinstance(raw_token_boards, dict):
-            for board_asset_id, board_tokens in raw_token_boards.items():
-                salvaged_tokens = []
-                for board_token in board_tokens or []:
-                    try:
-                        salvaged_tokens.append(MapToken(**board_token))
-                    except (ValidationError, TypeError) as token_error:
-                        logger.warning(
-                            f"Dropped malformed map token on board {board_asset_id} "
-                            f"at session end: {token_error}"
-                        )
-                if salvaged_tokens:
-                    token_boards[board_asset_id] = salvaged_tokens
-
-        # Get active map state for ETL — contract data is nested under map_config
-        active_map = map_service.get_active_map(request.session_id)
-        map_state = None
-        if active_map and active_map.get("map_config", {}).get("filename"):
-            map_state = MapConfig(**active_map["map_config"])
-
-        # Get active image state for ETL — contract data is nested under image_config
-        active_image = image_service.get_active_image(request.session_id)
-        image_state = None
-        if active_image and active_image.get("image_config", {}).get("filename"):
-            image_state = ImageConfig(**active_image["image_config"])
-
-        # Get active_display from game session
-        active_display = image_service.get_active_display(request.session_id)
-
-        # Build final state — extract __master_volume from audio_state (it's a float,
-        # not an AudioChannelState) before passing to the typed contract
-        raw_audio_state = dict(room.get("audio_state", {}))
-        broadcast_master_volume = raw_audio_state.pop("__master_volume", None)
-        # Spotify BGM block (track/context/channel level) — cold-stored for cross-session restore.
-        # If the session ends mid-play, freeze the live anchor into paused_elapsed NOW — the
-        # started_at epoch is meaningless after cold storage, and without this a later
-        # "Resume where you left off" starts the track from 0:00.
-        spotify_state = dict(room.get("spotify", {}) or {})
-        if spotify_state.get("playback_state") == "playing" and spotify_state.get("started_at"):
-            elapsed = max(0.0, time.time() - spotify_state["started_at"])
-            duration_ms = (spotify_state.get("track_meta") or {}).get("duration_ms")
-            if spotify_state.get("is_looping") and duration_ms:
-                elapsed = elapsed % (duration_ms / 1000.0)
-            elif duration_ms:
-                elapsed = min(elapsed, duration_ms / 1000.0)
-            spotify_state.update({
-                "playback_state": "paused",
-                "paused_elapsed": elapsed,
-                "started_at": None,
-                "is_playing": False,
-            })
-        final_state = SessionEndFinalState(
-            players=players,
-            session_stats=SessionStats(
-                duration_minutes=duration_minutes,
-                total_logs=log_count,
-                max_players=room.get("max_players", 0),
-            ),
-            audio_state=raw_audio_state,
-            audio_track_config=room.get("audio_track_config", {}),
-            broadcast_master_volume=broadcast_master_volume,
-            spotify_state=spotify_state,
-            map_state=map_state,
-            image_state=image_state,
-            active_display=active_display,
-            adventure_log=log_entries,
-            map_token_state=token_boards,
-        )
+        final_state = build_final_state(snapshot)
 
         # If not validate_only, delete the game (deprecated flow)
         if not validate_only:
             logger.warning(f"Using deprecated delete flow for session {request.session_id}")
-            GameService.delete_room(request.session_id)
+            await run_db(GameService.delete_room, request.session_id)
 
         logger.info(f"Returned final state for session {request.session_id} (validate_only={validate_only})")
 
-        return SessionEndResponse(
+        # Serialized once, straight to JSON bytes — returning the model would
+        # have FastAPI re-validate the whole final state against response_model
+        end_response = SessionEndResponse(
             success=True,
             final_state=final_state,
             message="Final state retrieved" if validate_only else "Session ended"
         )
+        return Response(content=end_response.model_dump_json(), media_type="application/json")
 
     except HTTPException:
         raise
@@ -852,7 +698,7 @@ async def delete_session(game_id: str, keep_logs: bool = True):
     """
     try:
         # Check if session exists
-        room = GameService.get_room(game_id)
+        room = await run_db(GameService.get_room_core, game_id)
         if not room:
             # Already deleted - return success
             logger.info(f"Session {game_id} already deleted")
@@ -864,16 +710,22 @@ async def delete_session(game_id: str, keep_logs: bool = True):
         # Gracefully disconnect all WebSocket clients before deletion
         logger.info(f"Closing WebSocket connections for room {game_id}")
         await connection_manager.close_room_connections(game_id, reason="Session ended")
+        room_actors.close_room(game_id)
+        await release_room_drag_state(game_id)
 
-        # Delete active_session from MongoDB
-        GameService.delete_room(game_id)
+        # Delete active_session from MongoDB (and drop its cached doc — even
+        # if the delete failed, nothing should keep serving a torn-down room)
+        await run_db(GameService.delete_room, game_id)
+        GameService.invalidate_room_cache(game_id)
 
-        # Optionally delete logs and maps
-        if not keep_logs:
+        # Optionally delete logs and maps (kept logs must be on disk first)
+        if keep_logs:
+            await run_db(adventure_log.flush)
+        else:
             logger.info(f"Deleting logs, maps, and images for {game_id}")
-            adventure_log.delete_room_logs(game_id)
-            map_service.clear_active_map(game_id)
-            image_service.delete_room_images(game_id)
+            await run_db(adventure_log.delete_room_logs, game_id)
+            await run_db(map_service.clear_active_map, game_id)
+            await run_db(image_service.delete_room_images, game_id)
 
         logger.info(f"Deleted session {game_id} (keep_logs={keep_logs})")
 
@@ -917,18 +769,19 @@ async def update_player_character(room_id: str, character_data: dict):
     """
     try:
         # Verify room exists
-        room = GameService.get_room(room_id)
+        room = await run_db(GameService.get_room_core, room_id)
         if not room:
             raise HTTPException(status_code=404, detail="Session not found")
 
         # Update the character in room metadata
-        GameService.update_player_character(room_id, character_data)
+        await run_db(GameService.update_player_character, room_id, character_data)
+        await room_affinity.publish_room_change(room_id)
 
         # Broadcast character change to all clients via WebSocket. Forward the
         # merged record from MongoDB rather than the inbound delta so the event
         # carries every field clients need (including campaign_role for the
         # spectator-derivation effect). Frontend handler merges fields.
-        refreshed = GameService.get_room(room_id) or {}
+        refreshed = await run_db(GameService.get_room_core, room_id) or {}
         merged = (refreshed.get("player_metadata") or {}).get(character_data.get("user_id", "")) or character_data
         player_name = merged.get("player_name", "unknown")
         character_name = merged.get("character_name", "unknown")
@@ -973,7 +826,7 @@ async def update_seat_layout(room_id: str, request: dict):
         logger.debug(f"Received seat layout update request for room {room_id}")
         logger.debug(f"Request data: {request}")
 
-        check_room = GameService.get_room(id=room_id)
+        check_room = await run_db(GameService.get_room_core, id=room_id)
         if not check_room:
             logger.error(f"Room {room_id} not found")
             raise HTTPException(status_code=404, detail=f"Room {room_id} not found")
@@ -1027,7 +880,8 @@ async def update_seat_layout(room_id: str, request: dict):
         
         # Update MongoDB record
         logger.debug(f"Calling GameService.update_seat_layout({room_id}, {seat_layout})")
-        GameService.update_seat_layout(room_id, seat_layout)
+        await run_db(GameService.update_seat_layout, room_id, seat_layout)
+        await room_affinity.publish_room_change(room_id)
         logger.info(f"Successfully saved seat layout to database")
         
         # Log the change (only if there are actual players). Resolve each seat's user_id to a
@@ -1071,7 +925,7 @@ async def update_seat_layout(room_id: str, request: dict):
 async def clear_system_messages(room_id: str, request: dict):
     """Clear all system messages from the adventure log"""
     try:
-        check_room = GameService.get_room(id=room_id)
+        check_room = await run_db(GameService.get_room_core, id=room_id)
         if not check_room:
             raise HTTPException(status_code=404, detail=f"Room {room_id} not found")
         
@@ -1080,7 +934,7 @@ async def clear_system_messages(room_id: str, request: dict):
         logger.info(f"Clearing system messages for room {room_id} by {cleared_by}")
 
         # Clear system messages from the database
-        deleted_count = adventure_log.clear_system_messages(room_id)
+        deleted_count = await run_db(adventure_log.clear_system_messages, room_id)
 
         logger.info(f"Cleared {deleted_count} system messages")
         
@@ -1109,7 +963,7 @@ async def clear_system_messages(room_id: str, request: dict):
 async def clear_all_messages(room_id: str, request: dict):
     """Clear all adventure log messages"""
     try:
-        check_room = GameService.get_room(id=room_id)
+        check_room = await run_db(GameService.get_room_core, id=room_id)
         if not check_room:
             raise HTTPException(status_code=404, detail=f"Room {room_id} not found")
         
@@ -1118,7 +972,7 @@ async def clear_all_messages(room_id: str, request: dict):
         logger.info(f"Clearing all messages for room {room_id} by {cleared_by}")
 
         # Clear all messages from the database
-        deleted_count = adventure_log.clear_all_messages(room_id)
+        deleted_count = await run_db(adventure_log.clear_all_messages, room_id)
 
         logger.info(f"Cleared {deleted_count} total messages")
         
@@ -1145,5 +999,5 @@ async def clear_all_messages(room_id: str, request: dict):
 
 
 # Register WebSocket routes - avoid circular dependencies
-from websocket_handlers.app_websocket import register_websocket_routes
+from websocket_handlers.app_websocket import hand_off_room, is_room_active, register_websocket_routes
 register_websocket_routes(app)
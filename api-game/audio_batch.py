@@ -0,0 +1,218 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Pure compiler for remote_audio_batch operations.
+
+A batch (a "play scene" loads and starts several channels at once) used
+to persist op by op — one update per channel, plus a read and a write or
+two of audio_track_config for every load — all against an audio_state
+snapshot taken before the first op. compile_audio_batch instead applies
+the ops in order to in-memory copies of audio_state and
+audio_track_config, so each op sees the ones before it, and folds the
+result into ONE $set/$unset update on the room doc. GameService.
+apply_audio_batch writes that in a single update_one, atomic on the doc.
+
+Kept free of database imports so the op logic unit-tests directly.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from shared_contracts.audio import AudioChannelState, AudioEffects, AudioTrackConfig
+
+VALID_AUDIO_BATCH_OPS = (
+    "play", "stop", "pause", "resume", "volume", "loop", "load", "clear",
+    "effects", "mute", "solo", "master_volume",
+)
+
+# master_volume rides in audio_state under this key as a bare float
+MASTER_VOLUME_KEY = "__master_volume"
+
+
+@dataclass
+class AudioBatch:
+    """A compiled batch: the room update, and the ops as broadcast (load
+    ops carry the config they resolved to)."""
+
+    update_doc: Dict[str, Any]
+    operations: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _outgoing_track_config(old_ch: Dict[str, Any]) -> Dict[str, Any]:
+    """What a channel's track stashes when it is swapped out or cleared."""
+    return AudioTrackConfig(
+        volume=old_ch.get("volume"),
+        looping=old_ch.get("looping"),
+        effects=AudioEffects(**(old_ch.get("effects") or {})),
+        paused_elapsed=old_ch.get("paused_elapsed"),
+    ).model_dump()
+
+
+def _loaded_channel(op: Dict[str, Any], old_ch: Dict[str, Any],
+                    saved_config: Dict[str, Any]) -> AudioChannelState:
+    """Channel state for a load — restored from the track's stash when it
+    has one, else the op's defaults."""
+    if saved_config:
+        channel_state = AudioChannelState(
+            filename=op.get("filename"),
+            asset_id=op.get("asset_id"),
+            s3_url=op.get("s3_url"),
+            volume=saved_config.get("volume", op.get("volume", 0.8)),
+            looping=saved_config.get("looping", op.get("looping")),
+            effects=saved_config.get("effects", {}),
+            playback_state="stopped",
+            started_at=None,
+            paused_elapsed=saved_config.get("paused_elapsed"),
+        )
+    else:
+        channel_state = AudioChannelState(
+            filename=op.get("filename"),
+            asset_id=op.get("asset_id"),
+            s3_url=op.get("s3_url"),
+            volume=op.get("volume", 0.8),
+            looping=op.get("looping") if op.get("looping") is not None else True,
+            effects=op.get("effects", {}),
+            playback_state="stopped",
+            started_at=None,
+            paused_elapsed=None,
+        )
+
+    # Preserve channel-level mute/solo (not asset-level — survives track swaps)
+    channel_state.muted = old_ch.get("muted", False)
+    channel_state.soloed = old_ch.get("soloed", False)
+    return channel_state
+
+
+def _apply_audio_op(audio_state: Dict[str, Any], track_configs: Dict[str, Any],
+                    op: Dict[str, Any], now: float) -> Dict[str, Any]:
+    """Apply one op to the working state in place. Returns the op as it
+    should be broadcast. Raises ValidationError when the result breaks the
+    AudioChannelState contract."""
+    track_id = op.get("trackId")
+    operation = op.get("operation")
+    ch = audio_state.get(track_id) or {}
+
+    if operation == "master_volume":
+        # Store broadcast master volume as a top-level field on audio_state
+        audio_state[MASTER_VOLUME_KEY] = op.get("volume", 1.0)
+        return op
+
+    if operation == "play":
+        play_fields = {
+            "filename": op.get("filename"),
+            "asset_id": op.get("asset_id"),
+            "s3_url": op.get("s3_url"),
+            "volume": op.get("volume", 0.8),
+            "looping": op.get("looping", True),
+            "playback_state": "playing",
+            "started_at": now,
+            "paused_elapsed": None,
+        }
+        for loop_field in ("loop_mode", "loop_start", "loop_end"):
+            if op.get(loop_field) is not None:
+                play_fields[loop_field] = op.get(loop_field)
+        channel_state = AudioChannelState(**{**ch, **play_fields})
+
+    elif operation == "stop":
+        # Stop playback but keep track loaded in channel
+        channel_state = AudioChannelState(
+            **{**ch, "playback_state": "stopped", "started_at": None, "paused_elapsed": None}
+        )
+
+    elif operation == "pause":
+        started_at = ch.get("started_at")
+        paused_elapsed = (now - started_at) if started_at else 0
+        channel_state = AudioChannelState(
+            **{**ch, "playback_state": "paused", "paused_elapsed": paused_elapsed}
+        )
+
+    elif operation == "resume":
+        paused_elapsed = ch.get("paused_elapsed") or 0
+        channel_state = AudioChannelState(
+            **{**ch, "playback_state": "playing", "started_at": now - paused_elapsed, "paused_elapsed": None}
+        )
+
+    elif operation == "volume":
+        channel_state = AudioChannelState(**{**ch, "volume": op.get("volume")})
+
+    elif operation == "loop":
+        loop_update = {"looping": op.get("looping")}
+        if op.get("loop_mode") is not None:
+            loop_update["loop_mode"] = op.get("loop_mode")
+        channel_state = AudioChannelState(**{**ch, **loop_update})
+
+    elif operation == "load":
+        # Stash the outgoing track's config, then restore the incoming
+        # track's stash (if any) into the channel — it is live again, so
+        # the stash goes.
+        if ch.get("asset_id"):
+            track_configs[ch["asset_id"]] = _outgoing_track_config(ch)
+        new_asset_id = op.get("asset_id")
+        saved_config = track_configs.pop(new_asset_id, None) if new_asset_id else None
+        channel_state = _loaded_channel(op, ch, saved_config)
+
+        # The broadcast carries the resolved config
+        op = {
+            **op,
+            "volume": channel_state.volume,
+            "looping": channel_state.looping,
+            "effects": channel_state.effects.model_dump(),
+            "paused_elapsed": channel_state.paused_elapsed,
+        }
+
+    elif operation == "effects":
+        channel_state = AudioChannelState(**{**ch, "effects": op.get("effects", {})})
+
+    elif operation == "mute":
+        channel_state = AudioChannelState(**{**ch, "muted": op.get("muted", False)})
+
+    elif operation == "solo":
+        channel_state = AudioChannelState(**{**ch, "soloed": op.get("soloed", False)})
+
+    elif operation == "clear":
+        # Save outgoing track's full config before clearing
+        if ch.get("asset_id"):
+            track_configs[ch["asset_id"]] = _outgoing_track_config(ch)
+        channel_state = AudioChannelState(volume=op.get("volume", 0.8), looping=False)
+
+    else:
+        raise ValueError(f"Unsupported audio batch operation: {operation}")
+
+    audio_state[track_id] = channel_state.model_dump()
+    return op
+
+
+def compile_audio_batch(audio_state: Dict[str, Any], audio_track_config: Dict[str, Any],
+                        operations: List[Dict[str, Any]], now: float) -> AudioBatch:
+    """Fold validated batch ops, applied in order to the room's current
+    audio_state and audio_track_config, into one room update.
+
+    Only the channels and stash entries the batch touched are written —
+    `$set` for what they ended up as, `$unset` for stash entries a load
+    consumed — so the update never clobbers untouched channels. Raises
+    ValidationError (before anything is written) if any op breaks the
+    contract, so a batch lands whole or not at all.
+    """
+    working_state = dict(audio_state or {})
+    working_configs = dict(audio_track_config or {})
+
+    resolved_ops = [
+        _apply_audio_op(working_state, working_configs, op, now) for op in operations
+    ]
+
+    set_fields, unset_fields = {}, {}
+    for channel_id, channel_state in working_state.items():
+        if (audio_state or {}).get(channel_id) != channel_state:
+            set_fields[f"audio_state.{channel_id}"] = channel_state
+    for asset_id in set(working_configs) | set(audio_track_config or {}):
+        if asset_id not in working_configs:
+            unset_fields[f"audio_track_config.{asset_id}"] = ""
+        elif (audio_track_config or {}).get(asset_id) != working_configs[asset_id]:
+            set_fields[f"audio_track_config.{asset_id}"] = working_configs[asset_id]
+
+    update_doc = {}
+    if set_fields:
+        update_doc["$set"] = set_fields
+    if unset_fields:
+        update_doc["$unset"] = unset_fields
+    return AudioBatch(update_doc=update_doc, operations=resolved_ops)
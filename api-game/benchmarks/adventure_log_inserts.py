@@ -0,0 +1,88 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Adventure-log insert throughput: insert_one + per-insert aggregation
+trim (legacy) vs AdventureLogService's write-behind buffer with amortized
+trim. The buffered run's timing includes the final flush, so both numbers
+are for entries durably in Mongo.
+
+Needs a reachable MongoDB (the api-game container, or MONGO_* pointing at
+one). Writes to a scratch room in the real adventure_logs collection and
+deletes it afterwards.
+
+Run from api-game/:
+    python -m benchmarks.adventure_log_inserts [--inserts 2000]
+"""
+
+import argparse
+import time
+import uuid
+
+import mongo_client
+from adventure_log_service import MAX_LOGS_PER_ROOM, adventure_log
+from models.log_type import LogType
+
+
+def legacy_insert(room_id: str, message: str):
+    """The pre-amortization add_log_entry: insert, then aggregate the
+    newest MAX_LOGS_PER_ROOM ids and $nin-delete the rest — every time."""
+    collection = adventure_log.adventure_logs
+    collection.insert_one({
+        "room_id": room_id,
+        "message": message,
+        "type": LogType.SYSTEM.value,
+        "log_id": int(time.time() * 1000000),
+    })
+    result = list(collection.aggregate([
+        {"$match": {"room_id": room_id}},
+        {"$sort": {"log_id": -1}},
+        {"$limit": MAX_LOGS_PER_ROOM},
+        {"$group": {"_id": None, "keep_ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+    ]))
+    if result and result[0]["count"] == MAX_LOGS_PER_ROOM:
+        collection.delete_many({"room_id": room_id, "_id": {"$nin": result[0]["keep_ids"]}})
+
+
+def buffered_insert(room_id: str, message: str):
+    adventure_log.add_log_entry(room_id, message, LogType.SYSTEM)
+
+
+def run(label: str, insert, inserts: int) -> float:
+    room_id = f"bench-{uuid.uuid4()}"
+    try:
+        # Start at the cap so every insert is a trimming insert.
+        for index in range(MAX_LOGS_PER_ROOM):
+            adventure_log.add_log_entry(room_id, f"prefill {index}", LogType.SYSTEM)
+        adventure_log.flush()
+
+        started = time.perf_counter()
+        for index in range(inserts):
+            insert(room_id, f"{label} {index}")
+        adventure_log.flush()
+        elapsed = time.perf_counter() - started
+
+        visible = adventure_log.get_room_log_count(room_id)
+        print(f"{label:>10}: {inserts / elapsed:8.0f} inserts/s  "
+              f"({elapsed * 1000 / inserts:.2f} ms/insert, {visible} visible)")
+        return inserts / elapsed
+    finally:
+        adventure_log.delete_room_logs(room_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inserts", type=int, default=2000)
+    args = parser.parse_args()
+
+    if not mongo_client.connect():
+        raise SystemExit("MongoDB unreachable")
+    adventure_log.ensure_indexes()
+
+    before = run("legacy", legacy_insert, args.inserts)
+    after = run("buffered", buffered_insert, args.inserts)
+    print(f"speedup: {after / before:.1f}x")
+    adventure_log.close()
+
+
+if __name__ == "__main__":
+    main()
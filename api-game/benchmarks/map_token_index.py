@@ -0,0 +1,82 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Map-token lookups on a crowded board: linear scans of the token array
+(what apply_map_token_op and an occupancy check did) vs BoardIndex.
+
+Pure in-memory — no MongoDB needed. Boards are random mixes of footprint
+1–4 tokens on a 100x100 grid.
+
+Run from api-game/:
+    python -m benchmarks.map_token_index [--tokens 500 1000 2000] [--queries 20000]
+"""
+
+import argparse
+import random
+import time
+
+from map_token_index import BoardIndex, token_cell_span
+
+GRID = {"enabled": True, "grid_cell_size": 50, "offset_x": 0, "offset_y": 0,
+        "grid_width": 100, "grid_height": 100}
+
+
+def make_board(count: int, rng: random.Random) -> list:
+    board = []
+    for index in range(count):
+        footprint = rng.choice((1, 1, 1, 2, 3, 4))
+        col, row = rng.randrange(100 - footprint), rng.randrange(100 - footprint)
+        board.append({
+            "id": f"token-{index}", "kind": "npc", "footprint": footprint,
+            "x": (col + footprint / 2) * 50, "y": (row + footprint / 2) * 50,
+        })
+    return board
+
+
+def scan_find(board: list, token_id: str):
+    return next((token for token in board if token.get("id") == token_id), None)
+
+
+def scan_cell_occupied(board: list, col: int, row: int) -> bool:
+    for token in board:
+        first_col, first_row, size = token_cell_span(token["x"], token["y"], token["footprint"], GRID)
+        if first_col <= col < first_col + size and first_row <= row < first_row + size:
+            return True
+    return False
+
+
+def timed(label: str, queries: list, lookup) -> float:
+    started = time.perf_counter()
+    for query in queries:
+        lookup(*query)
+    per_query_us = (time.perf_counter() - started) * 1e6 / len(queries)
+    print(f"  {label:<28} {per_query_us:9.2f} us/query")
+    return per_query_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, nargs="+", default=[500, 1000, 2000])
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    for count in args.tokens:
+        board = make_board(count, rng)
+        index = BoardIndex(board)
+        index.cell_occupied(0, 0, GRID)  # build the cell table up front
+        ids = [(f"token-{rng.randrange(count)}",) for _ in range(args.queries)]
+        cells = [(rng.randrange(100), rng.randrange(100)) for _ in range(args.queries)]
+        # The scan answers far slower; a slice of the queries keeps runs short
+        scan_cells = cells[:max(1, args.queries // 20)]
+
+        print(f"{count} tokens")
+        find_before = timed("find by id (scan)", ids, lambda token_id: scan_find(board, token_id))
+        find_after = timed("find by id (index)", ids, index.get)
+        occupied_before = timed("cell occupied (scan)", scan_cells, lambda col, row: scan_cell_occupied(board, col, row))
+        occupied_after = timed("cell occupied (index)", cells, lambda col, row: index.cell_occupied(col, row, GRID))
+        print(f"  speedup: find {find_before / find_after:.0f}x, cell occupied {occupied_before / occupied_after:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
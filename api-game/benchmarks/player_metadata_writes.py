@@ -0,0 +1,96 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Player-scoped write amplification: bytes per update document for the
+legacy whole-field rewrites vs player_metadata_ops' targeted paths, by
+party size.
+
+"Bytes" is the BSON size of the update document — what the primary has
+to apply and replicate. The targeted writes also send a guard filter
+(their optimistic-concurrency conditions), reported separately: it is
+matched, not written. No MongoDB needed.
+
+Run from api-game/:
+    python -m benchmarks.player_metadata_writes [--party-sizes 2,4,8,16]
+"""
+
+import argparse
+
+import bson
+
+from player_metadata_ops import (
+    EMPTY_SEAT,
+    build_player_character_update,
+    build_player_role_update,
+    build_seat_layout_update,
+)
+
+
+def make_player(index: int) -> dict:
+    user_id = f"{index:08d}-0000-4000-8000-000000000000"
+    return {
+        "user_id": user_id,
+        "player_name": f"player{index}",
+        "campaign_role": "player",
+        "character_id": f"{index:08d}-1111-4000-8000-000000000000",
+        "character_name": f"Adventurer {index}",
+        "character_class": ["Ranger", "Rogue"],
+        "character_race": "Half-Elf",
+        "level": 5,
+        "hp_current": 31,
+        "hp_max": 38,
+        "ac": 15,
+        "color": "#3b82f6",
+    }
+
+
+def size(*docs) -> int:
+    return sum(len(bson.encode(doc)) for doc in docs)
+
+
+def measure(party_size: int) -> dict:
+    players = [make_player(index) for index in range(party_size)]
+    player_metadata = {player["user_id"]: player for player in players}
+    subject = players[-1]
+    hp_sync = {"user_id": subject["user_id"], "hp_current": 12}
+
+    # The last player takes the last seat; everyone else is already seated
+    current_layout = [player["user_id"] for player in players[:-1]] + [EMPTY_SEAT]
+    seat_layout = current_layout[:-1] + [subject["user_id"]]
+
+    merged_metadata = {**player_metadata, subject["user_id"]: {**subject, **hp_sync}}
+    seat_filter, seat_update = build_seat_layout_update(current_layout, seat_layout)
+    role_filter, role_update = build_player_role_update(subject["user_id"], "spectator")
+
+    return {
+        "character sync": (
+            size({"$set": {"player_metadata": merged_metadata}}),
+            size(build_player_character_update(hp_sync)),
+            0,
+        ),
+        "take a seat": (
+            size({"$set": {"seat_layout": seat_layout}}),
+            size(seat_update),
+            size(seat_filter),
+        ),
+        "role change": (
+            size({"$set": {f"player_metadata.{subject['user_id']}.campaign_role": "spectator"}}),
+            size(role_update),
+            size(role_filter),
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--party-sizes", default="2,4,8,16")
+    args = parser.parse_args()
+
+    print(f"{'op':>15} {'party':>6} {'before':>8} {'after':>8} {'guard':>8}")
+    for party_size in (int(value) for value in args.party_sizes.split(",")):
+        for op, (before, after, guard) in measure(party_size).items():
+            print(f"{op:>15} {party_size:>6} {before:>7}B {after:>7}B {guard:>7}B")
+
+
+if __name__ == "__main__":
+    main()
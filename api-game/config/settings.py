@@ -39,6 +39,50 @@ class Settings(BaseSettings):
     MONGO_INITDB_ROOT_USERNAME: str
     MONGO_INITDB_ROOT_PASSWORD: str
 
+    # MongoDB connection pool (one process-wide client, see mongo_client.py)
+    MONGO_HOST: str = "mongo"
+    MONGO_MAX_POOL_SIZE: int = 50
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 60000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    # Threads that run blocking pymongo calls off the event loop (db_executor.py).
+    # Keep at or below MONGO_MAX_POOL_SIZE so workers never queue on a socket.
+    DB_EXECUTOR_MAX_WORKERS: int = 16
+
+    # Live-drag relay: move frames are coalesced per room and flushed as one
+    # map_token_drag_batch this many times a second (drag_coalescer.py).
+    MAP_TOKEN_DRAG_TICK_HZ: int = 20
+
+    # Adventure-log write-behind buffer (adventure_log_service.py): entries are
+    # written with insert_many every FLUSH_INTERVAL_MS, or sooner once this
+    # many are waiting.
+    ADVENTURE_LOG_FLUSH_INTERVAL_MS: int = 250
+    ADVENTURE_LOG_FLUSH_MAX_ENTRIES: int = 100
+
+    # Cross-worker WebSocket backplane (websocket_handlers/backplane.py).
+    # Unset: in-memory, single worker. Set: Redis pub/sub + shared presence.
+    WS_BACKPLANE_REDIS_URL: Optional[str] = None
+
+    # Room affinity (websocket_handlers/room_affinity.py): each room lives on
+    # one owner worker, leased in Redis. Unset: every room is served locally.
+    # WORKER_ADVERTISE_URL is this worker's address as other workers reach
+    # it (e.g. ws://api-game-2:8081) — also its id in the hash ring.
+    # ROOM_AFFINITY_SECRET signs proxied sockets and handoff tokens; every
+    # worker must share it.
+    ROOM_AFFINITY_REDIS_URL: Optional[str] = None
+    WORKER_ADVERTISE_URL: Optional[str] = None
+    ROOM_AFFINITY_SECRET: Optional[str] = None
+    ROOM_LEASE_TTL_SECONDS: int = 15
+
+    # Map-token hold store (map_token_holds.py). Unset: in-memory, lost on
+    # restart. Set: holds shared by every worker and kept across restarts.
+    MAP_TOKEN_HOLDS_REDIS_URL: Optional[str] = None
+
+    # Fog mask blob store (fog_masks.py). Unset: the fog_masks Mongo
+    # collection. Set: files under this directory (a mounted volume).
+    FOG_MASK_STORE_DIR: Optional[str] = None
+
     # POSTGRESQL (for user/character/game data)
     POSTGRES_HOST: str
     POSTGRES_PORT: str
@@ -84,6 +128,23 @@ def get_settings() -> dict:
     return {
         'MONGO_USER': _settings.MONGO_INITDB_ROOT_USERNAME,
         'MONGO_PASS': _settings.MONGO_INITDB_ROOT_PASSWORD,
+        'MONGO_HOST': _settings.MONGO_HOST,
+        'MONGO_MAX_POOL_SIZE': _settings.MONGO_MAX_POOL_SIZE,
+        'MONGO_MIN_POOL_SIZE': _settings.MONGO_MIN_POOL_SIZE,
+        'MONGO_MAX_IDLE_TIME_MS': _settings.MONGO_MAX_IDLE_TIME_MS,
+        'MONGO_SERVER_SELECTION_TIMEOUT_MS': _settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        'MONGO_CONNECT_TIMEOUT_MS': _settings.MONGO_CONNECT_TIMEOUT_MS,
+        'DB_EXECUTOR_MAX_WORKERS': _settings.DB_EXECUTOR_MAX_WORKERS,
+        'MAP_TOKEN_DRAG_TICK_HZ': _settings.MAP_TOKEN_DRAG_TICK_HZ,
+        'ADVENTURE_LOG_FLUSH_INTERVAL_MS': _settings.ADVENTURE_LOG_FLUSH_INTERVAL_MS,
+        'ADVENTURE_LOG_FLUSH_MAX_ENTRIES': _settings.ADVENTURE_LOG_FLUSH_MAX_ENTRIES,
+        'WS_BACKPLANE_REDIS_URL': _settings.WS_BACKPLANE_REDIS_URL,
+        'ROOM_AFFINITY_REDIS_URL': _settings.ROOM_AFFINITY_REDIS_URL,
+        'WORKER_ADVERTISE_URL': _settings.WORKER_ADVERTISE_URL,
+        'ROOM_AFFINITY_SECRET': _settings.ROOM_AFFINITY_SECRET,
+        'ROOM_LEASE_TTL_SECONDS': _settings.ROOM_LEASE_TTL_SECONDS,
+        'MAP_TOKEN_HOLDS_REDIS_URL': _settings.MAP_TOKEN_HOLDS_REDIS_URL,
+        'FOG_MASK_STORE_DIR': _settings.FOG_MASK_STORE_DIR,
         'APP_NAME': _settings.APP_NAME,
         'APP_VERSION': _settings.app_version,
         'environment': _settings.ENVIRONMENT,
@@ -7,3 +7,14 @@ Loading this conftest puts the api-game root on sys.path, so tests import
 application modules (`from map_token_ops import ...`) identically under both
 `pytest` and `python -m pytest`, matching how uvicorn resolves them at runtime.
 """
+
+import os
+
+# config.settings requires these at import time. Unit tests never open a
+# connection, so placeholders are enough — real env vars still win.
+for _required_setting in (
+    "MONGO_INITDB_ROOT_USERNAME", "MONGO_INITDB_ROOT_PASSWORD",
+    "POSTGRES_HOST", "POSTGRES_PORT", "POSTGRES_DB",
+    "APP_DB_USER", "APP_DB_PASSWORD",
+):
+    os.environ.setdefault(_required_setting, "test")
@@ -0,0 +1,68 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Awaitable bridge from async handlers to the synchronous persistence layer.
+
+GameService, AdventureLogService, MapService and ImageService are plain
+pymongo — every call blocks the calling thread for a full round-trip. Called
+straight from a WebsocketEvent coroutine that thread is the event loop, so
+one slow write stalls every socket in every room on the worker.
+
+run_db() hands the call to a dedicated, bounded thread pool and awaits the
+result, so the loop keeps servicing other sockets while Mongo works:
+
+    room = await run_db(GameService.get_room, room_id)
+
+The pool is separate from the loop's default executor (which Starlette uses
+for sync endpoints and file I/O) and capped at DB_EXECUTOR_MAX_WORKERS, kept
+at or below the Mongo pool size so a worker never waits on a socket. Excess
+calls queue in the executor instead of piling onto the driver.
+
+Ordering: two awaited run_db calls from one coroutine still execute in
+order. Calls issued concurrently (gather, separate handlers) may interleave
+exactly as they would across two uvicorn workers.
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from config.settings import get_settings
+
+logger = logging.getLogger()
+CONFIG = get_settings()
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """The shared persistence executor, created on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=CONFIG.get('DB_EXECUTOR_MAX_WORKERS'),
+            thread_name_prefix="db",
+        )
+    return _executor
+
+
+async def run_db(fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Run a blocking persistence call on the db executor and await it.
+
+    Exceptions raised by fn propagate to the awaiting coroutine unchanged,
+    so existing try/except blocks around service calls keep working."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown() -> None:
+    """Lifespan shutdown hook: finish in-flight calls, then drop the pool."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+        logger.info("Shut down db executor")
@@ -0,0 +1,198 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Content-addressed storage for fog-of-war masks.
+
+A FogRegion's mask used to ride inline as a base64 PNG data URL — into
+active_maps on every fog save and into every fog_config_update broadcast,
+up to FOG_REGIONS_MAX of them each time, even when one region changed.
+
+Now each mask is stored once, keyed by the sha256 of its PNG bytes, and
+regions carry only `mask_hash`. Saving a config whose regions are
+unchanged writes no blobs (the hash is already there); clients that
+already show a hash skip the fetch and the decode. Blobs are the raw PNG
+bytes — a quarter smaller than the base64 text they replace.
+
+store_fog_masks turns inline masks into refs on the way in (every
+MapService write). hydrate_fog_masks turns refs back into data URLs for
+the ETL to api-site, whose cold storage keeps masks inline.
+
+Tiled masks (fog_tiles) keep their tiles in the same store.
+
+MaskStore is the interface. MongoMaskStore (the fog_masks collection) is
+the default; FilesystemMaskStore keeps blobs under FOG_MASK_STORE_DIR.
+Blobs are immutable and never deleted here — a hash is the content, so
+any two rooms painting the same mask share one blob.
+"""
+
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from config.settings import get_settings
+
+logger = logging.getLogger()
+CONFIG = get_settings()
+
+MASK_DATA_URL_PREFIX = "data:image/png;base64,"
+
+_MASK_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_mask_hash(value: Any) -> bool:
+    return isinstance(value, str) and _MASK_HASH_PATTERN.match(value) is not None
+
+
+def mask_content_hash(png_bytes: bytes) -> str:
+    return hashlib.sha256(png_bytes).hexdigest()
+
+
+def decode_mask_data_url(mask: str) -> bytes:
+    """PNG bytes of a mask data URL. Raises ValueError if it isn't one."""
+    if not isinstance(mask, str) or not mask.startswith(MASK_DATA_URL_PREFIX):
+        raise ValueError("Fog mask must be a PNG data URL")
+    try:
+        return base64.b64decode(mask[len(MASK_DATA_URL_PREFIX):], validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("Fog mask is not valid base64")
+
+
+def encode_mask_data_url(png_bytes: bytes) -> str:
+    return MASK_DATA_URL_PREFIX + base64.b64encode(png_bytes).decode("ascii")
+
+
+class MaskStore(ABC):
+    """Blob store keyed by mask hash. Sync, like the other Mongo-backed
+    services — call through run_db."""
+
+    @abstractmethod
+    def has(self, mask_hash: str) -> bool:
+        ...
+
+    @abstractmethod
+    def get(self, mask_hash: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def put(self, mask_hash: str, png_bytes: bytes) -> None:
+        """Store a blob. Writing a hash that exists is a no-op."""
+
+
+class MongoMaskStore(MaskStore):
+    def __init__(self, collection):
+        self.collection = collection
+
+    def has(self, mask_hash: str) -> bool:
+        return self.collection.count_documents({"_id": mask_hash}, limit=1) > 0
+
+    def get(self, mask_hash: str) -> Optional[bytes]:
+        doc = self.collection.find_one({"_id": mask_hash})
+        return bytes(doc["data"]) if doc else None
+
+    def put(self, mask_hash: str, png_bytes: bytes) -> None:
+        # $setOnInsert: a hash that's already stored is never rewritten
+        self.collection.update_one(
+            {"_id": mask_hash},
+            {"$setOnInsert": {"data": png_bytes, "size": len(png_bytes)}},
+            upsert=True,
+        )
+
+
+class FilesystemMaskStore(MaskStore):
+    """Blobs at <root>/<hash[:2]>/<hash>.png, written atomically."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, mask_hash: str) -> str:
+        if not is_mask_hash(mask_hash):
+            raise ValueError(f"Not a fog mask hash: {mask_hash!r}")
+        return os.path.join(self.root, mask_hash[:2], f"{mask_hash}.png")
+
+    def has(self, mask_hash: str) -> bool:
+        return os.path.exists(self._path(mask_hash))
+
+    def get(self, mask_hash: str) -> Optional[bytes]:
+        try:
+            with open(self._path(mask_hash), "rb") as blob_file:
+                return blob_file.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, mask_hash: str, png_bytes: bytes) -> None:
+        path = self._path(mask_hash)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so a reader never sees half a blob
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as blob_file:
+                blob_file.write(png_bytes)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def create_mask_store(database, directory: Optional[str] = CONFIG.get('FOG_MASK_STORE_DIR')) -> MaskStore:
+    """Files when a directory is configured, otherwise the fog_masks collection."""
+    if directory:
+        return FilesystemMaskStore(directory)
+    return MongoMaskStore(database.fog_masks)
+
+
+def store_fog_masks(fog_config: Optional[Dict[str, Any]], store: MaskStore) -> Optional[Dict[str, Any]]:
+    """Copy of fog_config with every inline mask stored and replaced by
+    its mask_hash. Regions that already carry a hash (or a tile map of
+    hashes) must name stored blobs. Raises ValueError on a malformed mask
+    or an unknown hash."""
+    if not fog_config:
+        return fog_config
+
+    stored_regions = []
+    for region in fog_config.get("regions") or []:
+        if region.get("mask"):
+            png_bytes = decode_mask_data_url(region["mask"])
+            mask_hash = mask_content_hash(png_bytes)
+            if not store.has(mask_hash):
+                store.put(mask_hash, png_bytes)
+            region = {**region, "mask": None, "mask_hash": mask_hash}
+        elif region.get("mask_hash") is not None:
+            if not is_mask_hash(region["mask_hash"]) or not store.has(region["mask_hash"]):
+                raise ValueError(f"Unknown fog mask {region['mask_hash']!r} on region {region.get('id')}")
+        elif region.get("mask_tiles"):
+            for tile_hash in region["mask_tiles"].values():
+                if not is_mask_hash(tile_hash) or not store.has(tile_hash):
+                    raise ValueError(f"Unknown fog tile {tile_hash!r} on region {region.get('id')}")
+        stored_regions.append(region)
+    return {**fog_config, "regions": stored_regions}
+
+
+def hydrate_fog_masks(fog_config: Optional[Dict[str, Any]], store: MaskStore) -> Optional[Dict[str, Any]]:
+    """Copy of fog_config with mask_hash refs resolved back to inline data
+    URLs. A blob that can't be found leaves its region unpainted (logged)
+    rather than failing the caller — this runs at session end."""
+    if not fog_config:
+        return fog_config
+
+    hydrated_regions = []
+    for region in fog_config.get("regions") or []:
+        mask_hash = region.get("mask_hash")
+        if mask_hash is not None:
+            png_bytes = store.get(mask_hash) if is_mask_hash(mask_hash) else None
+            if png_bytes is None:
+                logger.warning(f"Fog mask {mask_hash} missing for region {region.get('id')}; dropped")
+            region = {
+                **region,
+                "mask": encode_mask_data_url(png_bytes) if png_bytes is not None else None,
+                "mask_hash": None,
+            }
+        hydrated_regions.append(region)
+    return {**fog_config, "regions": hydrated_regions}
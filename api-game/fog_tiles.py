@@ -0,0 +1,248 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Fixed-size tiles for fog-of-war masks.
+
+A region stored as one mask PNG costs the whole map's pixels on every
+save, however small the brush stroke. Tiled regions carry `mask_tiles`
+instead — "col,row" -> the content hash of that FOG_TILE_PX square —
+and a fog_tile_update sends only the tiles its strokes touched. A tile
+missing from the map is fully transparent, so revealed fog stores
+nothing at all.
+
+store_tile_patches validates a client's tile pixels and stores them;
+merge_fog_tiles folds the stored tiles into the active map's fog_config
+and returns the diff receivers apply; flatten_fog_tiles stitches tile
+maps back into one inline mask for the ETL to api-site. Tiles live in
+the same content-addressed MaskStore as whole masks (fog_masks), so the
+fog-masks route serves both.
+"""
+
+import io
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from fog_masks import (
+    MaskStore,
+    decode_mask_data_url,
+    encode_mask_data_url,
+    is_mask_hash,
+    mask_content_hash,
+)
+from shared_contracts.map import FOG_MASK_MAX_PX, FOG_TILE_PX, FogConfig
+
+logger = logging.getLogger()
+
+_TILE_KEY_PATTERN = re.compile(r"^(\d+),(\d+)$")
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Patch-only keys — the rest of a patch is the region's FogRegion fields.
+_PATCH_KEYS = ("tiles", "reset")
+
+
+def tile_key(col: int, row: int) -> str:
+    return f"{col},{row}"
+
+
+def parse_tile_key(key: str) -> Tuple[int, int]:
+    """(col, row) of a tile key. Raises ValueError if it isn't one."""
+    match = _TILE_KEY_PATTERN.match(key) if isinstance(key, str) else None
+    if match is None:
+        raise ValueError(f"Not a fog tile key: {key!r}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def tile_dimensions(mask_width: int, mask_height: int, key: str) -> Tuple[int, int]:
+    """Pixel size of one tile of a mask — FOG_TILE_PX square except along
+    the right and bottom edges. Raises ValueError for a tile outside the mask."""
+    col, row = parse_tile_key(key)
+    left, top = col * FOG_TILE_PX, row * FOG_TILE_PX
+    if left >= mask_width or top >= mask_height:
+        raise ValueError(f"Fog tile {key} is outside a {mask_width}x{mask_height} mask")
+    return min(FOG_TILE_PX, mask_width - left), min(FOG_TILE_PX, mask_height - top)
+
+
+def png_dimensions(png_bytes: bytes) -> Tuple[int, int]:
+    """(width, height) from a PNG's IHDR chunk, without decoding pixels."""
+    if len(png_bytes) < 24 or not png_bytes.startswith(_PNG_SIGNATURE) or png_bytes[12:16] != b"IHDR":
+        raise ValueError("Fog tile is not a PNG")
+    return int.from_bytes(png_bytes[16:20], "big"), int.from_bytes(png_bytes[20:24], "big")
+
+
+def _check_png_decodes(png_bytes: bytes) -> None:
+    """Decode every pixel, so a tile with a sound header but a corrupt
+    body is refused at paint time rather than at session end."""
+    try:
+        with Image.open(io.BytesIO(png_bytes)) as tile:
+            tile.load()
+    except Exception as e:
+        raise ValueError(f"Fog tile does not decode: {e}")
+
+
+def _mask_size_ok(mask_width: Any, mask_height: Any) -> bool:
+    return all(
+        isinstance(size, int) and 1 <= size <= FOG_MASK_MAX_PX
+        for size in (mask_width, mask_height)
+    )
+
+
+def store_tile_patches(patches: List[Dict[str, Any]], store: MaskStore) -> List[Dict[str, Any]]:
+    """Copy of each region patch with its inline tiles stored and replaced
+    by their hashes. A None tile (cleared to transparent) stays None.
+    Raises ValueError on a malformed patch, key or tile, a mask size over
+    FOG_MASK_MAX_PX, a tile whose
+    size doesn't match its slot in the mask, or one that won't decode."""
+    stored_patches = []
+    for patch in patches:
+        if not isinstance(patch, dict):
+            raise ValueError("Fog tile patch must be an object")
+        tiles = patch.get("tiles") or {}
+        if not isinstance(tiles, dict):
+            raise ValueError(f"Fog tiles on region {patch.get('id')} must be an object")
+
+        stored_tiles = {}
+        if tiles or patch.get("reset"):
+            mask_width, mask_height = patch.get("mask_width"), patch.get("mask_height")
+            if not isinstance(mask_width, int) or not isinstance(mask_height, int):
+                raise ValueError(f"Fog region {patch.get('id')} sent tiles without its mask size")
+            if not _mask_size_ok(mask_width, mask_height):
+                raise ValueError(
+                    f"Fog region {patch.get('id')} mask {mask_width}x{mask_height} is outside 1..{FOG_MASK_MAX_PX} px")
+            for key, tile in tiles.items():
+                expected_dimensions = tile_dimensions(mask_width, mask_height, key)
+                if tile is None:
+                    stored_tiles[key] = None
+                    continue
+                png_bytes = decode_mask_data_url(tile)
+                if png_dimensions(png_bytes) != expected_dimensions:
+                    raise ValueError(f"Fog tile {key} on region {patch.get('id')} is not {expected_dimensions}")
+                _check_png_decodes(png_bytes)
+                tile_hash = mask_content_hash(png_bytes)
+                if not store.has(tile_hash):
+                    store.put(tile_hash, png_bytes)
+                stored_tiles[key] = tile_hash
+        stored_patches.append({**patch, "tiles": stored_tiles})
+    return stored_patches
+
+
+def _base_tiles(existing: Dict[str, Any], patch: Dict[str, Any], reset: bool) -> Dict[str, str]:
+    """The tile map a patch applies on top of."""
+    if reset:
+        return {}
+    if existing.get("mask") or existing.get("mask_hash"):
+        raise ValueError(f"Fog region {patch['id']} holds a whole mask; send its tiles as a reset")
+    if existing.get("mask_tiles") is None:
+        return {}  # never painted: trivially an empty tile map
+    if (existing.get("mask_width"), existing.get("mask_height")) != (patch.get("mask_width"), patch.get("mask_height")):
+        raise ValueError(f"Fog region {patch['id']} changed size; send its tiles as a reset")
+    return existing["mask_tiles"]
+
+
+def merge_fog_tiles(fog_config: Optional[Dict[str, Any]],
+                    patches: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Fold stored region patches into a stored fog_config.
+
+    `patches` is the map's full, ordered region list: every region's
+    FogRegion fields, plus `tiles` ({key: hash | None}) and `reset` on
+    regions whose pixels changed. A region left out is removed. A reset
+    starts the region from transparent; otherwise the region must already
+    be tiled (or never painted) at the same size.
+
+    Returns (fog_config, diffs). Each diff is the region's stored form
+    minus its tile map, plus the `tiles` and `reset` it changed by — what
+    receivers already in sync need. Raises ValueError when a patch doesn't
+    fit the stored config or the result breaks the FogConfig contract.
+    """
+    existing_regions = {region.get("id"): region for region in (fog_config or {}).get("regions") or []}
+
+    merged_regions, region_changes = [], []
+    for patch in patches:
+        tiles = patch.get("tiles") or {}
+        reset = bool(patch.get("reset"))
+        existing = existing_regions.get(patch.get("id")) or {}
+        region = {key: value for key, value in patch.items() if key not in _PATCH_KEYS}
+
+        if tiles or reset:
+            mask_tiles = dict(_base_tiles(existing, patch, reset))
+            for key, tile_hash in tiles.items():
+                if tile_hash is None:
+                    mask_tiles.pop(key, None)
+                else:
+                    mask_tiles[key] = tile_hash
+            region.update(mask=None, mask_hash=None, mask_tiles=mask_tiles)
+        elif existing:
+            # Metadata-only: the pixels stay exactly as stored
+            for key in ("mask", "mask_hash", "mask_tiles", "mask_width", "mask_height"):
+                region[key] = existing.get(key)
+        else:
+            region.update(mask=None, mask_hash=None, mask_tiles=None)
+
+        merged_regions.append(region)
+        region_changes.append((tiles, reset))
+
+    merged = FogConfig.model_validate({
+        "version": (fog_config or {}).get("version", 2),
+        "regions": merged_regions,
+    }).model_dump()
+
+    diffs = [
+        {**{key: value for key, value in region.items() if key != "mask_tiles"}, "tiles": tiles, "reset": reset}
+        for region, (tiles, reset) in zip(merged["regions"], region_changes)
+    ]
+    return merged, diffs
+
+
+def compose_tiled_mask(mask_width: int, mask_height: int,
+                       mask_tiles: Dict[str, str], store: MaskStore) -> bytes:
+    """One mask PNG stitched from a tile map. A tile whose blob can't be
+    found or decoded is left transparent (logged) — this runs at session
+    end."""
+    mask = Image.new("RGBA", (mask_width, mask_height), (0, 0, 0, 0))
+    for key, tile_hash in mask_tiles.items():
+        col, row = parse_tile_key(key)
+        png_bytes = store.get(tile_hash) if is_mask_hash(tile_hash) else None
+        if png_bytes is None:
+            logger.warning(f"Fog tile {tile_hash} missing at {key}; left transparent")
+            continue
+        try:
+            with Image.open(io.BytesIO(png_bytes)) as tile:
+                mask.paste(tile.convert("RGBA"), (col * FOG_TILE_PX, row * FOG_TILE_PX))
+        except Exception as e:
+            logger.warning(f"Fog tile {tile_hash} at {key} does not decode ({e}); left transparent")
+
+    out = io.BytesIO()
+    mask.save(out, format="PNG")
+    return out.getvalue()
+
+
+def flatten_fog_tiles(fog_config: Optional[Dict[str, Any]], store: MaskStore) -> Optional[Dict[str, Any]]:
+    """Copy of fog_config with every tiled region turned back into one
+    inline mask. Regions that aren't tiled pass through untouched; a
+    tiled region that can't be composed (oversized, malformed) is dropped
+    (logged) — this runs at session end and must not fail it."""
+    if not fog_config:
+        return fog_config
+
+    flattened_regions = []
+    for region in fog_config.get("regions") or []:
+        if region.get("mask_tiles") is not None:
+            painted = bool(region["mask_tiles"]) and region.get("mask_width") and region.get("mask_height")
+            try:
+                if painted and not _mask_size_ok(region["mask_width"], region["mask_height"]):
+                    raise ValueError(f"mask {region['mask_width']}x{region['mask_height']} is oversized")
+                region = {
+                    **region,
+                    "mask": encode_mask_data_url(compose_tiled_mask(
+                        region["mask_width"], region["mask_height"], region["mask_tiles"], store,
+                    )) if painted else None,
+                    "mask_tiles": None,
+                }
+            except Exception as e:
+                logger.error(f"Fog region {region.get('id')} could not be flattened ({e}); dropped")
+                continue
+        flattened_regions.append(region)
+    return {**fog_config, "regions": flattened_regions}
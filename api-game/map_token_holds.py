@@ -1,11 +1,11 @@
 # Copyright (C) 2025 Matthew Davey
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-"""In-memory registry of actively-held (grabbed) map tokens, per room.
+"""Registry of actively-held (grabbed) map tokens, per room.
 
 This is presence state, not game state: it records whose hand is on which
-mini right now. It is never persisted, dies with the process, and can never
-become committed state without a lane-1 map_token_update the server writes.
+mini right now. It is never written to Mongo and can never become committed
+state without a lane-1 map_token_update the server writes.
 
 The hold-lock is concurrency, not ownership (product decision 11): anyone may
 move any token — just not one currently in someone else's hand. First grab
@@ -20,24 +20,92 @@ token on map B across an active-map switch.
 Staleness is lazily expired on access: a hold older than
 HOLD_STALENESS_SECONDS with no activity is treated as abandoned (browser
 gone mid-drag without a clean disconnect). A same-user re-grab — and each
-live-drag move frame — refreshes the clock.
+live-drag move frame (refresh) — resets the clock.
+
+The store also keeps the hidden-hold flags: holds on hidden tokens, whose
+drag presence must never be relayed to players (decision 17). They live
+next to the holds so every worker agrees on both.
+
+HoldStore is the interface. InMemoryHoldStore is the default (one worker,
+dies with the process). RedisHoldStore shares holds between workers and
+survives restarts: one SET NX PX key per hold, so a crashed worker's holds
+lapse by themselves, with Lua scripts for the compare-and-set paths (grab,
+refresh, release, release_all_for_user). Enabled by
+MAP_TOKEN_HOLDS_REDIS_URL.
 """
 
+import math
 import time
-from typing import Dict, List, Optional, Tuple
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Set, Tuple
+
+from config.settings import get_settings
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # optional: only needed when MAP_TOKEN_HOLDS_REDIS_URL is set
+    redis_asyncio = None
+
+CONFIG = get_settings()
 
 HOLD_STALENESS_SECONDS = 10.0
 
+HoldKey = Tuple[str, str]
+
+
+class HoldStore(ABC):
+    """Hold registry interface; every method is a coroutine so the Redis
+    backend never blocks the event loop."""
+
+    @abstractmethod
+    async def holder(self, room_id: str, asset_id: str, token_id: str) -> Optional[str]:
+        """Current holder's user_id, or None if unheld (stale holds expire here)."""
+
+    @abstractmethod
+    async def try_grab(self, room_id: str, asset_id: str, token_id: str, user_id: str) -> Optional[str]:
+        """Grab a token. Returns None on success, or the blocking holder's
+        user_id when denied. A same-user grab succeeds and refreshes the clock."""
+
+    @abstractmethod
+    async def refresh(self, room_id: str, asset_id: str, token_id: str, user_id: str) -> bool:
+        """Reset the clock on a hold user_id still has (a live move frame).
+        Returns False, and grabs nothing, if they no longer hold it."""
+
+    @abstractmethod
+    async def release(self, room_id: str, asset_id: str, token_id: str, user_id: str) -> bool:
+        """Release a token if user_id holds it. Returns whether a hold was cleared."""
+
+    @abstractmethod
+    async def release_all_for_user(self, room_id: str, user_id: str) -> List[HoldKey]:
+        """Clear every hold user_id has in a room (disconnect cleanup).
+        Returns the released (asset_id, token_id) pairs."""
+
+    @abstractmethod
+    async def set_hidden_held(self, room_id: str, asset_id: str, token_id: str, hidden: bool) -> None:
+        """Flag (or unflag) a held token as hidden from players."""
+
+    @abstractmethod
+    async def is_hidden_held(self, room_id: str, asset_id: str, token_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def clear_room(self, room_id: str) -> None:
+        """Drop all holds and hidden flags for a room (session ended or moved)."""
+
+    async def close(self) -> None:
+        pass
+
 
-class MapTokenHolds:
+class InMemoryHoldStore(HoldStore):
     def __init__(self, staleness_seconds: float = HOLD_STALENESS_SECONDS, clock=time.monotonic):
         # room_id -> {(asset_id, token_id): (holder_user_id, grabbed_at)}
-        self._holds: Dict[str, Dict[Tuple[str, str], Tuple[str, float]]] = {}
+        self._holds: Dict[str, Dict[HoldKey, Tuple[str, float]]] = {}
+        # room_id -> {(asset_id, token_id)} held while hidden
+        self._hidden: Dict[str, Set[HoldKey]] = {}
         self._staleness_seconds = staleness_seconds
         self._clock = clock
 
-    def holder(self, room_id: str, asset_id: str, token_id: str) -> Optional[str]:
-        """Current holder's user_id, or None if unheld (stale holds expire here)."""
+    async def holder(self, room_id: str, asset_id: str, token_id: str) -> Optional[str]:
         room_holds = self._holds.get(room_id)
         if not room_holds:
             return None
@@ -54,19 +122,22 @@ class MapTokenHolds:
             return None
         return holder_user_id
 
-    def try_grab(self, room_id: str, asset_id: str, token_id: str, user_id: str) -> Optional[str]:
-        """Grab a token. Returns None on success, or the blocking holder's
-        user_id when denied. A same-user grab succeeds and refreshes the clock."""
-        current_holder = self.holder(room_id, asset_id, token_id)
+    async def try_grab(self, room_id: str, asset_id: str, token_id: str, user_id: str) -> Optional[str]:
+        current_holder = await self.holder(room_id, asset_id, token_id)
         if current_holder is not None and current_holder != user_id:
             return current_holder
 
         self._holds.setdefault(room_id, {})[(asset_id, token_id)] = (user_id, self._clock())
         return None
 
-    def release(self, room_id: str, asset_id: str, token_id: str, user_id: str) -> bool:
-        """Release a token if user_id holds it. Returns whether a hold was cleared."""
-        if self.holder(room_id, asset_id, token_id) != user_id:
+    async def refresh(self, room_id: str, asset_id: str, token_id: str, user_id: str) -> bool:
+        if await self.holder(room_id, asset_id, token_id) != user_id:
+            return False
+        self._holds[room_id][(asset_id, token_id)] = (user_id, self._clock())
+        return True
+
+    async def release(self, room_id: str, asset_id: str, token_id: str, user_id: str) -> bool:
+        if await self.holder(room_id, asset_id, token_id) != user_id:
             return False
 
         del self._holds[room_id][(asset_id, token_id)]
@@ -74,9 +145,7 @@ class MapTokenHolds:
             del self._holds[room_id]
         return True
 
-    def release_all_for_user(self, room_id: str, user_id: str) -> List[Tuple[str, str]]:
-        """Clear every hold user_id has in a room (disconnect cleanup).
-        Returns the released (asset_id, token_id) pairs."""
+    async def release_all_for_user(self, room_id: str, user_id: str) -> List[HoldKey]:
         room_holds = self._holds.get(room_id)
         if not room_holds:
             return []
@@ -91,6 +160,223 @@ class MapTokenHolds:
             del self._holds[room_id]
         return released_keys
 
-    def clear_room(self, room_id: str) -> None:
-        """Drop all holds for a room (session ended)."""
+    async def set_hidden_held(self, room_id: str, asset_id: str, token_id: str, hidden: bool) -> None:
+        if hidden:
+            self._hidden.setdefault(room_id, set()).add((asset_id, token_id))
+            return
+        room_hidden = self._hidden.get(room_id)
+        if room_hidden is not None:
+            room_hidden.discard((asset_id, token_id))
+            if not room_hidden:
+                del self._hidden[room_id]
+
+    async def is_hidden_held(self, room_id: str, asset_id: str, token_id: str) -> bool:
+        return (asset_id, token_id) in self._hidden.get(room_id, ())
+
+    async def clear_room(self, room_id: str) -> None:
         self._holds.pop(room_id, None)
+        self._hidden.pop(room_id, None)
+
+
+HOLD_PREFIX = "rollplay:hold:"
+ROOM_HOLDS_PREFIX = "rollplay:holds:"
+HIDDEN_PREFIX = "rollplay:hidden-holds:"
+
+# A hold value is "<grabbed_at>|<user_id>". grabbed_at comes from the
+# store's clock and decides staleness; the key's PX expiry (the same
+# window) only garbage-collects holds nobody touches again.
+_PARSE_HOLD = """
+local function parse_hold(value)
+    local sep = string.find(value, '|', 1, true)
+    return string.sub(value, sep + 1), tonumber(string.sub(value, 1, sep - 1))
+end
+"""
+
+# KEYS: hold, room index. ARGV: user_id, now, staleness, ttl_ms, member.
+# Returns nil on success or the blocking holder.
+_GRAB_SCRIPT = _PARSE_HOLD + """
+local value = ARGV[2] .. '|' .. ARGV[1]
+if not redis.call('SET', KEYS[1], value, 'NX', 'PX', ARGV[4]) then
+    local holder, grabbed_at = parse_hold(redis.call('GET', KEYS[1]))
+    if holder ~= ARGV[1] and tonumber(ARGV[2]) - grabbed_at <= tonumber(ARGV[3]) then
+        return holder
+    end
+    redis.call('SET', KEYS[1], value, 'PX', ARGV[4])
+end
+redis.call('SADD', KEYS[2], ARGV[5])
+redis.call('PEXPIRE', KEYS[2], ARGV[4])
+return false
+"""
+
+# KEYS: hold, room index. ARGV: user_id, now, staleness, ttl_ms.
+# Returns 1 if the hold was user_id's and fresh (and is now refreshed).
+_REFRESH_SCRIPT = _PARSE_HOLD + """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+local holder, grabbed_at = parse_hold(current)
+if holder ~= ARGV[1] or tonumber(ARGV[2]) - grabbed_at > tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2] .. '|' .. ARGV[1], 'PX', ARGV[4])
+redis.call('PEXPIRE', KEYS[2], ARGV[4])
+return 1
+"""
+
+# KEYS: hold, room index. ARGV: user_id, now, staleness, member.
+# Returns 1 if user_id's fresh hold was cleared. A stale hold is cleared
+# too (as holder() would) but reports 0.
+_RELEASE_SCRIPT = _PARSE_HOLD + """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    redis.call('SREM', KEYS[2], ARGV[4])
+    return 0
+end
+local holder, grabbed_at = parse_hold(current)
+local stale = tonumber(ARGV[2]) - grabbed_at > tonumber(ARGV[3])
+if holder ~= ARGV[1] and not stale then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('SREM', KEYS[2], ARGV[4])
+if stale then
+    return 0
+end
+return 1
+"""
+
+# KEYS: room index. ARGV: user_id, now, staleness, hold key prefix.
+# Sweeps the room: drops user_id's holds (returned) and any stale or
+# already-expired ones (not returned).
+_RELEASE_ALL_SCRIPT = _PARSE_HOLD + """
+local released = {}
+for _, member in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    local key = ARGV[4] .. member
+    local current = redis.call('GET', key)
+    if not current then
+        redis.call('SREM', KEYS[1], member)
+    else
+        local holder, grabbed_at = parse_hold(current)
+        if tonumber(ARGV[2]) - grabbed_at > tonumber(ARGV[3]) then
+            redis.call('DEL', key)
+            redis.call('SREM', KEYS[1], member)
+        elseif holder == ARGV[1] then
+            redis.call('DEL', key)
+            redis.call('SREM', KEYS[1], member)
+            table.insert(released, member)
+        end
+    end
+end
+return released
+"""
+
+# KEYS: room index, hidden set. ARGV: hold key prefix.
+_CLEAR_ROOM_SCRIPT = """
+for _, member in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    redis.call('DEL', ARGV[1] .. member)
+end
+redis.call('DEL', KEYS[1], KEYS[2])
+return 0
+"""
+
+
+class RedisHoldStore(HoldStore):
+    """Holds shared by every worker through Redis.
+
+    Keys, per room: rollplay:hold:<room>:<asset>\\n<token> (one per hold,
+    SET NX PX), rollplay:holds:<room> (the set of held members, for
+    release_all_for_user and clear_room) and rollplay:hidden-holds:<room>
+    (hidden-hold flags). The clock should be wall time shared by the
+    workers; staleness is measured against it, not against the PX expiry.
+    """
+
+    def __init__(self, client, staleness_seconds: float = HOLD_STALENESS_SECONDS, clock=time.time):
+        self._redis = client
+        self._staleness_seconds = staleness_seconds
+        self._ttl_ms = math.ceil(staleness_seconds * 1000)
+        self._clock = clock
+        self._grab = client.register_script(_GRAB_SCRIPT)
+        self._refresh = client.register_script(_REFRESH_SCRIPT)
+        self._release = client.register_script(_RELEASE_SCRIPT)
+        self._release_all = client.register_script(_RELEASE_ALL_SCRIPT)
+        self._clear_room = client.register_script(_CLEAR_ROOM_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisHoldStore":
+        return cls(redis_asyncio.from_url(url, decode_responses=True))
+
+    @staticmethod
+    def _member(asset_id: str, token_id: str) -> str:
+        return f"{asset_id}\n{token_id}"
+
+    def _hold_prefix(self, room_id: str) -> str:
+        return f"{HOLD_PREFIX}{room_id}:"
+
+    def _keys(self, room_id: str, asset_id: str, token_id: str) -> List[str]:
+        member = self._member(asset_id, token_id)
+        return [f"{self._hold_prefix(room_id)}{member}", f"{ROOM_HOLDS_PREFIX}{room_id}"]
+
+    async def holder(self, room_id: str, asset_id: str, token_id: str) -> Optional[str]:
+        value = await self._redis.get(self._keys(room_id, asset_id, token_id)[0])
+        if value is None:
+            return None
+        grabbed_at, holder_user_id = value.split("|", 1)
+        if self._clock() - float(grabbed_at) > self._staleness_seconds:
+            return None
+        return holder_user_id
+
+    async def try_grab(self, room_id: str, asset_id: str, token_id: str, user_id: str) -> Optional[str]:
+        return await self._grab(
+            keys=self._keys(room_id, asset_id, token_id),
+            args=[user_id, repr(self._clock()), self._staleness_seconds, self._ttl_ms,
+                  self._member(asset_id, token_id)],
+        )
+
+    async def refresh(self, room_id: str, asset_id: str, token_id: str, user_id: str) -> bool:
+        return bool(await self._refresh(
+            keys=self._keys(room_id, asset_id, token_id),
+            args=[user_id, repr(self._clock()), self._staleness_seconds, self._ttl_ms],
+        ))
+
+    async def release(self, room_id: str, asset_id: str, token_id: str, user_id: str) -> bool:
+        return bool(await self._release(
+            keys=self._keys(room_id, asset_id, token_id),
+            args=[user_id, repr(self._clock()), self._staleness_seconds, self._member(asset_id, token_id)],
+        ))
+
+    async def release_all_for_user(self, room_id: str, user_id: str) -> List[HoldKey]:
+        released = await self._release_all(
+            keys=[f"{ROOM_HOLDS_PREFIX}{room_id}"],
+            args=[user_id, repr(self._clock()), self._staleness_seconds, self._hold_prefix(room_id)],
+        )
+        return [tuple(member.split("\n", 1)) for member in released]
+
+    async def set_hidden_held(self, room_id: str, asset_id: str, token_id: str, hidden: bool) -> None:
+        # No expiry: a flag may outlive its hold, which only ever suppresses
+        # relays for a token players cannot see. clear_room drops them.
+        if hidden:
+            await self._redis.sadd(f"{HIDDEN_PREFIX}{room_id}", self._member(asset_id, token_id))
+        else:
+            await self._redis.srem(f"{HIDDEN_PREFIX}{room_id}", self._member(asset_id, token_id))
+
+    async def is_hidden_held(self, room_id: str, asset_id: str, token_id: str) -> bool:
+        return bool(await self._redis.sismember(f"{HIDDEN_PREFIX}{room_id}", self._member(asset_id, token_id)))
+
+    async def clear_room(self, room_id: str) -> None:
+        await self._clear_room(
+            keys=[f"{ROOM_HOLDS_PREFIX}{room_id}", f"{HIDDEN_PREFIX}{room_id}"],
+            args=[self._hold_prefix(room_id)],
+        )
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_hold_store(redis_url: Optional[str] = CONFIG.get('MAP_TOKEN_HOLDS_REDIS_URL')) -> HoldStore:
+    """Redis when a URL is configured, otherwise in-memory."""
+    if not redis_url:
+        return InMemoryHoldStore()
+    if redis_asyncio is None:
+        raise RuntimeError("MAP_TOKEN_HOLDS_REDIS_URL is set but the redis package is not installed")
+    return RedisHoldStore.from_url(redis_url)
@@ -0,0 +1,228 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""In-memory spatial index of one map board's tokens.
+
+Boards are flat arrays in map_token_state[asset_id], so "which token has
+this id" and "what stands on D7" were linear scans. BoardIndex keeps, next
+to the array:
+
+  - id -> token, in board order (O(1) target lookups)
+  - the ids of hidden tokens, so the players' view (decision 17) skips
+    the filter pass entirely on a board with nothing hidden
+  - grid cell -> ids of the tokens covering it, honouring footprint 1–4
+    (odd footprints are centered on a cell, even ones on an intersection —
+    the same lattice as shared_contracts.grid_math)
+
+Cells are (col, row) lattice indices under a grid_config. The cell table
+is built lazily for the geometry a query asks about and rebuilt only when
+that geometry changes (a re-snap); committed ops keep it current. With no
+usable grid there are no cells and the spatial queries find nothing.
+
+Occupancy informs, it doesn't enforce: tokens may share cells (mounts,
+flyers, a crowd at the door). cell_occupied/collisions are there for
+callers that want to know.
+
+MapTokenIndexes holds one BoardIndex per (room_id, asset_id), stamped with
+the board revision it reflects. GameService updates it inside the room
+lock after each committed op; any other board write bumps the revision
+(re-snap), so a mismatch rebuilds it from the cached board on next use.
+"""
+
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from shared_contracts.grid_math import GEOMETRY_FIELDS, grid_usable
+
+Cell = Tuple[int, int]
+
+
+def token_cell_span(x: float, y: float, footprint: int,
+                    grid_config: Optional[Dict[str, Any]]) -> Optional[Tuple[int, int, int]]:
+    """(first_col, first_row, size) of the square of cells a token covers,
+    or None when the grid can't address it. Exact for snapped tokens; an
+    unsnapped anchor covers the cells nearest its disc."""
+    if not grid_usable(grid_config):
+        return None
+    cell_size = grid_config["grid_cell_size"]
+    footprint = footprint or 1
+    half = footprint / 2
+    first_col = math.floor((x - (grid_config.get("offset_x") or 0)) / cell_size - half + 0.5)
+    first_row = math.floor((y - (grid_config.get("offset_y") or 0)) / cell_size - half + 0.5)
+    return first_col, first_row, footprint
+
+
+def _token_cells(token: Dict[str, Any], grid_config: Optional[Dict[str, Any]]) -> List[Cell]:
+    span = token_cell_span(token.get("x"), token.get("y"), token.get("footprint", 1), grid_config)
+    if span is None:
+        return []
+    first_col, first_row, size = span
+    return [(first_col + col, first_row + row) for col in range(size) for row in range(size)]
+
+
+def _geometry(grid_config: Optional[Dict[str, Any]]) -> Optional[Tuple[Any, ...]]:
+    if not grid_usable(grid_config):
+        return None
+    return tuple(grid_config.get(field_name) for field_name in GEOMETRY_FIELDS)
+
+
+class BoardIndex:
+    """One board's tokens by id and by grid cell. Not thread-safe on its
+    own — MapTokenIndexes callers hold the room lock."""
+
+    def __init__(self, tokens: Iterable[Dict[str, Any]] = (), revision: int = 0):
+        self.revision = revision
+        self._tokens: Dict[str, Dict[str, Any]] = {}
+        # token_id -> insertion number, to hand query results back in board order
+        self._positions: Dict[str, int] = {}
+        self._next_position = 0
+        self._hidden: Set[str] = set()
+        self._grid_config: Optional[Dict[str, Any]] = None
+        self._geometry: Optional[Tuple[Any, ...]] = None
+        self._cells: Dict[Cell, Set[str]] = {}
+        self._token_cells: Dict[str, List[Cell]] = {}
+        for token in tokens:
+            self.put(token)
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def get(self, token_id: str) -> Optional[Dict[str, Any]]:
+        return self._tokens.get(token_id)
+
+    def tokens(self) -> List[Dict[str, Any]]:
+        """The board, in board order."""
+        return list(self._tokens.values())
+
+    def visible_tokens(self) -> List[Dict[str, Any]]:
+        """The players' view of the board: hidden tokens left out."""
+        if not self._hidden:
+            return self.tokens()
+        return [token for token_id, token in self._tokens.items() if token_id not in self._hidden]
+
+    def put(self, token: Dict[str, Any]) -> None:
+        """Add a placed token, or replace a moved/configured one in place
+        (board order is kept, as the array's positional $set keeps it)."""
+        token_id = token.get("id")
+        self._unindex(token_id)
+        if token_id not in self._positions:
+            self._positions[token_id] = self._next_position
+            self._next_position += 1
+        self._tokens[token_id] = token
+        if token.get("hidden"):
+            self._hidden.add(token_id)
+        else:
+            self._hidden.discard(token_id)
+        if self._geometry is not None:
+            self._index(token)
+
+    def remove(self, token_id: str) -> None:
+        self._unindex(token_id)
+        self._tokens.pop(token_id, None)
+        self._positions.pop(token_id, None)
+        self._hidden.discard(token_id)
+
+    # Spatial queries. grid_config is the board's current grid.
+
+    def occupants(self, col: int, row: int, grid_config: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Tokens covering one cell."""
+        self._ensure_cells(grid_config)
+        return self._in_board_order(self._cells.get((col, row), ()))
+
+    def cell_occupied(self, col: int, row: int, grid_config: Optional[Dict[str, Any]],
+                      exclude_id: Optional[str] = None) -> bool:
+        self._ensure_cells(grid_config)
+        occupant_ids = self._cells.get((col, row))
+        if not occupant_ids:
+            return False
+        return exclude_id is None or len(occupant_ids - {exclude_id}) > 0
+
+    def tokens_in_rect(self, first_col: int, first_row: int, last_col: int, last_row: int,
+                       grid_config: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Tokens touching any cell of an inclusive cell rectangle, in
+        board order."""
+        self._ensure_cells(grid_config)
+        found: Set[str] = set()
+        rect_cells = (last_col - first_col + 1) * (last_row - first_row + 1)
+        if rect_cells <= len(self._cells):
+            for col in range(first_col, last_col + 1):
+                for row in range(first_row, last_row + 1):
+                    found.update(self._cells.get((col, row), ()))
+        else:
+            # A rect bigger than the occupied area: walk the occupied cells
+            for (col, row), occupant_ids in self._cells.items():
+                if first_col <= col <= last_col and first_row <= row <= last_row:
+                    found.update(occupant_ids)
+        return self._in_board_order(found)
+
+    def collisions(self, x: float, y: float, footprint: int, grid_config: Optional[Dict[str, Any]],
+                   exclude_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Tokens already covering any cell a token anchored at (x, y) with
+        this footprint would cover (exclude_id: the token being moved)."""
+        self._ensure_cells(grid_config)
+        found: Set[str] = set()
+        for cell in _token_cells({"x": x, "y": y, "footprint": footprint}, grid_config):
+            found.update(self._cells.get(cell, ()))
+        found.discard(exclude_id)
+        return self._in_board_order(found)
+
+    def _in_board_order(self, token_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        return [self._tokens[token_id] for token_id in sorted(token_ids, key=self._positions.__getitem__)]
+
+    def _ensure_cells(self, grid_config: Optional[Dict[str, Any]]) -> None:
+        geometry = _geometry(grid_config)
+        if geometry == self._geometry:
+            return
+        self._grid_config = dict(grid_config) if geometry is not None else None
+        self._geometry = geometry
+        self._cells = {}
+        self._token_cells = {}
+        if geometry is not None:
+            for token in self._tokens.values():
+                self._index(token)
+
+    def _index(self, token: Dict[str, Any]) -> None:
+        token_id = token.get("id")
+        cells = _token_cells(token, self._grid_config)
+        self._token_cells[token_id] = cells
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(token_id)
+
+    def _unindex(self, token_id: str) -> None:
+        for cell in self._token_cells.pop(token_id, ()):
+            occupant_ids = self._cells.get(cell)
+            if occupant_ids is not None:
+                occupant_ids.discard(token_id)
+                if not occupant_ids:
+                    del self._cells[cell]
+
+
+class MapTokenIndexes:
+    """(room_id, asset_id) -> BoardIndex at a known board revision."""
+
+    def __init__(self):
+        self._indexes: Dict[Tuple[str, str], BoardIndex] = {}
+        self._lock = threading.Lock()
+
+    def get(self, room_id: str, asset_id: str, revision: int) -> Optional[BoardIndex]:
+        """The board's index, if there is one built at this revision."""
+        with self._lock:
+            index = self._indexes.get((str(room_id), asset_id))
+        if index is None or index.revision != revision:
+            return None
+        return index
+
+    def build(self, room_id: str, asset_id: str, board: List[Dict[str, Any]], revision: int) -> BoardIndex:
+        index = BoardIndex(board, revision)
+        with self._lock:
+            self._indexes[(str(room_id), asset_id)] = index
+        return index
+
+    def drop_room(self, room_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._indexes if key[0] == str(room_id)]:
+                del self._indexes[key]
+
+
+map_token_indexes = MapTokenIndexes()
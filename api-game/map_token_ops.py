@@ -13,6 +13,26 @@ from typing import Any, Dict, Optional, Tuple
 
 VALID_MAP_TOKEN_OPS = ("place", "move", "remove", "configure")
 
+# Why a committed op didn't apply — the conflict_reason of the sender's
+# op "conflict" board reply, so a client rolls back on a known cause
+CONFLICT_DUPLICATE_TOKEN = "duplicate_token"  # place: id already on the board
+CONFLICT_TOKEN_NOT_FOUND = "token_not_found"  # move/configure: target not on the board
+CONFLICT_REVISION_MISMATCH = "revision_mismatch"  # board moved past expected_revision
+CONFLICT_VERSION_MISMATCH = "version_mismatch"  # target changed since expected_version
+CONFLICT_STALE_BOARD = "stale_board"  # the server's board was out of date; resync
+
+
+class MapTokenConflict(ValueError):
+    """A committed op that can't apply to the board as it stands. `reason`
+    is one of the CONFLICT_* codes; `board` is the board the op was
+    checked against ({tokens, revision, player_revision}), or None when
+    the server's own copy turned out stale."""
+
+    def __init__(self, reason: str, message: str, board: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.reason = reason
+        self.board = board
+
 
 def is_valid_asset_key(asset_id: Any) -> bool:
     """Hard-block invariant: asset_id becomes a Mongo field name under
@@ -57,19 +77,143 @@ def map_token_array_path(asset_id: str) -> str:
     return f"map_token_state.{asset_id}"
 
 
+def map_token_revision_path(asset_id: str) -> str:
+    """Dotted Mongo path of one board's revision counter (every committed
+    op and every re-snap bumps it)."""
+    return f"map_token_revisions.{asset_id}"
+
+
+def map_token_player_revision_path(asset_id: str) -> str:
+    """Dotted Mongo path of one board's player-view revision. Bumped only
+    when the player's (hidden-filtered) view of the board changes — a
+    single shared counter would show players a gap for every hidden-token
+    op and leak that the DM moved something (decision 17)."""
+    return f"map_token_player_revisions.{asset_id}"
+
+
+def player_view_changed(op: str, pre_op_token: Optional[Dict[str, Any]],
+                        token_payload: Optional[Dict[str, Any]]) -> bool:
+    """Whether a committed op changes what players can see of the board.
+
+    Hidden-only ops (moving/removing/configuring a token that stays hidden,
+    placing a hidden token) send players nothing at all — not even the
+    log line or an empty fragment, which would leak that something
+    happened (decision 17)."""
+    was_hidden = bool((pre_op_token or {}).get("hidden"))
+    if op == "place":
+        return not (token_payload or {}).get("hidden")
+    if op == "configure":
+        now_hidden = bool((token_payload or {}).get("hidden"))
+        return not was_hidden or not now_hidden
+    return not was_hidden
+
+
+def with_revision_bump(update_doc: Dict[str, Any], asset_id: str,
+                       player_visible: bool) -> Dict[str, Any]:
+    """update_doc plus the $inc of the board's revision counters, so the
+    op and its revision commit in the same atomic update_one."""
+    increments = {map_token_revision_path(asset_id): 1}
+    if player_visible:
+        increments[map_token_player_revision_path(asset_id)] = 1
+    return {**update_doc, "$inc": increments}
+
+
+def check_map_token_op(op: str, pre_op_token: Optional[Dict[str, Any]], view_revision: int,
+                       expected_revision: Optional[int] = None,
+                       expected_version: Optional[str] = None) -> Optional[str]:
+    """The CONFLICT_* reason an op would hit on the board, or None.
+
+    pre_op_token is the board's copy of the target (None when absent) and
+    view_revision the revision of the sender's view of the board — the
+    one expected_revision was read from. expected_version is the target's
+    updated_at as the sender last saw it: every committed op re-stamps it,
+    so it versions the token. Both conditions are optional; without them
+    ops keep their default semantics (same-token last-write-wins,
+    idempotent remove)."""
+    if expected_revision is not None and expected_revision != view_revision:
+        return CONFLICT_REVISION_MISMATCH
+    if op == "place":
+        return CONFLICT_DUPLICATE_TOKEN if pre_op_token is not None else None
+    if op in ("move", "configure") and pre_op_token is None:
+        return CONFLICT_TOKEN_NOT_FOUND
+    if expected_version is not None and (pre_op_token or {}).get("updated_at") != expected_version:
+        return CONFLICT_VERSION_MISMATCH
+    return None
+
+
+def map_token_conflict_message(reason: str, asset_id: str, token_id: str) -> str:
+    """Human-readable text for a CONFLICT_* reason (logs, error replies)."""
+    messages = {
+        CONFLICT_DUPLICATE_TOKEN: f"Token {token_id} already exists on map {asset_id}",
+        CONFLICT_TOKEN_NOT_FOUND: f"Token {token_id} not found on map {asset_id}",
+        CONFLICT_REVISION_MISMATCH: f"Map {asset_id} changed since the expected revision",
+        CONFLICT_VERSION_MISMATCH: f"Token {token_id} changed since the expected version",
+        CONFLICT_STALE_BOARD: f"Map {asset_id} was out of date on the server; resync",
+    }
+    return messages[reason]
+
+
+def apply_map_token_op_to_board(
+    tokens: list,
+    op: str,
+    token: Optional[Dict[str, Any]] = None,
+    token_id: Optional[str] = None,
+    updated_at: str = "",
+) -> list:
+    """The board build_map_token_update's update produces, computed locally
+    from the pre-op board — same per-op semantics, no Mongo re-read. The
+    input list is not mutated."""
+    if op == "place":
+        return [*tokens, {**token, "updated_at": updated_at}]
+
+    if op == "remove":
+        return [board_token for board_token in tokens if board_token.get("id") != token_id]
+
+    if op not in ("move", "configure"):
+        raise ValueError(f"Unknown map token op: {op}")
+
+    new_tokens = []
+    for board_token in tokens:
+        if board_token.get("id") != token_id:
+            new_tokens.append(board_token)
+            continue
+        new_tokens.append(apply_map_token_op_to_token(board_token, op, token, updated_at))
+    return new_tokens
+
+
+def apply_map_token_op_to_token(board_token: Dict[str, Any], op: str,
+                                token: Dict[str, Any], updated_at: str = "") -> Dict[str, Any]:
+    """The post-op copy of one board token for a move/configure op (the
+    element build_map_token_update's positional $set produces)."""
+    changed_token = {**board_token, "updated_at": updated_at}
+    if op == "move":
+        changed_token["x"] = token["x"]
+        changed_token["y"] = token["y"]
+    else:
+        for field_name in CONFIGURABLE_TOKEN_FIELDS:
+            if token.get(field_name) is not None:
+                changed_token[field_name] = token[field_name]
+        if "owner_user_id" in token:
+            changed_token["owner_user_id"] = token["owner_user_id"]
+    return changed_token
+
+
 def build_map_token_update(
     asset_id: str,
     op: str,
     token: Optional[Dict[str, Any]] = None,
     token_id: Optional[str] = None,
     updated_at: str = "",
+    expected_version: Optional[str] = None,
 ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """Build (extra_filter, update_doc) for one committed token op.
 
     extra_filter merges into the room filter so every op is a single atomic
     update_one — per-op array surgery, never whole-array replace from the
     client. Two players committing different tokens simultaneously can't
-    clobber each other; same-token races are last-write-wins.
+    clobber each other; same-token races are last-write-wins unless the op
+    carries expected_version, which narrows the target match to the
+    token at that updated_at (see check_map_token_op).
 
     Per op:
       place     — $push, filtered on the id NOT already present (atomic
@@ -86,8 +230,15 @@ def build_map_token_update(
         update_doc = {"$push": {array_path: placed_token}}
         return extra_filter, update_doc
 
+    # The target as the positional $ binds it: by id, or by id at the
+    # version the sender expects
+    if expected_version is not None:
+        target_filter = {array_path: {"$elemMatch": {"id": token_id, "updated_at": expected_version}}}
+    else:
+        target_filter = {f"{array_path}.id": token_id}
+
     if op == "move":
-        extra_filter = {f"{array_path}.id": token_id}
+        extra_filter = target_filter
         update_doc = {
             "$set": {
                 f"{array_path}.$.x": token["x"],
@@ -98,7 +249,8 @@ def build_map_token_update(
         return extra_filter, update_doc
 
     if op == "remove":
-        return {}, {"$pull": {array_path: {"id": token_id}}}
+        extra_filter = target_filter if expected_version is not None else {}
+        return extra_filter, {"$pull": {array_path: {"id": token_id}}}
 
     if op == "configure":
         set_fields = {f"{array_path}.$.updated_at": updated_at}
@@ -111,7 +263,7 @@ def build_map_token_update(
         # denies owner changes on pc targets (ownership is identity there).
         if "owner_user_id" in token:
             set_fields[f"{array_path}.$.owner_user_id"] = token["owner_user_id"]
-        return {f"{array_path}.id": token_id}, {"$set": set_fields}
+        return target_filter, {"$set": set_fields}
 
     raise ValueError(f"Unknown map token op: {op}")
 
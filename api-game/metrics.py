@@ -0,0 +1,104 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Minimal in-process metrics: gauges, counters and fixed-bucket histograms.
+
+api-game has no metrics backend, so these live in memory and are exposed as
+JSON by GET /metrics. They are labelled by name only (room ids go in the
+name's label dict, not a separate series store) and are cheap enough to
+update on every WebSocket event.
+
+Not thread-safe by design: every update happens on the event loop.
+"""
+
+import bisect
+from typing import Dict, Iterable, Optional, Tuple
+
+# Seconds. Tuned for the event loop's scale: sub-millisecond dispatch up to
+# multi-second Mongo stalls.
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+class Histogram:
+    """Cumulative-style histogram: observe() drops a value into the first
+    bucket whose upper bound it doesn't exceed (+Inf catches the rest)."""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (None when
+        empty; the observed max when it falls in the +Inf bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6),
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                **{str(bound): bucket_count for bound, bucket_count in zip(self.buckets, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+class Metrics:
+    """Named metric registry. Metrics are created on first use."""
+
+    def __init__(self):
+        self.gauges: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = value
+
+    def remove_gauge(self, name: str) -> None:
+        self.gauges.pop(name, None)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float, buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(buckets)
+        histogram.observe(value)
+
+    def remove_histogram(self, name: str) -> None:
+        self.histograms.pop(name, None)
+
+    def snapshot(self) -> dict:
+        return {
+            "gauges": dict(self.gauges),
+            "counters": dict(self.counters),
+            "histograms": {name: histogram.snapshot() for name, histogram in self.histograms.items()},
+        }
+
+
+# Create metrics instance to be imported by other modules
+metrics = Metrics()
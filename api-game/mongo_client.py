@@ -0,0 +1,83 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""One process-wide, pooled MongoDB client shared by every api-game service.
+
+GameService, AdventureLogService, MapService and ImageService used to build
+their own MongoClient — GameService once per *call* — so a single committed
+token op could pay several TCP + SCRAM handshakes before touching a document.
+Every service now borrows its collections from this module instead, and all
+round-trips check a socket out of the same pool.
+
+MongoClient is thread-safe and lazy: constructing it opens no sockets, the
+pool fills on first use up to MONGO_MAX_POOL_SIZE. Pool sizing and timeouts
+come from Settings (MONGO_* env vars).
+
+Lifecycle is owned by the FastAPI lifespan in app.py: connect() at startup
+(warm the pool, surface a bad host early), close() at shutdown.
+"""
+
+import logging
+from typing import Optional
+
+from pymongo import MongoClient
+from pymongo.database import Database
+
+from config.settings import get_settings
+
+logger = logging.getLogger()
+CONFIG = get_settings()
+
+DATABASE_NAME = "rollplay"
+
+_client: Optional[MongoClient] = None
+
+
+def get_client() -> MongoClient:
+    """The shared client, created on first use."""
+    global _client
+    if _client is None:
+        username = CONFIG.get('MONGO_USER')
+        password = CONFIG.get('MONGO_PASS')
+        host = CONFIG.get('MONGO_HOST')
+        _client = MongoClient(
+            f'mongodb://{username}:{password}@{host}',
+            maxPoolSize=CONFIG.get('MONGO_MAX_POOL_SIZE'),
+            minPoolSize=CONFIG.get('MONGO_MIN_POOL_SIZE'),
+            maxIdleTimeMS=CONFIG.get('MONGO_MAX_IDLE_TIME_MS'),
+            serverSelectionTimeoutMS=CONFIG.get('MONGO_SERVER_SELECTION_TIMEOUT_MS'),
+            connectTimeoutMS=CONFIG.get('MONGO_CONNECT_TIMEOUT_MS'),
+        )
+    return _client
+
+
+def get_database() -> Database:
+    """The rollplay database on the shared client."""
+    return get_client()[DATABASE_NAME]
+
+
+def connect() -> bool:
+    """Lifespan startup hook: open the pool and ping the server.
+
+    A failed ping is logged, not raised — services degrade exactly as they
+    did when each one connected on its own, and the pool keeps retrying
+    server selection on the next operation."""
+    try:
+        get_client().admin.command("ping")
+        logger.info(
+            f"Connected successfully to MongoDB (pool max={CONFIG.get('MONGO_MAX_POOL_SIZE')}, "
+            f"min={CONFIG.get('MONGO_MIN_POOL_SIZE')})"
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Could not connect to MongoDB: {e}")
+        return False
+
+
+def close() -> None:
+    """Lifespan shutdown hook: drain the pool."""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+        logger.info("Closed MongoDB client")
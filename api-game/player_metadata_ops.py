@@ -0,0 +1,143 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Pure builders for player-scoped room updates.
+
+Player metadata and the seat layout used to be written whole: a
+character sync re-$set every player's entry, a seat change re-$set the
+full layout after validating a cached read. Each write grew with the
+party, and a concurrent write landing between the read and the $set was
+silently lost.
+
+These builders target only the paths an op changes
+(`player_metadata.<user_id>.<field>`, `seat_layout.<index>`) and return
+the extra filter that makes the write conditional on what the op was
+validated against — the same (extra_filter, update_doc) shape as
+map_token_ops. GameService runs them; a write whose filter no longer
+matches is a conflict, never a lost update.
+
+Kept free of database imports so the builders unit-test directly.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+EMPTY_SEAT = "empty"
+
+
+def is_valid_metadata_key(key: Any) -> bool:
+    """user_ids and field names become Mongo path segments here: a dot, a
+    leading '$' or a NUL byte would silently address the wrong field."""
+    if not key or not isinstance(key, str):
+        return False
+    return "." not in key and "\x00" not in key and not key.startswith("$")
+
+
+def player_metadata_path(user_id: str, field: str = None) -> str:
+    """Dotted path to a player's metadata entry, or one field of it.
+    Raises ValueError for a key that can't be a path segment."""
+    if not is_valid_metadata_key(user_id):
+        raise ValueError(f"Invalid user_id for player metadata: {user_id!r}")
+    if field is None:
+        return f"player_metadata.{user_id}"
+    if not is_valid_metadata_key(field):
+        raise ValueError(f"Invalid player metadata field: {field!r}")
+    return f"player_metadata.{user_id}.{field}"
+
+
+def build_player_character_update(character_data: Dict[str, Any]) -> Dict[str, Any]:
+    """$set of each provided (non-None) field on the player's entry.
+
+    Merging field by field means a player-only sync (user joins campaign)
+    never wipes character fields and a character sync never wipes player
+    fields — and there is nothing to read first, so nothing to race.
+    Raises ValueError without a user_id."""
+    user_id = character_data.get("user_id")
+    if not user_id:
+        raise ValueError("user_id is required")
+    set_fields = {
+        player_metadata_path(user_id, field): value
+        for field, value in character_data.items()
+        if value is not None
+    }
+    set_fields[player_metadata_path(user_id, "user_id")] = user_id
+    return {"$set": set_fields}
+
+
+def build_player_role_update(user_id: str, new_role: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """$set of the player's campaign_role. Promoting to mod is conditional
+    on the player not being seated — moderators can't hold party seats,
+    and the seat check the caller made may be stale by now."""
+    extra_filter = {"seat_layout": {"$ne": user_id}} if new_role == "mod" else {}
+    return extra_filter, {"$set": {player_metadata_path(user_id, "campaign_role"): new_role}}
+
+
+def seated_users(seat_layout: List[str]) -> List[str]:
+    return [seat for seat in seat_layout if seat != EMPTY_SEAT]
+
+
+def validate_seat_layout(seat_layout: List[str], dm_user_id: str,
+                         player_metadata: Dict[str, Any]) -> None:
+    """Raises (ValueError for rule breaks) when a layout isn't seatable:
+    duplicate users, the DM, moderators, or users without a character."""
+    seated_user_ids = seated_users(seat_layout)
+    if len(seated_user_ids) != len(set(seated_user_ids)):
+        duplicates = [uid for uid in set(seated_user_ids) if seated_user_ids.count(uid) > 1]
+        raise Exception(f"User '{duplicates[0]}' already occupies another seat")
+
+    if dm_user_id and dm_user_id in seat_layout:
+        raise Exception("Dungeon Master cannot sit in party seats")
+
+    if not isinstance(player_metadata, dict):
+        player_metadata = {}
+    if any(player_metadata.get(uid, {}).get("campaign_role") == "mod" for uid in seated_user_ids):
+        raise ValueError("Moderators cannot sit in party seats")
+
+    # Any seated user must have a selected character in hot-state metadata.
+    if any(not player_metadata.get(uid, {}).get("character_id") for uid in seated_user_ids):
+        raise ValueError("Only adventurers with selected characters can sit in party seats")
+
+
+def build_seat_layout_update(current_layout: List[str],
+                             seat_layout: List[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Conditional update taking the room from current_layout (what the
+    new layout was validated against) to seat_layout.
+
+    Only the seats that change are written, each guarded on still holding
+    what it held — so two players taking two different empty seats both
+    land, but two taking the same seat can't. Users who newly sit are
+    guarded on not having sat elsewhere meanwhile, and on still being
+    seatable (has a character, isn't the DM or a moderator) at write time.
+    A user moving seat, or a layout changing length, needs the whole
+    layout to be exactly as read.
+
+    Returns ({}, {}) when nothing changes.
+    """
+    extra_filter: Dict[str, Any] = {}
+    set_fields: Dict[str, Any] = {}
+
+    if len(current_layout) != len(seat_layout):
+        extra_filter["seat_layout"] = list(current_layout)
+        set_fields["seat_layout"] = list(seat_layout)
+        newly_seated = [uid for uid in seated_users(seat_layout) if uid not in current_layout]
+    else:
+        changed = [index for index, seat in enumerate(seat_layout) if current_layout[index] != seat]
+        for index in changed:
+            extra_filter[f"seat_layout.{index}"] = current_layout[index]
+            set_fields[f"seat_layout.{index}"] = seat_layout[index]
+
+        newly_seated = [seat_layout[index] for index in changed if seat_layout[index] != EMPTY_SEAT]
+        if any(uid in current_layout for uid in newly_seated):
+            # A move: the user must still be exactly where they were read
+            extra_filter = {"seat_layout": list(current_layout)}
+        elif newly_seated:
+            extra_filter["seat_layout"] = {"$nin": newly_seated}
+
+    for uid in newly_seated:
+        extra_filter[player_metadata_path(uid, "character_id")] = {"$nin": [None, ""]}
+        extra_filter[player_metadata_path(uid, "campaign_role")] = {"$ne": "mod"}
+    if newly_seated:
+        extra_filter["dungeon_master.user_id"] = {"$nin": newly_seated}
+
+    if not set_fields:
+        return {}, {}
+    return extra_filter, {"$set": set_fields}
@@ -0,0 +1,167 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""How a room's hot state is split across collections.
+
+A room used to be one active_sessions document holding everything: seats
+and player metadata, every channel's audio state, the Spotify anchor,
+every map's token board and the session's signed media URLs. Each cold
+load pulled all of it, and the boards alone grow with every map a
+campaign uses, toward the 16 MB document limit.
+
+The stored form is now split by purpose:
+
+  active_sessions   core — seats, players, DM, display, settings
+  room_audio        audio_state, audio_track_config, spotify (_id = room id)
+  room_media        token_images, urls_expire_at, available_assets (_id = room id)
+  map_token_boards  one doc per map board: tokens, revision, player_revision
+                    (_id = "<room id>:<asset id>")
+
+GameService still presents the one logical room document it always did —
+handlers, selectors and update documents keep the logical field paths —
+and this module maps between the two: route_update/route_filter send each
+logical path to the partition that stores it, split_room/board_fields go
+the other way. Kept free of database imports so the mapping unit-tests
+directly.
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+AUDIO_COLLECTION = "room_audio"
+MEDIA_COLLECTION = "room_media"
+BOARD_COLLECTION = "map_token_boards"
+
+CORE_PART = "core"
+AUDIO_PART = "audio"
+MEDIA_PART = "media"
+BOARDS_PART = "boards"  # every board of the room
+BOARD_PART_PREFIX = "board:"  # + asset_id: one board
+
+# Logical top-level fields stored in each room-keyed partition, with the
+# value a fresh room starts from.
+PARTITION_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    AUDIO_PART: {"audio_state": {}, "audio_track_config": {}, "spotify": {}},
+    MEDIA_PART: {"token_images": {}, "urls_expire_at": "", "available_assets": []},
+}
+PARTITION_COLLECTIONS = {AUDIO_PART: AUDIO_COLLECTION, MEDIA_PART: MEDIA_COLLECTION}
+
+# Logical per-asset maps on the room -> field on that asset's board doc
+BOARD_FIELDS = {
+    "map_token_state": "tokens",
+    "map_token_revisions": "revision",
+    "map_token_player_revisions": "player_revision",
+}
+BOARD_DEFAULTS = {"tokens": [], "revision": 0, "player_revision": 0}
+
+_FIELD_PARTS = {
+    field: part for part, defaults in PARTITION_DEFAULTS.items() for field in defaults
+}
+
+# Logical top-level fields that no longer live on the core doc
+PARTITIONED_FIELDS = (*_FIELD_PARTS, *BOARD_FIELDS)
+
+# A routing target: a partition name, or (BOARDS_PART, asset_id)
+Target = Union[str, Tuple[str, str]]
+
+
+def board_part(asset_id: str) -> str:
+    """Cache part name for one board."""
+    return f"{BOARD_PART_PREFIX}{asset_id}"
+
+
+def board_doc_id(room_id: str, asset_id: str) -> str:
+    return f"{room_id}:{asset_id}"
+
+
+def part_of_target(target: Target) -> str:
+    return board_part(target[1]) if isinstance(target, tuple) else target
+
+
+def route_path(path: str) -> Tuple[Target, str]:
+    """(target, path within the target's doc) for a logical dotted path.
+    Raises ValueError for a path naming every board at once — boards are
+    only ever written one map at a time."""
+    head, _, rest = path.partition(".")
+    if head in BOARD_FIELDS:
+        asset_id, _, inner = rest.partition(".")
+        if not asset_id:
+            raise ValueError(f"{path} spans every board; write one board at a time")
+        board_field = BOARD_FIELDS[head]
+        return (BOARDS_PART, asset_id), f"{board_field}.{inner}" if inner else board_field
+    return _FIELD_PARTS.get(head, CORE_PART), path
+
+
+def group_update(update_doc: Dict[str, Any]) -> Dict[Target, Dict[str, Any]]:
+    """Split a logical update document into one logical update per target
+    (paths unchanged — what the room cache mirrors)."""
+    grouped: Dict[Target, Dict[str, Any]] = {}
+    for operator, fields in update_doc.items():
+        for path, value in fields.items():
+            target, _target_path = route_path(path)
+            grouped.setdefault(target, {}).setdefault(operator, {})[path] = value
+    return grouped
+
+
+def stored_update(update_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """A single-target logical update with its paths rewritten for the
+    target's stored doc."""
+    return {
+        operator: {route_path(path)[1]: value for path, value in fields.items()}
+        for operator, fields in update_doc.items()
+    }
+
+
+def route_update(update_doc: Dict[str, Any]) -> Dict[Target, Dict[str, Any]]:
+    """Split a logical update document into one stored update per target."""
+    return {target: stored_update(logical) for target, logical in group_update(update_doc).items()}
+
+
+def route_filter(extra_filter: Dict[str, Any]) -> Dict[Target, Dict[str, Any]]:
+    """Split logical filter conditions (dotted path -> condition) per target."""
+    routed: Dict[Target, Dict[str, Any]] = {}
+    for path, condition in extra_filter.items():
+        target, target_path = route_path(path)
+        routed.setdefault(target, {})[target_path] = condition
+    return routed
+
+
+def split_room(room: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """(core, {part: partition fields}, {asset_id: board fields}) of a
+    logical room doc. Fields a legacy doc lacks take their defaults."""
+    core = {field: value for field, value in room.items() if field not in PARTITIONED_FIELDS}
+    partitions = {
+        part: {field: room.get(field, default) for field, default in defaults.items()}
+        for part, defaults in PARTITION_DEFAULTS.items()
+    }
+    boards: Dict[str, Dict[str, Any]] = {}
+    for logical_field, board_field in BOARD_FIELDS.items():
+        for asset_id, value in (room.get(logical_field) or {}).items():
+            boards.setdefault(asset_id, dict(BOARD_DEFAULTS))[board_field] = value
+    return core, partitions, boards
+
+
+def legacy_fields(core: Dict[str, Any]) -> List[str]:
+    """Partitioned fields still sitting on a core doc (not yet migrated)."""
+    return [field for field in core if field in PARTITIONED_FIELDS]
+
+
+def partition_fields(part: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """The logical fields a stored partition doc holds (defaults filled)."""
+    return {field: (doc or {}).get(field, default) for field, default in PARTITION_DEFAULTS[part].items()}
+
+
+def board_fields(asset_id: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """A stored board doc as logical dotted paths, ready to $set on the room."""
+    return {
+        f"{logical_field}.{asset_id}": (doc or {}).get(board_field, BOARD_DEFAULTS[board_field])
+        for logical_field, board_field in BOARD_FIELDS.items()
+    }
+
+
+def all_board_fields(docs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Every board of a room as the logical per-asset maps."""
+    logical = {logical_field: {} for logical_field in BOARD_FIELDS}
+    for doc in docs:
+        for logical_field, board_field in BOARD_FIELDS.items():
+            logical[logical_field][doc["asset_id"]] = doc.get(board_field, BOARD_DEFAULTS[board_field])
+    return logical
@@ -0,0 +1,247 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Write-through, per-room cache of active_sessions documents.
+
+Identity and role lookups (is_dm, is_moderator, _display_name, lobby names,
+player_has_selected_character) used to pull the whole session doc from
+Mongo, often several times for one event. Only GameService writes
+active_sessions, and with room affinity (websocket_handlers/room_affinity.py)
+each room is pinned to one owner worker, so the owner can hold the doc in
+memory and keep it exact. That holds only while the room stays pinned to
+this worker. Writes that other workers make (HTTP endpoints aren't routed
+by room) arrive here as room-change invalidations (publish_room_change),
+and a handoff drops the entry. With affinity off, api-game must run a
+single worker. The cache works like this:
+
+  - cold load: the first read of a room fetches the doc and caches it
+  - write-through: every GameService mutator applies the same $set/$unset/$inc
+    it sent to Mongo to the cached doc, after Mongo acknowledged it, while
+    holding the room's lock (so cache order == Mongo order)
+  - invalidation: delete_room / session end / a lost write race / a
+    handoff / another worker's room change drop the entry; the room's
+    lock outlives it, and only delete_room forgets the lock, once nobody
+    holds it
+
+Mongo then only serves writes and cold loads. Anything a mutator can't
+express as $set/$unset/$inc (token array ops) writes the resulting value back
+with put_path().
+
+Reads return deep copies so callers can mutate what they get (several
+handlers do) without corrupting the shared doc.
+
+The logical doc is stored in parts (room_partitions), and the cache
+loads them lazily: a cold read of the seats fetches only the core doc, a
+token op adds just its board. Each entry tracks which parts it holds. A
+write to a part that isn't loaded yet still mirrors here; the part's
+later load replaces it with what Mongo holds, which includes that write.
+"""
+
+import copy
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from room_partitions import BOARD_PART_PREFIX, BOARDS_PART
+
+# Parts marker for a doc cached whole (created here, or a full get_room)
+ALL_PARTS = "*"
+
+
+class RoomLock:
+    """A room's RLock, plus a count of the callers that have it in hand —
+    handed out by room_lock() and not yet released — so the cache can
+    tell when forgetting it can't split the room across two locks.
+    Use it as `with room_state_cache.room_lock(room_id):`."""
+
+    def __init__(self, registry_lock: threading.Lock):
+        self._lock = threading.RLock()
+        self._registry_lock = registry_lock
+        self.users = 0
+
+    def __enter__(self) -> "RoomLock":
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._lock.release()
+        with self._registry_lock:
+            self.users -= 1
+
+
+class RoomStateCache:
+    """Process-local room doc cache. Thread-safe: db_executor runs
+    GameService on a pool, so reads and write-throughs arrive from
+    several threads at once."""
+
+    def __init__(self):
+        self._rooms: Dict[str, Dict[str, Any]] = {}
+        self._parts: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._room_locks: Dict[str, RoomLock] = {}
+
+    def room_lock(self, room_id: str) -> RoomLock:
+        """Lock serialising one room's Mongo write + cache apply (and cold
+        load), so concurrent writers can't land in the cache out of order.
+        The same lock for as long as anyone holds or waits on it: dropping
+        the cached doc never replaces it (see discard_room_lock)."""
+        key = str(room_id)
+        with self._lock:
+            lock = self._room_locks.get(key)
+            if lock is None:
+                lock = self._room_locks[key] = RoomLock(self._lock)
+            lock.users += 1
+            return lock
+
+    def discard_room_lock(self, room_id: str) -> bool:
+        """Forget a deleted room's lock, unless a thread still holds or is
+        waiting on it (that thread's room_lock() handed it out). Returns
+        whether it was dropped."""
+        with self._lock:
+            lock = self._room_locks.get(str(room_id))
+            if lock is None or lock.users:
+                return False
+            del self._room_locks[str(room_id)]
+            return True
+
+    def contains(self, room_id: str) -> bool:
+        with self._lock:
+            return str(room_id) in self._rooms
+
+    def has_parts(self, room_id: str, parts: Iterable[str]) -> bool:
+        """Whether every named part of the room (see room_partitions) is
+        loaded. A board part is also covered by the all-boards part."""
+        with self._lock:
+            loaded = self._parts.get(str(room_id))
+            if loaded is None:
+                return False
+            if ALL_PARTS in loaded:
+                return True
+            return all(
+                part in loaded or (part.startswith(BOARD_PART_PREFIX) and BOARDS_PART in loaded)
+                for part in parts
+            )
+
+    def merge(self, room_id: str, fields: Dict[str, Any], part: str) -> None:
+        """Lay a freshly loaded part over a cached doc (dotted path ->
+        value) and mark it loaded. No-op on a miss."""
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            if room is None:
+                return
+            for path, value in fields.items():
+                _set_path(room, path, copy.deepcopy(value))
+            self._parts[str(room_id)].add(part)
+
+    def get(self, room_id: str) -> Optional[Dict[str, Any]]:
+        """Deep copy of the cached doc, or None on a miss."""
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            return copy.deepcopy(room) if room is not None else None
+
+    def read(self, room_id: str, selector: Callable[[Dict[str, Any]], Any], default: Any = None) -> Any:
+        """Deep copy of selector(doc) — cheaper than get() when the caller
+        only needs one field. Returns default on a miss."""
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            if room is None:
+                return default
+            return copy.deepcopy(selector(room))
+
+    def put(self, room_id: str, room: Dict[str, Any], parts: Optional[Iterable[str]] = None) -> None:
+        """Cache a freshly loaded/created doc (stored as a private copy).
+        `parts` names what it holds; None means the whole room."""
+        with self._lock:
+            self._rooms[str(room_id)] = copy.deepcopy(room)
+            self._parts[str(room_id)] = {ALL_PARTS} if parts is None else set(parts)
+
+    def apply_update(self, room_id: str, update_doc: Dict[str, Any]) -> None:
+        """Mirror an acknowledged Mongo update. Supports $set, $unset and
+        $inc on dotted paths — the only operators GameService mutators emit
+        through here. A miss is a no-op: the next read cold-loads the
+        already-updated doc."""
+        unsupported = set(update_doc) - {"$set", "$unset", "$inc"}
+        if unsupported:
+            raise ValueError(f"Unsupported update operators for cache write-through: {sorted(unsupported)}")
+
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            if room is None:
+                return
+            for path, value in update_doc.get("$set", {}).items():
+                _set_path(room, path, copy.deepcopy(value))
+            for path in update_doc.get("$unset", {}):
+                _unset_path(room, path)
+            for path, amount in update_doc.get("$inc", {}).items():
+                _inc_path(room, path, amount)
+
+    def put_path(self, room_id: str, path: str, value: Any) -> None:
+        """Write one dotted-path value into a cached doc (no-op on a miss)."""
+        self.apply_update(room_id, {"$set": {path: value}})
+
+    def invalidate(self, room_id: str) -> None:
+        """Drop a room's cached doc (the next read cold-loads). The room's
+        lock stays: callers invalidate while holding it."""
+        with self._lock:
+            self._rooms.pop(str(room_id), None)
+            self._parts.pop(str(room_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rooms.clear()
+            self._parts.clear()
+            self._room_locks = {key: lock for key, lock in self._room_locks.items() if lock.users}
+
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any) -> None:
+    """$set semantics: create intermediate objects, replace the leaf. A
+    numeric key into an array sets that element (null-padding past the
+    end), as "seat_layout.2" does in Mongo."""
+    keys = path.split(".")
+    node = doc
+    for key in keys[:-1]:
+        if isinstance(node, list) and key.isdigit():
+            _pad_to(node, int(key))
+            child = node[int(key)]
+            if not isinstance(child, (dict, list)):
+                child = node[int(key)] = {}
+        else:
+            child = node.get(key)
+            if not isinstance(child, (dict, list)):
+                child = node[key] = {}
+        node = child
+    if isinstance(node, list) and keys[-1].isdigit():
+        _pad_to(node, int(keys[-1]))
+        node[int(keys[-1])] = value
+    else:
+        node[keys[-1]] = value
+
+
+def _pad_to(array: list, index: int) -> None:
+    array.extend([None] * (index + 1 - len(array)))
+
+
+def _unset_path(doc: Dict[str, Any], path: str) -> None:
+    """$unset semantics: drop the leaf if every parent exists."""
+    keys = path.split(".")
+    node = doc
+    for key in keys[:-1]:
+        node = node.get(key)
+        if not isinstance(node, dict):
+            return
+    node.pop(keys[-1], None)
+
+
+def _inc_path(doc: Dict[str, Any], path: str, amount: Any) -> None:
+    """$inc semantics: a missing field counts from zero."""
+    keys = path.split(".")
+    node = doc
+    for key in keys[:-1]:
+        child = node.get(key)
+        if not isinstance(child, dict):
+            child = node[key] = {}
+        node = child
+    node[keys[-1]] = (node.get(keys[-1]) or 0) + amount
+
+
+# Create cache instance to be imported by other modules
+room_state_cache = RoomStateCache()
@@ -0,0 +1,221 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Session start as one logical unit.
+
+POST /game/session/start used to insert the room first and then restore
+the map, the image, active_display and the adventure log one write at a
+time. A crash part-way left a live room missing its restored state, and
+the resume 409-guard (which only checks the room doc) then refused the
+retry that would have repaired it.
+
+The deployment runs a standalone mongod, so there are no multi-document
+transactions to lean on. Instead the room doc is the commit point:
+
+1. Every restore is keyed by session id and idempotent — set_active_map
+   and set_active_image upsert by filename, restore_room_logs clears the
+   room's logs before seeding — so they are issued concurrently and a
+   retry simply overwrites whatever a crashed attempt left behind.
+2. The room is inserted last, with the resolved active_display already
+   in it. Until it exists nobody can join, and the 409-guard lets a
+   retry through.
+3. If the insert fails for any reason other than another start winning
+   the race, the restored docs are cleaned up before the error surfaces.
+
+Restore failures stay non-fatal, as before: the session starts without
+that piece and the DM can load it again.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from adventure_log_service import adventure_log
+from db_executor import run_db
+from gameservice import GameService, GameSettings
+from imageservice import ImageSettings, image_service
+from mapservice import MapSettings, map_service
+from shared_contracts.session import SessionStartPayload
+
+logger = logging.getLogger()
+
+
+class SessionAlreadyExists(Exception):
+    """A room already exists for this session id."""
+
+
+@dataclass
+class SessionBootstrap:
+    """Everything one session start writes, built up front from the payload."""
+
+    session_id: str
+    settings: GameSettings
+    map_settings: Optional[MapSettings] = None
+    image_settings: Optional[ImageSettings] = None
+    log_entries: List[Dict[str, Any]] = field(default_factory=list)
+    active_display: Optional[str] = None
+
+
+def build_session_bootstrap(request: SessionStartPayload,
+                            now: Optional[datetime] = None) -> SessionBootstrap:
+    """The room settings and restores for a start payload. Pure — no I/O."""
+    # Convert assets to dict format for MongoDB storage
+    available_assets = [asset.model_dump() for asset in request.assets] if request.assets else []
+
+    # Key player_metadata by user_id — campaign_role lives on each entry
+    player_metadata = {}
+    for session_user in request.session_users or []:
+        # Flatten: top-level identity + character fields (if present)
+        entry = {
+            "user_id": session_user.user_id,
+            "player_name": session_user.player_name,
+            "campaign_role": session_user.campaign_role,
+        }
+        if session_user.character:
+            entry.update(session_user.character.model_dump())
+        player_metadata[session_user.user_id] = entry
+
+    # Restore the DM's Spotify BGM block from the previous session. The SpotifyState
+    # contract supplies defaults for anything unset (notably channel_level = -12 dB),
+    # so the room document always stores a complete, explicit block. The live anchor
+    # (started_at) is stale after a pause, so present it as paused/resumable — the DM
+    # continues via the "Resume where you left off" gesture (autoplay needs a user click).
+    spotify_restore = request.spotify_state.model_dump()
+    if spotify_restore.get("track_uri"):
+        spotify_restore["playback_state"] = "paused"
+        spotify_restore["is_playing"] = False
+
+    # Restore per-map token boards (cold → hot). api-site already pruned
+    # orphan boards for deleted maps; contract validation happened at the
+    # payload boundary, so this is a straight re-shape to stored dicts.
+    restored_map_token_state = {}
+    for board_asset_id, board_tokens in request.map_token_state.items():
+        restored_map_token_state[board_asset_id] = [
+            board_token.model_dump() for board_token in board_tokens
+        ]
+
+    settings = GameSettings(
+        max_players=request.max_players,
+        seat_layout=["empty"] * request.max_players,
+        created_at=now or datetime.utcnow(),
+        dungeon_master=request.dungeon_master.model_dump(),
+        available_assets=available_assets,
+        campaign_id=request.campaign_id,
+        player_metadata=player_metadata,
+        audio_state={k: v.model_dump() for k, v in request.audio_config.items()} if request.audio_config else {},
+        audio_track_config={k: v.model_dump() for k, v in request.audio_track_config.items()} if request.audio_track_config else {},
+        spotify=spotify_restore,
+        map_token_state=restored_map_token_state,
+        token_images={image_id: image_ref.model_dump() for image_id, image_ref in request.token_images.items()},
+        urls_expire_at=request.urls_expire_at or ""
+    )
+
+    bootstrap = SessionBootstrap(
+        session_id=request.session_id,
+        settings=settings,
+        log_entries=[entry.model_dump() for entry in request.adventure_log],
+        active_display=request.active_display,
+    )
+    if request.map_config and request.map_config.filename:
+        bootstrap.map_settings = MapSettings(
+            room_id=request.session_id,
+            uploaded_by="system",
+            map_config=request.map_config,
+        )
+    if request.image_config and request.image_config.filename:
+        bootstrap.image_settings = ImageSettings(
+            room_id=request.session_id,
+            loaded_by="system",
+            image_config=request.image_config,
+        )
+    return bootstrap
+
+
+def _restore_map(session_id: str, map_settings: Optional[MapSettings]) -> bool:
+    if map_settings is None:
+        return False
+    try:
+        restored = map_service.set_active_map(session_id, map_settings)
+    except Exception as e:
+        restored = False
+        logger.warning(f"Map restoration failed (non-fatal): {e}")
+    if restored:
+        logger.info(f"Restored map '{map_settings.map_config.filename}' for session {session_id}")
+    return restored
+
+
+def _restore_image(session_id: str, image_settings: Optional[ImageSettings]) -> bool:
+    if image_settings is None:
+        return False
+    try:
+        restored = image_service.set_active_image(session_id, image_settings)
+    except Exception as e:
+        restored = False
+        logger.warning(f"Image restoration failed (non-fatal): {e}")
+    if restored:
+        logger.info(f"Restored image '{image_settings.image_config.filename}' for session {session_id}")
+    return restored
+
+
+def _restore_logs(session_id: str, log_entries: List[Dict[str, Any]]) -> int:
+    if not log_entries:
+        return 0
+    try:
+        restored_count = adventure_log.restore_room_logs(session_id, log_entries)
+    except Exception as e:
+        logger.warning(f"Adventure log restoration failed (non-fatal): {e}")
+        return 0
+    logger.info(f"Restored {restored_count} adventure log entries for session {session_id}")
+    return restored_count
+
+
+def resolve_active_display(requested: Optional[str], map_restored: bool, image_restored: bool) -> Optional[str]:
+    """What the sequential restores used to leave behind: the restored
+    image over the restored map, and an explicit display over both."""
+    if requested:
+        return requested
+    if image_restored:
+        return "image"
+    if map_restored:
+        return "map"
+    return None
+
+
+async def discard_session_restores(session_id: str) -> None:
+    """Compensating cleanup for a start that never committed its room."""
+    await asyncio.gather(
+        run_db(adventure_log.delete_room_logs, session_id),
+        run_db(map_service.clear_active_map, session_id),
+        run_db(image_service.delete_room_images, session_id),
+    )
+
+
+async def bootstrap_session(bootstrap: SessionBootstrap) -> str:
+    """Restore everything concurrently, then commit the room. Returns the
+    room id. Raises SessionAlreadyExists when another start got there first."""
+    session_id = bootstrap.session_id
+
+    map_restored, image_restored, _restored_count = await asyncio.gather(
+        run_db(_restore_map, session_id, bootstrap.map_settings),
+        run_db(_restore_image, session_id, bootstrap.image_settings),
+        run_db(_restore_logs, session_id, bootstrap.log_entries),
+    )
+
+    settings = bootstrap.settings.model_copy(update={
+        "active_display": resolve_active_display(bootstrap.active_display, map_restored, image_restored),
+    })
+    try:
+        # Use session_id as MongoDB _id (back-reference to PostgreSQL session)
+        return await run_db(GameService.create_room, settings, room_id=session_id)
+    except DuplicateKeyError:
+        # A concurrent start committed first — its restores are the ones
+        # in place now, so leave them alone.
+        raise SessionAlreadyExists(session_id)
+    except Exception:
+        logger.error(f"Room insert failed for session {session_id}; discarding its restores")
+        await discard_session_restores(session_id)
+        raise
@@ -0,0 +1,216 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""One-shot read of everything a session's cold ETL needs.
+
+POST /game/session/end used to walk the session's collections one after
+another — the room, the log count, the logs, the active map, the active
+image, then the room again for active_display — each a separate round
+trip waited out in turn. read_session_snapshot issues one read per
+collection, all at once on the db executor, and derives the rest: the
+log count is the number of logs read (both are capped at
+MAX_LOGS_PER_ROOM), and active_display is a field of the room doc.
+
+build_final_state turns a snapshot into the SessionEndFinalState contract
+with no further I/O.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from adventure_log_service import MAX_LOGS_PER_ROOM, adventure_log
+from db_executor import run_db
+from gameservice import GameService
+from imageservice import image_service
+from mapservice import map_service
+from shared_contracts.image import ImageConfig
+from shared_contracts.map import MapConfig
+from shared_contracts.map_token import MapToken
+from shared_contracts.session import (
+    LogEntry,
+    PlayerState,
+    SessionEndFinalState,
+    SessionStats,
+)
+
+logger = logging.getLogger()
+
+
+@dataclass
+class SessionSnapshot:
+    """Raw hot state of one session, as read for the ETL."""
+
+    room: Dict[str, Any]
+    logs: List[Dict[str, Any]] = field(default_factory=list)
+    map_config: Optional[Dict[str, Any]] = None  # fog masks already inline
+    image_config: Optional[Dict[str, Any]] = None
+
+
+def _read_logs(session_id: str) -> List[Dict[str, Any]]:
+    # Make every accepted log line durable before the cold read
+    adventure_log.flush()
+    return adventure_log.get_room_logs(session_id, limit=MAX_LOGS_PER_ROOM)
+
+
+def _read_map_config(session_id: str) -> Optional[Dict[str, Any]]:
+    active_map = map_service.get_active_map(session_id)
+    if not active_map or not active_map.get("map_config", {}).get("filename"):
+        return None
+    # Cold storage keeps fog masks inline: resolve the hash refs and tiles
+    map_config = dict(active_map["map_config"])
+    map_config["fog_config"] = map_service.hydrate_fog_masks(map_config.get("fog_config"))
+    return map_config
+
+
+def _read_image_config(session_id: str) -> Optional[Dict[str, Any]]:
+    active_image = image_service.get_active_image(session_id)
+    if not active_image or not active_image.get("image_config", {}).get("filename"):
+        return None
+    return active_image["image_config"]
+
+
+async def read_session_snapshot(session_id: str) -> Optional[SessionSnapshot]:
+    """Every collection's share of a session, read concurrently. None when
+    the session has no room."""
+    # The final snapshot feeds the cold ETL, so read it from Mongo, not
+    # from this process's room cache: drop the entry and cold-load.
+    GameService.invalidate_room_cache(session_id)
+
+    room, logs, map_config, image_config = await asyncio.gather(
+        run_db(GameService.get_room, session_id),
+        run_db(_read_logs, session_id),
+        run_db(_read_map_config, session_id),
+        run_db(_read_image_config, session_id),
+    )
+    if not room:
+        return None
+    return SessionSnapshot(room=room, logs=logs, map_config=map_config, image_config=image_config)
+
+
+def _players(room: Dict[str, Any]) -> List[PlayerState]:
+    # ALL known players round-trip (not just the seated ones) so
+    # character-owned state (color) syncs cold for everyone. Seat position
+    # is looked up from the layout where present.
+    player_metadata = room.get("player_metadata", {})
+    seat_index_by_user = {
+        seat: idx for idx, seat in enumerate(room.get("seat_layout", [])) if seat != "empty"
+    }
+    players = []
+    if isinstance(player_metadata, dict):
+        for metadata_user_id, meta in player_metadata.items():
+            # Display name from metadata only — never fall back to the user_id (a UUID = PII)
+            players.append(PlayerState(
+                user_id=metadata_user_id,
+                player_name=meta.get("player_name") or "Unknown Adventurer",
+                seat_position=seat_index_by_user.get(metadata_user_id),
+                character_id=meta.get("character_id"),
+                color=meta.get("color"),
+            ))
+    return players
+
+
+def _log_entries(logs: List[Dict[str, Any]]) -> List[LogEntry]:
+    # Chronological (oldest first); timestamps go out as ISO-8601 with an
+    # explicit UTC offset (stored naive-UTC in Mongo).
+    log_entries = []
+    for log_doc in sorted(logs, key=lambda log_doc: log_doc.get("log_id") or 0):
+        log_timestamp = log_doc.get("timestamp")
+        if isinstance(log_timestamp, datetime):
+            log_timestamp = log_timestamp.replace(tzinfo=timezone.utc).isoformat()
+        log_entries.append(LogEntry(
+            message=log_doc.get("message", ""),
+            type=log_doc.get("type", "system"),
+            timestamp=log_timestamp or "",
+            from_player=log_doc.get("from_player"),
+            log_id=log_doc.get("log_id") or 0,
+            prompt_id=log_doc.get("prompt_id"),
+        ))
+    return log_entries
+
+
+def _token_boards(room: Dict[str, Any]) -> Dict[str, List[MapToken]]:
+    # Salvage per token: a malformed dict (e.g. old-shape data sitting hot
+    # across a contract change) is dropped with a warning rather than
+    # failing the whole pause and stranding the session ACTIVE.
+    # Adventure-log extraction is lenient for the same reason. Boards left
+    # empty after salvage (or by the last $pull) are culled so key clutter
+    # never accumulates cold.
+    raw_token_boards = room.get("map_token_state", {}) or {}
+    token_boards = {}
+    if isinstance(raw_token_boards, dict):
+        for board_asset_id, board_tokens in raw_token_boards.items():
+            salvaged_tokens = []
+            for board_token in board_tokens or []:
+                try:
+                    salvaged_tokens.append(MapToken(**board_token))
+                except (ValidationError, TypeError) as token_error:
+                    logger.warning(
+                        f"Dropped malformed map token on board {board_asset_id} "
+                        f"at session end: {token_error}"
+                    )
+            if salvaged_tokens:
+                token_boards[board_asset_id] = salvaged_tokens
+    return token_boards
+
+
+def _frozen_spotify_state(room: Dict[str, Any], now: float) -> Dict[str, Any]:
+    # If the session ends mid-play, freeze the live anchor into
+    # paused_elapsed NOW — the started_at epoch is meaningless after cold
+    # storage, and without this a later "Resume where you left off" starts
+    # the track from 0:00.
+    spotify_state = dict(room.get("spotify", {}) or {})
+    if spotify_state.get("playback_state") == "playing" and spotify_state.get("started_at"):
+        elapsed = max(0.0, now - spotify_state["started_at"])
+        duration_ms = (spotify_state.get("track_meta") or {}).get("duration_ms")
+        if spotify_state.get("is_looping") and duration_ms:
+            elapsed = elapsed % (duration_ms / 1000.0)
+        elif duration_ms:
+            elapsed = min(elapsed, duration_ms / 1000.0)
+        spotify_state.update({
+            "playback_state": "paused",
+            "paused_elapsed": elapsed,
+            "started_at": None,
+            "is_playing": False,
+        })
+    return spotify_state
+
+
+def build_final_state(snapshot: SessionSnapshot, now: Optional[float] = None) -> SessionEndFinalState:
+    """The SessionEndFinalState contract for a snapshot. Pure — no I/O."""
+    now = time.time() if now is None else now
+    room = snapshot.room
+
+    duration_minutes = 0
+    created_at = room.get("created_at")
+    if isinstance(created_at, datetime):
+        duration = datetime.utcfromtimestamp(now) - created_at
+        duration_minutes = int(duration.total_seconds() / 60)
+
+    # __master_volume rides in audio_state but is a float, not an
+    # AudioChannelState — pull it out before the typed contract
+    raw_audio_state = dict(room.get("audio_state", {}))
+    broadcast_master_volume = raw_audio_state.pop("__master_volume", None)
+
+    return SessionEndFinalState(
+        players=_players(room),
+        session_stats=SessionStats(
+            duration_minutes=duration_minutes,
+            total_logs=min(len(snapshot.logs), MAX_LOGS_PER_ROOM),
+            max_players=room.get("max_players", 0),
+        ),
+        audio_state=raw_audio_state,
+        audio_track_config=room.get("audio_track_config", {}),
+        broadcast_master_volume=broadcast_master_volume,
+        spotify_state=_frozen_spotify_state(room, now),
+        map_state=MapConfig(**snapshot.map_config) if snapshot.map_config else None,
+        image_state=ImageConfig(**snapshot.image_config) if snapshot.image_config else None,
+        active_display=room.get("active_display"),
+        adventure_log=_log_entries(snapshot.logs),
+        map_token_state=_token_boards(room),
+    )
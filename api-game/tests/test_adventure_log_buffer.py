@@ -0,0 +1,273 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Unit tests for the adventure-log write-behind buffer (read-your-writes
+merging, removals that reach into the buffer, failed-flush requeue,
+shutdown drain), keyset pages, and the in-memory room counts — against an
+in-memory stand-in for the collection.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+import adventure_log_service
+from adventure_log_service import MAX_LOGS_PER_ROOM, AdventureLogService, encode_log_cursor
+
+ROOM = "room-1"
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def skip(self, count):
+        self.docs = self.docs[count:]
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+    """Just enough of a pymongo Collection for AdventureLogService."""
+
+    def __init__(self):
+        self.docs = []
+        self.insert_calls = 0
+        self.fail_inserts = 0
+        self.count_calls = 0
+
+    def _matches(self, doc, query):
+        for key, value in query.items():
+            if isinstance(value, dict):
+                if not doc.get(key) < value["$lt"]:
+                    return False
+            elif doc.get(key) != value:
+                return False
+        return True
+
+    def insert_many(self, docs, ordered=True):
+        self.insert_calls += 1
+        if self.fail_inserts:
+            self.fail_inserts -= 1
+            raise AutoReconnect("connection reset")
+        self.docs.extend(dict(doc) for doc in docs)
+
+    def find(self, query, projection=None):
+        docs = [dict(doc) for doc in self.docs if self._matches(doc, query)]
+        if projection and projection.get("_id") == 0:
+            for doc in docs:
+                doc.pop("_id", None)
+        return FakeCursor(docs)
+
+    def count_documents(self, query, limit=0):
+        self.count_calls += 1
+        count = sum(1 for doc in self.docs if self._matches(doc, query))
+        return min(count, limit) if limit else count
+
+    def delete_many(self, query):
+        kept = [doc for doc in self.docs if not self._matches(doc, query)]
+        deleted_count = len(self.docs) - len(kept)
+        self.docs = kept
+        return SimpleNamespace(deleted_count=deleted_count)
+
+    def delete_one(self, query):
+        for index, doc in enumerate(self.docs):
+            if self._matches(doc, query):
+                del self.docs[index]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+
+@pytest.fixture
+def service():
+    service = AdventureLogService()
+    service.adventure_logs = FakeCollection()
+    yield service
+    service.close()
+
+
+def messages(logs):
+    return [log["message"] for log in logs]
+
+
+class TestReadYourWrites:
+    def test_buffered_entry_visible_before_flush(self, service):
+        service.add_log_entry(ROOM, "rolled a 20", "player-roll", from_player="Elara")
+        assert service.adventure_logs.docs == []
+        (log,) = service.get_room_logs(ROOM)
+        assert log["message"] == "rolled a 20"
+        assert "_id" not in log
+        assert service.get_room_log_count(ROOM) == 1
+
+    def test_page_straddles_buffer_and_collection(self, service):
+        for index in range(3):
+            service.add_log_entry(ROOM, f"stored {index}", "system")
+        service.flush()
+        for index in range(2):
+            service.add_log_entry(ROOM, f"buffered {index}", "system")
+
+        assert messages(service.get_room_logs(ROOM)) == [
+            "buffered 1", "buffered 0", "stored 2", "stored 1", "stored 0"
+        ]
+        first = service.get_room_log_page(ROOM, limit=3)
+        assert messages(first["logs"]) == ["buffered 1", "buffered 0", "stored 2"]
+        second = service.get_room_log_page(ROOM, limit=3, before=first["next_cursor"])
+        assert messages(second["logs"]) == ["stored 1", "stored 0"]
+        assert second["next_cursor"] is None
+        assert service.get_room_log_count(ROOM) == 5
+
+    def test_other_rooms_buffer_not_merged(self, service):
+        service.add_log_entry("room-2", "elsewhere", "system")
+        assert service.get_room_logs(ROOM) == []
+
+    def test_log_ids_strictly_increase(self, service):
+        entries = [service.add_log_entry(ROOM, str(index), "system") for index in range(50)]
+        log_ids = [entry["log_id"] for entry in entries]
+        assert log_ids == sorted(set(log_ids))
+
+
+class TestFlush:
+    def test_one_insert_many_per_flush(self, service):
+        for index in range(10):
+            service.add_log_entry(ROOM, str(index), "system")
+        assert service.flush() == 10
+        assert service.adventure_logs.insert_calls == 1
+        assert service.flush() == 0
+
+    def test_failed_flush_requeues_in_order(self, service):
+        service.add_log_entry(ROOM, "first", "system")
+        service.adventure_logs.fail_inserts = 1
+        with pytest.raises(AutoReconnect):
+            service.flush()
+        service.add_log_entry(ROOM, "second", "system")
+
+        assert messages(service.get_room_logs(ROOM)) == ["second", "first"]
+        service.flush()
+        assert [doc["message"] for doc in service.adventure_logs.docs] == ["first", "second"]
+
+    def test_size_threshold_wakes_flusher(self, service, monkeypatch):
+        monkeypatch.setattr(adventure_log_service, "FLUSH_INTERVAL_S", 60)
+        monkeypatch.setattr(adventure_log_service, "FLUSH_MAX_ENTRIES", 3)
+        for index in range(3):
+            service.add_log_entry(ROOM, str(index), "system")
+
+        deadline = time.monotonic() + 2
+        while len(service.adventure_logs.docs) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(service.adventure_logs.docs) == 3
+
+    def test_close_drains_then_writes_through(self, service):
+        service.add_log_entry(ROOM, "before close", "system")
+        service.close()
+        assert len(service.adventure_logs.docs) == 1
+
+        service.add_log_entry(ROOM, "after close", "system")
+        assert len(service.adventure_logs.docs) == 2
+
+
+class TestRemovals:
+    def test_buffered_prompt_removed_without_reaching_mongo(self, service):
+        service.add_log_entry(ROOM, "roll for initiative", "dungeon-master", prompt_id="prompt-1")
+        assert service.remove_log_by_prompt_id(ROOM, "prompt-1") == 1
+        service.flush()
+        assert service.adventure_logs.docs == []
+
+    def test_clear_system_spans_buffer_and_collection(self, service):
+        service.add_log_entry(ROOM, "stored", "system")
+        service.flush()
+        service.add_log_entry(ROOM, "buffered", "system")
+        service.add_log_entry(ROOM, "a roll", "player-roll")
+
+        assert service.clear_system_messages(ROOM) == 2
+        assert messages(service.get_room_logs(ROOM)) == ["a roll"]
+
+    def test_delete_room_logs_drops_buffer(self, service):
+        service.add_log_entry(ROOM, "stored", "system")
+        service.flush()
+        service.add_log_entry(ROOM, "buffered", "system")
+
+        assert service.delete_room_logs(ROOM) == 2
+        service.flush()
+        assert service.adventure_logs.docs == []
+
+
+class TestKeysetPages:
+    def test_pages_stable_while_new_entries_arrive(self, service):
+        for index in range(4):
+            service.add_log_entry(ROOM, f"old {index}", "system")
+        first = service.get_room_log_page(ROOM, limit=2)
+        service.add_log_entry(ROOM, "new", "system")
+        second = service.get_room_log_page(ROOM, limit=2, before=first["next_cursor"])
+        assert messages(first["logs"]) == ["old 3", "old 2"]
+        assert messages(second["logs"]) == ["old 1", "old 0"]
+
+    def test_paging_stops_at_the_cap(self, service):
+        for index in range(MAX_LOGS_PER_ROOM + 10):
+            service.add_log_entry(ROOM, str(index), "system")
+        service.flush()
+
+        served, cursor = [], None
+        while True:
+            page = service.get_room_log_page(ROOM, limit=64, before=cursor)
+            served += page["logs"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert len(served) == MAX_LOGS_PER_ROOM
+        assert served[-1]["message"] == "10"
+
+    def test_malformed_cursor_rejected(self, service):
+        with pytest.raises(ValueError):
+            service.get_room_log_page(ROOM, before="not-a-cursor")
+
+    def test_cursor_cannot_widen_the_window(self, service):
+        for index in range(3):
+            service.add_log_entry(ROOM, str(index), "system")
+        cursor = encode_log_cursor(10 ** 18, MAX_LOGS_PER_ROOM * 10)
+        page = service.get_room_log_page(ROOM, limit=MAX_LOGS_PER_ROOM * 10, before=cursor)
+        assert len(page["logs"]) == 3
+
+
+class TestCachedCounts:
+    def test_seeded_once_then_maintained(self, service):
+        service.add_log_entry(ROOM, "stored", "system")
+        service.flush()
+        assert service.get_room_log_count(ROOM) == 1
+        service.add_log_entry(ROOM, "buffered", "system", prompt_id="prompt-1")
+        service.add_log_entry(ROOM, "a roll", "player-roll")
+        assert service.get_room_log_count(ROOM) == 3
+
+        service.remove_log_by_prompt_id(ROOM, "prompt-1")
+        service.flush()
+        service.clear_system_messages(ROOM)
+        assert service.get_room_log_count(ROOM) == 1
+        assert service.adventure_logs.count_calls == 1
+
+    def test_count_capped_and_follows_trims(self, service):
+        for index in range(MAX_LOGS_PER_ROOM + 30):
+            service.add_log_entry(ROOM, str(index), "system")
+        assert service.get_room_log_count(ROOM) == MAX_LOGS_PER_ROOM
+        service.flush()
+        assert service._room_counts[ROOM] == len(service.adventure_logs.docs)
+
+    def test_restore_pins_count(self, service):
+        service.add_log_entry(ROOM, "stale", "system")
+        service.get_room_log_count(ROOM)
+        restored = [{"message": str(index), "log_id": index + 1, "timestamp": None} for index in range(4)]
+        assert service.restore_room_logs(ROOM, restored) == 4
+        assert service.get_room_log_count(ROOM) == 4
+        assert service.adventure_logs.count_calls == 1
@@ -0,0 +1,33 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Amortized adventure-log trimming: the per-room insert counter that
+decides when a physical trim runs. The trim queries themselves need Mongo
+(see benchmarks/adventure_log_inserts.py).
+
+Run from api-game/: python -m pytest tests/
+"""
+
+from adventure_log_service import TRIM_EVERY_N_INSERTS, AdventureLogService
+
+
+class TestTrimCadence:
+    def test_trims_once_per_n_inserts(self):
+        service = AdventureLogService()
+        due = [service._count_insert("room-1") for _ in range(TRIM_EVERY_N_INSERTS * 3)]
+        assert due.count(True) == 3
+        assert due[TRIM_EVERY_N_INSERTS - 1] is True
+
+    def test_rooms_counted_independently(self):
+        service = AdventureLogService()
+        for _ in range(TRIM_EVERY_N_INSERTS - 1):
+            service._count_insert("busy-room")
+        assert service._count_insert("quiet-room") is False
+        assert service._count_insert("busy-room") is True
+
+    def test_pending_trim_only_after_inserts(self):
+        service = AdventureLogService()
+        assert service._reset_trim_counter("room-1") is False
+        service._count_insert("room-1")
+        assert service._reset_trim_counter("room-1") is True
+        assert service._reset_trim_counter("room-1") is False
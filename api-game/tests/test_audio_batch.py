@@ -0,0 +1,126 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Compiled audio batches: one update for the whole batch, landing the
+room in exactly the state applying the ops one at a time would.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import pytest
+from pydantic import ValidationError
+
+from audio_batch import MASTER_VOLUME_KEY, compile_audio_batch
+from room_state_cache import RoomStateCache
+from shared_contracts.audio import AudioChannelState
+
+ROOM = "room-1"
+NOW = 1_700_000_000.0
+
+
+def channel(**overrides):
+    return AudioChannelState(**overrides).model_dump()
+
+
+def make_room():
+    return {
+        "_id": ROOM,
+        "audio_state": {
+            "bgm": channel(filename="tavern.mp3", asset_id="tavern", volume=0.6, muted=True,
+                           playback_state="playing", started_at=NOW - 30),
+            "sfx": channel(filename="rain.mp3", asset_id="rain", volume=0.3),
+            "ambient": channel(filename="wind.mp3", asset_id="wind"),
+            MASTER_VOLUME_KEY: 0.9,
+        },
+        "audio_track_config": {
+            "battle": {"volume": 1.2, "looping": False, "effects": {"reverb": True}, "paused_elapsed": 12.0},
+        },
+    }
+
+
+def applied(room, update_doc):
+    """The room doc after Mongo applies update_doc (the cache mirrors it)."""
+    cache = RoomStateCache()
+    cache.put(ROOM, room)
+    cache.apply_update(ROOM, update_doc)
+    return cache.get(ROOM)
+
+
+def apply_batch(room, operations):
+    audio_batch = compile_audio_batch(room["audio_state"], room["audio_track_config"], operations, NOW)
+    return applied(room, audio_batch.update_doc), audio_batch
+
+
+def apply_sequentially(room, operations):
+    for op in operations:
+        room, _audio_batch = apply_batch(room, [op])
+    return room
+
+
+# A "play scene": swap a stashed track into one channel and start it,
+# stop another, clear a third, restyle, and set the master volume.
+SCENE = [
+    {"trackId": "bgm", "operation": "load", "filename": "battle.mp3", "asset_id": "battle", "s3_url": "https://cdn/battle.mp3"},
+    {"trackId": "bgm", "operation": "play", "filename": "battle.mp3", "asset_id": "battle", "volume": 1.0},
+    {"trackId": "bgm", "operation": "pause"},
+    {"trackId": "bgm", "operation": "resume"},
+    {"trackId": "sfx", "operation": "stop"},
+    {"trackId": "sfx", "operation": "volume", "volume": 0.4},
+    {"trackId": "sfx", "operation": "effects", "effects": {"lpf": True}},
+    {"trackId": "ambient", "operation": "clear"},
+    {"trackId": "ambient", "operation": "load", "filename": "tavern.mp3", "asset_id": "tavern"},
+    {"trackId": "ambient", "operation": "loop", "looping": False, "loop_mode": "off"},
+    {"trackId": "ambient", "operation": "solo", "soloed": True},
+    {"trackId": "bgm", "operation": "mute", "muted": False},
+    {"trackId": "master", "operation": "master_volume", "volume": 0.7},
+]
+
+
+class TestCompileAudioBatch:
+    def test_matches_sequential_application(self):
+        batched, _audio_batch = apply_batch(make_room(), SCENE)
+        sequential = apply_sequentially(make_room(), SCENE)
+
+        assert batched["audio_state"] == sequential["audio_state"]
+        assert batched["audio_track_config"] == sequential["audio_track_config"]
+        for channel_id, channel_state in batched["audio_state"].items():
+            if channel_id != MASTER_VOLUME_KEY:
+                AudioChannelState(**channel_state)
+
+    def test_one_update_touching_only_changed_paths(self):
+        _room, audio_batch = apply_batch(make_room(), SCENE)
+
+        assert set(audio_batch.update_doc["$set"]) == {
+            "audio_state.bgm", "audio_state.sfx", "audio_state.ambient", f"audio_state.{MASTER_VOLUME_KEY}",
+            "audio_track_config.wind",
+        }
+        # tavern was stashed by the bgm load and consumed by the ambient one
+        assert audio_batch.update_doc["$unset"] == {"audio_track_config.battle": ""}
+
+    def test_load_restores_the_stash_and_keeps_channel_mute(self):
+        room, audio_batch = apply_batch(make_room(), SCENE[:1])
+
+        bgm = room["audio_state"]["bgm"]
+        assert (bgm["volume"], bgm["looping"], bgm["paused_elapsed"]) == (1.2, False, 12.0)
+        assert bgm["effects"]["reverb"] is True
+        assert bgm["muted"] is True
+        assert room["audio_track_config"]["tavern"]["volume"] == 0.6
+        # The broadcast carries what the load resolved to
+        assert audio_batch.operations[0]["volume"] == 1.2
+
+    def test_later_ops_see_earlier_ones(self):
+        room, _audio_batch = apply_batch(make_room(), SCENE[:4])
+        bgm = room["audio_state"]["bgm"]
+        assert bgm["playback_state"] == "playing"
+        assert bgm["started_at"] == NOW
+
+    def test_invalid_op_compiles_nothing(self):
+        with pytest.raises(ValidationError):
+            compile_audio_batch(make_room()["audio_state"], {}, [
+                {"trackId": "sfx", "operation": "stop"},
+                {"trackId": "sfx", "operation": "volume", "volume": 9.0},
+            ], NOW)
+
+    def test_no_change_is_an_empty_update(self):
+        _room, audio_batch = apply_batch(make_room(), [{"trackId": "sfx", "operation": "volume", "volume": 0.3}])
+        assert audio_batch.update_doc == {}
@@ -0,0 +1,181 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Cross-worker delivery through the WebSocket backplane: two
+ConnectionManagers stand in for two uvicorn workers sharing one Redis
+(fakeredis + lupa for the presence script, skipped when they aren't
+installed), plus the in-memory default.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from gameservice import GameService
+from websocket_handlers.backplane import InMemoryBackplane, RedisBackplane
+from websocket_handlers.connection_manager import ConnectionManager
+
+ROOM = "room-1"
+
+
+class FakeSocket:
+    def __init__(self):
+        self.scope = {"subprotocols": []}
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = code
+
+    def events(self, event_type):
+        return [message for message in self.sent if message.get("event_type") == event_type]
+
+
+@pytest.fixture(autouse=True)
+def no_mongo(monkeypatch):
+    monkeypatch.setattr(GameService, "get_room_core", staticmethod(lambda room_id: None))
+
+
+async def settle():
+    """Let the listeners drain what's been published."""
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+
+
+def run_workers(scenario):
+    """Run scenario(worker_a, worker_b) with two managers on one fake Redis."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+
+    async def main():
+        server = fakeredis.FakeServer()
+        workers = [
+            ConnectionManager(RedisBackplane(fakeredis.FakeAsyncRedis(server=server)))
+            for _ in range(2)
+        ]
+        for worker in workers:
+            await worker.start()
+        try:
+            return await scenario(*workers)
+        finally:
+            for task in asyncio.all_tasks() - {asyncio.current_task()}:
+                if task.get_name() != "ws-backplane":
+                    task.cancel()
+            for worker in workers:
+                await worker.stop()
+
+    return asyncio.run(main())
+
+
+class TestRedisBackplane:
+    def test_room_broadcast_reaches_other_worker_once(self):
+        async def scenario(worker_a, worker_b):
+            alice, bob = FakeSocket(), FakeSocket()
+            await worker_a.connect(alice, ROOM, "alice")
+            await worker_b.connect(bob, ROOM, "bob")
+            await settle()
+            await worker_a.update_room_data(ROOM, {"event_type": "dice_roll", "data": {"total": 17}})
+            await settle()
+            return alice, bob
+
+        alice, bob = run_workers(scenario)
+        assert alice.events("dice_roll") == [{"event_type": "dice_roll", "data": {"total": 17}}]
+        assert bob.events("dice_roll") == alice.events("dice_roll")
+
+    def test_views_and_direct_sends_cross_workers(self):
+        async def scenario(worker_a, worker_b):
+            dm, player = FakeSocket(), FakeSocket()
+            await worker_a.connect(dm, ROOM, "dm")
+            await worker_b.connect(player, ROOM, "player")
+            await settle()
+            await worker_a.update_room_views(
+                ROOM, "dm", {"event_type": "map_token_delta", "data": {"token": "goblin"}},
+                {"event_type": "map_token_delta", "data": {"token": None}},
+            )
+            await worker_a.send_to_player(ROOM, "player", {"event_type": "seat_displaced"})
+            await settle()
+            return dm, player
+
+        dm, player = run_workers(scenario)
+        assert dm.events("map_token_delta")[0]["data"]["token"] == "goblin"
+        assert player.events("map_token_delta")[0]["data"]["token"] is None
+        assert player.events("seat_displaced") == [{"event_type": "seat_displaced"}]
+
+    def test_lobby_sees_presence_from_every_worker(self):
+        async def scenario(worker_a, worker_b):
+            alice, bob = FakeSocket(), FakeSocket()
+            await worker_a.connect(alice, ROOM, "alice")
+            await worker_b.connect(bob, ROOM, "bob")
+            await worker_b.remove_connection(bob, ROOM, "bob")
+            await worker_a.broadcast_lobby_update(ROOM)
+            await settle()
+            return alice
+
+        alice = run_workers(scenario)
+        lobby = alice.events("lobby_update")[-1]["data"]["lobby_users"]
+        assert {user["user_id"]: user["status"] for user in lobby} == {
+            "alice": "connected", "bob": "disconnecting",
+        }
+
+    def test_close_room_closes_sockets_everywhere(self):
+        async def scenario(worker_a, worker_b):
+            alice, bob = FakeSocket(), FakeSocket()
+            await worker_a.connect(alice, ROOM, "alice")
+            await worker_b.connect(bob, ROOM, "bob")
+            await worker_a.close_room_connections(ROOM, reason="Session ended")
+            await settle()
+            return alice, bob, worker_b, await worker_a.backplane.get_presence(ROOM)
+
+        alice, bob, worker_b, presence = run_workers(scenario)
+        assert alice.closed_with == bob.closed_with == 1000
+        assert bob.events("session_ended")
+        assert ROOM not in worker_b.room_users
+        assert presence == {}
+
+
+class TestRedisPresence:
+    def test_update_presence_merges_and_never_revives(self):
+        async def scenario(worker_a, worker_b):
+            await worker_a.backplane.set_presence(ROOM, "alice", {"status": "connected", "is_in_party": False})
+            await worker_b.backplane.update_presence(ROOM, "alice", is_in_party=True)
+            merged = await worker_a.backplane.get_presence(ROOM)
+            await worker_a.backplane.remove_presence(ROOM, "alice")
+            await worker_b.backplane.update_presence(ROOM, "alice", status="disconnecting")
+            return merged, await worker_a.backplane.get_presence(ROOM)
+
+        merged, after_remove = run_workers(scenario)
+        assert merged == {"alice": {"status": "connected", "is_in_party": True}}
+        assert after_remove == {}
+
+
+class TestInMemoryBackplane:
+    def test_update_presence_ignores_absent_user(self):
+        async def scenario():
+            backplane = InMemoryBackplane()
+            await backplane.update_presence(ROOM, "ghost", status="connected")
+            await backplane.set_presence(ROOM, "alice", {"status": "connected", "is_in_party": False})
+            await backplane.update_presence(ROOM, "alice", is_in_party=True)
+            return await backplane.get_presence(ROOM)
+
+        assert asyncio.run(scenario()) == {"alice": {"status": "connected", "is_in_party": True}}
+
+    def test_seat_layout_sets_party(self):
+        async def scenario():
+            manager = ConnectionManager(InMemoryBackplane())
+            for user_id in ("alice", "bob"):
+                await manager.connect(FakeSocket(), ROOM, user_id)
+            await manager.update_party_from_seats(ROOM, ["alice", "empty"])
+            return await manager.backplane.get_presence(ROOM)
+
+        presence = asyncio.run(scenario())
+        assert presence["alice"]["is_in_party"] is True
+        assert presence["bob"]["is_in_party"] is False
@@ -0,0 +1,229 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Room broadcast fan-out: concurrent sends, slow-consumer downgrade and
+eviction, encode-once frames. Fake sockets stand in for Starlette
+WebSockets — only send_text, send_bytes and close are exercised.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from websocket_handlers import connection_manager as connection_manager_module
+from websocket_handlers.connection_manager import ConnectionManager
+from websocket_handlers.wire_codec import decode_binary_frame
+
+ROOM = "room-1"
+
+
+class FakeSocket:
+    def __init__(self, send_delay=0.0, fail=False):
+        self.send_delay = send_delay
+        self.fail = fail
+        self.sent = []
+        self.binary_frames = 0
+        self.closed_with = None
+
+    async def send_text(self, data):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        self.sent.append(json.loads(data))
+
+    async def send_bytes(self, data):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        self.binary_frames += 1
+        self.sent.append(decode_binary_frame(data))
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = code
+
+
+@pytest.fixture
+def fast_budgets(monkeypatch):
+    monkeypatch.setattr(connection_manager_module, "SLOW_SEND_SECONDS", 0.02)
+    monkeypatch.setattr(connection_manager_module, "SEND_TIMEOUT_SECONDS", 0.1)
+
+
+def make_room(**sockets):
+    manager = ConnectionManager()
+    manager.room_users[ROOM] = {}
+    for user_id, socket in sockets.items():
+        manager.connections.append(socket)
+        manager.room_users[ROOM][user_id] = {"websocket": socket, "degraded": False}
+        manager.backplane.presence.setdefault(ROOM, {})[user_id] = {
+            "is_in_party": False, "status": "connected",
+        }
+    return manager
+
+
+def presence(manager, user_id):
+    return manager.backplane.presence[ROOM][user_id]
+
+
+def run(coroutine_factory):
+    """Run inside a loop and let scheduled removal tasks be cancelled cleanly."""
+    async def scenario():
+        result = await coroutine_factory()
+        for task in asyncio.all_tasks() - {asyncio.current_task()}:
+            task.cancel()
+        return result
+    return asyncio.run(scenario())
+
+
+class TestFanOut:
+    def test_sends_concurrently(self, fast_budgets):
+        sockets = {f"user-{index}": FakeSocket(send_delay=0.05) for index in range(5)}
+        manager = make_room(**sockets)
+
+        async def broadcast():
+            started = time.perf_counter()
+            await manager.update_room_data(ROOM, {"event_type": "dice_roll"})
+            return time.perf_counter() - started
+
+        elapsed = run(broadcast)
+        # Sequential would take 5 x 0.05s.
+        assert elapsed < 0.15
+        assert all(socket.sent == [{"event_type": "dice_roll"}] for socket in sockets.values())
+
+    def test_stalled_client_evicted_without_delaying_others(self, fast_budgets):
+        healthy = FakeSocket()
+        stalled = FakeSocket(send_delay=10.0)
+        manager = make_room(alice=healthy, bob=stalled)
+
+        async def broadcast():
+            started = time.perf_counter()
+            await manager.update_room_data(ROOM, {"event_type": "seat_change"})
+            return time.perf_counter() - started
+
+        elapsed = run(broadcast)
+        assert elapsed < 0.5
+        assert healthy.sent == [{"event_type": "seat_change"}]
+        assert stalled.closed_with == connection_manager_module.EVICT_CLOSE_CODE
+        assert presence(manager, "bob")["status"] == "disconnecting"
+        assert stalled not in manager.connections
+
+    def test_dead_client_removed(self, fast_budgets):
+        manager = make_room(alice=FakeSocket(), bob=FakeSocket(fail=True))
+        run(lambda: manager.update_room_data(ROOM, {"event_type": "dice_roll"}))
+        assert manager.room_users[ROOM]["bob"]["websocket"] is None
+        assert presence(manager, "alice")["status"] == "connected"
+
+
+class TestDowngrade:
+    def test_slow_client_downgraded_and_skips_ephemeral(self, fast_budgets):
+        slow = FakeSocket(send_delay=0.05)
+        manager = make_room(alice=FakeSocket(), bob=slow)
+
+        async def scenario():
+            await manager.update_room_data(ROOM, {"event_type": "map_token_update"})
+            await manager.update_room_data(ROOM, {"event_type": "map_token_drag"}, ephemeral=True)
+
+        run(scenario)
+        assert manager.room_users[ROOM]["bob"]["degraded"] is True
+        assert slow.sent == [{"event_type": "map_token_update"}]
+
+    def test_degraded_client_still_gets_committed_state_and_recovers(self, fast_budgets):
+        client = FakeSocket()
+        manager = make_room(alice=client)
+        manager.room_users[ROOM]["alice"]["degraded"] = True
+
+        async def scenario():
+            await manager.update_room_data(ROOM, {"event_type": "map_token_drag"}, ephemeral=True)
+            await manager.update_room_data(ROOM, {"event_type": "map_token_update"})
+
+        run(scenario)
+        assert client.sent == [{"event_type": "map_token_update"}]
+        assert manager.room_users[ROOM]["alice"]["degraded"] is False
+
+
+class TestEncodeOnce:
+    def test_broadcast_encodes_once(self, fast_budgets, monkeypatch):
+        encode_calls = []
+        real_encode = connection_manager_module.encode_frame
+
+        def counting_encode(message):
+            encode_calls.append(message)
+            return real_encode(message)
+
+        monkeypatch.setattr(connection_manager_module, "encode_frame", counting_encode)
+        sockets = {f"user-{index}": FakeSocket() for index in range(6)}
+        manager = make_room(**sockets)
+        run(lambda: manager.update_room_data(ROOM, {"event_type": "lobby_update", "data": {"lobby_users": []}}))
+        assert len(encode_calls) == 1
+        assert all(socket.sent == [{"event_type": "lobby_update", "data": {"lobby_users": []}}]
+                   for socket in sockets.values())
+
+    def test_frame_matches_json_round_trip(self):
+        message = {"event_type": "dice_roll", "data": {"message": "Élan rolls", "total": 17, "nested": [1, None]}}
+        assert json.loads(connection_manager_module.encode_frame(message)) == message
+
+
+class TestViews:
+    def test_privileged_and_default_views(self, fast_budgets, monkeypatch):
+        encode_calls = []
+        real_encode = connection_manager_module.encode_frame
+        monkeypatch.setattr(connection_manager_module, "encode_frame",
+                            lambda message: encode_calls.append(message) or real_encode(message))
+        dm, alice, bob = FakeSocket(), FakeSocket(), FakeSocket()
+        manager = make_room(dm=dm, alice=alice, bob=bob)
+        run(lambda: manager.update_room_views(ROOM, "dm", {"view": "dm"}, {"view": "player"}))
+        assert dm.sent == [{"view": "dm"}]
+        assert alice.sent == bob.sent == [{"view": "player"}]
+        assert len(encode_calls) == 2
+
+    def test_no_default_view_sends_only_to_privileged(self, fast_budgets):
+        dm, alice = FakeSocket(), FakeSocket()
+        manager = make_room(dm=dm, alice=alice)
+        run(lambda: manager.update_room_views(ROOM, "dm", {"view": "dm"}, None))
+        assert dm.sent == [{"view": "dm"}]
+        assert alice.sent == []
+
+
+class TestBinaryClients:
+    def test_mixed_room_gets_one_frame_per_wire_format(self, fast_budgets):
+        json_client, binary_client = FakeSocket(), FakeSocket()
+        manager = make_room(alice=json_client, bob=binary_client)
+        manager.room_users[ROOM]["bob"]["binary"] = True
+        message = {"event_type": "map_token_drag_batch", "data": {"frames": [
+            {"asset_id": "map-1", "token_id": "goblin", "phase": "move", "x": 1.5, "y": 2.0, "holder_user_id": "dm"},
+        ]}}
+        run(lambda: manager.update_room_data(ROOM, message, ephemeral=True))
+        assert json_client.sent == binary_client.sent == [message]
+        assert json_client.binary_frames == 0
+        assert binary_client.binary_frames == 1
+
+    def test_binary_client_gets_text_for_unschemed_events(self, fast_budgets):
+        binary_client = FakeSocket()
+        manager = make_room(bob=binary_client)
+        manager.room_users[ROOM]["bob"]["binary"] = True
+        run(lambda: manager.update_room_data(ROOM, {"event_type": "dice_roll", "data": {"total": 17}}))
+        assert binary_client.sent == [{"event_type": "dice_roll", "data": {"total": 17}}]
+        assert binary_client.binary_frames == 0
+
+
+class TestRoomMetrics:
+    def test_fanout_histogram_goes_with_the_last_socket(self, fast_budgets, monkeypatch):
+        monkeypatch.setattr(connection_manager_module, "USER_REMOVAL_SECONDS", 0.01)
+        metric = f"broadcast.fanout_seconds{{room={ROOM}}}"
+
+        async def scenario():
+            alice = FakeSocket()
+            manager = make_room(alice=alice)
+            await manager.update_room_data(ROOM, {"event_type": "seat_change", "data": {}})
+            observed = metric in connection_manager_module.metrics.histograms
+            await manager.remove_connection(alice, ROOM, "alice")
+            await asyncio.sleep(0.05)
+            return observed, manager
+
+        observed, manager = run(scenario)
+        assert observed
+        assert ROOM not in manager.room_users
+        assert metric not in connection_manager_module.metrics.histograms
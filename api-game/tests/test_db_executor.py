@@ -0,0 +1,89 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Event-loop responsiveness under slow persistence.
+
+Handlers reach Mongo through db_executor.run_db, so a slow write must cost
+the *calling* coroutine its latency and nobody else. These tests slow
+GameService down with time.sleep (no Mongo needed) and measure how late a
+10 ms ticker wakes up while handlers are waiting on it.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from db_executor import run_db
+from gameservice import GameService
+from websocket_handlers.connection_manager import ConnectionManager
+
+SLOW_CALL_SECONDS = 0.2
+TICK_SECONDS = 0.01
+MAX_LOOP_LAG_SECONDS = 0.05
+
+
+async def measure_loop_lag(work) -> float:
+    """Run `work` alongside a ticker; return the ticker's worst oversleep."""
+    worst_lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst_lag
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            worst_lag = max(worst_lag, time.perf_counter() - started - TICK_SECONDS)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    try:
+        await work()
+    finally:
+        done.set()
+        await ticker_task
+    return worst_lag
+
+
+def slow_get_room(id):
+    time.sleep(SLOW_CALL_SECONDS)
+    return {"player_metadata": {}, "dungeon_master": {}}
+
+
+class TestRunDb:
+    def test_returns_result(self):
+        assert asyncio.run(run_db(lambda a, b=0: a + b, 2, b=3)) == 5
+
+    def test_propagates_exceptions(self):
+        def boom():
+            raise RuntimeError("mongo down")
+
+        with pytest.raises(RuntimeError, match="mongo down"):
+            asyncio.run(run_db(boom))
+
+
+class TestLoopLag:
+    def test_probe_detects_blocking_call(self):
+        """Sanity check: the probe must see a sync sleep on the loop."""
+        async def blocking_work():
+            slow_get_room("room-1")
+
+        lag = asyncio.run(measure_loop_lag(blocking_work))
+        assert lag > MAX_LOOP_LAG_SECONDS
+
+    def test_slow_mongo_does_not_stall_loop(self, monkeypatch):
+        monkeypatch.setattr(GameService, "get_room_core", staticmethod(slow_get_room))
+        manager = ConnectionManager()
+        room_ids = [f"room-{index}" for index in range(4)]
+        for room_id in room_ids:
+            manager.backplane.presence[room_id] = {
+                "user-1": {"is_in_party": False, "status": "disconnecting"},
+            }
+
+        async def concurrent_lobby_updates():
+            await asyncio.gather(*(manager.broadcast_lobby_update(room_id) for room_id in room_ids))
+
+        lag = asyncio.run(measure_loop_lag(concurrent_lobby_updates))
+        assert lag < MAX_LOOP_LAG_SECONDS
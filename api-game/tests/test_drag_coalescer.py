@@ -0,0 +1,117 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Unit tests for live-drag frame coalescing: latest position per hold,
+one batch per tick, flush-time relay checks, and room teardown.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import asyncio
+
+from websocket_handlers.drag_coalescer import DragCoalescer
+
+ROOM = "room-1"
+TICK_HZ = 100  # 10 ms ticks keep the tests fast
+
+
+def frame(token_id, x, holder="alice", asset_id="map-1"):
+    return {"asset_id": asset_id, "token_id": token_id, "phase": "move",
+            "x": x, "y": 0.0, "holder_user_id": holder}
+
+
+class Recorder:
+    def __init__(self):
+        self.sent = []
+
+    async def __call__(self, room_id, message):
+        self.sent.append((room_id, message))
+
+
+class TestCoalescing:
+    def test_latest_frame_per_hold_in_one_batch(self):
+        async def scenario():
+            coalescer = DragCoalescer(tick_hz=TICK_HZ)
+            broadcast = Recorder()
+            for x in range(10):
+                coalescer.offer(ROOM, frame("goblin", float(x)), broadcast)
+            coalescer.offer(ROOM, frame("elara", 5.0, holder="bob"), broadcast)
+            await asyncio.sleep(0.05)
+            return broadcast.sent
+
+        sent = asyncio.run(scenario())
+        assert len(sent) == 1
+        room_id, message = sent[0]
+        assert room_id == ROOM
+        assert message["event_type"] == "map_token_drag_batch"
+        positions = {f["token_id"]: f["x"] for f in message["data"]["frames"]}
+        assert positions == {"goblin": 9.0, "elara": 5.0}
+
+    def test_flush_task_exits_when_idle_and_restarts(self):
+        async def scenario():
+            coalescer = DragCoalescer(tick_hz=TICK_HZ)
+            broadcast = Recorder()
+            coalescer.offer(ROOM, frame("goblin", 1.0), broadcast)
+            await asyncio.sleep(0.05)
+            idle = ROOM not in coalescer._tasks
+            coalescer.offer(ROOM, frame("goblin", 2.0), broadcast)
+            await asyncio.sleep(0.05)
+            return idle, [m["data"]["frames"][0]["x"] for _, m in broadcast.sent]
+
+        idle, xs = asyncio.run(scenario())
+        assert idle
+        assert xs == [1.0, 2.0]
+
+    def test_same_token_id_on_two_maps_kept_apart(self):
+        async def scenario():
+            coalescer = DragCoalescer(tick_hz=TICK_HZ)
+            broadcast = Recorder()
+            coalescer.offer(ROOM, frame("stamp", 1.0, asset_id="map-1"), broadcast)
+            coalescer.offer(ROOM, frame("stamp", 2.0, asset_id="map-2"), broadcast)
+            await asyncio.sleep(0.05)
+            return broadcast.sent
+
+        (_, message), = asyncio.run(scenario())
+        assert len(message["data"]["frames"]) == 2
+
+
+class TestRelayChecks:
+    def test_unrelayable_frames_dropped_at_flush(self):
+        hidden = set()
+
+        async def scenario():
+            coalescer = DragCoalescer(
+                tick_hz=TICK_HZ,
+                is_relayable=lambda room_id, f: f["token_id"] not in hidden,
+            )
+            broadcast = Recorder()
+            coalescer.offer(ROOM, frame("goblin", 1.0), broadcast)
+            coalescer.offer(ROOM, frame("elara", 1.0), broadcast)
+            hidden.add("goblin")  # hidden mid-hold, before the tick
+            await asyncio.sleep(0.05)
+            return broadcast.sent
+
+        (_, message), = asyncio.run(scenario())
+        assert [f["token_id"] for f in message["data"]["frames"]] == ["elara"]
+
+    def test_discard_drops_pending_frame(self):
+        async def scenario():
+            coalescer = DragCoalescer(tick_hz=TICK_HZ)
+            broadcast = Recorder()
+            coalescer.offer(ROOM, frame("goblin", 1.0), broadcast)
+            coalescer.discard(ROOM, "map-1", "goblin")
+            await asyncio.sleep(0.05)
+            return broadcast.sent
+
+        assert asyncio.run(scenario()) == []
+
+    def test_close_room_cancels_flush(self):
+        async def scenario():
+            coalescer = DragCoalescer(tick_hz=TICK_HZ)
+            broadcast = Recorder()
+            coalescer.offer(ROOM, frame("goblin", 1.0), broadcast)
+            coalescer.close_room(ROOM)
+            await asyncio.sleep(0.05)
+            return broadcast.sent
+
+        assert asyncio.run(scenario()) == []
@@ -0,0 +1,198 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Content-addressed fog masks: the blob stores, inline -> ref on the way
+in, ref -> inline for the ETL out, and MapService skipping writes of an
+unchanged fog config.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import base64
+
+import pytest
+
+from fog_masks import (
+    FilesystemMaskStore,
+    MaskStore,
+    MongoMaskStore,
+    encode_mask_data_url,
+    hydrate_fog_masks,
+    mask_content_hash,
+    store_fog_masks,
+)
+from mapservice import MapService
+
+PNG_A = b"\x89PNG\r\n\x1a\nmask-a"
+PNG_B = b"\x89PNG\r\n\x1a\nmask-b"
+
+
+def region(region_id, png_bytes=None, **overrides):
+    return {
+        "id": region_id, "name": "Region", "enabled": True, "role": "prepped",
+        "mask": encode_mask_data_url(png_bytes) if png_bytes else None, "mask_hash": None,
+        "mask_width": 64, "mask_height": 64, **overrides,
+    }
+
+
+class FakeMaskCollection:
+    """The slice of a pymongo collection MongoMaskStore uses."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def count_documents(self, filter_criteria, limit=0):
+        return int(filter_criteria["_id"] in self.docs)
+
+    def find_one(self, filter_criteria):
+        return self.docs.get(filter_criteria["_id"])
+
+    def update_one(self, filter_criteria, update_doc, upsert=False):
+        if filter_criteria["_id"] not in self.docs:
+            self.docs[filter_criteria["_id"]] = {"_id": filter_criteria["_id"], **update_doc["$setOnInsert"]}
+
+
+class CountingStore(MaskStore):
+    def __init__(self):
+        self.blobs = {}
+        self.puts = 0
+
+    def has(self, mask_hash):
+        return mask_hash in self.blobs
+
+    def get(self, mask_hash):
+        return self.blobs.get(mask_hash)
+
+    def put(self, mask_hash, png_bytes):
+        self.puts += 1
+        self.blobs[mask_hash] = png_bytes
+
+
+@pytest.fixture(params=["mongo", "filesystem"])
+def store(request, tmp_path):
+    if request.param == "mongo":
+        return MongoMaskStore(FakeMaskCollection())
+    return FilesystemMaskStore(str(tmp_path / "fog-masks"))
+
+
+class TestMaskStores:
+    def test_put_get_roundtrip(self, store):
+        mask_hash = mask_content_hash(PNG_A)
+        assert not store.has(mask_hash)
+        assert store.get(mask_hash) is None
+        store.put(mask_hash, PNG_A)
+        assert store.has(mask_hash)
+        assert store.get(mask_hash) == PNG_A
+
+    def test_put_is_write_once(self, store):
+        mask_hash = mask_content_hash(PNG_A)
+        store.put(mask_hash, PNG_A)
+        store.put(mask_hash, PNG_B)
+        assert store.get(mask_hash) == PNG_A
+
+    def test_filesystem_rejects_non_hash_keys(self, tmp_path):
+        filesystem_store = FilesystemMaskStore(str(tmp_path))
+        with pytest.raises(ValueError):
+            filesystem_store.get("../../etc/passwd")
+
+
+class TestStoreFogMasks:
+    def test_inline_masks_become_refs(self):
+        store = CountingStore()
+        stored = store_fog_masks({"version": 2, "regions": [region("a", PNG_A), region("b")]}, store)
+        assert stored["regions"][0]["mask"] is None
+        assert stored["regions"][0]["mask_hash"] == mask_content_hash(PNG_A)
+        assert stored["regions"][1] == region("b")
+        assert store.blobs == {mask_content_hash(PNG_A): PNG_A}
+
+    def test_unchanged_mask_is_not_rewritten(self):
+        store = CountingStore()
+        first = store_fog_masks({"version": 2, "regions": [region("a", PNG_A)]}, store)
+        # Same pixels re-sent inline, and the ref form sent back: no new blobs
+        store_fog_masks({"version": 2, "regions": [region("a", PNG_A)]}, store)
+        assert store_fog_masks(first, store) == first
+        assert store.puts == 1
+
+    def test_identical_masks_share_one_blob(self):
+        store = CountingStore()
+        stored = store_fog_masks({"version": 2, "regions": [region("a", PNG_A), region("b", PNG_A)]}, store)
+        assert stored["regions"][0]["mask_hash"] == stored["regions"][1]["mask_hash"]
+        assert store.puts == 1
+
+    def test_unknown_hash_rejected(self):
+        with pytest.raises(ValueError):
+            store_fog_masks({"version": 2, "regions": [region("a", mask_hash="0" * 64)]}, CountingStore())
+
+    def test_malformed_mask_rejected(self):
+        bad_regions = [
+            region("a", mask="data:image/jpeg;base64,AAAA"),
+            region("a", mask="data:image/png;base64,not base64!"),
+        ]
+        for bad_region in bad_regions:
+            with pytest.raises(ValueError):
+                store_fog_masks({"version": 2, "regions": [bad_region]}, CountingStore())
+
+    def test_cleared_fog_passes_through(self):
+        assert store_fog_masks(None, CountingStore()) is None
+
+    def test_input_not_mutated(self):
+        fog_config = {"version": 2, "regions": [region("a", PNG_A)]}
+        store_fog_masks(fog_config, CountingStore())
+        assert fog_config["regions"][0]["mask"] == encode_mask_data_url(PNG_A)
+
+
+class TestHydrateFogMasks:
+    def test_roundtrip_restores_inline_masks(self):
+        store = CountingStore()
+        fog_config = {"version": 2, "regions": [region("a", PNG_A), region("b")]}
+        assert hydrate_fog_masks(store_fog_masks(fog_config, store), store) == fog_config
+
+    def test_inline_regions_untouched(self):
+        fog_config = {"version": 2, "regions": [region("a", PNG_A)]}
+        assert hydrate_fog_masks(fog_config, CountingStore()) == fog_config
+
+    def test_missing_blob_leaves_region_unpainted(self):
+        hydrated = hydrate_fog_masks({"version": 2, "regions": [region("a", mask_hash="0" * 64)]}, CountingStore())
+        assert hydrated["regions"][0]["mask"] is None
+        assert hydrated["regions"][0]["mask_hash"] is None
+
+    def test_data_url_is_standard_base64(self):
+        assert encode_mask_data_url(PNG_A) == "data:image/png;base64," + base64.b64encode(PNG_A).decode()
+
+
+class FakeMapCollection:
+    def __init__(self, doc):
+        self.doc = doc
+        self.updates = []
+
+    def find_one(self, filter_criteria):
+        return self.doc
+
+    def find_one_and_update(self, filter_criteria, update_doc, projection=None, return_document=None):
+        self.updates.append(update_doc)
+        self.doc["fog_revision"] = self.doc.get("fog_revision", 0) + update_doc["$inc"]["fog_revision"]
+        return {"fog_revision": self.doc["fog_revision"]}
+
+
+class TestUpdateFogConfig:
+    def make_service(self, fog_config):
+        map_service = MapService.__new__(MapService)
+        map_service.mask_store = CountingStore()
+        map_service.collection = FakeMapCollection({"map_config": {"filename": "map.png", "fog_config": fog_config}})
+        return map_service
+
+    def test_unchanged_config_is_not_rewritten(self):
+        map_service = self.make_service(None)
+        stored = map_service.store_fog_masks({"version": 2, "regions": [region("a", PNG_A)]})
+        map_service.collection.doc["map_config"]["fog_config"] = stored
+
+        assert map_service.update_fog_config("room-1", "map.png", stored) == 0
+        assert map_service.collection.updates == []
+
+    def test_changed_config_is_written(self):
+        map_service = self.make_service(None)
+        stored = map_service.store_fog_masks({"version": 2, "regions": [region("a", PNG_A)]})
+        assert map_service.update_fog_config("room-1", "map.png", stored) == 1
+        assert map_service.collection.updates == [
+            {"$set": {"map_config.fog_config": stored}, "$inc": {"fog_revision": 1}},
+        ]
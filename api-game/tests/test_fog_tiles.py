@@ -0,0 +1,278 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tiled fog masks: tile geometry, storing a client's dirty tiles, merging
+them into the stored fog_config, stitching tiles back for the ETL, and
+MapService's revision-guarded write.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from fog_masks import MaskStore, decode_mask_data_url, encode_mask_data_url, mask_content_hash
+from fog_tiles import (
+    FOG_MASK_MAX_PX,
+    FOG_TILE_PX,
+    compose_tiled_mask,
+    flatten_fog_tiles,
+    merge_fog_tiles,
+    png_dimensions,
+    store_tile_patches,
+    tile_dimensions,
+)
+from mapservice import MapService
+
+# 2x1 tiles: a full 256 square and a 44-px edge column
+MASK_WIDTH, MASK_HEIGHT = 300, 200
+
+
+def png(width, height, alpha=255):
+    out = io.BytesIO()
+    Image.new("RGBA", (width, height), (0, 0, 0, alpha)).save(out, format="PNG")
+    return out.getvalue()
+
+
+def corrupt_png(width, height):
+    """A PNG whose IHDR is sound but whose image data is garbage."""
+    png_bytes = bytearray(png(width, height))
+    data_start = png_bytes.index(b"IDAT") + 4
+    png_bytes[data_start:data_start + 8] = b"\xff" * 8
+    return bytes(png_bytes)
+
+
+def tile_url(width, height, alpha=255):
+    return encode_mask_data_url(png(width, height, alpha))
+
+
+def patch(region_id, tiles=None, reset=False, **overrides):
+    return {
+        "id": region_id, "name": "Region", "enabled": True, "role": "prepped",
+        "mask_width": MASK_WIDTH, "mask_height": MASK_HEIGHT,
+        "hide_feather_px": 20, "texture_dilate_px": 30, "opacity": 1.0,
+        "tiles": tiles or {}, "reset": reset, **overrides,
+    }
+
+
+class CountingStore(MaskStore):
+    def __init__(self):
+        self.blobs = {}
+        self.puts = 0
+
+    def has(self, mask_hash):
+        return mask_hash in self.blobs
+
+    def get(self, mask_hash):
+        return self.blobs.get(mask_hash)
+
+    def put(self, mask_hash, png_bytes):
+        self.puts += 1
+        self.blobs[mask_hash] = png_bytes
+
+
+class TestTileGeometry:
+    def test_edge_tiles_are_cut_to_the_mask(self):
+        assert tile_dimensions(MASK_WIDTH, MASK_HEIGHT, "0,0") == (FOG_TILE_PX, MASK_HEIGHT)
+        assert tile_dimensions(MASK_WIDTH, MASK_HEIGHT, "1,0") == (MASK_WIDTH - FOG_TILE_PX, MASK_HEIGHT)
+
+    def test_out_of_mask_and_malformed_keys_rejected(self):
+        for key in ("2,0", "0,1", "a,b", "0.0", "-1,0"):
+            with pytest.raises(ValueError):
+                tile_dimensions(MASK_WIDTH, MASK_HEIGHT, key)
+
+    def test_png_dimensions_reads_ihdr(self):
+        assert png_dimensions(png(44, 200)) == (44, 200)
+        with pytest.raises(ValueError):
+            png_dimensions(b"GIF89a" + b"\0" * 32)
+
+
+class TestStoreTilePatches:
+    def test_tiles_become_hashes(self):
+        store = CountingStore()
+        stored = store_tile_patches([patch("a", {"1,0": tile_url(44, 200), "0,0": None})], store)
+        tile_hash = mask_content_hash(png(44, 200))
+        assert stored[0]["tiles"] == {"1,0": tile_hash, "0,0": None}
+        assert store.blobs == {tile_hash: png(44, 200)}
+
+    def test_identical_tiles_share_one_blob(self):
+        store = CountingStore()
+        store_tile_patches([patch("a", {"0,0": tile_url(256, 200)}), patch("b", {"0,0": tile_url(256, 200)})], store)
+        assert store.puts == 1
+
+    def test_wrong_tile_size_rejected(self):
+        with pytest.raises(ValueError):
+            store_tile_patches([patch("a", {"1,0": tile_url(256, 200)})], CountingStore())
+
+    def test_corrupt_tile_body_rejected(self):
+        corrupt = corrupt_png(44, 200)
+        assert png_dimensions(corrupt) == (44, 200)
+        store = CountingStore()
+        with pytest.raises(ValueError):
+            store_tile_patches([patch("a", {"1,0": encode_mask_data_url(corrupt)})], store)
+        assert store.blobs == {}
+
+    def test_tiles_without_mask_size_rejected(self):
+        with pytest.raises(ValueError):
+            store_tile_patches([patch("a", {"0,0": None}, mask_width=None)], CountingStore())
+
+    def test_oversized_mask_rejected(self):
+        huge = 2 ** 31 - 1
+        with pytest.raises(ValueError):
+            store_tile_patches([patch("a", {"0,0": None}, mask_width=huge, mask_height=huge)], CountingStore())
+        with pytest.raises(ValueError):
+            merge_fog_tiles(None, [patch("a", mask_width=FOG_MASK_MAX_PX + 1)])
+
+    def test_metadata_only_patch_needs_no_size(self):
+        stored = store_tile_patches([patch("a", mask_width=None, mask_height=None)], CountingStore())
+        assert stored[0]["tiles"] == {}
+
+
+class TestMergeFogTiles:
+    def test_tiles_merge_into_stored_map(self):
+        stored = {"version": 2, "regions": [{**patch("a"), "mask_tiles": {"0,0": "a" * 64, "1,0": "b" * 64}}]}
+        for key in ("tiles", "reset"):
+            del stored["regions"][0][key]
+
+        merged, diffs = merge_fog_tiles(stored, [patch("a", {"1,0": "c" * 64, "0,0": None})])
+
+        assert merged["regions"][0]["mask_tiles"] == {"1,0": "c" * 64}
+        assert diffs[0]["tiles"] == {"1,0": "c" * 64, "0,0": None}
+        assert diffs[0]["reset"] is False
+        assert "mask_tiles" not in diffs[0]
+
+    def test_never_painted_region_starts_empty(self):
+        merged, _diffs = merge_fog_tiles(None, [patch("a", {"0,0": "a" * 64})])
+        assert merged["regions"][0]["mask_tiles"] == {"0,0": "a" * 64}
+        assert merged["regions"][0]["mask_hash"] is None
+
+    def test_whole_mask_needs_a_reset(self):
+        stored = {"version": 2, "regions": [{"id": "a", "mask_hash": "a" * 64, "mask_width": MASK_WIDTH, "mask_height": MASK_HEIGHT}]}
+        with pytest.raises(ValueError):
+            merge_fog_tiles(stored, [patch("a", {"0,0": "b" * 64})])
+
+        merged, diffs = merge_fog_tiles(stored, [patch("a", {"0,0": "b" * 64}, reset=True)])
+        assert merged["regions"][0]["mask_hash"] is None
+        assert merged["regions"][0]["mask_tiles"] == {"0,0": "b" * 64}
+        assert diffs[0]["reset"] is True
+
+    def test_resize_needs_a_reset(self):
+        stored = {"version": 2, "regions": [{"id": "a", "mask_tiles": {}, "mask_width": 512, "mask_height": 512}]}
+        with pytest.raises(ValueError):
+            merge_fog_tiles(stored, [patch("a", {"0,0": "b" * 64})])
+
+    def test_metadata_only_keeps_pixels_and_drops_missing_regions(self):
+        stored = {"version": 2, "regions": [
+            {"id": "a", "mask_hash": "a" * 64, "mask_width": MASK_WIDTH, "mask_height": MASK_HEIGHT},
+            {"id": "b", "mask_tiles": {"0,0": "b" * 64}, "mask_width": MASK_WIDTH, "mask_height": MASK_HEIGHT},
+        ]}
+        merged, diffs = merge_fog_tiles(stored, [patch("a", enabled=False, mask_width=None)])
+
+        assert [region["id"] for region in merged["regions"]] == ["a"]
+        assert merged["regions"][0]["enabled"] is False
+        assert merged["regions"][0]["mask_hash"] == "a" * 64
+        assert merged["regions"][0]["mask_width"] == MASK_WIDTH
+        assert diffs[0]["tiles"] == {}
+
+    def test_contract_violations_rejected(self):
+        with pytest.raises(ValueError):
+            merge_fog_tiles(None, [patch("a", opacity=2.0)])
+        with pytest.raises(ValueError):
+            merge_fog_tiles(None, [patch("a", unknown_field=1)])
+
+
+class TestFlattenFogTiles:
+    def test_tiles_stitch_into_one_mask(self):
+        store = CountingStore()
+        stored = store_tile_patches([patch("a", {"1,0": tile_url(44, 200, alpha=128)})], store)
+        fog_config, _diffs = merge_fog_tiles(None, stored)
+
+        region = flatten_fog_tiles(fog_config, store)["regions"][0]
+
+        assert region["mask_tiles"] is None
+        with Image.open(io.BytesIO(decode_mask_data_url(region["mask"]))) as mask:
+            assert mask.size == (MASK_WIDTH, MASK_HEIGHT)
+            assert mask.getpixel((10, 10))[3] == 0
+            assert mask.getpixel((FOG_TILE_PX + 10, 10))[3] == 128
+
+    def test_empty_tile_map_is_unpainted(self):
+        fog_config = {"version": 2, "regions": [{"id": "a", "mask_tiles": {}, "mask_width": 300, "mask_height": 200}]}
+        assert flatten_fog_tiles(fog_config, CountingStore())["regions"][0]["mask"] is None
+
+    def test_missing_tile_left_transparent(self):
+        mask_png = compose_tiled_mask(MASK_WIDTH, MASK_HEIGHT, {"0,0": "0" * 64}, CountingStore())
+        with Image.open(io.BytesIO(mask_png)) as mask:
+            assert mask.getpixel((10, 10))[3] == 0
+
+    def test_uncomposable_region_dropped(self):
+        huge = 2 ** 31 - 1
+        fog_config = {"version": 2, "regions": [
+            {"id": "a", "mask_tiles": {"0,0": "0" * 64}, "mask_width": huge, "mask_height": huge},
+            {"id": "b", "mask_tiles": {}, "mask_width": 300, "mask_height": 200},
+        ]}
+        assert [region["id"] for region in flatten_fog_tiles(fog_config, CountingStore())["regions"]] == ["b"]
+
+    def test_corrupt_tile_left_transparent(self):
+        store = CountingStore()
+        store.put("1" * 64, corrupt_png(44, 200))
+        store.put("2" * 64, png(256, 200, alpha=128))
+        mask_png = compose_tiled_mask(MASK_WIDTH, MASK_HEIGHT, {"1,0": "1" * 64, "0,0": "2" * 64}, store)
+        with Image.open(io.BytesIO(mask_png)) as mask:
+            assert mask.getpixel((10, 10))[3] == 128
+            assert mask.getpixel((FOG_TILE_PX + 10, 10))[3] == 0
+
+
+class FakeRevisionCollection:
+    """active_maps doc with a fog revision; loses the first `conflicts`
+    guarded writes as if another writer got there first."""
+
+    def __init__(self, doc, conflicts=0):
+        self.doc = doc
+        self.conflicts = conflicts
+        self.updates = []
+
+    def find_one(self, filter_criteria):
+        return self.doc
+
+    def update_one(self, filter_criteria, update_doc):
+        class Result:
+            matched_count = 1
+
+        self.doc["fog_revision"] = self.doc.get("fog_revision", 0) + 1
+        if self.conflicts:
+            self.conflicts -= 1
+            Result.matched_count = 0
+        else:
+            self.updates.append((filter_criteria, update_doc))
+        return Result()
+
+
+class TestApplyFogTiles:
+    def make_service(self, doc, conflicts=0):
+        map_service = MapService.__new__(MapService)
+        map_service.mask_store = CountingStore()
+        map_service.collection = FakeRevisionCollection(doc, conflicts)
+        return map_service
+
+    def test_write_bumps_revision_guarded_on_base(self):
+        map_service = self.make_service({"map_config": {"filename": "map.png", "fog_config": None}})
+        update = map_service.apply_fog_tiles("room-1", "map.png", [patch("a", {"0,0": "a" * 64})])
+
+        assert (update["base_revision"], update["revision"]) == (0, 1)
+        [(filter_criteria, update_doc)] = map_service.collection.updates
+        assert filter_criteria["fog_revision"] == {"$in": [0, None]}
+        assert update_doc["$inc"] == {"fog_revision": 1}
+        assert update_doc["$set"]["map_config.fog_config"]["regions"][0]["mask_tiles"] == {"0,0": "a" * 64}
+
+    def test_lost_race_remerges_on_fresh_revision(self):
+        doc = {"map_config": {"filename": "map.png", "fog_config": None}, "fog_revision": 4}
+        map_service = self.make_service(doc, conflicts=1)
+        update = map_service.apply_fog_tiles("room-1", "map.png", [patch("a")])
+
+        assert (update["base_revision"], update["revision"]) == (5, 6)
+        assert map_service.collection.updates[0][0]["fog_revision"] == 5
+
+    def test_no_active_map(self):
+        assert self.make_service(None).apply_fog_tiles("room-1", "map.png", [patch("a")]) is None
@@ -8,9 +8,16 @@ Run from api-game/: python -m pytest tests/
 Pure math, no database or framework imports.
 """
 
+import random
+import struct
+
+import pytest
+
+from shared_contracts import grid_math
 from shared_contracts.grid_math import (
     grid_geometry_changed,
     grid_usable,
+    resnap_board_positions,
     resnap_token_position,
     snap_axis_nearest,
 )
@@ -132,3 +139,120 @@ class TestNearestSnapMirrorsClient:
         # Math.round(2.5) === 3 in JS; Python's round(2.5) is 2 (banker's).
         # The shared math must match the client.
         assert snap_axis_nearest(250.0, 0, 100.0, 2) == 300.0
+
+
+def bits(value):
+    """Exact IEEE-754 bits, so 0.0 vs -0.0 or a 1-ulp drift fails too."""
+    return struct.pack("<d", float(value))
+
+
+def random_grid(rng):
+    """A random usable grid; int or float fields, like both config sources."""
+    cell_size = rng.choice([rng.randint(8, 200), rng.uniform(8.0, 200.0), 100.0 / 3])
+    return make_grid(
+        grid_cell_size=cell_size,
+        offset_x=rng.choice([0, rng.randint(-300, 300), rng.uniform(-300.0, 300.0)]),
+        offset_y=rng.choice([0, rng.randint(-300, 300), rng.uniform(-300.0, 300.0)]),
+        grid_width=rng.choice([rng.randint(1, 60), 0, None]),
+        grid_height=rng.choice([rng.randint(1, 60), 0, None]),
+    )
+
+
+def random_anchor(rng, grid_config):
+    """Anchors on cell centers, corners, exact half-cells, or anywhere —
+    inside the grid, on its edge, and well outside it."""
+    cell_size = grid_config["grid_cell_size"]
+    origin = grid_config["offset_x"]
+    index = rng.randint(-10, 70)
+    return rng.choice([
+        origin + (index + 0.5) * cell_size,
+        origin + index * cell_size,
+        origin + (index + rng.choice([0.5, -0.5])) * cell_size,
+        rng.uniform(-2000.0, 12000.0),
+        float(rng.randint(-2000, 12000)),
+    ])
+
+
+def random_board(rng, grid_config, size):
+    xs = [random_anchor(rng, grid_config) for _ in range(size)]
+    ys = [random_anchor(rng, grid_config) for _ in range(size)]
+    footprints = [rng.randint(1, 4) for _ in range(size)]
+    return xs, ys, footprints
+
+
+def scalar_board(xs, ys, footprints, old_grid_config, new_grid_config):
+    pairs = [
+        resnap_token_position(x, y, footprint, old_grid_config, new_grid_config)
+        for x, y, footprint in zip(xs, ys, footprints)
+    ]
+    return [x for x, _y in pairs], [y for _x, y in pairs]
+
+
+@pytest.fixture(params=["numpy", "fallback"])
+def board_path(request, monkeypatch):
+    """Run each board test on the vectorized path and the scalar fallback."""
+    if request.param == "numpy":
+        if grid_math.np is None:
+            pytest.skip("numpy not installed")
+    else:
+        monkeypatch.setattr(grid_math, "np", None)
+    return request.param
+
+
+class TestBoardResnapMatchesScalar:
+    """resnap_board_positions is resnap_token_position over a whole board,
+    bit for bit. Seeded random boards stand in for a property-based run."""
+
+    @pytest.mark.parametrize("seed", range(40))
+    def test_random_boards_bit_identical(self, board_path, seed):
+        rng = random.Random(seed)
+        old_grid_config = random_grid(rng)
+        new_grid_config = random_grid(rng)
+        xs, ys, footprints = random_board(rng, old_grid_config, 250)
+
+        new_xs, new_ys = resnap_board_positions(xs, ys, footprints, old_grid_config, new_grid_config)
+        expected_xs, expected_ys = scalar_board(xs, ys, footprints, old_grid_config, new_grid_config)
+        assert [bits(x) for x in new_xs] == [bits(x) for x in expected_xs]
+        assert [bits(y) for y in new_ys] == [bits(y) for y in expected_ys]
+        assert all(type(value) is float for value in new_xs + new_ys)
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_gridless_history_matches_nearest_snap(self, board_path, seed):
+        rng = random.Random(1000 + seed)
+        new_grid_config = random_grid(rng)
+        xs, ys, footprints = random_board(rng, new_grid_config, 200)
+
+        for old_grid_config in (None, make_grid(enabled=False), make_grid(grid_cell_size=0)):
+            new_xs, new_ys = resnap_board_positions(xs, ys, footprints, old_grid_config, new_grid_config)
+            expected_xs = [
+                snap_axis_nearest(x, new_grid_config["offset_x"], new_grid_config["grid_cell_size"], footprint)
+                for x, footprint in zip(xs, footprints)
+            ]
+            expected_ys = [
+                snap_axis_nearest(y, new_grid_config["offset_y"], new_grid_config["grid_cell_size"], footprint)
+                for y, footprint in zip(ys, footprints)
+            ]
+            assert [bits(x) for x in new_xs] == [bits(x) for x in expected_xs]
+            assert [bits(y) for y in new_ys] == [bits(y) for y in expected_ys]
+
+    def test_unusable_new_grid_leaves_board(self, board_path):
+        xs, ys, footprints = [123.4, 350.0], [567.8, 650.0], [1, 2]
+        for new_grid_config in (None, make_grid(enabled=False), make_grid(grid_cell_size=None)):
+            assert resnap_board_positions(xs, ys, footprints, make_grid(), new_grid_config) == (xs, ys)
+
+    def test_edge_cases_against_scalar(self, board_path):
+        old_grid_config, new_grid_config = make_grid(), make_grid(grid_cell_size=80.0, grid_width=10, grid_height=4)
+        # half-cell boundaries, the last in-bounds cell/intersection, one past it, negatives
+        xs = [250.0, 1950.0, 2000.0, 2050.0, -50.0, -100.0, 0.0, 1850.0]
+        ys = [250.0, 950.0, 1000.0, 1050.0, -50.0, -100.0, 0.0, 650.0]
+        footprints = [2, 1, 2, 1, 1, 2, 4, 3]
+        assert resnap_board_positions(xs, ys, footprints, old_grid_config, new_grid_config) == scalar_board(
+            xs, ys, footprints, old_grid_config, new_grid_config
+        )
+
+    def test_empty_board(self, board_path):
+        assert resnap_board_positions([], [], [], make_grid(), make_grid(grid_cell_size=80.0)) == ([], [])
+
+    def test_length_mismatch_rejected(self):
+        with pytest.raises(ValueError):
+            resnap_board_positions([1.0, 2.0], [1.0], [1, 1], make_grid(), make_grid())
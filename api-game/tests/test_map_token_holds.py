@@ -1,12 +1,23 @@
 # Copyright (C) 2025 Matthew Davey
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-"""Unit tests for the in-memory map-token hold registry (product decision 11:
+"""Conformance tests for the map-token hold stores (product decision 11:
 first hand on the mini wins — concurrency, not ownership). Holds are keyed
 (asset_id, token_id) within a room: NPC stamps reuse one token id across
-maps, so per-board scoping is what stops cross-map interference."""
+maps, so per-board scoping is what stops cross-map interference.
 
-from map_token_holds import MapTokenHolds
+Every test runs against InMemoryHoldStore and RedisHoldStore (fakeredis +
+lupa for the Lua scripts, both from requirements-test.txt; the Redis run
+is skipped when they aren't installed).
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import asyncio
+
+import pytest
+
+from map_token_holds import InMemoryHoldStore, RedisHoldStore
 
 ROOM = "room-1"
 BOARD = "asset-1"
@@ -23,24 +34,54 @@ class FakeClock:
         self.now += seconds
 
 
-def make_holds(staleness_seconds=10.0):
-    clock = FakeClock()
-    return MapTokenHolds(staleness_seconds=staleness_seconds, clock=clock), clock
+class SyncHolds:
+    """Drives a store's coroutines on one loop so the tests read top-down."""
+
+    def __init__(self, store, loop):
+        self._store = store
+        self._loop = loop
+
+    def __getattr__(self, name):
+        method = getattr(self._store, name)
+        return lambda *args: self._loop.run_until_complete(method(*args))
+
+
+@pytest.fixture(params=["memory", "redis"])
+def make_holds(request):
+    loop = asyncio.new_event_loop()
+    stores = []
+
+    def make(staleness_seconds=10.0):
+        clock = FakeClock()
+        if request.param == "memory":
+            store = InMemoryHoldStore(staleness_seconds=staleness_seconds, clock=clock)
+        else:
+            fakeredis = pytest.importorskip("fakeredis")
+            pytest.importorskip("lupa")
+            client = fakeredis.FakeAsyncRedis(decode_responses=True)
+            store = RedisHoldStore(client, staleness_seconds=staleness_seconds, clock=clock)
+        stores.append(store)
+        return SyncHolds(store, loop), clock
+
+    yield make
+    for store in stores:
+        loop.run_until_complete(store.close())
+    loop.close()
 
 
 class TestGrab:
-    def test_first_grab_wins(self):
+    def test_first_grab_wins(self, make_holds):
         holds, _clock = make_holds()
         assert holds.try_grab(ROOM, BOARD, "token-1", "alice") is None
         assert holds.holder(ROOM, BOARD, "token-1") == "alice"
 
-    def test_competing_grab_denied_with_holder(self):
+    def test_competing_grab_denied_with_holder(self, make_holds):
         holds, _clock = make_holds()
         holds.try_grab(ROOM, BOARD, "token-1", "alice")
         assert holds.try_grab(ROOM, BOARD, "token-1", "bob") == "alice"
         assert holds.holder(ROOM, BOARD, "token-1") == "alice"
 
-    def test_same_user_regrab_succeeds_and_refreshes(self):
+    def test_same_user_regrab_succeeds_and_refreshes(self, make_holds):
         holds, clock = make_holds(staleness_seconds=10.0)
         holds.try_grab(ROOM, BOARD, "token-1", "alice")
         clock.advance(7.0)
@@ -48,12 +89,12 @@ class TestGrab:
         clock.advance(7.0)  # 14s since first grab, 7s since refresh
         assert holds.holder(ROOM, BOARD, "token-1") == "alice"
 
-    def test_different_tokens_hold_independently(self):
+    def test_different_tokens_hold_independently(self, make_holds):
         holds, _clock = make_holds()
         assert holds.try_grab(ROOM, BOARD, "token-1", "alice") is None
         assert holds.try_grab(ROOM, BOARD, "token-2", "bob") is None
 
-    def test_same_token_id_on_different_boards_holds_independently(self):
+    def test_same_token_id_on_different_boards_holds_independently(self, make_holds):
         # NPC per-map stamps: one draft id, one token per board. A hold on
         # map A must not block (or be released by) the same id on map B.
         holds, _clock = make_holds()
@@ -62,30 +103,30 @@ class TestGrab:
         assert holds.holder(ROOM, "asset-a", "goblin") == "alice"
         assert holds.holder(ROOM, "asset-b", "goblin") == "bob"
 
-    def test_rooms_are_isolated(self):
+    def test_rooms_are_isolated(self, make_holds):
         holds, _clock = make_holds()
         holds.try_grab("room-1", BOARD, "token-1", "alice")
         assert holds.try_grab("room-2", BOARD, "token-1", "bob") is None
 
 
 class TestRelease:
-    def test_holder_release_clears(self):
+    def test_holder_release_clears(self, make_holds):
         holds, _clock = make_holds()
         holds.try_grab(ROOM, BOARD, "token-1", "alice")
         assert holds.release(ROOM, BOARD, "token-1", "alice") is True
         assert holds.holder(ROOM, BOARD, "token-1") is None
 
-    def test_non_holder_release_is_refused(self):
+    def test_non_holder_release_is_refused(self, make_holds):
         holds, _clock = make_holds()
         holds.try_grab(ROOM, BOARD, "token-1", "alice")
         assert holds.release(ROOM, BOARD, "token-1", "bob") is False
         assert holds.holder(ROOM, BOARD, "token-1") == "alice"
 
-    def test_release_of_unheld_token_is_refused(self):
+    def test_release_of_unheld_token_is_refused(self, make_holds):
         holds, _clock = make_holds()
         assert holds.release(ROOM, BOARD, "token-1", "alice") is False
 
-    def test_release_on_wrong_board_is_refused(self):
+    def test_release_on_wrong_board_is_refused(self, make_holds):
         holds, _clock = make_holds()
         holds.try_grab(ROOM, "asset-a", "goblin", "alice")
         assert holds.release(ROOM, "asset-b", "goblin", "alice") is False
@@ -93,20 +134,20 @@ class TestRelease:
 
 
 class TestStaleness:
-    def test_stale_hold_expires_lazily(self):
+    def test_stale_hold_expires_lazily(self, make_holds):
         holds, clock = make_holds(staleness_seconds=10.0)
         holds.try_grab(ROOM, BOARD, "token-1", "alice")
         clock.advance(11.0)
         assert holds.holder(ROOM, BOARD, "token-1") is None
 
-    def test_stale_hold_is_grabbable(self):
+    def test_stale_hold_is_grabbable(self, make_holds):
         holds, clock = make_holds(staleness_seconds=10.0)
         holds.try_grab(ROOM, BOARD, "token-1", "alice")
         clock.advance(11.0)
         assert holds.try_grab(ROOM, BOARD, "token-1", "bob") is None
         assert holds.holder(ROOM, BOARD, "token-1") == "bob"
 
-    def test_fresh_hold_does_not_expire(self):
+    def test_fresh_hold_does_not_expire(self, make_holds):
         holds, clock = make_holds(staleness_seconds=10.0)
         holds.try_grab(ROOM, BOARD, "token-1", "alice")
         clock.advance(9.0)
@@ -114,7 +155,7 @@ class TestStaleness:
 
 
 class TestDisconnectCleanup:
-    def test_releases_all_holds_for_user_across_boards(self):
+    def test_releases_all_holds_for_user_across_boards(self, make_holds):
         holds, _clock = make_holds()
         holds.try_grab(ROOM, "asset-a", "token-1", "alice")
         holds.try_grab(ROOM, "asset-b", "token-2", "alice")
@@ -127,8 +168,92 @@ class TestDisconnectCleanup:
         assert holds.holder(ROOM, "asset-b", "token-2") is None
         assert holds.holder(ROOM, "asset-a", "token-3") == "bob"
 
-    def test_clear_room_drops_everything(self):
+    def test_clear_room_drops_everything(self, make_holds):
         holds, _clock = make_holds()
         holds.try_grab(ROOM, BOARD, "token-1", "alice")
         holds.clear_room(ROOM)
         assert holds.holder(ROOM, BOARD, "token-1") is None
+
+    def test_clear_room_drops_hidden_flags(self, make_holds):
+        holds, _clock = make_holds()
+        holds.try_grab(ROOM, BOARD, "token-1", "alice")
+        holds.set_hidden_held(ROOM, BOARD, "token-1", True)
+        holds.clear_room(ROOM)
+        assert holds.is_hidden_held(ROOM, BOARD, "token-1") is False
+
+
+class TestRefresh:
+    def test_holder_refresh_resets_clock(self, make_holds):
+        holds, clock = make_holds(staleness_seconds=10.0)
+        holds.try_grab(ROOM, BOARD, "token-1", "alice")
+        clock.advance(7.0)
+        assert holds.refresh(ROOM, BOARD, "token-1", "alice") is True
+        clock.advance(7.0)
+        assert holds.holder(ROOM, BOARD, "token-1") == "alice"
+
+    def test_refresh_never_grabs(self, make_holds):
+        holds, _clock = make_holds()
+        assert holds.refresh(ROOM, BOARD, "token-1", "alice") is False
+        assert holds.holder(ROOM, BOARD, "token-1") is None
+
+    def test_non_holder_refresh_refused(self, make_holds):
+        holds, _clock = make_holds()
+        holds.try_grab(ROOM, BOARD, "token-1", "alice")
+        assert holds.refresh(ROOM, BOARD, "token-1", "bob") is False
+
+    def test_stale_hold_not_refreshed(self, make_holds):
+        holds, clock = make_holds(staleness_seconds=10.0)
+        holds.try_grab(ROOM, BOARD, "token-1", "alice")
+        clock.advance(11.0)
+        assert holds.refresh(ROOM, BOARD, "token-1", "alice") is False
+
+
+class TestHiddenHeld:
+    def test_flags_set_and_cleared_per_board(self, make_holds):
+        holds, _clock = make_holds()
+        holds.set_hidden_held(ROOM, "asset-a", "goblin", True)
+        assert holds.is_hidden_held(ROOM, "asset-a", "goblin") is True
+        assert holds.is_hidden_held(ROOM, "asset-b", "goblin") is False
+        assert holds.is_hidden_held("room-2", "asset-a", "goblin") is False
+
+        holds.set_hidden_held(ROOM, "asset-a", "goblin", False)
+        assert holds.is_hidden_held(ROOM, "asset-a", "goblin") is False
+
+
+class TestSharedRedis:
+    def test_workers_see_each_others_holds(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+
+        async def scenario():
+            server = fakeredis.FakeServer()
+            worker_a, worker_b = (
+                RedisHoldStore(fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+                for _ in range(2)
+            )
+            try:
+                first = await worker_a.try_grab(ROOM, BOARD, "token-1", "alice")
+                denied = await worker_b.try_grab(ROOM, BOARD, "token-1", "bob")
+                await worker_a.release_all_for_user(ROOM, "alice")
+                regrab = await worker_b.try_grab(ROOM, BOARD, "token-1", "bob")
+                return first, denied, regrab
+            finally:
+                await worker_a.close()
+                await worker_b.close()
+
+        assert asyncio.run(scenario()) == (None, "alice", None)
+
+    def test_holds_expire_in_redis(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+
+        async def scenario():
+            client = fakeredis.FakeAsyncRedis(decode_responses=True)
+            store = RedisHoldStore(client, staleness_seconds=10.0)
+            try:
+                await store.try_grab(ROOM, BOARD, "token-1", "alice")
+                return await client.pttl(f"rollplay:hold:{ROOM}:{BOARD}\ntoken-1")
+            finally:
+                await store.close()
+
+        assert 0 < asyncio.run(scenario()) <= 10_000
@@ -0,0 +1,263 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Unit tests for the per-board spatial index: footprint cell coverage on
+the odd/even lattice, occupancy, rectangle and collision queries, and
+GameService.apply_map_token_op keeping the index in step with the board
+and deciding conflicts on it.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from gameservice import GameService
+from map_token_index import BoardIndex, map_token_indexes, token_cell_span
+from map_token_ops import (
+    CONFLICT_DUPLICATE_TOKEN,
+    CONFLICT_REVISION_MISMATCH,
+    CONFLICT_STALE_BOARD,
+    CONFLICT_TOKEN_NOT_FOUND,
+    CONFLICT_VERSION_MISMATCH,
+    MapTokenConflict,
+    apply_map_token_op_to_board,
+)
+from room_state_cache import room_state_cache
+
+ROOM = "room-1"
+ASSET_ID = "asset-1"
+GRID = {"enabled": True, "grid_cell_size": 50, "offset_x": 0, "offset_y": 0,
+        "grid_width": 40, "grid_height": 40}
+
+
+def cell_anchor(col, row, footprint=1):
+    """Snapped anchor for a token whose top-left cell is (col, row)."""
+    return (col + footprint / 2) * 50, (row + footprint / 2) * 50
+
+
+def make_token(token_id, col, row, footprint=1, **overrides):
+    x, y = cell_anchor(col, row, footprint)
+    return {"id": token_id, "kind": "npc", "x": x, "y": y, "footprint": footprint,
+            "created_by": "dm", "updated_at": None, **overrides}
+
+
+class TestCellSpan:
+    @pytest.mark.parametrize("footprint", [1, 2, 3, 4])
+    def test_snapped_token_covers_its_footprint(self, footprint):
+        x, y = cell_anchor(5, 7, footprint)
+        assert token_cell_span(x, y, footprint, GRID) == (5, 7, footprint)
+
+    def test_offsets_shift_the_lattice(self):
+        grid = {**GRID, "offset_x": 20, "offset_y": -30}
+        assert token_cell_span(20 + 75, -30 + 25, 1, grid) == (1, 0, 1)
+
+    def test_unusable_grid_has_no_cells(self):
+        assert token_cell_span(25, 25, 1, {**GRID, "enabled": False}) is None
+        assert token_cell_span(25, 25, 1, None) is None
+
+
+class TestQueries:
+    def test_occupants_honour_footprint(self):
+        index = BoardIndex([make_token("ogre", 2, 2, footprint=2), make_token("goblin", 5, 5)])
+        for cell in [(2, 2), (3, 2), (2, 3), (3, 3)]:
+            assert [token["id"] for token in index.occupants(*cell, GRID)] == ["ogre"]
+        assert index.occupants(4, 4, GRID) == []
+        assert index.cell_occupied(5, 5, GRID)
+        assert not index.cell_occupied(5, 5, GRID, exclude_id="goblin")
+
+    def test_stacked_tokens_both_occupy(self):
+        index = BoardIndex([make_token("rider", 1, 1), make_token("mount", 1, 1)])
+        assert [token["id"] for token in index.occupants(1, 1, GRID)] == ["rider", "mount"]
+
+    def test_tokens_in_rect_board_order(self):
+        index = BoardIndex([make_token("c", 9, 9), make_token("a", 0, 0), make_token("b", 3, 1)])
+        assert [token["id"] for token in index.tokens_in_rect(0, 0, 3, 3, GRID)] == ["a", "b"]
+        assert [token["id"] for token in index.tokens_in_rect(-100, -100, 100, 100, GRID)] == ["c", "a", "b"]
+
+    def test_collisions_exclude_the_mover(self):
+        index = BoardIndex([make_token("ogre", 2, 2, footprint=2), make_token("goblin", 5, 5)])
+        x, y = cell_anchor(3, 3, 3)  # a 3x3 covering (3..5, 3..5)
+        assert [token["id"] for token in index.collisions(x, y, 3, GRID)] == ["ogre", "goblin"]
+        assert [token["id"] for token in index.collisions(x, y, 3, GRID, exclude_id="goblin")] == ["ogre"]
+
+    def test_put_and_remove_keep_cells_current(self):
+        index = BoardIndex([make_token("goblin", 1, 1)])
+        assert index.cell_occupied(1, 1, GRID)
+        index.put(make_token("goblin", 4, 4))
+        assert not index.cell_occupied(1, 1, GRID)
+        assert index.cell_occupied(4, 4, GRID)
+        index.remove("goblin")
+        assert not index.cell_occupied(4, 4, GRID)
+        assert len(index) == 0
+
+    def test_geometry_change_reindexes(self):
+        index = BoardIndex([make_token("goblin", 1, 1)])  # anchor (75, 75)
+        assert index.cell_occupied(1, 1, GRID)
+        bigger = {**GRID, "grid_cell_size": 100}
+        assert index.cell_occupied(0, 0, bigger)
+        assert not index.cell_occupied(1, 1, bigger)
+
+    def test_visible_tokens_follow_hide_and_reveal(self):
+        index = BoardIndex([make_token("goblin", 1, 1), make_token("ogre", 2, 2, hidden=True)])
+        assert [token["id"] for token in index.visible_tokens()] == ["goblin"]
+
+        index.put(make_token("ogre", 2, 2))
+        index.put(make_token("goblin", 1, 1, hidden=True))
+        assert [token["id"] for token in index.visible_tokens()] == ["ogre"]
+        index.remove("goblin")
+        assert [token["id"] for token in index.visible_tokens()] == ["ogre"]
+
+    def test_no_grid_no_spatial_answers(self):
+        index = BoardIndex([make_token("goblin", 1, 1)])
+        assert index.occupants(1, 1, None) == []
+        assert index.collisions(75, 75, 1, None) == []
+        assert index.get("goblin")["id"] == "goblin"
+
+
+def without_timestamps(tokens):
+    return [{**token, "updated_at": None} for token in tokens]
+
+
+class FakeCollection:
+    """Records each write's filter; matches unless told the stored board
+    has moved on (matches=False)."""
+
+    def __init__(self, matches=True):
+        self.matches = matches
+        self.filters = []
+
+    def find_one(self, filter_criteria):
+        return None  # every room the tests use is already cached
+
+    def update_one(self, filter_criteria, update_doc, upsert=False):
+        self.filters.append(filter_criteria)
+        return SimpleNamespace(matched_count=int(self.matches), modified_count=int(self.matches))
+
+
+@pytest.fixture
+def room(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(GameService, "_get_active_session", staticmethod(lambda: collection))
+    monkeypatch.setattr(GameService, "_get_collection", staticmethod(lambda name: collection))
+    board = [make_token("goblin", 1, 1, updated_at="t1"), make_token("ogre", 4, 4, footprint=2)]
+    room_state_cache.put(ROOM, {
+        "_id": ROOM,
+        "map_token_state": {ASSET_ID: board},
+        "map_token_revisions": {ASSET_ID: 3},
+        "map_token_player_revisions": {ASSET_ID: 2},
+    })
+    yield SimpleNamespace(board=board, collection=collection)
+    GameService.invalidate_room_cache(ROOM)
+
+
+class TestApplyMapTokenOp:
+    def test_board_and_index_track_every_op(self, room):
+        expected = list(room.board)
+        ops = [
+            ("place", make_token("elara", 8, 8, kind="pc"), None),
+            ("move", make_token("goblin", 6, 6), "goblin"),
+            ("configure", {**make_token("ogre", 4, 4, footprint=2), "label": "Grok", "hidden": True}, "ogre"),
+            ("remove", None, "elara"),
+        ]
+        for op, token, token_id in ops:
+            result = GameService.apply_map_token_op(ROOM, ASSET_ID, op, token=token, token_id=token_id)
+            expected = apply_map_token_op_to_board(
+                expected, op, token=token, token_id=token_id,
+                updated_at=result["token"]["updated_at"] if result["token"] else "",
+            )
+            assert without_timestamps(result["tokens"]) == without_timestamps(expected)
+
+        assert result["revision"] == 7
+        occupied = GameService.read_map_token_index(
+            ROOM, ASSET_ID, lambda index: [token["id"] for token in index.occupants(6, 6, GRID)]
+        )
+        assert occupied == ["goblin"]
+        assert GameService.read_map_token_index(
+            ROOM, ASSET_ID, lambda index: index.cell_occupied(1, 1, GRID)
+        ) is False
+
+    def test_stale_index_rebuilt_after_board_rewrite(self, room):
+        GameService.apply_map_token_op(ROOM, ASSET_ID, "move", token=make_token("goblin", 2, 2), token_id="goblin")
+        # A re-snap-style rewrite: new board, bumped revision, index untouched
+        room_state_cache.apply_update(ROOM, {
+            "$set": {f"map_token_state.{ASSET_ID}": [make_token("goblin", 9, 9)]},
+            "$inc": {f"map_token_revisions.{ASSET_ID}": 1},
+        })
+        assert GameService.read_map_token_index(
+            ROOM, ASSET_ID, lambda index: [token["id"] for token in index.occupants(9, 9, GRID)]
+        ) == ["goblin"]
+
+    def test_results_are_copies(self, room):
+        result = GameService.apply_map_token_op(ROOM, ASSET_ID, "move", token=make_token("goblin", 2, 2), token_id="goblin")
+        result["token"]["x"] = -1
+        result["tokens"][0]["x"] = -1
+        assert map_token_indexes.get(ROOM, ASSET_ID, 4).get("goblin")["x"] == cell_anchor(2, 2)[0]
+
+
+class TestRoomTokenContext:
+    def test_target_comes_from_the_index(self, room, monkeypatch):
+        GameService.apply_map_token_op(ROOM, ASSET_ID, "configure",
+                                       token={**make_token("ogre", 4, 4, footprint=2), "hidden": True},
+                                       token_id="ogre")
+        monkeypatch.setattr(GameService, "_board_index", staticmethod(
+            lambda room_id, asset_id, revision: map_token_indexes.get(room_id, asset_id, revision)))
+
+        _dm_user_id, _images, target, board = GameService.get_room_token_context(ROOM, ASSET_ID, "ogre")
+
+        assert target["id"] == "ogre" and target["hidden"]
+        assert [token["id"] for token in board["tokens"]] == ["goblin", "ogre"]
+        assert [token["id"] for token in board["visible_tokens"]] == ["goblin"]
+        assert (board["revision"], board["player_revision"]) == (4, 3)
+
+    def test_unknown_room_has_no_board(self, room):
+        assert GameService.get_room_token_context("room-missing", ASSET_ID, "goblin") == (None, {}, None, None)
+
+
+class TestMapTokenConflicts:
+    def conflict(self, **op_args):
+        with pytest.raises(MapTokenConflict) as raised:
+            GameService.apply_map_token_op(ROOM, ASSET_ID, **op_args)
+        return raised.value
+
+    def test_reasons_come_from_the_cached_board_without_a_write(self, room):
+        duplicate = self.conflict(op="place", token=make_token("goblin", 2, 2))
+        missing = self.conflict(op="move", token=make_token("wraith", 2, 2), token_id="wraith")
+
+        assert (duplicate.reason, missing.reason) == (CONFLICT_DUPLICATE_TOKEN, CONFLICT_TOKEN_NOT_FOUND)
+        assert duplicate.board["revision"] == 3
+        assert [token["id"] for token in duplicate.board["tokens"]] == ["goblin", "ogre"]
+        assert room.collection.filters == []
+
+    def test_expected_revision_counts_the_senders_view(self, room):
+        move = {"op": "move", "token": make_token("goblin", 2, 2), "token_id": "goblin"}
+        assert self.conflict(**move, expected_revision=2).reason == CONFLICT_REVISION_MISMATCH
+
+        GameService.apply_map_token_op(ROOM, ASSET_ID, **move, expected_revision=2, player_view=True)
+        [filter_criteria] = room.collection.filters
+        assert filter_criteria["player_revision"] == 2
+
+    def test_expected_version_guards_the_target(self, room):
+        move = {"op": "move", "token": make_token("goblin", 2, 2), "token_id": "goblin"}
+        assert self.conflict(**move, expected_version="t0").reason == CONFLICT_VERSION_MISMATCH
+        assert self.conflict(op="remove", token_id="wraith", expected_version="t1").reason == CONFLICT_VERSION_MISMATCH
+
+        GameService.apply_map_token_op(ROOM, ASSET_ID, **move, expected_version="t1")
+        [filter_criteria] = room.collection.filters
+        assert filter_criteria["tokens"] == {"$elemMatch": {"id": "goblin", "updated_at": "t1"}}
+
+    def test_write_miss_is_a_stale_board_and_drops_the_cache(self, room):
+        room.collection.matches = False
+        conflict = self.conflict(op="move", token=make_token("goblin", 2, 2), token_id="goblin")
+
+        assert (conflict.reason, conflict.board) == (CONFLICT_STALE_BOARD, None)
+        assert not room_state_cache.contains(ROOM)
+        assert map_token_indexes.get(ROOM, ASSET_ID, 3) is None
+
+    def test_stale_board_keeps_the_held_room_lock(self, room):
+        room.collection.matches = False
+        with room_state_cache.room_lock(ROOM) as held:
+            self.conflict(op="move", token=make_token("goblin", 2, 2), token_id="goblin")
+            with room_state_cache.room_lock(ROOM) as after:
+                assert after is held
@@ -11,11 +11,19 @@ GameService.apply_map_token_op executes atomically.
 import pytest
 
 from map_token_ops import (
+    CONFLICT_DUPLICATE_TOKEN,
+    CONFLICT_REVISION_MISMATCH,
+    CONFLICT_TOKEN_NOT_FOUND,
+    CONFLICT_VERSION_MISMATCH,
     VALID_MAP_TOKEN_OPS,
+    apply_map_token_op_to_board,
     build_map_token_update,
+    check_map_token_op,
     grid_cell_label,
     is_valid_asset_key,
     map_token_array_path,
+    player_view_changed,
+    with_revision_bump,
 )
 
 ASSET_ID = "asset-abc"
@@ -196,3 +204,102 @@ class TestAssetKeyGuard:
         assert is_valid_asset_key("") is False
         assert is_valid_asset_key(None) is False
         assert is_valid_asset_key(123) is False
+
+
+class TestLocalBoardApply:
+    """apply_map_token_op_to_board must produce the board Mongo produces
+    for the same op — the commit path writes it to the cache instead of
+    re-reading."""
+
+    def board(self):
+        return [make_token(id="token-1"), make_token(id="token-2", kind="npc", owner_user_id=None)]
+
+    def test_place_appends_stamped_token(self):
+        tokens = apply_map_token_op_to_board(
+            self.board(), "place", token=make_token(id="token-3"), updated_at="stamp"
+        )
+        assert [t["id"] for t in tokens] == ["token-1", "token-2", "token-3"]
+        assert tokens[-1]["updated_at"] == "stamp"
+
+    def test_move_sets_position_and_stamp_only(self):
+        tokens = apply_map_token_op_to_board(
+            self.board(), "move", token=make_token(id="token-2", x=5.0, y=6.0, label="ignored"),
+            token_id="token-2", updated_at="stamp"
+        )
+        assert tokens[1]["x"] == 5.0 and tokens[1]["y"] == 6.0
+        assert tokens[1]["updated_at"] == "stamp"
+        assert tokens[1]["label"] is None
+        assert tokens[0] == make_token(id="token-1")
+
+    def test_remove_filters_by_id_and_is_idempotent(self):
+        assert [t["id"] for t in apply_map_token_op_to_board(self.board(), "remove", token_id="token-1")] == ["token-2"]
+        assert apply_map_token_op_to_board(self.board(), "remove", token_id="absent") == self.board()
+
+    def test_configure_matches_update_spec(self):
+        payload = make_token(id="token-2", kind="npc", label="Ogre", footprint=2, owner_user_id=None, x=999.0)
+        tokens = apply_map_token_op_to_board(
+            self.board(), "configure", token={**payload, "hidden": True}, token_id="token-2", updated_at="stamp"
+        )
+        configured = tokens[1]
+        assert configured["label"] == "Ogre"
+        assert configured["footprint"] == 2
+        assert configured["hidden"] is True
+        assert configured["x"] == 100.0  # position is move's job
+        assert configured["updated_at"] == "stamp"
+
+    def test_input_board_not_mutated(self):
+        board = self.board()
+        apply_map_token_op_to_board(board, "move", token=make_token(x=1.0, y=1.0), token_id="token-1")
+        assert board == self.board()
+
+
+class TestRevisionBump:
+    def test_visible_op_bumps_both_counters(self):
+        _extra_filter, update_doc = build_map_token_update(ASSET_ID, "remove", token_id="token-1")
+        bumped = with_revision_bump(update_doc, ASSET_ID, player_visible=True)
+        assert bumped["$pull"] == update_doc["$pull"]
+        assert bumped["$inc"] == {
+            f"map_token_revisions.{ASSET_ID}": 1,
+            f"map_token_player_revisions.{ASSET_ID}": 1,
+        }
+
+    def test_hidden_only_op_leaves_player_revision_alone(self):
+        bumped = with_revision_bump({"$pull": {}}, ASSET_ID, player_visible=False)
+        assert bumped["$inc"] == {f"map_token_revisions.{ASSET_ID}": 1}
+
+    def test_player_view_changed_per_op(self):
+        hidden = make_token(hidden=True)
+        visible = make_token(hidden=False)
+        assert player_view_changed("place", None, visible)
+        assert not player_view_changed("place", None, hidden)
+        assert player_view_changed("move", visible, visible)
+        assert not player_view_changed("move", hidden, hidden)
+        assert not player_view_changed("remove", hidden, None)
+        assert player_view_changed("configure", hidden, visible)   # reveal
+        assert player_view_changed("configure", visible, hidden)   # hide
+        assert not player_view_changed("configure", hidden, hidden)
+
+
+class TestConditionalOps:
+    def test_unconditioned_ops_keep_their_semantics(self):
+        assert check_map_token_op("place", None, 5) is None
+        assert check_map_token_op("place", make_token(), 5) == CONFLICT_DUPLICATE_TOKEN
+        assert check_map_token_op("move", None, 5) == CONFLICT_TOKEN_NOT_FOUND
+        assert check_map_token_op("remove", None, 5) is None  # idempotent
+
+    def test_expected_revision_and_version(self):
+        token = make_token(updated_at="2026-07-20T12:00:00+00:00")
+        assert check_map_token_op("move", token, 5, expected_revision=4) == CONFLICT_REVISION_MISMATCH
+        assert check_map_token_op("move", token, 5, expected_revision=5) is None
+        assert check_map_token_op("configure", token, 5, expected_version="stale") == CONFLICT_VERSION_MISMATCH
+        assert check_map_token_op("remove", None, 5, expected_version=token["updated_at"]) == CONFLICT_VERSION_MISMATCH
+        assert check_map_token_op("move", token, 5, expected_version=token["updated_at"]) is None
+
+    def test_expected_version_narrows_the_positional_match(self):
+        version_match = {ARRAY_PATH: {"$elemMatch": {"id": "token-1", "updated_at": "v1"}}}
+        extra_filter, _update_doc = build_map_token_update(
+            ASSET_ID, "move", token=make_token(), token_id="token-1", expected_version="v1"
+        )
+        assert extra_filter == version_match
+        extra_filter, _update_doc = build_map_token_update(ASSET_ID, "remove", token_id="token-1", expected_version="v1")
+        assert extra_filter == version_match
@@ -0,0 +1,208 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Targeted player-scoped writes: the builders touch only the changed
+paths and guard on what the op was validated against, and GameService
+turns a guard miss into a conflict instead of a lost update.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from gameservice import GameService
+from player_metadata_ops import (
+    build_player_character_update,
+    build_player_role_update,
+    build_seat_layout_update,
+    player_metadata_path,
+)
+from room_state_cache import room_state_cache
+
+ROOM = "room-1"
+
+
+class TestPlayerMetadataPath:
+    def test_rejects_keys_that_are_not_one_segment(self):
+        for user_id in ("a.b", "$where", "", None, "a\x00b"):
+            with pytest.raises(ValueError):
+                player_metadata_path(user_id, "color")
+        with pytest.raises(ValueError):
+            player_metadata_path("alice", "hp.current")
+
+
+class TestBuildPlayerCharacterUpdate:
+    def test_sets_only_provided_fields(self):
+        update_doc = build_player_character_update({"user_id": "alice", "hp_current": 12, "ac": None})
+        assert update_doc == {"$set": {
+            "player_metadata.alice.hp_current": 12,
+            "player_metadata.alice.user_id": "alice",
+        }}
+
+    def test_requires_user_id(self):
+        with pytest.raises(ValueError):
+            build_player_character_update({"hp_current": 12})
+
+
+class TestBuildPlayerRoleUpdate:
+    def test_promotion_guards_against_a_seat(self):
+        assert build_player_role_update("alice", "mod") == (
+            {"seat_layout": {"$ne": "alice"}},
+            {"$set": {"player_metadata.alice.campaign_role": "mod"}},
+        )
+
+    def test_demotion_is_unconditional(self):
+        extra_filter, _update_doc = build_player_role_update("alice", "spectator")
+        assert extra_filter == {}
+
+
+class TestBuildSeatLayoutUpdate:
+    def test_taking_a_seat_writes_and_guards_that_seat(self):
+        extra_filter, update_doc = build_seat_layout_update(["alice", "empty", "empty"], ["alice", "bob", "empty"])
+
+        assert update_doc == {"$set": {"seat_layout.1": "bob"}}
+        assert extra_filter["seat_layout.1"] == "empty"
+        assert extra_filter["seat_layout"] == {"$nin": ["bob"]}
+        assert extra_filter["player_metadata.bob.character_id"] == {"$nin": [None, ""]}
+        assert extra_filter["player_metadata.bob.campaign_role"] == {"$ne": "mod"}
+        assert extra_filter["dungeon_master.user_id"] == {"$nin": ["bob"]}
+
+    def test_leaving_guards_only_the_seat(self):
+        extra_filter, update_doc = build_seat_layout_update(["alice", "bob"], ["alice", "empty"])
+        assert update_doc == {"$set": {"seat_layout.1": "empty"}}
+        assert extra_filter == {"seat_layout.1": "bob"}
+
+    def test_moving_needs_the_layout_as_read(self):
+        extra_filter, update_doc = build_seat_layout_update(["alice", "empty"], ["empty", "alice"])
+        assert update_doc == {"$set": {"seat_layout.0": "empty", "seat_layout.1": "alice"}}
+        assert extra_filter["seat_layout"] == ["alice", "empty"]
+
+    def test_resize_rewrites_the_layout(self):
+        extra_filter, update_doc = build_seat_layout_update(["alice", "empty"], ["alice", "empty", "empty"])
+        assert update_doc == {"$set": {"seat_layout": ["alice", "empty", "empty"]}}
+        assert extra_filter == {"seat_layout": ["alice", "empty"]}
+
+    def test_no_change(self):
+        assert build_seat_layout_update(["alice", "empty"], ["alice", "empty"]) == ({}, {})
+
+
+class FakeCollection:
+    """Loses the first `conflicts` guarded writes as if another writer
+    changed the room first; records the ones that land."""
+
+    def __init__(self, conflicts=0, room_exists=True):
+        self.conflicts = conflicts
+        self.room_exists = room_exists
+        self.updates = []
+
+    def update_one(self, filter_criteria, update_doc):
+        if not self.room_exists or self.conflicts:
+            self.conflicts -= 1
+            return SimpleNamespace(matched_count=0, modified_count=0)
+        self.updates.append((filter_criteria, update_doc))
+        return SimpleNamespace(matched_count=1, modified_count=1)
+
+    def count_documents(self, filter_criteria, limit=0):
+        return int(self.room_exists)
+
+    def find_one(self, filter_criteria):
+        return {"_id": ROOM, "seat_layout": ["alice", "bob"]} if self.room_exists else None
+
+
+class OverlapRecordingCollection(FakeCollection):
+    """Always loses the race, slowly, and records how many writes were
+    in flight at once — the room lock should make that one."""
+
+    def __init__(self):
+        super().__init__(conflicts=10**6)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.counter_lock = threading.Lock()
+
+    def update_one(self, filter_criteria, update_doc):
+        with self.counter_lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.005)
+        with self.counter_lock:
+            self.in_flight -= 1
+        return super().update_one(filter_criteria, update_doc)
+
+
+@pytest.fixture
+def seated_room(monkeypatch):
+    def install(collection):
+        monkeypatch.setattr(GameService, "_get_active_session", staticmethod(lambda: collection))
+        room_state_cache.put(ROOM, {
+            "_id": ROOM,
+            "seat_layout": ["alice", "empty"],
+            "dungeon_master": {"user_id": "dm"},
+            "player_metadata": {
+                "alice": {"character_id": "char-a"},
+                "bob": {"character_id": "char-b"},
+            },
+        })
+        return collection
+    yield install
+    GameService.invalidate_room_cache(ROOM)
+
+
+class TestGuardedWrites:
+    def test_seat_write_lands_and_mirrors(self, seated_room):
+        collection = seated_room(FakeCollection())
+        GameService.update_seat_layout(ROOM, ["alice", "bob"])
+
+        [(_filter_criteria, update_doc)] = collection.updates
+        assert update_doc == {"$set": {"seat_layout.1": "bob"}}
+        assert GameService.get_seat_layout(ROOM) == ["alice", "bob"]
+
+    def test_lost_race_is_a_conflict_and_drops_the_cache(self, seated_room):
+        seated_room(FakeCollection(conflicts=1))
+        with pytest.raises(ValueError):
+            GameService.update_seat_layout(ROOM, ["alice", "bob"])
+        assert not room_state_cache.contains(ROOM)
+
+    def test_vacate_retries_on_the_fresh_layout(self, seated_room):
+        collection = seated_room(FakeCollection(conflicts=1))
+        # Bob sat down meanwhile: the retry cold-loads ["alice", "bob"] and keeps him
+        assert GameService.vacate_seat(ROOM, "alice") == ["empty", "bob"]
+        assert collection.updates == [({"_id": ROOM, "seat_layout.0": "alice"}, {"$set": {"seat_layout.0": "empty"}})]
+
+    def test_promoting_a_seated_player_conflicts(self, seated_room):
+        seated_room(FakeCollection(conflicts=1))
+        with pytest.raises(ValueError, match="Seated players"):
+            GameService.update_player_role(ROOM, "alice", "mod")
+
+    def test_character_sync_is_one_targeted_set(self, seated_room):
+        collection = seated_room(FakeCollection())
+        GameService.update_player_character(ROOM, {"user_id": "alice", "hp_current": 3})
+
+        [(_filter_criteria, update_doc)] = collection.updates
+        assert set(update_doc["$set"]) == {"player_metadata.alice.hp_current", "player_metadata.alice.user_id"}
+        assert GameService.get_room(ROOM)["player_metadata"]["alice"] == {
+            "character_id": "char-a", "hp_current": 3, "user_id": "alice",
+        }
+
+    def test_conflicts_keep_writers_serialised_on_one_lock(self, seated_room):
+        collection = seated_room(OverlapRecordingCollection())
+        with room_state_cache.room_lock(ROOM) as lock_before:
+            pass
+
+        def promote():
+            for _attempt in range(3):
+                with pytest.raises(ValueError):
+                    GameService.update_player_role(ROOM, "alice", "mod")
+
+        threads = [threading.Thread(target=promote) for _thread in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert collection.max_in_flight == 1
+        with room_state_cache.room_lock(ROOM) as lock_after:
+            assert lock_after is lock_before
@@ -0,0 +1,154 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Unit tests for per-room event actors: serial arrival-order handling per
+room, isolation between rooms, bounded queues with ephemeral drop, and
+survival of failing handlers.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import asyncio
+
+from metrics import metrics
+from websocket_handlers.room_actor import RoomActorRegistry, is_ephemeral
+
+ROOM = "room-1"
+
+
+def record(log, label, delay=0.0):
+    async def job():
+        if delay:
+            await asyncio.sleep(delay)
+        log.append(label)
+    return job
+
+
+class TestOrdering:
+    def test_events_run_serially_in_arrival_order(self):
+        async def scenario():
+            registry = RoomActorRegistry()
+            log = []
+            # A slow first event must not let later ones overtake it.
+            await registry.submit(ROOM, "seat_change", record(log, "a", delay=0.05))
+            await registry.submit(ROOM, "player_kicked", record(log, "b"))
+            await registry.submit(ROOM, "seat_change", record(log, "c", delay=0.01))
+            await registry.get(ROOM).drain()
+            return log
+
+        assert asyncio.run(scenario()) == ["a", "b", "c"]
+
+    def test_rooms_do_not_block_each_other(self):
+        async def scenario():
+            registry = RoomActorRegistry()
+            log = []
+            await registry.submit("hot-room", "map_load", record(log, "hot", delay=0.2))
+            await registry.submit("quiet-room", "dice_roll", record(log, "quiet"))
+            await registry.get("quiet-room").drain()
+            quiet_done_first = log == ["quiet"]
+            await registry.get("hot-room").drain()
+            return quiet_done_first
+
+        assert asyncio.run(scenario())
+
+    def test_failing_handler_does_not_stop_actor(self):
+        async def scenario():
+            registry = RoomActorRegistry()
+            log = []
+
+            async def boom():
+                raise RuntimeError("handler bug")
+
+            await registry.submit(ROOM, "dice_roll", boom)
+            await registry.submit(ROOM, "dice_roll", record(log, "after"))
+            await registry.get(ROOM).drain()
+            return log
+
+        assert asyncio.run(scenario()) == ["after"]
+
+
+class TestBackpressure:
+    def test_ephemeral_frames_dropped_past_threshold(self):
+        async def scenario():
+            registry = RoomActorRegistry(max_size=8, ephemeral_drop_depth=2)
+            gate = asyncio.Event()
+            log = []
+
+            async def blocked():
+                await gate.wait()
+
+            await registry.submit(ROOM, "map_token_update", blocked)
+            await asyncio.sleep(0.01)  # worker picks up the blocked job
+            accepted = []
+            for index in range(4):
+                accepted.append(await registry.submit(
+                    ROOM, "map_token_drag", record(log, index), ephemeral=True
+                ))
+            # Durable events still queue past the ephemeral threshold.
+            durable_accepted = await registry.submit(ROOM, "map_token_update", record(log, "durable"))
+            gate.set()
+            await registry.get(ROOM).drain()
+            return accepted, durable_accepted, log
+
+        dropped_before = metrics.counters.get("room_actor.dropped_ephemeral", 0)
+        accepted, durable_accepted, log = asyncio.run(scenario())
+        assert accepted == [True, True, False, False]
+        assert durable_accepted is True
+        assert log == [0, 1, "durable"]
+        assert metrics.counters["room_actor.dropped_ephemeral"] == dropped_before + 2
+
+    def test_full_queue_parks_durable_submitter(self):
+        async def scenario():
+            registry = RoomActorRegistry(max_size=1)
+            gate = asyncio.Event()
+
+            async def blocked():
+                await gate.wait()
+
+            await registry.submit(ROOM, "a", blocked)
+            await asyncio.sleep(0.01)
+            await registry.submit(ROOM, "b", blocked)  # fills the queue
+            third = asyncio.create_task(registry.submit(ROOM, "c", blocked))
+            await asyncio.sleep(0.01)
+            parked = not third.done()
+            gate.set()
+            await third
+            await registry.get(ROOM).drain()
+            return parked
+
+        assert asyncio.run(scenario())
+
+
+class TestLifecycle:
+    def test_idle_actor_exits_and_is_replaced(self):
+        async def scenario():
+            registry = RoomActorRegistry(idle_seconds=0.01)
+            first = registry.get(ROOM)
+            await asyncio.sleep(0.05)
+            idle_exited = not first.running
+            second = registry.get(ROOM)
+            replaced = second is not first and second.running
+            registry.close_room(ROOM)
+            return idle_exited, replaced
+
+        assert asyncio.run(scenario()) == (True, True)
+
+    def test_wait_time_recorded(self):
+        async def scenario():
+            registry = RoomActorRegistry()
+            await registry.submit(ROOM, "dice_roll", record([], "x"))
+            await registry.get(ROOM).drain()
+
+        before = metrics.histograms.get("room_actor.queue_wait_seconds")
+        before_count = before.count if before else 0
+        asyncio.run(scenario())
+        assert metrics.histograms["room_actor.queue_wait_seconds"].count == before_count + 1
+
+
+class TestIsEphemeral:
+    def test_only_drag_moves_are_ephemeral(self):
+        assert is_ephemeral("map_token_drag", {"phase": "move"})
+        assert not is_ephemeral("map_token_drag", {"phase": "grab"})
+        assert not is_ephemeral("map_token_drag", {"phase": "release"})
+        assert not is_ephemeral("map_token_update", {"phase": "move"})
+        assert not is_ephemeral("map_token_drag", None)
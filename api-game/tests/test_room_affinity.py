@@ -0,0 +1,280 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Room affinity: consistent-hash placement, lease-based routing and
+handoff on rebalance. Two RoomAffinity instances sharing an
+InMemoryLeaseStore stand in for two workers.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import asyncio
+
+import pytest
+
+from websocket_handlers import room_affinity as room_affinity_module
+from websocket_handlers.room_affinity import (
+    HashRing,
+    InMemoryLeaseStore,
+    RedisLeaseStore,
+    RoomAffinity,
+    RoomUnavailable,
+)
+
+WORKER_A = "ws://worker-a:8081"
+WORKER_B = "ws://worker-b:8081"
+ROOMS = [f"room-{index}" for index in range(200)]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Worker:
+    """A RoomAffinity plus the rooms it has live sockets for."""
+
+    def __init__(self, store, worker_id):
+        self.affinity = RoomAffinity(store, worker_id=worker_id, lease_ttl=15)
+        self.active = set()
+        self.handed_off = []
+
+    async def hand_off(self, room_id):
+        self.handed_off.append(room_id)
+        self.active.discard(room_id)
+
+    async def join(self):
+        # start() without the background task: tests drive rebalance() directly
+        self.affinity._hand_off = self.hand_off
+        self.affinity._is_active = lambda room_id: room_id in self.active
+        await self.affinity._store.heartbeat(self.affinity.worker_id, 15)
+        await self.affinity._refresh_ring()
+
+    async def serve(self, room_id, forwarded=False):
+        target = await self.affinity.route(room_id, forwarded=forwarded)
+        if target is None:
+            self.active.add(room_id)
+        return target
+
+
+def owned_by(worker_id, workers):
+    ring = HashRing(workers)
+    return next(room_id for room_id in ROOMS if ring.owner(room_id) == worker_id)
+
+
+class TestHashRing:
+    def test_owner_is_deterministic(self):
+        first, second = HashRing([WORKER_A, WORKER_B]), HashRing([WORKER_B, WORKER_A])
+        assert [first.owner(room_id) for room_id in ROOMS] == [second.owner(room_id) for room_id in ROOMS]
+
+    def test_adding_a_worker_moves_a_minority(self):
+        before = HashRing([WORKER_A, WORKER_B])
+        after = HashRing([WORKER_A, WORKER_B, "ws://worker-c:8081"])
+        moved = [room_id for room_id in ROOMS if before.owner(room_id) != after.owner(room_id)]
+        assert 0 < len(moved) < len(ROOMS) / 2
+        assert all(after.owner(room_id) == "ws://worker-c:8081" for room_id in moved)
+
+    def test_empty_ring_has_no_owner(self):
+        assert HashRing().owner("room-1") is None
+
+
+class TestRouting:
+    def test_disabled_always_serves_locally(self):
+        assert asyncio.run(RoomAffinity(None).route("room-1")) is None
+
+    def test_single_worker_owns_everything(self):
+        async def scenario():
+            worker = Worker(InMemoryLeaseStore(Clock()), WORKER_A)
+            await worker.join()
+            return [await worker.serve(room_id) for room_id in ROOMS[:10]], worker
+
+        targets, worker = asyncio.run(scenario())
+        assert targets == [None] * 10
+        assert worker.affinity.owned_rooms == frozenset(ROOMS[:10])
+
+    def test_wrong_worker_gets_the_lease_holder(self):
+        async def scenario():
+            store = InMemoryLeaseStore(Clock())
+            worker_a, worker_b = Worker(store, WORKER_A), Worker(store, WORKER_B)
+            await worker_a.join()
+            await worker_b.join()
+            await worker_a.join()  # see B in the ring too
+            room_id = owned_by(WORKER_A, [WORKER_A, WORKER_B])
+            return await worker_b.serve(room_id), await worker_a.serve(room_id)
+
+        assert asyncio.run(scenario()) == (WORKER_A, None)
+
+    def test_forwarded_socket_never_forwarded_again(self):
+        async def scenario():
+            store = InMemoryLeaseStore(Clock())
+            worker_a, worker_b = Worker(store, WORKER_A), Worker(store, WORKER_B)
+            await worker_a.join()
+            await worker_b.join()
+            await worker_a.join()
+            room_id = owned_by(WORKER_A, [WORKER_A, WORKER_B])
+            await worker_a.serve(room_id)
+            await worker_b.serve(room_id, forwarded=True)
+
+        with pytest.raises(RoomUnavailable):
+            asyncio.run(scenario())
+
+    def test_dead_owner_lease_lapses(self):
+        async def scenario():
+            clock = Clock()
+            store = InMemoryLeaseStore(clock)
+            worker_a, worker_b = Worker(store, WORKER_A), Worker(store, WORKER_B)
+            await worker_a.join()
+            await worker_b.join()
+            await worker_a.join()
+            room_id = owned_by(WORKER_A, [WORKER_A, WORKER_B])
+            await worker_a.serve(room_id)
+
+            clock.now += 60  # A stops heartbeating and its lease expires
+            await worker_b.join()
+            return await worker_b.serve(room_id), worker_b.affinity.owned_rooms
+
+        target, owned = asyncio.run(scenario())
+        assert target is None
+        assert len(owned) == 1
+
+
+class TestRebalance:
+    def test_new_worker_takes_its_rooms(self):
+        async def scenario():
+            store = InMemoryLeaseStore(Clock())
+            worker_a, worker_b = Worker(store, WORKER_A), Worker(store, WORKER_B)
+            await worker_a.join()
+            for room_id in ROOMS[:20]:
+                await worker_a.serve(room_id)
+
+            await worker_b.join()
+            await worker_a.affinity.rebalance()
+            moved = list(worker_a.handed_off)
+            targets = [await worker_a.serve(room_id) for room_id in moved]
+            served_by_b = [await worker_b.serve(room_id) for room_id in moved]
+            return moved, targets, served_by_b, worker_a.affinity.owned_rooms
+
+        moved, targets, served_by_b, still_owned = asyncio.run(scenario())
+        ring = HashRing([WORKER_A, WORKER_B])
+        assert sorted(moved) == sorted(room_id for room_id in ROOMS[:20] if ring.owner(room_id) == WORKER_B)
+        assert moved
+        assert targets == [WORKER_B] * len(moved)
+        assert served_by_b == [None] * len(moved)
+        assert still_owned == frozenset(ROOMS[:20]) - set(moved)
+
+    def test_idle_rooms_release_their_lease(self):
+        async def scenario():
+            store = InMemoryLeaseStore(Clock())
+            worker = Worker(store, WORKER_A)
+            await worker.join()
+            await worker.serve("room-1")
+            worker.active.clear()
+            await worker.affinity.rebalance()
+            return worker, await store.holder("room-1")
+
+        worker, holder = asyncio.run(scenario())
+        assert holder is None
+        assert worker.affinity.owned_rooms == frozenset()
+        assert worker.handed_off == []
+
+    def test_stop_hands_off_everything(self):
+        async def scenario():
+            store = InMemoryLeaseStore(Clock())
+            worker = Worker(store, WORKER_A)
+            await worker.join()
+            for room_id in ROOMS[:3]:
+                await worker.serve(room_id)
+            await worker.affinity.stop()
+            return worker, [await store.holder(room_id) for room_id in ROOMS[:3]], await store.live_workers()
+
+        worker, holders, live = asyncio.run(scenario())
+        assert sorted(worker.handed_off) == sorted(ROOMS[:3])
+        assert holders == [None] * 3
+        assert live == []
+
+
+class TestRoomChanges:
+    """An HTTP write on one worker drops the room from every other
+    worker's cache, the owner's included."""
+
+    @staticmethod
+    async def changes_seen(store, publish):
+        worker_a, worker_b = RoomAffinity(store, WORKER_A), RoomAffinity(store, WORKER_B)
+        seen = {WORKER_A: [], WORKER_B: []}
+        listeners = [
+            asyncio.create_task(worker._listen(seen[worker.worker_id].append))
+            for worker in (worker_a, worker_b)
+        ]
+        await asyncio.sleep(0.05)  # let both subscribe
+        await publish(worker_a, worker_b)
+        await asyncio.sleep(0.05)
+        for listener in listeners:
+            listener.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+        return seen
+
+    def test_other_workers_drop_the_room(self):
+        async def publish(worker_a, worker_b):
+            await worker_b.publish_room_change("room-1")
+            await worker_a.publish_room_change("room-2")
+
+        seen = asyncio.run(self.changes_seen(InMemoryLeaseStore(Clock()), publish))
+        assert seen == {WORKER_A: ["room-1"], WORKER_B: ["room-2"]}
+
+    def test_changes_cross_redis(self):
+        fakeredis = pytest.importorskip("fakeredis")
+
+        async def publish(worker_a, worker_b):
+            await worker_b.publish_room_change("room-1")
+
+        async def scenario():
+            store = RedisLeaseStore(fakeredis.FakeAsyncRedis(decode_responses=True))
+            return await self.changes_seen(store, publish)
+
+        assert asyncio.run(scenario()) == {WORKER_A: ["room-1"], WORKER_B: []}
+
+    def test_disabled_publishes_nothing(self):
+        asyncio.run(RoomAffinity(None).publish_room_change("room-1"))
+
+
+class TestSignedForwarding:
+    """FORWARDED_HEADER and ?handoff= come in on client-reachable
+    sockets, so only values signed with the shared secret count."""
+
+    SECRET = "shared-secret"
+
+    def affinity(self, worker_id=WORKER_A, secret=SECRET):
+        return RoomAffinity(InMemoryLeaseStore(Clock()), worker_id, secret=secret)
+
+    def test_worker_signed_header_is_trusted(self):
+        header = self.affinity(WORKER_B).forwarded_by("room-1")
+        assert self.affinity().is_forwarded("room-1", header)
+
+    def test_spoofed_or_replayed_header_is_not(self):
+        header = self.affinity(WORKER_B).forwarded_by("room-1")
+        affinity = self.affinity()
+        assert not affinity.is_forwarded("room-1", WORKER_B)
+        assert not affinity.is_forwarded("room-1", f"{WORKER_B} {'0' * 64}")
+        assert not affinity.is_forwarded("room-2", header)
+        assert not self.affinity(secret="other-secret").is_forwarded("room-1", header)
+
+    def test_handoff_token_is_per_user_and_room(self):
+        token = self.affinity(WORKER_B).handoff_token("room-1", "alice")
+        affinity = self.affinity()
+        assert affinity.is_handoff("room-1", "alice", token)
+        assert not affinity.is_handoff("room-1", "bob", token)
+        assert not affinity.is_handoff("room-2", "alice", token)
+        assert not affinity.is_handoff("room-1", "alice", "1")
+        assert not affinity.is_handoff("room-1", "alice", None)
+
+    def test_handoff_token_expires(self, monkeypatch):
+        token = self.affinity().handoff_token("room-1", "alice")
+        monkeypatch.setattr(room_affinity_module.time, "time", lambda: 10 ** 12)
+        assert not self.affinity().is_handoff("room-1", "alice", token)
+
+    def test_without_a_secret_nothing_is_trusted(self):
+        header = self.affinity(WORKER_B).forwarded_by("room-1")
+        assert not self.affinity(secret=None).is_forwarded("room-1", header)
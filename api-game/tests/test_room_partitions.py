@@ -0,0 +1,217 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Split room storage: logical paths route to the partition doc that
+stores them, GameService loads only the parts a read needs, and a legacy
+single-doc room migrates on its first load.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import copy
+from types import SimpleNamespace
+
+import pytest
+
+from gameservice import GameService
+from room_partitions import (
+    AUDIO_COLLECTION,
+    BOARD_COLLECTION,
+    BOARDS_PART,
+    CORE_PART,
+    MEDIA_COLLECTION,
+    legacy_fields,
+    route_filter,
+    route_update,
+    split_room,
+)
+from room_state_cache import _set_path, room_state_cache
+
+ROOM = "room-1"
+ASSET_ID = "map-1"
+
+
+class TestRouting:
+    def test_paths_route_to_their_partition(self):
+        assert route_update({"$set": {
+            "seat_layout.1": "bob",
+            "audio_state.channel_A": {"volume": 1},
+            "token_images.img-1": {"url": "u"},
+        }}) == {
+            CORE_PART: {"$set": {"seat_layout.1": "bob"}},
+            "audio": {"$set": {"audio_state.channel_A": {"volume": 1}}},
+            "media": {"$set": {"token_images.img-1": {"url": "u"}}},
+        }
+
+    def test_board_paths_drop_the_asset_level(self):
+        target = (BOARDS_PART, ASSET_ID)
+        assert route_update({
+            "$set": {f"map_token_state.{ASSET_ID}.$.x": 3},
+            "$inc": {f"map_token_revisions.{ASSET_ID}": 1},
+        }) == {target: {"$set": {"tokens.$.x": 3}, "$inc": {"revision": 1}}}
+        assert route_filter({f"map_token_state.{ASSET_ID}.id": "goblin"}) == {target: {"tokens.id": "goblin"}}
+
+    def test_every_board_at_once_is_rejected(self):
+        with pytest.raises(ValueError):
+            route_update({"$set": {"map_token_state": {}}})
+
+
+class TestSplitRoom:
+    def test_split_fills_defaults_and_groups_boards(self):
+        core, partitions, boards = split_room({
+            "_id": ROOM,
+            "seat_layout": ["empty"],
+            "spotify": {"track": "t"},
+            "map_token_state": {ASSET_ID: [{"id": "goblin"}]},
+            "map_token_revisions": {ASSET_ID: 4},
+        })
+        assert core == {"_id": ROOM, "seat_layout": ["empty"]}
+        assert partitions["audio"] == {"audio_state": {}, "audio_track_config": {}, "spotify": {"track": "t"}}
+        assert boards == {ASSET_ID: {"tokens": [{"id": "goblin"}], "revision": 4, "player_revision": 0}}
+        assert legacy_fields(core) == []
+
+
+class FakeCollection:
+    """Just enough of a pymongo collection for the partition docs:
+    equality/$nin/$exists/$or filters and $set/$unset/$inc updates."""
+
+    def __init__(self, docs=()):
+        self.docs = {doc["_id"]: copy.deepcopy(doc) for doc in docs}
+        self.reads = 0
+
+    def _matches(self, doc, filter_criteria):
+        for field, condition in filter_criteria.items():
+            if field == "$or":
+                if not any(self._matches(doc, branch) for branch in condition):
+                    return False
+            elif isinstance(condition, dict) and "$exists" in condition:
+                if (field in doc) != condition["$exists"]:
+                    return False
+            elif isinstance(condition, dict) and "$nin" in condition:
+                if doc.get(field) in condition["$nin"]:
+                    return False
+            elif doc.get(field) != condition:
+                return False
+        return True
+
+    def find_one(self, filter_criteria):
+        self.reads += 1
+        return next((copy.deepcopy(doc) for doc in self.docs.values() if self._matches(doc, filter_criteria)), None)
+
+    def find(self, filter_criteria):
+        self.reads += 1
+        return [copy.deepcopy(doc) for doc in self.docs.values() if self._matches(doc, filter_criteria)]
+
+    def count_documents(self, filter_criteria, limit=0):
+        return len(self.find(filter_criteria))
+
+    def insert_one(self, doc):
+        self.docs[doc["_id"]] = copy.deepcopy(doc)
+
+    def replace_one(self, filter_criteria, doc, upsert=False):
+        self.docs[filter_criteria["_id"]] = {"_id": filter_criteria["_id"], **copy.deepcopy(doc)}
+
+    def update_one(self, filter_criteria, update_doc, upsert=False):
+        doc = self.docs.get(filter_criteria["_id"])
+        if doc is None and upsert:
+            doc = self.docs[filter_criteria["_id"]] = {"_id": filter_criteria["_id"], **update_doc.get("$setOnInsert", {})}
+            matched = 0
+        elif doc is None:
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+        else:
+            matched = 1
+        for path, value in update_doc.get("$set", {}).items():
+            _set_path(doc, path, copy.deepcopy(value))
+        for path in update_doc.get("$unset", {}):
+            doc.pop(path, None)
+        for path, value in update_doc.get("$inc", {}).items():
+            doc[path] = doc.get(path, 0) + value
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_id=None if matched else doc["_id"])
+
+    def delete_one(self, filter_criteria):
+        self.docs.pop(filter_criteria["_id"], None)
+
+    def delete_many(self, filter_criteria):
+        for doc in self.find(filter_criteria):
+            del self.docs[doc["_id"]]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    collections = {
+        "active_sessions": FakeCollection(),
+        AUDIO_COLLECTION: FakeCollection(),
+        MEDIA_COLLECTION: FakeCollection(),
+        BOARD_COLLECTION: FakeCollection(),
+    }
+    monkeypatch.setattr(GameService, "_get_active_session", staticmethod(lambda: collections["active_sessions"]))
+    monkeypatch.setattr(GameService, "_get_collection", staticmethod(lambda name: collections[name]))
+    yield collections
+    GameService.invalidate_room_cache(ROOM)
+
+
+class TestLazyLoad:
+    def test_core_read_leaves_the_other_parts_unread(self, db):
+        db["active_sessions"].insert_one({"_id": ROOM, "dungeon_master": {"user_id": "dm"}})
+        db[BOARD_COLLECTION].insert_one({"_id": f"{ROOM}:{ASSET_ID}", "room_id": ROOM, "asset_id": ASSET_ID, "tokens": [{"id": "goblin"}], "revision": 2})
+
+        assert GameService.get_dm_user_id(ROOM) == "dm"
+        assert db[AUDIO_COLLECTION].reads == db[BOARD_COLLECTION].reads == 0
+
+        assert GameService.get_map_tokens(ROOM, ASSET_ID) == [{"id": "goblin"}]
+        assert GameService.get_map_token_revisions(ROOM, ASSET_ID) == (2, 0)
+        assert db[BOARD_COLLECTION].reads == 1
+        assert db[AUDIO_COLLECTION].reads == 0
+
+    def test_write_lands_in_its_partition_and_reads_back(self, db):
+        db["active_sessions"].insert_one({"_id": ROOM})
+        GameService.update_audio_state(ROOM, "channel_A", {"volume": 0.5})
+
+        assert db[AUDIO_COLLECTION].docs[ROOM]["audio_state"] == {"channel_A": {"volume": 0.5}}
+        assert "audio_state" not in db["active_sessions"].docs[ROOM]
+        assert GameService.get_audio_state(ROOM) == {"channel_A": {"volume": 0.5}}
+
+    def test_partition_write_to_a_missing_room_is_a_miss(self, db):
+        GameService.update_spotify_state(ROOM, {"track": "t"})
+        assert db[AUDIO_COLLECTION].docs == {}
+
+
+class TestCreateAndMigrate:
+    def test_legacy_room_migrates_on_first_load(self, db):
+        db["active_sessions"].insert_one({
+            "_id": ROOM,
+            "seat_layout": ["empty"],
+            "audio_state": {"channel_A": {"volume": 1}},
+            "token_images": {"img-1": {"url": "u"}},
+            "map_token_state": {ASSET_ID: [{"id": "goblin"}]},
+            "map_token_revisions": {ASSET_ID: 7},
+        })
+
+        room = GameService.get_room(ROOM)
+
+        assert db["active_sessions"].docs[ROOM] == {"_id": ROOM, "seat_layout": ["empty"]}
+        assert db[BOARD_COLLECTION].docs[f"{ROOM}:{ASSET_ID}"]["revision"] == 7
+        assert room["map_token_state"] == {ASSET_ID: [{"id": "goblin"}]}
+        assert room["token_images"] == {"img-1": {"url": "u"}}
+        assert room["audio_state"] == {"channel_A": {"volume": 1}}
+
+    def test_startup_sweep_migrates_and_counts(self, db):
+        db["active_sessions"].insert_one({"_id": ROOM, "spotify": {"track": "t"}})
+        db["active_sessions"].insert_one({"_id": "room-2"})
+
+        with room_state_cache.room_lock(ROOM) as held:
+            assert GameService.migrate_legacy_rooms() == 1
+            with room_state_cache.room_lock(ROOM) as after:
+                assert after is held
+        assert db["active_sessions"].docs[ROOM] == {"_id": ROOM}
+        assert db[AUDIO_COLLECTION].docs[ROOM]["spotify"] == {"track": "t"}
+
+    def test_delete_takes_the_partitions_with_it(self, db):
+        db["active_sessions"].insert_one({"_id": ROOM})
+        GameService.save_track_config(ROOM, "track-1", {"volume": 0.2})
+        GameService.replace_map_token_board(ROOM, ASSET_ID, [])
+        assert db[BOARD_COLLECTION].docs
+
+        GameService.delete_room(ROOM)
+
+        assert all(not collection.docs for collection in db.values())
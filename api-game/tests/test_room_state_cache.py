@@ -0,0 +1,147 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Unit tests for the write-through room doc cache. apply_update must mirror
+exactly what Mongo does with the same $set/$unset document, or cached reads
+drift from the stored session.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import pytest
+
+from room_state_cache import RoomStateCache
+
+ROOM = "room-1"
+
+
+def make_cache():
+    cache = RoomStateCache()
+    cache.put(ROOM, {
+        "_id": ROOM,
+        "dungeon_master": {"user_id": "dm-1", "player_name": "Dee"},
+        "player_metadata": {"alice": {"player_name": "Alice", "campaign_role": "player"}},
+        "audio_track_config": {"track-1": {"volume": 0.5}},
+    })
+    return cache
+
+
+class TestReads:
+    def test_miss_returns_none_and_default(self):
+        cache = RoomStateCache()
+        assert cache.get(ROOM) is None
+        assert cache.read(ROOM, lambda doc: doc["seat_layout"], []) == []
+
+    def test_get_returns_isolated_copy(self):
+        cache = make_cache()
+        room = cache.get(ROOM)
+        room["player_metadata"]["alice"]["player_name"] = "Mallory"
+        assert cache.get(ROOM)["player_metadata"]["alice"]["player_name"] == "Alice"
+
+    def test_read_returns_isolated_copy(self):
+        cache = make_cache()
+        dm = cache.read(ROOM, lambda doc: doc["dungeon_master"])
+        dm["user_id"] = "someone-else"
+        assert cache.read(ROOM, lambda doc: doc["dungeon_master"]["user_id"]) == "dm-1"
+
+    def test_put_stores_private_copy(self):
+        cache = RoomStateCache()
+        room = {"seat_layout": ["empty"]}
+        cache.put(ROOM, room)
+        room["seat_layout"].append("alice")
+        assert cache.get(ROOM)["seat_layout"] == ["empty"]
+
+
+class TestApplyUpdate:
+    def test_set_dotted_path(self):
+        cache = make_cache()
+        cache.apply_update(ROOM, {"$set": {"player_metadata.alice.color": "#ff0000"}})
+        assert cache.get(ROOM)["player_metadata"]["alice"] == {
+            "player_name": "Alice", "campaign_role": "player", "color": "#ff0000",
+        }
+
+    def test_set_creates_missing_parents(self):
+        cache = make_cache()
+        cache.apply_update(ROOM, {"$set": {"audio_state.channel_A": {"playback_state": "playing"}}})
+        assert cache.get(ROOM)["audio_state"] == {"channel_A": {"playback_state": "playing"}}
+
+    def test_set_replaces_whole_subdocument(self):
+        cache = make_cache()
+        cache.apply_update(ROOM, {"$set": {"dungeon_master": {}}})
+        assert cache.get(ROOM)["dungeon_master"] == {}
+
+    def test_set_value_is_copied(self):
+        cache = make_cache()
+        seats = ["alice", "empty"]
+        cache.apply_update(ROOM, {"$set": {"seat_layout": seats}})
+        seats[1] = "bob"
+        assert cache.get(ROOM)["seat_layout"] == ["alice", "empty"]
+
+    def test_set_array_element(self):
+        cache = make_cache()
+        cache.apply_update(ROOM, {"$set": {"seat_layout": ["alice", "empty"]}})
+        cache.apply_update(ROOM, {"$set": {"seat_layout.1": "bob"}})
+        assert cache.get(ROOM)["seat_layout"] == ["alice", "bob"]
+
+    def test_set_past_array_end_pads_with_null(self):
+        cache = make_cache()
+        cache.apply_update(ROOM, {"$set": {"seat_layout": ["alice"]}})
+        cache.apply_update(ROOM, {"$set": {"seat_layout.2": "bob"}})
+        assert cache.get(ROOM)["seat_layout"] == ["alice", None, "bob"]
+
+    def test_unset_dotted_path(self):
+        cache = make_cache()
+        cache.apply_update(ROOM, {"$unset": {"audio_track_config.track-1": ""}})
+        assert cache.get(ROOM)["audio_track_config"] == {}
+
+    def test_unset_missing_path_is_noop(self):
+        cache = make_cache()
+        cache.apply_update(ROOM, {"$unset": {"spotify.anchor": ""}})
+        assert "spotify" not in cache.get(ROOM)
+
+    def test_inc_counts_from_zero(self):
+        cache = make_cache()
+        cache.apply_update(ROOM, {"$inc": {"map_token_revisions.map-1": 1}})
+        cache.apply_update(ROOM, {"$inc": {"map_token_revisions.map-1": 1}})
+        assert cache.get(ROOM)["map_token_revisions"] == {"map-1": 2}
+
+    def test_miss_is_noop(self):
+        cache = RoomStateCache()
+        cache.apply_update(ROOM, {"$set": {"seat_layout": []}})
+        assert cache.get(ROOM) is None
+
+    def test_unsupported_operator_rejected(self):
+        cache = make_cache()
+        with pytest.raises(ValueError):
+            cache.apply_update(ROOM, {"$push": {"seat_layout": "alice"}})
+
+
+class TestInvalidate:
+    def test_invalidate_drops_entry(self):
+        cache = make_cache()
+        cache.invalidate(ROOM)
+        assert cache.get(ROOM) is None
+        assert not cache.contains(ROOM)
+
+    def test_room_lock_is_reentrant_and_per_room(self):
+        cache = RoomStateCache()
+        lock = cache.room_lock(ROOM)
+        assert cache.room_lock(ROOM) is lock
+        assert cache.room_lock("room-2") is not lock
+        with lock:
+            with cache.room_lock(ROOM):
+                pass
+
+    def test_invalidate_keeps_a_held_lock(self):
+        cache = make_cache()
+        with cache.room_lock(ROOM) as held:
+            cache.invalidate(ROOM)
+            assert cache.room_lock(ROOM) is held
+        assert not cache.contains(ROOM)
+
+    def test_lock_is_discarded_only_once_released(self):
+        cache = RoomStateCache()
+        with cache.room_lock(ROOM) as held:
+            assert not cache.discard_room_lock(ROOM)
+        assert cache.discard_room_lock(ROOM)
+        assert cache.room_lock(ROOM) is not held
@@ -0,0 +1,139 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Session start: the restores run concurrently, the room insert commits
+the start last, and a failed insert cleans up after itself.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import session_bootstrap
+from session_bootstrap import (
+    SessionAlreadyExists,
+    bootstrap_session,
+    build_session_bootstrap,
+    resolve_active_display,
+)
+from shared_contracts.session import SessionStartPayload
+
+SLOW_WRITE_SECONDS = 0.2
+NOW = datetime(2025, 1, 1, 12, 0)
+
+
+def make_payload(**overrides):
+    return SessionStartPayload(**{
+        "session_id": "session-1",
+        "campaign_id": "campaign-1",
+        "max_players": 4,
+        "dungeon_master": {"user_id": "dm", "player_name": "DM", "campaign_role": "dm"},
+        "map_config": {"asset_id": "map-1", "filename": "map.png", "original_filename": "map.png", "file_path": "https://cdn/map.png"},
+        "image_config": {"asset_id": "image-1", "filename": "image.png", "original_filename": "image.png", "file_path": "https://cdn/image.png"},
+        "adventure_log": [{"message": "hello", "type": "system", "timestamp": "2025-01-01T11:00:00+00:00", "log_id": 1}],
+        **overrides,
+    })
+
+
+class Recorder:
+    """Stands in for the services; logs every write in the order it lands."""
+
+    def __init__(self, monkeypatch, delay=0.0, create_error=None):
+        self.writes = []
+        self.delay = delay
+        self.create_error = create_error
+        self.room = None
+
+        monkeypatch.setattr(session_bootstrap.map_service, "set_active_map", self.write("map", True))
+        monkeypatch.setattr(session_bootstrap.image_service, "set_active_image", self.write("image", True))
+        monkeypatch.setattr(session_bootstrap.adventure_log, "restore_room_logs", self.write("logs", 1))
+        monkeypatch.setattr(session_bootstrap.adventure_log, "delete_room_logs", self.write("delete_logs", 0))
+        monkeypatch.setattr(session_bootstrap.map_service, "clear_active_map", self.write("clear_map", True))
+        monkeypatch.setattr(session_bootstrap.image_service, "delete_room_images", self.write("delete_images", True))
+        monkeypatch.setattr(session_bootstrap.GameService, "create_room", staticmethod(self.create_room))
+
+    def write(self, name, result):
+        def record(session_id, *args):
+            time.sleep(self.delay)
+            self.writes.append(name)
+            return result
+        return record
+
+    def create_room(self, settings, room_id=None):
+        if self.create_error:
+            raise self.create_error
+        self.writes.append("room")
+        self.room = settings
+        return room_id
+
+
+class TestBuildSessionBootstrap:
+    def test_room_settings_and_restores(self):
+        bootstrap = build_session_bootstrap(make_payload(), now=NOW)
+
+        assert bootstrap.settings.created_at == NOW
+        assert bootstrap.settings.seat_layout == ["empty"] * 4
+        assert bootstrap.map_settings.map_config.filename == "map.png"
+        assert bootstrap.image_settings.image_config.filename == "image.png"
+        assert [entry["message"] for entry in bootstrap.log_entries] == ["hello"]
+
+    def test_nothing_to_restore(self):
+        bootstrap = build_session_bootstrap(make_payload(map_config=None, image_config=None, adventure_log=[]))
+        assert (bootstrap.map_settings, bootstrap.image_settings, bootstrap.log_entries) == (None, None, [])
+
+
+class TestResolveActiveDisplay:
+    def test_matches_the_old_write_order(self):
+        assert resolve_active_display(None, map_restored=True, image_restored=True) == "image"
+        assert resolve_active_display(None, map_restored=True, image_restored=False) == "map"
+        assert resolve_active_display("map", map_restored=True, image_restored=True) == "map"
+        assert resolve_active_display(None, map_restored=False, image_restored=False) is None
+
+
+class TestBootstrapSession:
+    def test_restores_run_concurrently_before_the_room(self, monkeypatch):
+        recorder = Recorder(monkeypatch, delay=SLOW_WRITE_SECONDS)
+
+        started = time.perf_counter()
+        room_id = asyncio.run(bootstrap_session(build_session_bootstrap(make_payload())))
+        elapsed = time.perf_counter() - started
+
+        assert room_id == "session-1"
+        assert sorted(recorder.writes[:3]) == ["image", "logs", "map"]
+        assert recorder.writes[3:] == ["room"]
+        # Three slow writes back to back would take 3x as long
+        assert elapsed < 2 * SLOW_WRITE_SECONDS
+
+    def test_room_carries_the_resolved_display(self, monkeypatch):
+        recorder = Recorder(monkeypatch)
+        asyncio.run(bootstrap_session(build_session_bootstrap(make_payload())))
+        assert recorder.room.active_display == "image"
+
+    def test_failed_restore_is_non_fatal(self, monkeypatch):
+        recorder = Recorder(monkeypatch)
+        monkeypatch.setattr(session_bootstrap.image_service, "set_active_image", lambda session_id, settings: False)
+
+        asyncio.run(bootstrap_session(build_session_bootstrap(make_payload())))
+
+        assert recorder.room.active_display == "map"
+
+    def test_failed_insert_discards_the_restores(self, monkeypatch):
+        recorder = Recorder(monkeypatch, create_error=RuntimeError("mongo down"))
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(bootstrap_session(build_session_bootstrap(make_payload())))
+
+        assert sorted(recorder.writes[3:]) == ["clear_map", "delete_images", "delete_logs"]
+
+    def test_lost_race_keeps_the_winners_restores(self, monkeypatch):
+        recorder = Recorder(monkeypatch, create_error=DuplicateKeyError("E11000"))
+
+        with pytest.raises(SessionAlreadyExists):
+            asyncio.run(bootstrap_session(build_session_bootstrap(make_payload())))
+
+        assert sorted(recorder.writes) == ["image", "logs", "map"]
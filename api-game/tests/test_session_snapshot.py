@@ -0,0 +1,113 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Session-end snapshot: the per-collection reads run concurrently, and
+build_final_state assembles the ETL contract from the snapshot alone.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+import session_snapshot
+from session_snapshot import SessionSnapshot, build_final_state, read_session_snapshot
+
+SLOW_READ_SECONDS = 0.2
+NOW = 1_700_000_000.0
+
+
+def make_room(**overrides):
+    return {
+        "_id": "session-1",
+        "created_at": datetime.utcfromtimestamp(NOW - 90 * 60),
+        "max_players": 6,
+        "seat_layout": ["user-a", "empty"],
+        "player_metadata": {
+            "user-a": {"player_name": "Ada", "character_id": "char-a", "color": "#ff0000"},
+            "user-b": {"character_id": "char-b"},
+        },
+        "audio_state": {"__master_volume": 0.8},
+        "audio_track_config": {},
+        "active_display": "map",
+        **overrides,
+    }
+
+
+def log(log_id, message):
+    return {"log_id": log_id, "message": message, "type": "system", "timestamp": datetime.utcfromtimestamp(NOW)}
+
+
+class TestReadSessionSnapshot:
+    def test_reads_run_concurrently(self, monkeypatch):
+        def slow(result):
+            def read(session_id):
+                time.sleep(SLOW_READ_SECONDS)
+                return result
+            return read
+
+        monkeypatch.setattr(session_snapshot.GameService, "invalidate_room_cache", staticmethod(lambda session_id: None))
+        monkeypatch.setattr(session_snapshot.GameService, "get_room", staticmethod(slow(make_room())))
+        monkeypatch.setattr(session_snapshot, "_read_logs", slow([log(1, "hello")]))
+        monkeypatch.setattr(session_snapshot, "_read_map_config", slow(None))
+        monkeypatch.setattr(session_snapshot, "_read_image_config", slow(None))
+
+        started = time.perf_counter()
+        snapshot = asyncio.run(read_session_snapshot("session-1"))
+        elapsed = time.perf_counter() - started
+
+        assert snapshot.room["_id"] == "session-1"
+        assert [entry["message"] for entry in snapshot.logs] == ["hello"]
+        # Four slow reads back to back would take 4x as long
+        assert elapsed < 2 * SLOW_READ_SECONDS
+
+    def test_missing_room_is_none(self, monkeypatch):
+        monkeypatch.setattr(session_snapshot.GameService, "invalidate_room_cache", staticmethod(lambda session_id: None))
+        monkeypatch.setattr(session_snapshot.GameService, "get_room", staticmethod(lambda session_id: None))
+        monkeypatch.setattr(session_snapshot, "_read_logs", lambda session_id: [])
+        monkeypatch.setattr(session_snapshot, "_read_map_config", lambda session_id: None)
+        monkeypatch.setattr(session_snapshot, "_read_image_config", lambda session_id: None)
+
+        assert asyncio.run(read_session_snapshot("session-1")) is None
+
+
+class TestBuildFinalState:
+    def test_players_stats_and_display_come_from_the_room(self):
+        final_state = build_final_state(SessionSnapshot(room=make_room(), logs=[log(1, "a"), log(2, "b")]), now=NOW)
+
+        assert [(p.user_id, p.player_name, p.seat_position) for p in final_state.players] == [
+            ("user-a", "Ada", 0), ("user-b", "Unknown Adventurer", None),
+        ]
+        assert final_state.session_stats.duration_minutes == 90
+        assert final_state.session_stats.total_logs == 2
+        assert final_state.session_stats.max_players == 6
+        assert final_state.active_display == "map"
+        assert final_state.broadcast_master_volume == 0.8
+        assert final_state.audio_state == {}
+
+    def test_logs_are_chronological_with_utc_timestamps(self):
+        final_state = build_final_state(SessionSnapshot(room=make_room(), logs=[log(2, "second"), log(1, "first")]), now=NOW)
+
+        assert [entry.message for entry in final_state.adventure_log] == ["first", "second"]
+        assert final_state.adventure_log[0].timestamp.endswith("+00:00")
+
+    def test_playing_spotify_is_frozen_paused(self):
+        room = make_room(spotify={
+            "playback_state": "playing", "started_at": NOW - 30, "is_playing": True,
+            "track_meta": {"duration_ms": 20_000}, "is_looping": True,
+        })
+        spotify_state = build_final_state(SessionSnapshot(room=room), now=NOW).spotify_state
+
+        assert spotify_state.playback_state == "paused"
+        assert spotify_state.paused_elapsed == 10.0
+        assert spotify_state.started_at is None
+
+    def test_malformed_tokens_and_empty_boards_are_dropped(self):
+        room = make_room(map_token_state={"board-a": [{"not": "a token"}], "board-b": []})
+        assert build_final_state(SessionSnapshot(room=room), now=NOW).map_token_state == {}
+
+    def test_no_map_or_image(self):
+        final_state = build_final_state(SessionSnapshot(room=make_room()), now=NOW)
+        assert final_state.map_state is None
+        assert final_state.image_state is None
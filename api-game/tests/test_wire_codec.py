@@ -0,0 +1,84 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Unit tests for the opt-in MessagePack wire format: lossless round trips,
+JSON fallback for unschemed events, negotiation, and malformed input.
+
+Run from api-game/: python -m pytest tests/
+"""
+
+import json
+
+import msgpack
+import pytest
+
+from websocket_handlers.wire_codec import (
+    BINARY_SUBPROTOCOL,
+    decode_binary_frame,
+    encode_binary_frame,
+    negotiate_subprotocol,
+)
+
+
+def drag_batch(count):
+    return {"event_type": "map_token_drag_batch", "data": {"frames": [
+        {"asset_id": "3f1c9a2e-0000-4000-8000-000000000001", "token_id": f"token-{index}",
+         "phase": "move", "x": 1024.5 + index, "y": 768.25, "holder_user_id": "user-7"}
+        for index in range(count)
+    ]}}
+
+
+class TestRoundTrip:
+    def test_drag_batch_round_trips(self):
+        message = drag_batch(3)
+        assert decode_binary_frame(encode_binary_frame(message)) == message
+
+    def test_unknown_field_names_pass_through(self):
+        message = {"event_type": "remote_audio_batch", "data": {
+            "operations": [{"trackId": "audio_channel_A", "operation": "play",
+                            "effects": {"hpf": True, "reverb_mix": 0.4}}],
+            "triggered_by": "dm",
+            "some_future_field": [1, None, "x"],
+        }}
+        assert decode_binary_frame(encode_binary_frame(message)) == message
+
+    def test_lobby_update_round_trips(self):
+        message = {"event_type": "lobby_update", "data": {"lobby_users": [
+            {"name": "Élan", "user_id": "u1", "id": "u1", "status": "connected"},
+        ]}}
+        assert decode_binary_frame(encode_binary_frame(message)) == message
+
+    def test_smaller_than_json(self):
+        # The uuid ids dominate what's left; key names and numbers shrink.
+        message = drag_batch(4)
+        json_size = len(json.dumps(message, separators=(",", ":")).encode())
+        assert len(encode_binary_frame(message)) < 0.6 * json_size
+
+
+class TestFallback:
+    def test_unschemed_event_not_encoded(self):
+        assert encode_binary_frame({"event_type": "dice_roll", "data": {}}) is None
+
+    def test_extra_envelope_keys_not_encoded(self):
+        assert encode_binary_frame({"event_type": "lobby_update", "data": {}, "seq": 1}) is None
+
+
+class TestNegotiation:
+    def test_offered_subprotocol_accepted(self):
+        assert negotiate_subprotocol(["chat", BINARY_SUBPROTOCOL]) == BINARY_SUBPROTOCOL
+
+    def test_json_clients_negotiate_nothing(self):
+        assert negotiate_subprotocol([]) is None
+        assert negotiate_subprotocol(["rollplay.msgpack.v0"]) is None
+
+
+class TestMalformed:
+    @pytest.mark.parametrize("frame", [
+        b"\xc1",                                   # never-used msgpack byte
+        msgpack.packb({"event_type": "x"}),        # not an envelope
+        msgpack.packb([99, {}]),                   # unknown event code
+        msgpack.packb([1, {999: "x"}]),            # unknown field key
+    ])
+    def test_rejected_with_value_error(self, frame):
+        with pytest.raises(ValueError):
+            decode_binary_frame(frame)
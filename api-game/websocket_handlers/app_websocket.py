@@ -1,20 +1,542 @@
 # Copyright (C) 2025 Matthew Davey
 # SPDX-License-Identifier: GPL-3.0-or-later
+import asyncio
+import json
 import logging
 from datetime import datetime
+from typing import Optional
 from fastapi import FastAPI, WebSocket
 from starlette.websockets import WebSocketDisconnect
 
 logger = logging.getLogger(__name__)
 
 from .connection_manager import manager, RoomManager
-from .websocket_events import WebsocketEvent
+from .websocket_events import WebsocketEvent, release_room_drag_state
+from .room_actor import room_actors, is_ephemeral
+from .room_affinity import (
+    FORWARDED_HEADER, ROOM_MOVED_CLOSE_CODE, TRY_AGAIN_CLOSE_CODE,
+    RoomUnavailable, proxy_websocket, room_affinity,
+)
+from .wire_codec import decode_binary_frame, negotiate_subprotocol
 from map_token_ops import filter_map_token_state_for_player
-from adventure_log_service import AdventureLogService
+from adventure_log_service import adventure_log
 from models.log_type import LogType
+from db_executor import run_db
+
+# The event loop only holds weak references to tasks: keep the scheduled
+# dice-roll follow-ups here until they finish so none is collected mid-sleep
+_followup_tasks: set = set()
+
+
+async def _send_dice_roll_followups(room_manager: RoomManager, log_removal_message, clear_prompt_message):
+    """Deliver a dice roll's prompt cleanup after the roll itself."""
+    await asyncio.sleep(0.5)  # Small delay to ensure dice roll is processed first
+
+    # Send log removal message first
+    if log_removal_message:
+        await room_manager.update_room_data(log_removal_message)
+
+    # Then send prompt clear message
+    if clear_prompt_message:
+        await room_manager.update_room_data(clear_prompt_message)
+
+
+async def _dispatch_event(websocket: WebSocket, data: dict, user_id: str, client_id: str,
+                          room_manager: RoomManager):
+    """Handle one inbound event. Runs on the room's actor (room_actor.py),
+    so events for a room are handled one at a time, in arrival order."""
+    event_type = data.get("event_type")
+    event_data = data.get("data")
+
+    logger.debug(f"WebSocket received: {event_type} from {user_id}")
+
+    # Initialize variables for post-processing
+    broadcast_message = None
+    log_removal_message = None
+    clear_prompt_message = None
+
+    if event_type == "seat_change":
+        # Existing seat change logic...
+        seat_layout = data.get("data")
+
+        if not isinstance(seat_layout, list):
+            error_message = {
+                "event_type": "error",
+                "data": "Seat layout must be an array."
+            }
+            await websocket.send_json(error_message)
+            return
+
+        result = await WebsocketEvent.seat_change(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+        # After seat change, update lobby
+        await room_manager.broadcast_lobby_update()
+
+    elif event_type == "dice_prompt":
+        result = await WebsocketEvent.dice_prompt(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "initiative_prompt_all":
+        if not event_data.get("players", []):
+            logger.warning("No players provided for initiative prompt")
+            return
+
+        result = await WebsocketEvent.initiative_prompt_all(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    # NEW: Handle clearing dice prompts
+    elif event_type == "dice_prompt_clear":
+        result = await WebsocketEvent.dice_prompt_clear(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+        log_removal_message = result.log_removal_message
+
+    elif event_type == "combat_state":
+        result = await WebsocketEvent.combat_state(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "seat_count_change":
+        result = await WebsocketEvent.seat_count_change(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "player_kicked":
+        result = await WebsocketEvent.player_kicked(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "role_change":
+        result = await WebsocketEvent.role_change(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "dice_roll":
+        result = await WebsocketEvent.dice_roll(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+        log_removal_message = result.log_removal_message
+        clear_prompt_message = result.clear_prompt_message
+
+    elif event_type == "clear_system_messages":
+        result = await WebsocketEvent.clear_system_messages(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+        # Check if it's an error message and handle accordingly
+        if broadcast_message.get("event_type") == "error":
+            await websocket.send_json(broadcast_message)
+            return
+
+    elif event_type == "clear_all_messages":
+        result = await WebsocketEvent.clear_all_messages(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+        # Check if it's an error message and handle accordingly
+        if broadcast_message.get("event_type") == "error":
+            await websocket.send_json(broadcast_message)
+            return
+
+    elif event_type == "color_change":
+        result = await WebsocketEvent.color_change(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+        # Check if it's an error message and handle accordingly
+        if broadcast_message.get("event_type") == "error":
+            await websocket.send_json(broadcast_message)
+            return
+
+    elif event_type == "remote_audio_play":
+        result = await WebsocketEvent.remote_audio_play(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "remote_audio_resume":
+        result = await WebsocketEvent.remote_audio_resume(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "remote_audio_batch":
+        result = await WebsocketEvent.remote_audio_batch(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "spotify_control":
+        result = await WebsocketEvent.spotify_control(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    # Map management events
+    elif event_type == "map_load":
+        try:
+            result = await WebsocketEvent.map_load(
+                websocket=websocket,
+                data=data,
+                event_data=event_data,
+                user_id=user_id,
+                client_id=client_id,
+                manager=manager
+            )
+            broadcast_message = result.broadcast_message
+            logger.debug(f"Map load result broadcast_message: {broadcast_message}")
+        except Exception as e:
+            logger.error(f"Exception in map_load handler: {e}")
+            broadcast_message = {"event_type": "error", "data": f"Map load failed: {str(e)}"}
+
+    elif event_type == "map_clear":
+        result = await WebsocketEvent.map_clear(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "map_config_update":
+        result = await WebsocketEvent.map_config_update(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "fog_config_update":
+        result = await WebsocketEvent.fog_config_update(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "fog_tile_update":
+        result = await WebsocketEvent.fog_tile_update(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "fog_resync":
+        result = await WebsocketEvent.fog_resync(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        # resync answers the requesting client only
+        if result.broadcast_message:
+            broadcast_message = result.broadcast_message
+        else:
+            return
+
+    elif event_type == "map_token_update":
+        result = await WebsocketEvent.map_token_update(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        if result.broadcast_message:
+            broadcast_message = result.broadcast_message
+        else:
+            return  # denied (answered to sender) or per-recipient hidden filtering already sent
+
+    elif event_type == "map_token_drag":
+        result = await WebsocketEvent.map_token_drag(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        if result.broadcast_message:
+            broadcast_message = result.broadcast_message
+        else:
+            return  # deny answered the sender directly; moves batch via drag_coalescer; stale frames drop silently
+
+    elif event_type == "map_token_resync":
+        result = await WebsocketEvent.map_token_resync(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        # resync answers the requesting client only
+        if result.broadcast_message:
+            broadcast_message = result.broadcast_message
+        else:
+            return
+
+    elif event_type == "map_request":
+        result = await WebsocketEvent.map_request(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        # map_request sends directly to client, no broadcast needed
+        if result.broadcast_message:
+            broadcast_message = result.broadcast_message
+        else:
+            return  # Skip broadcasting for direct client responses
+
+    # Image management events
+    elif event_type == "image_load":
+        try:
+            result = await WebsocketEvent.image_load(
+                websocket=websocket,
+                data=data,
+                event_data=event_data,
+                user_id=user_id,
+                client_id=client_id,
+                manager=manager
+            )
+            broadcast_message = result.broadcast_message
+            logger.debug(f"Image load result broadcast_message: {broadcast_message}")
+        except Exception as e:
+            logger.error(f"Exception in image_load handler: {e}")
+            broadcast_message = {"event_type": "error", "data": f"Image load failed: {str(e)}"}
+
+    elif event_type == "image_clear":
+        result = await WebsocketEvent.image_clear(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "image_config_update":
+        result = await WebsocketEvent.image_config_update(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        broadcast_message = result.broadcast_message
+
+    elif event_type == "image_request":
+        result = await WebsocketEvent.image_request(
+            websocket=websocket,
+            data=data,
+            event_data=event_data,
+            user_id=user_id,
+            client_id=client_id,
+            manager=manager
+        )
+        # image_request sends directly to client, no broadcast needed
+        if result.broadcast_message:
+            broadcast_message = result.broadcast_message
+        else:
+            return  # Skip broadcasting for direct client responses
+
+    else:
+        # Unknown event type - log and ignore
+        logger.warning(f"Unknown WebSocket event type: {event_type}")
+        return
+
+    # Send errors back to sender only, don't broadcast
+    if broadcast_message and broadcast_message.get("event_type") == "error":
+        await websocket.send_json(broadcast_message)
+        return
+
+    # Broadcast the main message (live-drag moves skip degraded clients)
+    await room_manager.update_room_data(broadcast_message, ephemeral=is_ephemeral(event_type, event_data))
+
+    # Handle special cases for adventure log removal
+    if event_type == "dice_roll":
+        # The follow-ups trail the roll by a small delay so clients process
+        # the roll first. Scheduled, not awaited: sleeping here would hold
+        # the room's actor — and every event queued behind it — for 0.5s.
+        task = asyncio.create_task(
+            _send_dice_roll_followups(room_manager, log_removal_message, clear_prompt_message)
+        )
+        _followup_tasks.add(task)
+        task.add_done_callback(_followup_tasks.discard)
+
+    elif event_type == "dice_prompt_clear":
+        # Send log removal message for cancelled prompts (no delay needed)
+        if log_removal_message:
+            await room_manager.update_room_data(log_removal_message)
+
+
+
+async def _receive_event(websocket: WebSocket) -> dict:
+    """Next inbound event: JSON text, or a MessagePack frame from a client
+    that negotiated the binary subprotocol (wire_codec.py)."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    if message.get("bytes") is not None:
+        return decode_binary_frame(message["bytes"])
+    return json.loads(message["text"])
+
+
+async def _handle_disconnect(websocket: WebSocket, user_id: str, client_id: str, room_manager: RoomManager):
+    """Server-side disconnect handling with seat cleanup (runs on the room's
+    actor, behind anything the player sent before leaving)."""
+    result = await WebsocketEvent.player_disconnect(
+        websocket=websocket,
+        data={},
+        event_data={},
+        user_id=user_id,
+        client_id=client_id,
+        manager=manager
+    )
+
+    # Send lobby update after disconnect (will show user as disconnecting)
+    await room_manager.broadcast_lobby_update()
+
+    # Broadcast disconnect and seat change messages
+    await room_manager.update_room_data(result.broadcast_message)
+    if result.clear_prompt_message:  # This contains the seat change message
+        await room_manager.update_room_data(result.clear_prompt_message)
+
+
+async def hand_off_room(room_id: str):
+    """Move a room off this worker (room_affinity.py): close its sockets so
+    the clients reconnect to the new owner, let everything already queued
+    land, then make sure Mongo holds all of the room's state."""
+    from gameservice import GameService
+    await manager.release_room(
+        room_id, ROOM_MOVED_CLOSE_CODE, lambda user_id: room_affinity.handoff_token(room_id, user_id)
+    )
+    await room_actors.drain_room(room_id)
+    await release_room_drag_state(room_id)
+    await run_db(adventure_log.flush)
+    GameService.invalidate_room_cache(room_id)
+
+
+def is_room_active(room_id: str) -> bool:
+    """Whether this worker still holds sockets for the room."""
+    return room_id in manager.room_users
 
-# Initialize shared services
-adventure_log = AdventureLogService()
 
 def register_websocket_routes(app: FastAPI):
     """Register WebSocket routes with the FastAPI app"""
@@ -23,8 +545,27 @@ def register_websocket_routes(app: FastAPI):
     async def websocket_endpoint(
         websocket: WebSocket,
         client_id: str,  # This should be your room_id
-        user_id: str
+        user_id: str,
+        handoff: Optional[str] = None  # token from a ROOM_MOVED_CLOSE_CODE close: not a new arrival
     ):
+        # Room affinity: serve the room only on its owner worker
+        try:
+            owner_url = await room_affinity.route(
+                client_id,
+                forwarded=room_affinity.is_forwarded(client_id, websocket.headers.get(FORWARDED_HEADER)),
+            )
+        except RoomUnavailable as e:
+            logger.info(f"Room affinity: {e}; asking {user_id} to retry")
+            await websocket.accept(subprotocol=negotiate_subprotocol(websocket.scope.get("subprotocols", [])))
+            await websocket.close(code=TRY_AGAIN_CLOSE_CODE, reason="Room moving")
+            return
+        if owner_url is not None:
+            await proxy_websocket(
+                websocket, f"{owner_url}{websocket.url.path}?{websocket.url.query}",
+                room_affinity.forwarded_by(client_id),
+            )
+            return
+
         await manager.connect(websocket, client_id, user_id)
 
         # Create room-scoped manager for this connection
@@ -33,7 +574,7 @@ def register_websocket_routes(app: FastAPI):
         # Send initial state to THIS client only (before broadcasting connection to others)
         from gameservice import GameService
         try:
-            room = GameService.get_room(client_id)
+            room = await run_db(GameService.get_room, client_id)
             if room:
                 # Hidden tokens never reach player clients (decision 17) —
                 # this send is already per-socket, so filter right here.
@@ -42,9 +583,12 @@ def register_websocket_routes(app: FastAPI):
                 # so players get refs for visible-board images only (a
                 # reveal fragment delivers the ref when it's needed).
                 map_token_state = room.get("map_token_state", {})
+                map_token_revisions = room.get("map_token_revisions", {})
                 token_images = room.get("token_images", {})
                 if user_id != room.get("dungeon_master", {}).get("user_id"):
                     map_token_state = filter_map_token_state_for_player(map_token_state)
+                    # Players apply deltas against their own (filtered) view's revision
+                    map_token_revisions = room.get("map_token_player_revisions", {})
                     visible_image_ids = set()
                     for visible_board in map_token_state.values():
                         for visible_token in visible_board:
@@ -67,6 +611,7 @@ def register_websocket_routes(app: FastAPI):
                         "audio_state": room.get("audio_state", {}),
                         "spotify": room.get("spotify", {}),
                         "map_token_state": map_token_state,
+                        "map_token_revisions": map_token_revisions,
                         # Filtered for non-DM recipients above (decision 17:
                         # refs for hidden-only images would leak the
                         # monster's artwork; reveal fragments deliver the
@@ -82,423 +627,8 @@ def register_websocket_routes(app: FastAPI):
             logger.error(f"Error sending initial state: {e}")
 
         # Handle connection event and get result (broadcasts to ALL clients)
-        result = await WebsocketEvent.player_connection(
-            websocket=websocket,
-            data={},
-            event_data={},
-            user_id=user_id,
-            client_id=client_id,
-            manager=manager
-        )
-        await room_manager.update_room_data(result.broadcast_message)
-
-        try:
-            while True:
-                data = await websocket.receive_json()
-                event_type = data.get("event_type")
-                event_data = data.get("data")
-
-                logger.debug(f"WebSocket received: {event_type} from {user_id}")
-
-                # Initialize variables for post-processing
-                broadcast_message = None
-                log_removal_message = None
-                clear_prompt_message = None
-
-                if event_type == "seat_change":
-                    # Existing seat change logic...
-                    seat_layout = data.get("data")
-
-                    if not isinstance(seat_layout, list):
-                        error_message = {
-                            "event_type": "error",
-                            "data": "Seat layout must be an array."
-                        }
-                        await websocket.send_json(error_message)
-                        continue
-
-                    result = await WebsocketEvent.seat_change(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                    # After seat change, update lobby
-                    await room_manager.broadcast_lobby_update()
-
-                elif event_type == "dice_prompt":
-                    result = await WebsocketEvent.dice_prompt(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                elif event_type == "initiative_prompt_all":
-                    if not event_data.get("players", []):
-                        logger.warning("No players provided for initiative prompt")
-                        continue
-
-                    result = await WebsocketEvent.initiative_prompt_all(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                # NEW: Handle clearing dice prompts
-                elif event_type == "dice_prompt_clear":
-                    result = await WebsocketEvent.dice_prompt_clear(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-                    log_removal_message = result.log_removal_message
-
-                elif event_type == "combat_state":
-                    result = await WebsocketEvent.combat_state(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                elif event_type == "seat_count_change":
-                    result = await WebsocketEvent.seat_count_change(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                elif event_type == "player_kicked":
-                    result = await WebsocketEvent.player_kicked(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                elif event_type == "role_change":
-                    result = await WebsocketEvent.role_change(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                elif event_type == "dice_roll":
-                    result = await WebsocketEvent.dice_roll(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-                    log_removal_message = result.log_removal_message
-                    clear_prompt_message = result.clear_prompt_message
-
-                elif event_type == "clear_system_messages":
-                    result = await WebsocketEvent.clear_system_messages(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                    # Check if it's an error message and handle accordingly
-                    if broadcast_message.get("event_type") == "error":
-                        await websocket.send_json(broadcast_message)
-                        continue
-
-                elif event_type == "clear_all_messages":
-                    result = await WebsocketEvent.clear_all_messages(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                    # Check if it's an error message and handle accordingly
-                    if broadcast_message.get("event_type") == "error":
-                        await websocket.send_json(broadcast_message)
-                        continue
-
-                elif event_type == "color_change":
-                    result = await WebsocketEvent.color_change(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                    # Check if it's an error message and handle accordingly
-                    if broadcast_message.get("event_type") == "error":
-                        await websocket.send_json(broadcast_message)
-                        continue
-
-                elif event_type == "remote_audio_play":
-                    result = await WebsocketEvent.remote_audio_play(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                elif event_type == "remote_audio_resume":
-                    result = await WebsocketEvent.remote_audio_resume(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                elif event_type == "remote_audio_batch":
-                    result = await WebsocketEvent.remote_audio_batch(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                elif event_type == "spotify_control":
-                    result = await WebsocketEvent.spotify_control(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                # Map management events
-                elif event_type == "map_load":
-                    try:
-                        result = await WebsocketEvent.map_load(
-                            websocket=websocket,
-                            data=data,
-                            event_data=event_data,
-                            user_id=user_id,
-                            client_id=client_id,
-                            manager=manager
-                        )
-                        broadcast_message = result.broadcast_message
-                        logger.debug(f"Map load result broadcast_message: {broadcast_message}")
-                    except Exception as e:
-                        logger.error(f"Exception in map_load handler: {e}")
-                        broadcast_message = {"event_type": "error", "data": f"Map load failed: {str(e)}"}
-
-                elif event_type == "map_clear":
-                    result = await WebsocketEvent.map_clear(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                elif event_type == "map_config_update":
-                    result = await WebsocketEvent.map_config_update(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                elif event_type == "fog_config_update":
-                    result = await WebsocketEvent.fog_config_update(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                elif event_type == "map_token_update":
-                    result = await WebsocketEvent.map_token_update(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    if result.broadcast_message:
-                        broadcast_message = result.broadcast_message
-                    else:
-                        continue  # denied (answered to sender) or per-recipient hidden filtering already sent
-
-                elif event_type == "map_token_drag":
-                    result = await WebsocketEvent.map_token_drag(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    if result.broadcast_message:
-                        broadcast_message = result.broadcast_message
-                    else:
-                        continue  # deny answered the sender directly; stale frames drop silently
-
-                elif event_type == "map_request":
-                    result = await WebsocketEvent.map_request(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    # map_request sends directly to client, no broadcast needed
-                    if result.broadcast_message:
-                        broadcast_message = result.broadcast_message
-                    else:
-                        continue  # Skip broadcasting for direct client responses
-
-                # Image management events
-                elif event_type == "image_load":
-                    try:
-                        result = await WebsocketEvent.image_load(
-                            websocket=websocket,
-                            data=data,
-                            event_data=event_data,
-                            user_id=user_id,
-                            client_id=client_id,
-                            manager=manager
-                        )
-                        broadcast_message = result.broadcast_message
-                        logger.debug(f"Image load result broadcast_message: {broadcast_message}")
-                    except Exception as e:
-                        logger.error(f"Exception in image_load handler: {e}")
-                        broadcast_message = {"event_type": "error", "data": f"Image load failed: {str(e)}"}
-
-                elif event_type == "image_clear":
-                    result = await WebsocketEvent.image_clear(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                elif event_type == "image_config_update":
-                    result = await WebsocketEvent.image_config_update(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    broadcast_message = result.broadcast_message
-
-                elif event_type == "image_request":
-                    result = await WebsocketEvent.image_request(
-                        websocket=websocket,
-                        data=data,
-                        event_data=event_data,
-                        user_id=user_id,
-                        client_id=client_id,
-                        manager=manager
-                    )
-                    # image_request sends directly to client, no broadcast needed
-                    if result.broadcast_message:
-                        broadcast_message = result.broadcast_message
-                    else:
-                        continue  # Skip broadcasting for direct client responses
-
-                else:
-                    # Unknown event type - log and ignore
-                    logger.warning(f"Unknown WebSocket event type: {event_type}")
-                    continue
-
-                # Send errors back to sender only, don't broadcast
-                if broadcast_message and broadcast_message.get("event_type") == "error":
-                    await websocket.send_json(broadcast_message)
-                    continue
-
-                # Broadcast the main message
-                await room_manager.update_room_data(broadcast_message)
-
-                # Handle special cases for adventure log removal
-                if event_type == "dice_roll":
-                    import asyncio
-                    await asyncio.sleep(0.5)  # Small delay to ensure dice roll is processed first
-
-                    # Send log removal message first
-                    if log_removal_message:
-                        await room_manager.update_room_data(log_removal_message)
-
-                    # Then send prompt clear message
-                    if clear_prompt_message:
-                        await room_manager.update_room_data(clear_prompt_message)
-
-                elif event_type == "dice_prompt_clear":
-                    # Send log removal message for cancelled prompts (no delay needed)
-                    if log_removal_message:
-                        await room_manager.update_room_data(log_removal_message)
-
-        except WebSocketDisconnect:
-            # Server-side disconnect handling with seat cleanup
-            result = await WebsocketEvent.player_disconnect(
+        async def announce_connection():
+            result = await WebsocketEvent.player_connection(
                 websocket=websocket,
                 data={},
                 event_data={},
@@ -506,11 +636,32 @@ def register_websocket_routes(app: FastAPI):
                 client_id=client_id,
                 manager=manager
             )
+            await room_manager.update_room_data(result.broadcast_message)
 
-            # Send lobby update after disconnect (will show user as disconnecting)
-            await room_manager.broadcast_lobby_update()
+        if not room_affinity.is_handoff(client_id, user_id, handoff):
+            await room_actors.submit(client_id, "player_connection", announce_connection)
 
-            # Broadcast disconnect and seat change messages
-            await room_manager.update_room_data(result.broadcast_message)
-            if result.clear_prompt_message:  # This contains the seat change message
-                await room_manager.update_room_data(result.clear_prompt_message)
+        try:
+            while True:
+                data = await _receive_event(websocket)
+
+                # Parse here, handle on the room's actor: ordered per room,
+                # and the receive loop is free to read the next frame.
+                async def handle(data=data):
+                    await _dispatch_event(websocket, data, user_id, client_id, room_manager)
+
+                await room_actors.submit(
+                    client_id,
+                    data.get("event_type"),
+                    handle,
+                    ephemeral=is_ephemeral(data.get("event_type"), data.get("data")),
+                )
+
+        except WebSocketDisconnect:
+            if manager.was_released(websocket):
+                return  # handed off to another worker — still in the game
+
+            async def handle_disconnect():
+                await _handle_disconnect(websocket, user_id, client_id, room_manager)
+
+            await room_actors.submit(client_id, "player_disconnect", handle_disconnect)
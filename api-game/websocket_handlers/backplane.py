@@ -0,0 +1,215 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Cross-worker broadcast backplane and shared presence for ConnectionManager.
+
+A socket lives on exactly one uvicorn worker, but the event that should reach
+it can be handled on any of them. ConnectionManager always fans out to its
+own sockets first, then publishes the same delivery as an envelope:
+
+    {"kind": "room",   "room_id", "data", "ephemeral"}
+    {"kind": "views",  "room_id", "privileged_user_id", "privileged_data", "default_data"}
+    {"kind": "player", "room_id", "user_id", "message"}
+    {"kind": "close",  "room_id", "reason"}
+
+Every other worker receives it and delivers to the sockets it holds. Lobby
+presence (who is in a room, connected/disconnecting, party or lobby) is
+kept in the backplane too, so any worker can build the lobby for a room.
+
+InMemoryBackplane is the default: one worker, nothing to relay, presence in
+a dict. RedisBackplane relays over Redis pub/sub (one pattern subscription
+per worker) and keeps presence in one hash per room; it is enabled by
+WS_BACKPLANE_REDIS_URL and needs the redis package only then.
+"""
+
+import asyncio
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import orjson
+
+from config.settings import get_settings
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # optional: only needed when WS_BACKPLANE_REDIS_URL is set
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+CONFIG = get_settings()
+
+CHANNEL_PREFIX = "rollplay:ws:room:"
+PRESENCE_PREFIX = "rollplay:ws:presence:"
+
+Envelope = Dict[str, Any]
+Deliver = Callable[[Envelope], Awaitable[None]]
+Presence = Dict[str, Dict[str, Any]]
+
+
+class Backplane(ABC):
+    """Interface ConnectionManager talks to. Presence entries are small
+    dicts ({"status", "is_in_party"}) keyed by user_id."""
+
+    async def start(self, deliver: Deliver) -> None:
+        """Begin receiving other workers' envelopes into deliver."""
+
+    async def close(self) -> None:
+        """Stop receiving and release connections."""
+
+    @abstractmethod
+    async def publish(self, envelope: Envelope) -> None:
+        ...
+
+    @abstractmethod
+    async def get_presence(self, room_id: str) -> Presence:
+        ...
+
+    @abstractmethod
+    async def set_presence(self, room_id: str, user_id: str, presence: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def update_presence(self, room_id: str, user_id: str, **fields: Any) -> None:
+        """Merge fields into an existing entry; no-op for an absent user."""
+
+    @abstractmethod
+    async def remove_presence(self, room_id: str, user_id: str) -> None:
+        ...
+
+    @abstractmethod
+    async def clear_presence(self, room_id: str) -> None:
+        ...
+
+
+class InMemoryBackplane(Backplane):
+    """Single worker: every socket is local, so publish relays nothing."""
+
+    def __init__(self):
+        self.presence: Dict[str, Presence] = {}
+
+    async def publish(self, envelope: Envelope) -> None:
+        pass
+
+    async def get_presence(self, room_id: str) -> Presence:
+        return {user_id: dict(entry) for user_id, entry in self.presence.get(room_id, {}).items()}
+
+    async def set_presence(self, room_id: str, user_id: str, presence: Dict[str, Any]) -> None:
+        self.presence.setdefault(room_id, {})[user_id] = dict(presence)
+
+    async def update_presence(self, room_id: str, user_id: str, **fields: Any) -> None:
+        entry = self.presence.get(room_id, {}).get(user_id)
+        if entry is not None:
+            entry.update(fields)
+
+    async def remove_presence(self, room_id: str, user_id: str) -> None:
+        room_presence = self.presence.get(room_id)
+        if room_presence is not None:
+            room_presence.pop(user_id, None)
+            if not room_presence:
+                del self.presence[room_id]
+
+    async def clear_presence(self, room_id: str) -> None:
+        self.presence.pop(room_id, None)
+
+
+# KEYS: room presence hash. ARGV: user_id, JSON of the fields to merge.
+# Read and write happen in one step, so a remove_presence on another
+# worker can't be undone by a merge that read the entry just before it.
+_UPDATE_PRESENCE_SCRIPT = """
+local entry = redis.call('HGET', KEYS[1], ARGV[1])
+if not entry then
+    return 0
+end
+local merged = cjson.decode(entry)
+for field, value in pairs(cjson.decode(ARGV[2])) do
+    merged[field] = value
+end
+redis.call('HSET', KEYS[1], ARGV[1], cjson.encode(merged))
+return 1
+"""
+
+
+class RedisBackplane(Backplane):
+    """Redis pub/sub relay. Each worker tags what it publishes with its own
+    worker_id and skips those on receipt — it already delivered locally.
+
+    Envelopes from one publisher arrive in publish order and are delivered
+    one at a time, so a room's events keep their order on every worker."""
+
+    def __init__(self, client):
+        self._redis = client
+        self.worker_id = uuid.uuid4().hex
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._update_presence = client.register_script(_UPDATE_PRESENCE_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackplane":
+        return cls(redis_asyncio.from_url(url))
+
+    async def start(self, deliver: Deliver) -> None:
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+        self._listener = asyncio.create_task(self._listen(deliver), name="ws-backplane")
+        logger.info(f"WebSocket backplane subscribed (worker {self.worker_id})")
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        await self._redis.aclose()
+
+    async def _listen(self, deliver: Deliver) -> None:
+        async for message in self._pubsub.listen():
+            if message.get("type") != "pmessage":
+                continue
+            try:
+                envelope = orjson.loads(message["data"])
+                if envelope.pop("origin", None) == self.worker_id:
+                    continue
+                await deliver(envelope)
+            except Exception as e:
+                # One bad envelope must not stop the relay
+                logger.error(f"Backplane delivery failed: {e}")
+
+    async def publish(self, envelope: Envelope) -> None:
+        payload = orjson.dumps({**envelope, "origin": self.worker_id})
+        await self._redis.publish(f"{CHANNEL_PREFIX}{envelope['room_id']}", payload)
+
+    async def get_presence(self, room_id: str) -> Presence:
+        entries = await self._redis.hgetall(f"{PRESENCE_PREFIX}{room_id}")
+        return {
+            (user_id.decode() if isinstance(user_id, bytes) else user_id): orjson.loads(entry)
+            for user_id, entry in entries.items()
+        }
+
+    async def set_presence(self, room_id: str, user_id: str, presence: Dict[str, Any]) -> None:
+        await self._redis.hset(f"{PRESENCE_PREFIX}{room_id}", user_id, orjson.dumps(presence))
+
+    async def update_presence(self, room_id: str, user_id: str, **fields: Any) -> None:
+        if fields:
+            await self._update_presence(keys=[f"{PRESENCE_PREFIX}{room_id}"], args=[user_id, orjson.dumps(fields)])
+
+    async def remove_presence(self, room_id: str, user_id: str) -> None:
+        await self._redis.hdel(f"{PRESENCE_PREFIX}{room_id}", user_id)
+
+    async def clear_presence(self, room_id: str) -> None:
+        await self._redis.delete(f"{PRESENCE_PREFIX}{room_id}")
+
+
+def create_backplane(redis_url: Optional[str] = CONFIG.get('WS_BACKPLANE_REDIS_URL')) -> Backplane:
+    """Redis when a URL is configured, otherwise in-memory."""
+    if not redis_url:
+        return InMemoryBackplane()
+    if redis_asyncio is None:
+        raise RuntimeError("WS_BACKPLANE_REDIS_URL is set but the redis package is not installed")
+    return RedisBackplane.from_url(redis_url)
@@ -1,19 +1,109 @@
 # Copyright (C) 2025 Matthew Davey
 # SPDX-License-Identifier: GPL-3.0-or-later
+import asyncio
+import time
+from typing import Callable, Dict, Optional, Union
+
+import orjson
 from fastapi import WebSocket
 
+from db_executor import run_db
+from metrics import metrics
+from .backplane import Backplane, Envelope, create_backplane
+from .wire_codec import encode_binary_frame, negotiate_subprotocol
+
+# Outbound budgets (seconds). A send slower than SLOW_SEND_SECONDS downgrades
+# the client — it stops receiving ephemeral frames (live-drag moves) until a
+# send is fast again. A send still pending after SEND_TIMEOUT_SECONDS is
+# abandoned and the client evicted: its socket buffer is full, and a frame
+# cancelled mid-write leaves the stream unusable anyway. The client's
+# reconnect path restores it with a fresh initial_state.
+SLOW_SEND_SECONDS = 0.25
+SEND_TIMEOUT_SECONDS = 2.0
+EVICT_CLOSE_CODE = 1013  # "Try Again Later"
+
+# Grace before a disconnected user leaves the room for good.
+USER_REMOVAL_SECONDS = 30
+
+
+def _fanout_metric(room_id: str) -> str:
+    """Per-room broadcast histogram; removed once the room has no local
+    sockets, so the label set stays bounded by the live rooms."""
+    return f"broadcast.fanout_seconds{{room={room_id}}}"
+
+
+def encode_frame(message) -> str:
+    """Serialize a message to its wire text ONCE, for any number of sends.
+
+    send_json re-ran json.dumps for every recipient; a room broadcast now
+    costs one orjson encode per distinct payload. Output is compact JSON,
+    equivalent to what Starlette's send_json produced."""
+    return orjson.dumps(message).decode("utf-8")
+
+
+def frame_for(message, binary: bool, frames: Dict[bool, Union[str, bytes]]) -> Union[str, bytes]:
+    """The wire frame for one recipient, encoded at most once per wire
+    format: frames caches them across a fan-out. Binary clients get JSON
+    text for events outside the binary schema."""
+    frame = frames.get(binary)
+    if frame is None:
+        if binary:
+            frame = encode_binary_frame(message)
+            if frame is None:
+                frame = frame_for(message, False, frames)
+        else:
+            frame = encode_frame(message)
+        frames[binary] = frame
+    return frame
+
+
 class ConnectionManager:
     """
     Manages the connect and disconnect of client websocket connections
+
+    room_users holds only this worker's sockets. Every delivery goes to
+    local sockets first and is then published on the backplane for the
+    sockets other workers hold; lobby presence lives in the backplane so
+    every worker sees the whole room (see backplane.py).
     """
-    def __init__(self):
+    def __init__(self, backplane: Optional[Backplane] = None):
         self.connections: list[WebSocket] = []
         self.room_users: dict[str, dict[str, dict]] = {}
         # Track disconnect timeouts
         self.disconnect_timeouts: dict[str, dict[str, any]] = {}
+        self.backplane = backplane if backplane is not None else create_backplane()
+        # Sockets closed by release_room: their receive loops must skip the
+        # normal disconnect handling (the player is moving, not leaving)
+        self._released_sockets: set = set()
+
+    async def start(self):
+        """Lifespan startup: receive other workers' deliveries."""
+        await self.backplane.start(self._deliver_remote)
+
+    async def stop(self):
+        """Lifespan shutdown."""
+        await self.backplane.close()
+
+    async def _deliver_remote(self, envelope: Envelope):
+        """A delivery published by another worker, for our sockets."""
+        kind = envelope.get("kind")
+        room_id = envelope.get("room_id")
+        if kind == "room":
+            await self._fanout_room(room_id, envelope["data"], envelope.get("ephemeral", False))
+        elif kind == "views":
+            await self._fanout_views(
+                room_id, envelope.get("privileged_user_id"),
+                envelope["privileged_data"], envelope.get("default_data"),
+            )
+        elif kind == "player":
+            await self._send_local_player(room_id, envelope["user_id"], envelope["message"])
+        elif kind == "close":
+            await self._close_local_room(room_id, envelope.get("reason", "Room closed"))
 
     async def connect(self, websocket: WebSocket, room_id: str, user_id: str):
-        await websocket.accept()
+        # Opt-in binary subprotocol (wire_codec.py); everyone else gets JSON.
+        subprotocol = negotiate_subprotocol(websocket.scope.get("subprotocols", []))
+        await websocket.accept(subprotocol=subprotocol)
         self.connections.append(websocket)
 
         # Initialize room tracking if not exists
@@ -29,14 +119,18 @@ class ConnectionManager:
         # Add user to room tracking
         self.room_users[room_id][user_id] = {
             "websocket": websocket,
-            "is_in_party": False,  # Will be updated when they join a seat
-            "status": "connected"
+            "degraded": False,  # Slow consumer: skipped for ephemeral frames
+            "binary": subprotocol is not None  # MessagePack frames for schema events
         }
+        await self.backplane.set_presence(room_id, user_id, {
+            "is_in_party": False,  # Will be updated when they join a seat
+            "status": "connected",
+        })
 
         # Send lobby update to all clients in this room
         await self.broadcast_lobby_update(room_id)
 
-    def remove_connection(self, websocket: WebSocket, room_id: str = None, user_id: str = None):
+    async def remove_connection(self, websocket: WebSocket, room_id: str = None, user_id: str = None):
         """Remove a disconnected websocket from the connections list"""
         if websocket in self.connections:
             self.connections.remove(websocket)
@@ -45,8 +139,8 @@ class ConnectionManager:
         if room_id and user_id and room_id in self.room_users:
             if user_id in self.room_users[room_id]:
                 # Mark as disconnected instead of removing immediately
-                self.room_users[room_id][user_id]["status"] = "disconnecting"
                 self.room_users[room_id][user_id]["websocket"] = None
+                await self.backplane.update_presence(room_id, user_id, status="disconnecting")
 
                 # Set up 30-second timeout for complete removal
                 self.schedule_user_removal(room_id, user_id)
@@ -56,19 +150,24 @@ class ConnectionManager:
         import asyncio
 
         async def remove_user_after_timeout():
-            await asyncio.sleep(30)  # 30 seconds
-
-            # Only remove if user is still disconnecting (hasn't reconnected)
-            if (room_id in self.room_users and
-                user_id in self.room_users[room_id] and
-                self.room_users[room_id][user_id].get("status") == "disconnecting"):
-
-                del self.room_users[room_id][user_id]
-                print(f"🕒 Removed {user_id} from room {room_id} after 30-second timeout")
+            await asyncio.sleep(USER_REMOVAL_SECONDS)
 
+            # Our socket slot is dead either way (a reconnect to this worker
+            # would have cancelled the timeout)
+            local_users = self.room_users.get(room_id, {})
+            if user_id in local_users and local_users[user_id]["websocket"] is None:
+                del local_users[user_id]
                 # Clean up empty rooms
-                if not self.room_users[room_id]:
+                if not local_users:
                     del self.room_users[room_id]
+                    metrics.remove_histogram(_fanout_metric(room_id))
+
+            # Only remove if user is still disconnecting (hasn't reconnected,
+            # here or on another worker)
+            presence = (await self.backplane.get_presence(room_id)).get(user_id)
+            if presence is not None and presence.get("status") == "disconnecting":
+                await self.backplane.remove_presence(room_id, user_id)
+                print(f"🕒 Removed {user_id} from room {room_id} after 30-second timeout")
 
                 # Send lobby update after removal
                 await self.broadcast_lobby_update(room_id)
@@ -91,47 +190,99 @@ class ConnectionManager:
         timeout_task = asyncio.create_task(remove_user_after_timeout())
         self.disconnect_timeouts[room_id][user_id] = timeout_task
 
-    def update_party_status(self, room_id: str, user_id: str, is_in_party: bool):
+    async def update_party_status(self, room_id: str, user_id: str, is_in_party: bool):
         """Update whether a user is in the party or lobby"""
-        if room_id in self.room_users and user_id in self.room_users[room_id]:
-            self.room_users[room_id][user_id]["is_in_party"] = is_in_party
+        await self.backplane.update_presence(room_id, user_id, is_in_party=is_in_party)
+
+    async def update_party_from_seats(self, room_id: str, seat_layout: list):
+        """Party = seated: refresh is_in_party for everyone in the room"""
+        for uid in await self.backplane.get_presence(room_id):
+            await self.update_party_status(room_id, uid, uid in seat_layout)
 
     async def remove_player_from_party(self, room_id: str, user_id: str):
         """Remove a user from party and move them to lobby"""
-        if room_id in self.room_users and user_id in self.room_users[room_id]:
-            self.room_users[room_id][user_id]["is_in_party"] = False
+        if user_id in await self.backplane.get_presence(room_id):
+            await self.update_party_status(room_id, user_id, False)
             print(f"🚪 Moved {user_id} from party to lobby in room {room_id}")
             # Broadcast lobby update after status change
             await self.broadcast_lobby_update(room_id)
 
+    async def _send(self, room_id: str, user_id: str, websocket: WebSocket,
+                    frame: Union[str, bytes]) -> bool:
+        """Send one pre-encoded frame (text, or bytes for binary clients)
+        within the outbound budget. Returns False when the client was dead
+        or evicted. Updates the client's degraded flag."""
+        started = time.perf_counter()
+        send = websocket.send_bytes if isinstance(frame, bytes) else websocket.send_text
+        try:
+            await asyncio.wait_for(send(frame), timeout=SEND_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            metrics.increment("broadcast.evicted_slow_consumers")
+            print(f"🐌 Evicting slow consumer {user_id} from room {room_id} (send > {SEND_TIMEOUT_SECONDS}s)")
+            await self._evict(websocket, room_id, user_id)
+            return False
+        except Exception:
+            # Connection is dead, remove it
+            await self.remove_connection(websocket, room_id, user_id)
+            return False
+
+        elapsed = time.perf_counter() - started
+        metrics.observe("broadcast.send_seconds", elapsed)
+        user_data = self.room_users.get(room_id, {}).get(user_id)
+        if user_data is not None and user_data.get("websocket") is websocket:
+            degraded = elapsed > SLOW_SEND_SECONDS
+            if degraded and not user_data.get("degraded"):
+                metrics.increment("broadcast.downgraded_consumers")
+            user_data["degraded"] = degraded
+        return True
+
+    async def _evict(self, websocket: WebSocket, room_id: str, user_id: str):
+        """Drop a slow consumer. The close is best-effort and bounded — its
+        transport is by definition not draining."""
+        await self.remove_connection(websocket, room_id, user_id)
+        try:
+            await asyncio.wait_for(
+                websocket.close(code=EVICT_CLOSE_CODE, reason="Slow consumer"),
+                timeout=SEND_TIMEOUT_SECONDS,
+            )
+        except Exception:
+            pass
+
     async def send_to_player(self, room_id: str, user_id: str, message: dict):
-        """Send a message to a specific user"""
+        """Send a message to a specific user, on whichever worker holds them"""
+        if not await self._send_local_player(room_id, user_id, message):
+            await self.backplane.publish({
+                "kind": "player", "room_id": room_id, "user_id": user_id, "message": message,
+            })
+
+    async def _send_local_player(self, room_id: str, user_id: str, message: dict) -> bool:
+        """Send to the user's socket if this worker holds it."""
         if (room_id in self.room_users and
             user_id in self.room_users[room_id] and
             self.room_users[room_id][user_id]["websocket"]):
 
-            websocket = self.room_users[room_id][user_id]["websocket"]
-            try:
-                await websocket.send_json(data=message)
-            except Exception:
-                # Connection is dead, remove it
-                self.remove_connection(websocket, room_id, user_id)
+            user_data = self.room_users[room_id][user_id]
+            frame = frame_for(message, user_data.get("binary", False), {})
+            await self._send(room_id, user_id, user_data["websocket"], frame)
+            return True
+        return False
 
     async def broadcast_lobby_update(self, room_id: str):
         """Send lobby update to all clients in a room"""
-        if room_id not in self.room_users:
+        presence = await self.backplane.get_presence(room_id)
+        if not presence:
             return
 
         # Look up player names from the room's player_metadata
         from gameservice import GameService
-        room = GameService.get_room(room_id)
+        room = await run_db(GameService.get_room_core, room_id)
         player_metadata = room.get("player_metadata", {}) if room else {}
         dm = room.get("dungeon_master", {}) if room else {}
 
         # Include all users tracked in the room (connected and disconnecting),
         # independent of seat/party state.
         lobby_users = []
-        for uid, user_data in self.room_users[room_id].items():
+        for uid, user_presence in presence.items():
             # Resolve display name: player_metadata → DM contract → fallback to uid
             meta = player_metadata.get(uid)
             if meta:
@@ -144,7 +295,7 @@ class ConnectionManager:
                 "name": display_name,
                 "user_id": uid,
                 "id": uid,
-                "status": user_data.get("status", "connected")
+                "status": user_presence.get("status", "connected")
             })
 
         lobby_message = {
@@ -166,26 +317,34 @@ class ConnectionManager:
         Only use for server-wide events like maintenance announcements.
         For normal game events, use RoomManager.broadcast() instead.
         """
-        dead_connections = []
+        frame = encode_frame(data)
 
-        for connection in self.connections:
+        async def send(connection):
             try:
-                await connection.send_json(data=data)
+                await asyncio.wait_for(connection.send_text(frame), timeout=SEND_TIMEOUT_SECONDS)
             except Exception:
-                # Mark this connection as dead
-                dead_connections.append(connection)
+                # Dead or stalled — either way, drop it
+                await self.remove_connection(connection)
 
-        # Remove all dead connections
-        for dead_connection in dead_connections:
-            self.remove_connection(dead_connection)
+        await asyncio.gather(*(send(connection) for connection in list(self.connections)))
 
-    async def update_room_data(self, room_id: str, data):
-        """Send data only to clients in a specific room"""
+    async def update_room_data(self, room_id: str, data, ephemeral: bool = False):
+        """Send data only to clients in a specific room, on every worker.
+
+        Fan-out is concurrent: every recipient's send is in flight at once,
+        so one stalled socket costs the room at most SEND_TIMEOUT_SECONDS
+        instead of delaying everyone queued behind it. ephemeral frames
+        (live-drag moves) skip degraded clients."""
+        await self._fanout_room(room_id, data, ephemeral)
+        await self.backplane.publish({
+            "kind": "room", "room_id": room_id, "data": data, "ephemeral": ephemeral,
+        })
+
+    async def _fanout_room(self, room_id: str, data, ephemeral: bool):
         if room_id not in self.room_users:
             return
 
-        dead_connections = []
-
+        recipients = []
         for uid, user_data in self.room_users[room_id].items():
             websocket = user_data["websocket"]
 
@@ -193,30 +352,86 @@ class ConnectionManager:
             if websocket is None:
                 continue
 
-            try:
-                await websocket.send_json(data=data)
-            except Exception:
-                # Mark this connection as dead
-                dead_connections.append((room_id, uid, websocket))
+            # Slow consumers keep committed state but shed superseded frames
+            if ephemeral and user_data.get("degraded"):
+                metrics.increment("broadcast.skipped_degraded")
+                continue
+
+            recipients.append((uid, websocket, user_data.get("binary", False)))
+
+        if not recipients:
+            return
+
+        frames = {}
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            self._send(room_id, uid, websocket, frame_for(data, binary, frames))
+            for uid, websocket, binary in recipients
+        ))
+        metrics.observe(_fanout_metric(room_id), time.perf_counter() - started)
+
+    async def update_room_views(self, room_id: str, privileged_user_id: Optional[str],
+                                privileged_data, default_data):
+        """Two-view fan-out: privileged_user_id (the DM) gets privileged_data,
+        everyone else default_data — or nothing when default_data is None.
+
+        Each view is encoded once per wire format, not once per recipient
+        (hidden-token filtering, decision 17, is the caller)."""
+        await self._fanout_views(room_id, privileged_user_id, privileged_data, default_data)
+        await self.backplane.publish({
+            "kind": "views", "room_id": room_id, "privileged_user_id": privileged_user_id,
+            "privileged_data": privileged_data, "default_data": default_data,
+        })
+
+    async def _fanout_views(self, room_id: str, privileged_user_id: Optional[str],
+                            privileged_data, default_data):
+        if room_id not in self.room_users:
+            return
+
+        privileged_frames, default_frames = {}, {}
 
-        # Remove all dead connections
-        for room, user, ws in dead_connections:
-            self.remove_connection(ws, room, user)
+        recipients = []
+        for uid, user_data in self.room_users[room_id].items():
+            websocket = user_data["websocket"]
+            if websocket is None:
+                continue
+            binary = user_data.get("binary", False)
+            if uid == privileged_user_id:
+                frame = frame_for(privileged_data, binary, privileged_frames)
+            elif default_data is not None:
+                frame = frame_for(default_data, binary, default_frames)
+            else:
+                continue
+            recipients.append((uid, websocket, frame))
+
+        if not recipients:
+            return
+
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            self._send(room_id, uid, websocket, frame) for uid, websocket, frame in recipients
+        ))
+        metrics.observe(_fanout_metric(room_id), time.perf_counter() - started)
 
     async def close_room_connections(self, room_id: str, reason: str = "Room closed"):
-        """Gracefully close all WebSocket connections in a room"""
+        """Gracefully close all WebSocket connections in a room, on every worker"""
+        await self._close_local_room(room_id, reason)
+        await self.backplane.publish({"kind": "close", "room_id": room_id, "reason": reason})
+        await self.backplane.clear_presence(room_id)
+
+    async def _close_local_room(self, room_id: str, reason: str):
         if room_id not in self.room_users:
             print(f"🔌 No connections to close for room {room_id}")
             return
 
         # Send closure notification to all clients
-        closure_message = {
+        closure_frame = encode_frame({
             "event_type": "session_ended",
             "data": {
                 "reason": reason,
                 "message": "This game session has ended. You will be redirected shortly."
             }
-        }
+        })
 
         # Get all users in this room before closing
         users_to_close = list(self.room_users[room_id].items())
@@ -232,7 +447,7 @@ class ConnectionManager:
 
             try:
                 # Send closure notification
-                await websocket.send_json(closure_message)
+                await websocket.send_text(closure_frame)
 
                 # Close the WebSocket connection gracefully
                 await websocket.close(code=1000, reason=reason)
@@ -248,6 +463,7 @@ class ConnectionManager:
         # Clean up room data
         if room_id in self.room_users:
             del self.room_users[room_id]
+        metrics.remove_histogram(_fanout_metric(room_id))
 
         # Clean up disconnect timeouts for this room
         if room_id in self.disconnect_timeouts:
@@ -258,6 +474,37 @@ class ConnectionManager:
 
         print(f"✅ All connections closed for room {room_id}")
 
+    async def release_room(self, room_id: str, close_code: int, reason_for: Callable[[str], str]):
+        """Close this worker's sockets for a room that is moving to another
+        worker (room_affinity.py), each with reason_for(user_id) as its
+        close reason. No session_ended notice and no lobby or presence
+        changes — the clients reconnect to the new owner."""
+        for uid, user_data in list(self.room_users.pop(room_id, {}).items()):
+            websocket = user_data["websocket"]
+            if websocket is None:
+                continue
+            self._released_sockets.add(websocket)
+            if websocket in self.connections:
+                self.connections.remove(websocket)
+            try:
+                await asyncio.wait_for(websocket.close(code=close_code, reason=reason_for(uid)),
+                                       timeout=SEND_TIMEOUT_SECONDS)
+            except Exception as e:
+                print(f"⚠️ Error releasing WebSocket for {uid}: {e}")
+
+        for timeout_task in self.disconnect_timeouts.pop(room_id, {}).values():
+            timeout_task.cancel()
+        await self.backplane.clear_presence(room_id)
+        metrics.remove_histogram(_fanout_metric(room_id))
+
+    def was_released(self, websocket: WebSocket) -> bool:
+        """True (once) for a socket closed by release_room."""
+        if websocket in self._released_sockets:
+            self._released_sockets.discard(websocket)
+            return True
+        return False
+
+
 class RoomManager:
     """
     Room-scoped manager that ensures all broadcasts stay within a specific room.
@@ -268,14 +515,20 @@ class RoomManager:
         self.connection_manager = connection_manager
         self.room_id = room_id
 
-    async def update_room_data(self, data):
+    async def update_room_data(self, data, ephemeral: bool = False):
         """Update data for all clients in this room only"""
-        await self.connection_manager.update_room_data(self.room_id, data)
+        await self.connection_manager.update_room_data(self.room_id, data, ephemeral=ephemeral)
 
     async def send_to_player(self, user_id: str, message: dict):
         """Send message to a specific user in this room"""
         await self.connection_manager.send_to_player(self.room_id, user_id, message)
 
+    async def update_room_views(self, privileged_user_id, privileged_data, default_data):
+        """Two-view fan-out within this room (see ConnectionManager)"""
+        await self.connection_manager.update_room_views(
+            self.room_id, privileged_user_id, privileged_data, default_data
+        )
+
     async def broadcast_lobby_update(self):
         """Send lobby update to all clients in this room"""
         await self.connection_manager.broadcast_lobby_update(self.room_id)
@@ -284,9 +537,9 @@ class RoomManager:
         """Remove a user from party and move them to lobby in this room"""
         await self.connection_manager.remove_player_from_party(self.room_id, user_id)
 
-    def update_party_status(self, user_id: str, is_in_party: bool):
+    async def update_party_status(self, user_id: str, is_in_party: bool):
         """Update whether a user is in the party or lobby in this room"""
-        self.connection_manager.update_party_status(self.room_id, user_id, is_in_party)
+        await self.connection_manager.update_party_status(self.room_id, user_id, is_in_party)
 
 
 # Create manager instance to be imported by other modules
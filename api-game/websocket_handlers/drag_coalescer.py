@@ -0,0 +1,113 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Per-room coalescing of live-drag move frames.
+
+Every dragging client streams map_token_drag "move" frames at ~20 Hz, and
+each one used to be relayed to the whole room on arrival — three players
+dragging in a six-seat room meant ~360 sends a second, most of them
+positions already superseded before they were rendered.
+
+Now a move frame only records the latest position for its hold
+(asset_id, token_id). A per-room flush task wakes every 1/tick_hz seconds
+and sends whatever accumulated as ONE map_token_drag_batch frame, then
+exits once a tick finds nothing pending (the next frame restarts it).
+Fan-out per room is bounded by the tick rate, not by the number of hands.
+
+grab/release are never coalesced — they move the hold lock and go out on
+arrival. Validation stays with the handler (holder check, hidden-hold
+suppression); is_relayable re-checks at flush time so a frame queued just
+before a release or a mid-hold hide can't leak out after it.
+"""
+
+import asyncio
+import inspect
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from config.settings import get_settings
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+CONFIG = get_settings()
+
+DRAG_BATCH_TICK_HZ = CONFIG.get('MAP_TOKEN_DRAG_TICK_HZ')
+
+Broadcast = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+FrameFilter = Callable[[str, Dict[str, Any]], Union[bool, Awaitable[bool]]]
+
+
+class DragCoalescer:
+    """room_id -> latest move frame per hold, flushed on a fixed tick."""
+
+    def __init__(self, tick_hz: float = DRAG_BATCH_TICK_HZ,
+                 is_relayable: Optional[FrameFilter] = None):
+        self._interval = 1.0 / tick_hz
+        self._is_relayable = is_relayable
+        self._pending: Dict[str, Dict[Tuple[str, str], Dict[str, Any]]] = {}
+        self._broadcasts: Dict[str, Broadcast] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def offer(self, room_id: str, frame: Dict[str, Any], broadcast: Broadcast) -> None:
+        """Record a validated move frame; it goes out with the room's next
+        batch unless a newer frame for the same hold replaces it first."""
+        room_pending = self._pending.setdefault(room_id, {})
+        hold_key = (frame["asset_id"], frame["token_id"])
+        if hold_key in room_pending:
+            metrics.increment("drag_coalescer.superseded_frames")
+        room_pending[hold_key] = frame
+        self._broadcasts[room_id] = broadcast
+
+        task = self._tasks.get(room_id)
+        if task is None or task.done():
+            self._tasks[room_id] = asyncio.create_task(
+                self._run(room_id), name=f"drag-coalescer-{room_id}"
+            )
+
+    def discard(self, room_id: str, asset_id: str, token_id: str) -> None:
+        """Drop a hold's pending frame (release: the hand is off the mini)."""
+        room_pending = self._pending.get(room_id)
+        if room_pending:
+            room_pending.pop((asset_id, token_id), None)
+
+    def close_room(self, room_id: str) -> None:
+        """Stop a room's flush task and drop anything pending (session ended)."""
+        self._pending.pop(room_id, None)
+        self._broadcasts.pop(room_id, None)
+        task = self._tasks.pop(room_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def _relayable(self, room_id: str, frame: Dict[str, Any]) -> bool:
+        if self._is_relayable is None:
+            return True
+        relayable = self._is_relayable(room_id, frame)
+        if inspect.isawaitable(relayable):
+            relayable = await relayable
+        return relayable
+
+    async def _run(self, room_id: str) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self._interval)
+                room_pending = self._pending.pop(room_id, None)
+                if not room_pending:
+                    return
+
+                frames = [
+                    frame for frame in room_pending.values()
+                    if await self._relayable(room_id, frame)
+                ]
+                if not frames:
+                    continue
+
+                batch_message = {"event_type": "map_token_drag_batch", "data": {"frames": frames}}
+                try:
+                    await self._broadcasts[room_id](room_id, batch_message)
+                except Exception as e:
+                    # Presence only — the next tick carries fresher positions.
+                    logger.error(f"Room {room_id} drag batch send failed: {e}")
+        finally:
+            if self._tasks.get(room_id) is asyncio.current_task():
+                del self._tasks[room_id]
+                self._broadcasts.pop(room_id, None)
@@ -0,0 +1,182 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Per-room event actors: one queue + one worker task per active room.
+
+Each socket's receive loop used to run its handler inline, so two players in
+the same room had their events interleave at every await inside the
+handlers (seat_change racing player_kicked, two token ops reading the same
+pre-op board). Now the receive loop only parses and submits; the room's
+actor runs events one at a time, in the order the room received them.
+
+  - Ordering: strictly serial per room, arrival order across all sockets.
+    Different rooms never share an actor, so a hot room can't delay a quiet
+    one — and no global lock is involved.
+  - Backpressure: the queue is bounded (ROOM_QUEUE_MAX_SIZE). A durable
+    event submitted to a full queue waits for space, which parks that
+    sender's receive loop — the slow room pushes back on its own sockets.
+  - Ephemeral lanes: live-drag move frames (map_token_drag phase "move")
+    are superseded by the next frame within milliseconds, so once the
+    queue is past EPHEMERAL_DROP_DEPTH they are dropped instead of queued.
+    grab/release are never dropped — they move the hold lock.
+  - Metrics: queue depth (gauge, per room), time spent queued and time
+    spent handling (histograms), dropped frames (counter).
+
+A worker exits after ACTOR_IDLE_SECONDS with nothing queued; the next
+event for that room starts a fresh one.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ROOM_QUEUE_MAX_SIZE = 256
+EPHEMERAL_DROP_DEPTH = 32
+ACTOR_IDLE_SECONDS = 60.0
+
+EventJob = Callable[[], Awaitable[Any]]
+
+
+def is_ephemeral(event_type: Optional[str], event_data: Any) -> bool:
+    """Frames that may be dropped under load: superseded by the next frame
+    and never part of committed state."""
+    return (
+        event_type == "map_token_drag"
+        and isinstance(event_data, dict)
+        and event_data.get("phase") == "move"
+    )
+
+
+@dataclass
+class _QueuedEvent:
+    event_type: Optional[str]
+    job: EventJob
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class RoomActor:
+    """Serial executor for one room's events."""
+
+    def __init__(self, room_id: str, registry: "RoomActorRegistry",
+                 max_size: int = ROOM_QUEUE_MAX_SIZE,
+                 ephemeral_drop_depth: int = EPHEMERAL_DROP_DEPTH,
+                 idle_seconds: float = ACTOR_IDLE_SECONDS):
+        self.room_id = room_id
+        self._registry = registry
+        self._queue: "asyncio.Queue[_QueuedEvent]" = asyncio.Queue(maxsize=max_size)
+        self._ephemeral_drop_depth = ephemeral_drop_depth
+        self._idle_seconds = idle_seconds
+        self._depth_gauge = f"room_actor.queue_depth{{room={room_id}}}"
+        self._worker = asyncio.create_task(self._run(), name=f"room-actor-{room_id}")
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        return not self._worker.done()
+
+    async def submit(self, event_type: Optional[str], job: EventJob, ephemeral: bool = False) -> bool:
+        """Queue a job. Returns False when an ephemeral frame was dropped."""
+        if ephemeral and self._queue.qsize() >= self._ephemeral_drop_depth:
+            metrics.increment("room_actor.dropped_ephemeral")
+            return False
+
+        await self._queue.put(_QueuedEvent(event_type, job))
+        metrics.set_gauge(self._depth_gauge, self._queue.qsize())
+        return True
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    queued = await asyncio.wait_for(self._queue.get(), timeout=self._idle_seconds)
+                except asyncio.TimeoutError:
+                    if self._queue.empty():
+                        return
+                    continue
+
+                started = time.perf_counter()
+                metrics.observe("room_actor.queue_wait_seconds", started - queued.enqueued_at)
+                metrics.set_gauge(self._depth_gauge, self._queue.qsize())
+                try:
+                    await queued.job()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # One bad event must not kill the room's ordering lane.
+                    logger.error(f"Room {self.room_id} actor: {queued.event_type} handler failed: {e}")
+                finally:
+                    metrics.observe("room_actor.handle_seconds", time.perf_counter() - started)
+                    self._queue.task_done()
+        finally:
+            metrics.remove_gauge(self._depth_gauge)
+            self._registry._discard(self)
+
+    async def drain(self) -> None:
+        """Wait until everything queued so far has been handled."""
+        await self._queue.join()
+
+    def stop(self) -> None:
+        """Cancel the worker; queued events are discarded."""
+        self._worker.cancel()
+
+
+class RoomActorRegistry:
+    """room_id -> RoomActor, created on demand."""
+
+    def __init__(self, max_size: int = ROOM_QUEUE_MAX_SIZE,
+                 ephemeral_drop_depth: int = EPHEMERAL_DROP_DEPTH,
+                 idle_seconds: float = ACTOR_IDLE_SECONDS):
+        self._actors: Dict[str, RoomActor] = {}
+        self._max_size = max_size
+        self._ephemeral_drop_depth = ephemeral_drop_depth
+        self._idle_seconds = idle_seconds
+
+    def get(self, room_id: str) -> RoomActor:
+        actor = self._actors.get(room_id)
+        if actor is None or not actor.running:
+            actor = RoomActor(
+                room_id, self,
+                max_size=self._max_size,
+                ephemeral_drop_depth=self._ephemeral_drop_depth,
+                idle_seconds=self._idle_seconds,
+            )
+            self._actors[room_id] = actor
+        return actor
+
+    async def submit(self, room_id: str, event_type: Optional[str], job: EventJob,
+                     ephemeral: bool = False) -> bool:
+        """Queue job on the room's actor (see RoomActor.submit)."""
+        return await self.get(room_id).submit(event_type, job, ephemeral=ephemeral)
+
+    async def drain_room(self, room_id: str) -> None:
+        """Finish everything queued for a room, then stop its actor (the
+        room is moving to another worker — its events must land first)."""
+        actor = self._actors.get(room_id)
+        if actor is not None and actor.running:
+            await actor.drain()
+        self.close_room(room_id)
+
+    def close_room(self, room_id: str) -> None:
+        """Stop a room's actor (session ended — nothing left to deliver to)."""
+        actor = self._actors.pop(room_id, None)
+        if actor is not None:
+            actor.stop()
+
+    def _discard(self, actor: RoomActor) -> None:
+        # Only forget the actor if it's still the registered one — an idle
+        # exit can race a fresh get() that already replaced it.
+        if self._actors.get(actor.room_id) is actor:
+            del self._actors[actor.room_id]
+
+
+# Create registry instance to be imported by other modules
+room_actors = RoomActorRegistry()
@@ -0,0 +1,529 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Room affinity: every session lives on exactly one api-game worker.
+
+The alternative to fanning every delivery out over the backplane is to keep
+a room's sockets, actor, holds, drag coalescer and room cache together on
+one owner worker — then all of that in-memory state stays correct with any
+number of workers.
+
+  - Ownership: a lease per room (room_id -> worker URL, with a TTL) in a
+    shared LeaseStore. The owner renews it while the room has sockets here.
+  - Placement: an unleased room goes to its consistent-hash owner among the
+    live workers (HashRing), so adding or removing a worker only moves
+    ~1/n of the rooms.
+  - Routing: a socket that lands on the wrong worker is proxied to the
+    owner (proxy_websocket) — the browser never sees which worker it got.
+    Proxied connections carry FORWARDED_HEADER, signed with the shared
+    ROOM_AFFINITY_SECRET (a client can send the header too); the receiving
+    worker serves them or refuses, but never forwards again.
+  - Rebalance: each maintenance tick re-reads the live workers. A room
+    whose ring owner is now another live worker is handed off: the room's
+    actor drains, buffered state is flushed to Mongo, and its sockets close
+    with ROOM_MOVED_CLOSE_CODE and a per-user handoff token as the close
+    reason. Clients reconnect straight away with that token and land on
+    the new owner, which loads the room from Mongo. Their seats are kept:
+    a handed-off socket skips the usual disconnect handling, and a valid
+    token skips the join announcement. A worker
+    shutting down hands off every room it owns. A crashed worker's leases
+    lapse after ROOM_LEASE_TTL_SECONDS.
+  - Cache invalidation: HTTP endpoints are served by whichever worker gets
+    the request, so a room write there would leave the owner's room cache
+    stale. Each such write is published (publish_room_change) and every
+    other worker drops its cached copy of the room.
+
+Enabled by ROOM_AFFINITY_REDIS_URL (RedisLeaseStore) plus this worker's
+reachable WORKER_ADVERTISE_URL and the ROOM_AFFINITY_SECRET every worker
+shares; unset, route() always serves locally.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import hmac
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import websockets
+
+from config.settings import get_settings
+
+try:
+    import redis.asyncio as redis_asyncio
+    from redis.exceptions import WatchError
+except ImportError:  # optional: only needed when ROOM_AFFINITY_REDIS_URL is set
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+CONFIG = get_settings()
+
+ROOM_MOVED_CLOSE_CODE = 4011
+TRY_AGAIN_CLOSE_CODE = 1013
+FORWARDED_HEADER = "x-rollplay-forwarded-by"
+RING_VNODES = 64
+HANDOFF_TOKEN_TTL_SECONDS = 60
+
+WORKERS_KEY = "rollplay:affinity:workers"
+LEASE_PREFIX = "rollplay:affinity:lease:"
+ROOM_CHANGES_CHANNEL = "rollplay:affinity:room-changes"
+
+HandOff = Callable[[str], Awaitable[None]]
+IsActive = Callable[[str], bool]
+RoomChanged = Callable[[str], None]
+
+
+class RoomUnavailable(Exception):
+    """The room can't be served anywhere right now (mid-handoff, or a dead
+    owner's lease hasn't lapsed). The client should retry shortly."""
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+def _sign(secret: str, *parts: str) -> str:
+    return hmac.new(secret.encode(), "|".join(parts).encode(), hashlib.sha256).hexdigest()
+
+
+class HashRing:
+    """Consistent hashing of room_ids onto worker ids, RING_VNODES points
+    per worker."""
+
+    def __init__(self, workers: Iterable[str] = (), vnodes: int = RING_VNODES):
+        self.workers = frozenset(workers)
+        points: List[Tuple[int, str]] = sorted(
+            (_ring_hash(f"{worker}#{index}"), worker)
+            for worker in self.workers
+            for index in range(vnodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [worker for _, worker in points]
+
+    def owner(self, room_id: str) -> Optional[str]:
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _ring_hash(room_id)) % len(self._hashes)
+        return self._owners[index]
+
+
+class LeaseStore(ABC):
+    """Worker registry + per-room leases, shared by every worker."""
+
+    @abstractmethod
+    async def heartbeat(self, worker_id: str, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def deregister(self, worker_id: str) -> None:
+        ...
+
+    @abstractmethod
+    async def live_workers(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    async def holder(self, room_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def acquire(self, room_id: str, worker_id: str, ttl: float) -> bool:
+        """Take an unheld lease; True if worker_id holds it afterwards."""
+
+    @abstractmethod
+    async def renew(self, room_id: str, worker_id: str, ttl: float) -> bool:
+        """Extend a lease worker_id still holds; False if it was lost."""
+
+    @abstractmethod
+    async def release(self, room_id: str, worker_id: str) -> None:
+        """Drop a lease, but only if worker_id still holds it."""
+
+    @abstractmethod
+    async def publish_room_change(self, room_id: str, worker_id: str) -> None:
+        """Announce that worker_id just wrote room_id outside its owner."""
+
+    @abstractmethod
+    def room_changes(self) -> AsyncIterator[Tuple[str, str]]:
+        """Every (room_id, worker_id) published from now on, until cancelled."""
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryLeaseStore(LeaseStore):
+    """Process-local store: one worker, or several RoomAffinity instances
+    sharing it in tests."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._workers: Dict[str, float] = {}
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._subscribers: List[asyncio.Queue] = []
+
+    async def heartbeat(self, worker_id: str, ttl: float) -> None:
+        self._workers[worker_id] = self._clock() + ttl
+
+    async def deregister(self, worker_id: str) -> None:
+        self._workers.pop(worker_id, None)
+
+    async def live_workers(self) -> List[str]:
+        now = self._clock()
+        return [worker for worker, expires_at in self._workers.items() if expires_at > now]
+
+    async def holder(self, room_id: str) -> Optional[str]:
+        lease = self._leases.get(room_id)
+        if lease is None or lease[1] <= self._clock():
+            return None
+        return lease[0]
+
+    async def acquire(self, room_id: str, worker_id: str, ttl: float) -> bool:
+        current = await self.holder(room_id)
+        if current is None:
+            self._leases[room_id] = (worker_id, self._clock() + ttl)
+            return True
+        return current == worker_id
+
+    async def renew(self, room_id: str, worker_id: str, ttl: float) -> bool:
+        if await self.holder(room_id) != worker_id:
+            return False
+        self._leases[room_id] = (worker_id, self._clock() + ttl)
+        return True
+
+    async def release(self, room_id: str, worker_id: str) -> None:
+        if await self.holder(room_id) == worker_id:
+            del self._leases[room_id]
+
+    async def publish_room_change(self, room_id: str, worker_id: str) -> None:
+        for queue in self._subscribers:
+            queue.put_nowait((room_id, worker_id))
+
+    async def room_changes(self) -> AsyncIterator[Tuple[str, str]]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.remove(queue)
+
+
+class RedisLeaseStore(LeaseStore):
+    """Workers in one sorted set scored by heartbeat expiry; one key per
+    lease (SET NX PX). Renew/release are WATCH-guarded so a worker can
+    never extend or drop a lease someone else has since taken."""
+
+    def __init__(self, client):
+        self._redis = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisLeaseStore":
+        return cls(redis_asyncio.from_url(url, decode_responses=True))
+
+    async def heartbeat(self, worker_id: str, ttl: float) -> None:
+        await self._redis.zadd(WORKERS_KEY, {worker_id: time.time() + ttl})
+
+    async def deregister(self, worker_id: str) -> None:
+        await self._redis.zrem(WORKERS_KEY, worker_id)
+
+    async def live_workers(self) -> List[str]:
+        now = time.time()
+        await self._redis.zremrangebyscore(WORKERS_KEY, "-inf", now)
+        return list(await self._redis.zrangebyscore(WORKERS_KEY, now, "+inf"))
+
+    async def holder(self, room_id: str) -> Optional[str]:
+        return await self._redis.get(f"{LEASE_PREFIX}{room_id}")
+
+    async def acquire(self, room_id: str, worker_id: str, ttl: float) -> bool:
+        key = f"{LEASE_PREFIX}{room_id}"
+        if await self._redis.set(key, worker_id, nx=True, px=int(ttl * 1000)):
+            return True
+        return await self._redis.get(key) == worker_id
+
+    async def _if_held(self, room_id: str, worker_id: str, apply) -> bool:
+        key = f"{LEASE_PREFIX}{room_id}"
+        async with self._redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                if await pipe.get(key) != worker_id:
+                    await pipe.unwatch()
+                    return False
+                pipe.multi()
+                apply(pipe, key)
+                await pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    async def renew(self, room_id: str, worker_id: str, ttl: float) -> bool:
+        return await self._if_held(room_id, worker_id, lambda pipe, key: pipe.pexpire(key, int(ttl * 1000)))
+
+    async def release(self, room_id: str, worker_id: str) -> None:
+        await self._if_held(room_id, worker_id, lambda pipe, key: pipe.delete(key))
+
+    async def publish_room_change(self, room_id: str, worker_id: str) -> None:
+        await self._redis.publish(ROOM_CHANGES_CHANNEL, json.dumps([room_id, worker_id]))
+
+    async def room_changes(self) -> AsyncIterator[Tuple[str, str]]:
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(ROOM_CHANGES_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                room_id, worker_id = json.loads(message["data"])
+                yield room_id, worker_id
+        finally:
+            await pubsub.aclose()
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class RoomAffinity:
+    """This worker's view of room ownership (see module docstring)."""
+
+    def __init__(self, store: Optional[LeaseStore], worker_id: Optional[str] = None,
+                 lease_ttl: float = CONFIG.get('ROOM_LEASE_TTL_SECONDS'),
+                 secret: Optional[str] = None):
+        self._store = store
+        self.worker_id = worker_id
+        self._secret = secret
+        self._lease_ttl = lease_ttl
+        self._ring = HashRing()
+        self._owned: set = set()
+        self._draining: set = set()
+        self._hand_off: Optional[HandOff] = None
+        self._is_active: Optional[IsActive] = None
+        self._task: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._store is not None
+
+    @property
+    def owned_rooms(self) -> frozenset:
+        return frozenset(self._owned)
+
+    async def start(self, hand_off: HandOff, is_active: IsActive,
+                    room_changed: Optional[RoomChanged] = None) -> None:
+        """Join the ring. hand_off(room_id) moves a room's local state out;
+        is_active(room_id) says whether it still has sockets here;
+        room_changed(room_id) drops it from the local cache after another
+        worker wrote it."""
+        if not self.enabled:
+            return
+        self._hand_off = hand_off
+        self._is_active = is_active
+        await self._store.heartbeat(self.worker_id, self._lease_ttl)
+        await self._refresh_ring()
+        self._task = asyncio.create_task(self._maintain(), name="room-affinity")
+        if room_changed is not None:
+            self._listener = asyncio.create_task(self._listen(room_changed), name="room-affinity-changes")
+        logger.info(f"Room affinity: joined as {self.worker_id} ({len(self._ring.workers)} workers)")
+
+    async def stop(self) -> None:
+        """Leave the ring, handing every owned room to its next owner."""
+        if not self.enabled:
+            return
+        for task in (self._task, self._listener):
+            if task is not None:
+                task.cancel()
+        self._task = self._listener = None
+        await self._store.deregister(self.worker_id)
+        for room_id in list(self._owned):
+            await self._hand_off_room(room_id)
+        await self._store.close()
+
+    async def publish_room_change(self, room_id: str) -> None:
+        """Tell every other worker to drop its cached copy of room_id. Call
+        after an HTTP request has written the room: this worker's own cache
+        is already current (write-through), but the owner's is not."""
+        if not self.enabled:
+            return
+        try:
+            await self._store.publish_room_change(room_id, self.worker_id)
+        except Exception as e:
+            logger.error(f"Room affinity: could not publish a change to {room_id}: {e}")
+
+    def forwarded_by(self, room_id: str) -> str:
+        """FORWARDED_HEADER value for a socket this worker proxies to the
+        owner of room_id: its worker id plus a signature over both."""
+        return f"{self.worker_id} {_sign(self._secret, room_id, self.worker_id)}"
+
+    def is_forwarded(self, room_id: str, header: Optional[str]) -> bool:
+        """Whether a FORWARDED_HEADER value really came from a worker. A
+        bad signature is treated as a direct client connection."""
+        if not header or not self._secret:
+            return False
+        worker_id, _, signature = header.rpartition(" ")
+        return bool(worker_id) and hmac.compare_digest(signature, _sign(self._secret, room_id, worker_id))
+
+    def handoff_token(self, room_id: str, user_id: str) -> str:
+        """Close reason for user_id's socket when room_id moves: the client
+        sends it back as ?handoff= on reconnect, to any worker."""
+        expires_at = str(int(time.time() + HANDOFF_TOKEN_TTL_SECONDS))
+        return f"{expires_at}.{_sign(self._secret, room_id, user_id, expires_at)}"
+
+    def is_handoff(self, room_id: str, user_id: str, token: Optional[str]) -> bool:
+        """Whether token is an unexpired handoff_token for this user and room."""
+        if not token or not self._secret:
+            return False
+        expires_at, _, signature = token.partition(".")
+        if not expires_at.isdigit() or int(expires_at) < time.time():
+            return False
+        return hmac.compare_digest(signature, _sign(self._secret, room_id, user_id, expires_at))
+
+    def is_draining(self, room_id: str) -> bool:
+        return room_id in self._draining
+
+    async def route(self, room_id: str, forwarded: bool = False) -> Optional[str]:
+        """None: serve the socket here (this worker now owns the room).
+        Otherwise the owner's URL to proxy to. Raises RoomUnavailable."""
+        if not self.enabled:
+            return None
+
+        if room_id not in self._draining:
+            holder = await self._store.holder(room_id)
+            if holder == self.worker_id:
+                self._owned.add(room_id)
+                return None
+            if holder is not None and holder in self._ring.workers:
+                if forwarded:
+                    raise RoomUnavailable(f"{room_id} is owned by {holder}")
+                return holder
+
+            # Unleased (or a dead owner's lease not yet lapsed): the ring decides
+            target = self._ring.owner(room_id)
+            if target in (None, self.worker_id) or forwarded:
+                if await self._store.acquire(room_id, self.worker_id, self._lease_ttl):
+                    self._owned.add(room_id)
+                    return None
+                raise RoomUnavailable(f"{room_id} is still leased")
+            return target
+
+        target = self._ring.owner(room_id)
+        if forwarded or target in (None, self.worker_id):
+            raise RoomUnavailable(f"{room_id} is being handed off")
+        return target
+
+    async def rebalance(self) -> None:
+        """One maintenance pass: heartbeat, re-read the ring, then renew,
+        release or hand off every owned room."""
+        await self._store.heartbeat(self.worker_id, self._lease_ttl)
+        await self._refresh_ring()
+        for room_id in list(self._owned):
+            if not self._is_active(room_id):
+                # Nobody here any more — let the next socket place it afresh
+                await self._store.release(room_id, self.worker_id)
+                self._owned.discard(room_id)
+            elif self._ring.owner(room_id) != self.worker_id:
+                logger.info(f"Room affinity: handing {room_id} to {self._ring.owner(room_id)}")
+                await self._hand_off_room(room_id)
+            elif not await self._store.renew(room_id, self.worker_id, self._lease_ttl):
+                logger.warning(f"Room affinity: lost the lease on {room_id}")
+                await self._hand_off_room(room_id)
+
+    async def _refresh_ring(self) -> None:
+        workers = set(await self._store.live_workers()) | {self.worker_id}
+        if workers != self._ring.workers:
+            self._ring = HashRing(workers)
+
+    async def _hand_off_room(self, room_id: str) -> None:
+        self._draining.add(room_id)
+        try:
+            await self._hand_off(room_id)
+        except Exception as e:
+            logger.error(f"Room affinity: handoff of {room_id} failed: {e}")
+        finally:
+            await self._store.release(room_id, self.worker_id)
+            self._owned.discard(room_id)
+            self._draining.discard(room_id)
+
+    async def _listen(self, room_changed: RoomChanged) -> None:
+        while True:
+            try:
+                async for room_id, worker_id in self._store.room_changes():
+                    if worker_id != self.worker_id:
+                        room_changed(room_id)
+            except Exception as e:
+                logger.error(f"Room affinity: room-change subscription failed: {e}")
+            # Changes published while unsubscribed are lost: drop every
+            # room this worker owns so they reload from Mongo
+            for room_id in list(self._owned):
+                room_changed(room_id)
+            await asyncio.sleep(1)
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(self._lease_ttl / 3)
+            try:
+                await self.rebalance()
+            except Exception as e:
+                logger.error(f"Room affinity: maintenance failed: {e}")
+
+
+async def proxy_websocket(websocket, upstream_url: str, forwarded_by: str) -> None:
+    """Relay an accepted-on-the-wrong-worker socket to the room's owner,
+    frame for frame, until either side closes. The owner's close code
+    (ROOM_MOVED_CLOSE_CODE, session end) is passed through."""
+    subprotocols = websocket.scope.get("subprotocols") or None
+    try:
+        upstream = await websockets.connect(
+            upstream_url,
+            subprotocols=subprotocols,
+            extra_headers={FORWARDED_HEADER: forwarded_by},
+            open_timeout=5,
+        )
+    except Exception as e:
+        logger.error(f"Room affinity: proxy to {upstream_url} failed: {e}")
+        await websocket.close(code=TRY_AGAIN_CLOSE_CODE)
+        return
+
+    await websocket.accept(subprotocol=upstream.subprotocol)
+
+    async def client_to_upstream():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            frame = message.get("bytes")
+            await upstream.send(frame if frame is not None else message.get("text", ""))
+
+    async def upstream_to_client():
+        async for frame in upstream:
+            if isinstance(frame, bytes):
+                await websocket.send_bytes(frame)
+            else:
+                await websocket.send_text(frame)
+
+    relays = [asyncio.create_task(client_to_upstream()), asyncio.create_task(upstream_to_client())]
+    try:
+        await asyncio.wait(relays, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for relay in relays:
+            relay.cancel()
+        await upstream.close()
+        try:
+            await websocket.close(code=upstream.close_code or 1000)
+        except Exception:
+            pass  # client already gone
+
+
+def create_room_affinity(redis_url: Optional[str] = CONFIG.get('ROOM_AFFINITY_REDIS_URL'),
+                         advertise_url: Optional[str] = CONFIG.get('WORKER_ADVERTISE_URL'),
+                         secret: Optional[str] = CONFIG.get('ROOM_AFFINITY_SECRET')) -> RoomAffinity:
+    """Redis-leased affinity when configured, otherwise disabled."""
+    if not redis_url:
+        return RoomAffinity(None)
+    if redis_asyncio is None:
+        raise RuntimeError("ROOM_AFFINITY_REDIS_URL is set but the redis package is not installed")
+    if not advertise_url:
+        raise RuntimeError("ROOM_AFFINITY_REDIS_URL requires WORKER_ADVERTISE_URL (this worker's ws:// address)")
+    if not secret:
+        raise RuntimeError("ROOM_AFFINITY_REDIS_URL requires ROOM_AFFINITY_SECRET (shared by every worker)")
+    return RoomAffinity(RedisLeaseStore.from_url(redis_url), worker_id=advertise_url.rstrip("/"), secret=secret)
+
+
+room_affinity = create_room_affinity()
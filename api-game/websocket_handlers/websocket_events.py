@@ -10,37 +10,58 @@ logger = logging.getLogger(__name__)
 from fastapi import WebSocket
 from pydantic import ValidationError
 from .connection_manager import ConnectionManager
+from .drag_coalescer import DragCoalescer
 from message_templates import format_message, MESSAGE_TEMPLATES
-from adventure_log_service import AdventureLogService
+from adventure_log_service import adventure_log
 from models.log_type import LogType
-from mapservice import MapService, MapSettings
-from imageservice import ImageService, ImageSettings
+from mapservice import map_service, MapSettings
+from imageservice import image_service, ImageSettings
 from gameservice import GameService
-from map_token_ops import VALID_MAP_TOKEN_OPS, filter_hidden_tokens, grid_cell_label, is_valid_asset_key
-from map_token_holds import MapTokenHolds
+from db_executor import run_db
+from audio_batch import VALID_AUDIO_BATCH_OPS, compile_audio_batch
+from map_token_ops import (
+    VALID_MAP_TOKEN_OPS,
+    MapTokenConflict,
+    filter_hidden_tokens,
+    grid_cell_label,
+    is_valid_asset_key,
+)
+from map_token_holds import create_hold_store
 from site_client import fetch_character_summary
 from shared_contracts.image import ImageConfig
-from shared_contracts.grid_math import grid_geometry_changed, grid_usable, resnap_token_position
+from shared_contracts.grid_math import grid_geometry_changed, grid_usable, resnap_board_positions
 from shared_contracts.map import MapConfig
 from shared_contracts.map_token import MapToken
-from shared_contracts.audio import AudioChannelState, AudioTrackConfig, AudioEffects
+from shared_contracts.audio import AudioChannelState
 from shared_contracts.spotify import SpotifyState
 
 
-adventure_log = AdventureLogService()
-map_service = MapService()
-image_service = ImageService()
-map_token_holds = MapTokenHolds()
-
-# Hidden tokens whose hold is (or was recently) active, keyed
-# (room_id, asset_id, token_id). Move frames arrive at ~20 Hz — far too hot
+# Holds plus hidden-hold flags. Move frames arrive at ~20 Hz — far too hot
 # for a per-frame board read — so the grab's board lookup caches the hidden
-# flag here and frames/releases consult the set instead (decision 17: drag
-# presence for hidden tokens must not reach player clients either).
-# Presence-adjacent and in-memory like MapTokenHolds itself; a stale entry
-# (lost release) is overwritten by the next grab and only ever suppresses
-# relays for a token players cannot see anyway.
-_hidden_held_tokens = set()
+# flag in the store (set_hidden_held) and frames/releases consult it instead
+# (decision 17: drag presence for hidden tokens must not reach player
+# clients either). A stale flag (lost release) only ever suppresses relays
+# for a token players cannot see anyway.
+map_token_holds = create_hold_store()
+
+
+async def _drag_frame_relayable(room_id: str, frame: Dict[str, Any]) -> bool:
+    """Flush-time re-check for a coalesced move frame: its hand must still
+    hold the token, and the token must not have been hidden mid-hold."""
+    asset_id, token_id = frame["asset_id"], frame["token_id"]
+    if await map_token_holds.holder(room_id, asset_id, token_id) != frame["holder_user_id"]:
+        return False
+    return not await map_token_holds.is_hidden_held(room_id, asset_id, token_id)
+
+
+drag_coalescer = DragCoalescer(is_relayable=_drag_frame_relayable)
+
+
+async def release_room_drag_state(room_id: str) -> None:
+    """Drop a room's live-drag presence (holds, hidden-hold flags, pending
+    move frames) — the room is moving to another worker or has ended."""
+    drag_coalescer.close_room(room_id)
+    await map_token_holds.clear_room(room_id)
 
 
 def _merge_preserved_map_fields(incoming: dict, existing: dict) -> Dict[str, Any]:
@@ -70,9 +91,9 @@ def _merge_preserved_map_fields(incoming: dict, existing: dict) -> Dict[str, Any
     return out
 
 
-def grid_resnap_fragment(room_id: str, asset_id: Optional[str], updated_by: str,
-                          old_grid_config: Optional[Dict[str, Any]],
-                          new_grid_config: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+async def grid_resnap_fragment(room_id: str, asset_id: Optional[str], updated_by: str,
+                                old_grid_config: Optional[Dict[str, Any]],
+                                new_grid_config: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     """Rewrite a map's token board for a grid geometry change and build the
     map_token_state_update fragment for it (tokens v2 decision 20: exact-cell
     re-snap, superseding v1 decision 7's no-auto-resnap).
@@ -90,18 +111,20 @@ def grid_resnap_fragment(room_id: str, asset_id: Optional[str], updated_by: str,
     if not grid_geometry_changed(old_grid_config, new_grid_config):
         return None
 
-    board_tokens = GameService.get_map_tokens(room_id, asset_id)
+    board_tokens = await run_db(GameService.get_map_tokens, room_id, asset_id)
     if not board_tokens:
         return None
 
+    new_xs, new_ys = resnap_board_positions(
+        [board_token.get("x") for board_token in board_tokens],
+        [board_token.get("y") for board_token in board_tokens],
+        [board_token.get("footprint", 1) for board_token in board_tokens],
+        old_grid_config, new_grid_config,
+    )
+
     resnapped_tokens = []
     any_token_moved = False
-    for board_token in board_tokens:
-        new_x, new_y = resnap_token_position(
-            board_token.get("x"), board_token.get("y"),
-            board_token.get("footprint", 1),
-            old_grid_config, new_grid_config,
-        )
+    for board_token, new_x, new_y in zip(board_tokens, new_xs, new_ys):
         if new_x != board_token.get("x") or new_y != board_token.get("y"):
             any_token_moved = True
             resnapped_tokens.append({**board_token, "x": new_x, "y": new_y})
@@ -111,15 +134,19 @@ def grid_resnap_fragment(room_id: str, asset_id: Optional[str], updated_by: str,
     if not any_token_moved:
         return None
 
-    if not GameService.replace_map_token_board(room_id, asset_id, resnapped_tokens):
+    revisions = await run_db(GameService.replace_map_token_board, room_id, asset_id, resnapped_tokens)
+    if revisions is None:
         logger.error(f"Grid re-snap board write failed for room {room_id}, map {asset_id}")
         return None
+    revision, player_revision = revisions
 
     return {
         "event_type": "map_token_state_update",
         "data": {
             "asset_id": asset_id,
             "tokens": resnapped_tokens,
+            "revision": revision,
+            "player_revision": player_revision,
             "op": "resnap",
             "token_id": None,
             "updated_by": updated_by,
@@ -131,21 +158,28 @@ async def send_map_token_fragment(manager, room_id: str, fragment: Dict[str, Any
     """Deliver a map_token_state_update with per-recipient hidden filtering
     (decision 17) — the shared rail for server-initiated board rewrites
     like the grid re-snap. Hidden tokens must never reach player clients,
-    whichever path emits the board. Fast path: nothing hidden → one room
-    broadcast, exactly as v1 behaved."""
-    fragment_tokens = fragment["data"]["tokens"]
-    if not any(board_token.get("hidden") for board_token in fragment_tokens):
+    whichever path emits the board. The fragment carries both revisions
+    (revision / player_revision); each view gets its own as "revision".
+    Fast path: nothing hidden and matching revisions → one room broadcast."""
+    fragment_data = {**fragment["data"]}
+    player_revision = fragment_data.pop("player_revision", fragment_data.get("revision"))
+    fragment = {**fragment, "data": fragment_data}
+    fragment_tokens = fragment_data["tokens"]
+    board_has_hidden = any(board_token.get("hidden") for board_token in fragment_tokens)
+    if not board_has_hidden and player_revision == fragment_data.get("revision"):
         await manager.update_room_data(room_id, fragment)
         return
 
-    dm_user_id = GameService.get_dm_user_id(room_id)
+    dm_user_id = await run_db(GameService.get_dm_user_id, room_id)
     player_fragment = {
         **fragment,
-        "data": {**fragment["data"], "tokens": filter_hidden_tokens(fragment_tokens)},
+        "data": {
+            **fragment_data,
+            "tokens": filter_hidden_tokens(fragment_tokens),
+            "revision": player_revision,
+        },
     }
-    for recipient_user_id in list(manager.room_users.get(room_id, {}).keys()):
-        recipient_fragment = fragment if recipient_user_id == dm_user_id else player_fragment
-        await manager.send_to_player(room_id, recipient_user_id, recipient_fragment)
+    await manager.update_room_views(room_id, dm_user_id, fragment, player_fragment)
 
 
 class WebsocketEventResult:
@@ -217,13 +251,13 @@ class WebsocketEvent():
         return "".join(message_parts)
 
     @staticmethod
-    def _get_player_metadata(room_id: str) -> Dict[str, Any]:
-        room = GameService.get_room(room_id) or {}
+    async def _get_player_metadata(room_id: str) -> Dict[str, Any]:
+        room = await run_db(GameService.get_room_core, room_id) or {}
         player_metadata = room.get("player_metadata", {})
         return player_metadata if isinstance(player_metadata, dict) else {}
 
     @staticmethod
-    def _display_name(room_id: str, user_id: str, player_metadata: Optional[Dict[str, Any]] = None) -> str:
+    async def _display_name(room_id: str, user_id: str, player_metadata: Optional[Dict[str, Any]] = None) -> str:
         """Resolve user_id to display name via player_metadata.
 
         NEVER returns a raw user_id (UUID = PII). Falls back to a neutral, non-identifying
@@ -232,17 +266,17 @@ class WebsocketEvent():
         if not user_id:
             return "Unknown Adventurer"
         if player_metadata is None:
-            player_metadata = WebsocketEvent._get_player_metadata(room_id)
+            player_metadata = await WebsocketEvent._get_player_metadata(room_id)
         metadata = player_metadata.get(user_id, {}) if isinstance(player_metadata, dict) else {}
         return metadata.get("player_name") or "Unknown Adventurer"
 
     @staticmethod
-    def _character_name_for_prompt(room_id: str, user_id: str, player_metadata: Optional[Dict[str, Any]] = None) -> str:
+    async def _character_name_for_prompt(room_id: str, user_id: str, player_metadata: Optional[Dict[str, Any]] = None) -> str:
         if not user_id:
             return "Unknown Adventurer"
 
         if player_metadata is None:
-            player_metadata = WebsocketEvent._get_player_metadata(room_id)
+            player_metadata = await WebsocketEvent._get_player_metadata(room_id)
 
         metadata = player_metadata.get(user_id, {}) if isinstance(player_metadata, dict) else {}
         # Never fall through to user_id (UUID = PII).
@@ -253,7 +287,7 @@ class WebsocketEvent():
         # Note: manager.connect() is already called in app_websocket.py
         # This event just handles the logging and broadcast
 
-        display_name = WebsocketEvent._display_name(client_id, user_id)
+        display_name = await WebsocketEvent._display_name(client_id, user_id)
 
         # Log player connection to database
         log_message = format_message(MESSAGE_TEMPLATES["player_connected"], player=display_name)
@@ -282,20 +316,18 @@ class WebsocketEvent():
         print(f"📡 Broadcasting seat layout change for room {client_id}: {seat_layout}")
 
         # Update party status for all users based on seat layout
-        for uid in manager.room_users.get(client_id, {}):
-            is_in_party = uid in seat_layout
-            manager.update_party_status(client_id, uid, is_in_party)
+        await manager.update_party_from_seats(client_id, seat_layout)
 
         # Phase I: pull this player's latest character snapshot from api-site so runtime changes
         # (level-up, HP, AC) flow into player_metadata on the next seat interaction. Best-effort.
         try:
-            metadata = WebsocketEvent._get_player_metadata(client_id) or {}
+            metadata = await WebsocketEvent._get_player_metadata(client_id) or {}
             character_id = (metadata.get(user_id) or {}).get("character_id")
             if character_id:
                 summary = await fetch_character_summary(character_id)
                 if summary:
                     summary["user_id"] = user_id
-                    GameService.update_player_character(client_id, summary)
+                    await run_db(GameService.update_player_character, client_id, summary)
         except Exception as e:
             print(f"⚠️ Character snapshot refresh failed for {user_id}: {e}")
 
@@ -314,9 +346,9 @@ class WebsocketEvent():
         prompted_by = event_data.get("prompted_by", user_id)
         prompt_id = event_data.get("prompt_id")
 
-        player_metadata = WebsocketEvent._get_player_metadata(client_id)
-        target_character = WebsocketEvent._character_name_for_prompt(client_id, prompted_player, player_metadata)
-        prompted_by_name = WebsocketEvent._display_name(client_id, prompted_by, player_metadata)
+        player_metadata = await WebsocketEvent._get_player_metadata(client_id)
+        target_character = await WebsocketEvent._character_name_for_prompt(client_id, prompted_player, player_metadata)
+        prompted_by_name = await WebsocketEvent._display_name(client_id, prompted_by, player_metadata)
 
         # Log the prompt to adventure log with prompt_id for later removal
         log_message = format_message(MESSAGE_TEMPLATES["dice_prompt"], target=target_character, roll_type=roll_type)
@@ -352,17 +384,17 @@ class WebsocketEvent():
         # Generate unique initiative prompt ID for potential removal
         initiative_prompt_id = f"initiative_all_{int(time.time() * 1000)}"
 
-        player_metadata = WebsocketEvent._get_player_metadata(client_id)
+        player_metadata = await WebsocketEvent._get_player_metadata(client_id)
 
         character_targets = [
-            WebsocketEvent._character_name_for_prompt(client_id, player, player_metadata)
+            await WebsocketEvent._character_name_for_prompt(client_id, player, player_metadata)
             for player in players_to_prompt
         ]
         
         # Log ONE adventure log entry for the collective action
         log_message = format_message(MESSAGE_TEMPLATES["initiative_prompt"], players=", ".join(character_targets))
         
-        prompted_by_name = WebsocketEvent._display_name(client_id, prompted_by, player_metadata)
+        prompted_by_name = await WebsocketEvent._display_name(client_id, prompted_by, player_metadata)
 
         adventure_log.add_log_entry(
             room_id=client_id,
@@ -401,7 +433,7 @@ class WebsocketEvent():
         if prompt_id:
             # Remove specific prompt log entry
             try:
-                deleted_count = adventure_log.remove_log_by_prompt_id(client_id, prompt_id)
+                deleted_count = await run_db(adventure_log.remove_log_by_prompt_id, client_id, prompt_id)
                 if deleted_count > 0:
                     print(f"🗑️ Removed adventure log entry for cancelled prompt {prompt_id}")
                     
@@ -418,7 +450,7 @@ class WebsocketEvent():
         elif clear_all and initiative_prompt_id:
             # Remove initiative prompt log entry when clearing all
             try:
-                deleted_count = adventure_log.remove_log_by_prompt_id(client_id, initiative_prompt_id)
+                deleted_count = await run_db(adventure_log.remove_log_by_prompt_id, client_id, initiative_prompt_id)
                 if deleted_count > 0:
                     print(f"🗑️ Removed initiative prompt log entry {initiative_prompt_id}")
                     
@@ -489,7 +521,7 @@ class WebsocketEvent():
         if prompt_id:
             # Remove the adventure log entry for this prompt
             try:
-                deleted_count = adventure_log.remove_log_by_prompt_id(client_id, prompt_id)
+                deleted_count = await run_db(adventure_log.remove_log_by_prompt_id, client_id, prompt_id)
                 if deleted_count > 0:
                     print(f"🗑️ Removed adventure log entry for completed prompt {prompt_id}")
                     
@@ -534,7 +566,7 @@ class WebsocketEvent():
         """Handle combat state changes"""
         combat_active = event_data.get("combatActive", False)
         action = "started" if combat_active else "ended"
-        display_name = WebsocketEvent._display_name(client_id, user_id)
+        display_name = await WebsocketEvent._display_name(client_id, user_id)
 
         template_key = "combat_started" if action == "started" else "combat_ended"
         log_message = format_message(MESSAGE_TEMPLATES[template_key], player=display_name)
@@ -556,7 +588,7 @@ class WebsocketEvent():
     @staticmethod
     async def seat_count_change(websocket, data, event_data, user_id, client_id, manager):
         """Handle seat count changes"""
-        display_name = WebsocketEvent._display_name(client_id, user_id)
+        display_name = await WebsocketEvent._display_name(client_id, user_id)
 
         max_players = event_data.get("max_players")
         displaced_players = event_data.get("displaced_players", [])
@@ -623,8 +655,8 @@ class WebsocketEvent():
     async def player_kicked(websocket, data, event_data, user_id, client_id, manager):
         """Handle player kicked events"""
         kicked_user_id = event_data.get("kicked_player")  # user_id of kicked player
-        display_name = WebsocketEvent._display_name(client_id, user_id)
-        kicked_name = WebsocketEvent._display_name(client_id, kicked_user_id)
+        display_name = await WebsocketEvent._display_name(client_id, user_id)
+        kicked_name = await WebsocketEvent._display_name(client_id, kicked_user_id)
 
         log_message = format_message(MESSAGE_TEMPLATES["player_kicked"], player=kicked_name)
 
@@ -649,7 +681,7 @@ class WebsocketEvent():
         cleared_by = event_data.get("cleared_by", user_id)
         
         try:
-            deleted_count = adventure_log.clear_system_messages(client_id)
+            deleted_count = await run_db(adventure_log.clear_system_messages, client_id)
             
             log_message = format_message(MESSAGE_TEMPLATES["messages_cleared"], player=cleared_by, count=deleted_count)
             
@@ -688,7 +720,7 @@ class WebsocketEvent():
         cleared_by = event_data.get("cleared_by", user_id)
         
         try:
-            deleted_count = adventure_log.clear_all_messages(client_id)
+            deleted_count = await run_db(adventure_log.clear_all_messages, client_id)
             
             log_message = format_message(MESSAGE_TEMPLATES["messages_cleared"], player=cleared_by, count=deleted_count)
             
@@ -741,7 +773,7 @@ class WebsocketEvent():
             return WebsocketEventResult(broadcast_message=error_message)
 
         try:
-            GameService.update_player_color(client_id, player_changing, new_color)
+            await run_db(GameService.update_player_color, client_id, player_changing, new_color)
 
             print(f"🎨 {changed_by} changed {player_changing}'s character color to {new_color}")
 
@@ -769,13 +801,13 @@ class WebsocketEvent():
     @staticmethod
     async def player_disconnect(websocket, data, event_data, user_id, client_id, manager):
         """Handle player disconnect event"""
-        display_name = WebsocketEvent._display_name(client_id, user_id)
+        display_name = await WebsocketEvent._display_name(client_id, user_id)
 
         # Drop any map-token holds the leaver had — remote clients clear their
         # lift affordances off this handler's player_disconnected broadcast.
-        released_hold_keys = map_token_holds.release_all_for_user(client_id, user_id)
+        released_hold_keys = await map_token_holds.release_all_for_user(client_id, user_id)
         for released_asset_id, released_token_id in released_hold_keys:
-            _hidden_held_tokens.discard((client_id, released_asset_id, released_token_id))
+            await map_token_holds.set_hidden_held(client_id, released_asset_id, released_token_id, False)
 
         # Log player disconnection to database
         log_message = format_message(MESSAGE_TEMPLATES["player_disconnected"], player=display_name)
@@ -789,22 +821,15 @@ class WebsocketEvent():
 
         # Update party status to move disconnecting user to lobby before marking as disconnected
         print(f"🚪 Moving {user_id} from party to lobby on disconnect")
-        manager.update_party_status(client_id, user_id, False)
+        await manager.update_party_status(client_id, user_id, False)
 
-        manager.remove_connection(websocket, client_id, user_id)
+        await manager.remove_connection(websocket, client_id, user_id)
 
         # Try to clean up disconnected user's seat (may fail if room already closed)
         try:
-            current_seats = GameService.get_seat_layout(client_id)
-
-            # Remove disconnected user from their seat
-            updated_seats = [
-                "empty" if seat == user_id else seat
-                for seat in current_seats
-            ]
-
-            # Update seat layout in database (may fail if room was deleted)
-            GameService.update_seat_layout(client_id, updated_seats)
+            # Remove disconnected user from their seat — a targeted write of
+            # just their seat (may fail if room was deleted)
+            updated_seats = await run_db(GameService.vacate_seat, client_id, user_id)
 
             # Broadcast player disconnection event
             disconnect_message = {
@@ -853,8 +878,8 @@ class WebsocketEvent():
         if not action or not target_user_id:
             return WebsocketEventResult.error(f"Invalid role change request: action={action}, target={target_user_id}")
 
-        display_name = WebsocketEvent._display_name(client_id, user_id)
-        target_name = WebsocketEvent._display_name(client_id, target_user_id)
+        display_name = await WebsocketEvent._display_name(client_id, user_id)
+        target_name = await WebsocketEvent._display_name(client_id, target_user_id)
 
         print(f"🎭 Role change: {action} for {target_user_id} by {user_id}")
 
@@ -947,7 +972,7 @@ class WebsocketEvent():
                         started_at=time.time(),
                         paused_elapsed=None,
                     )
-                    GameService.update_audio_state(client_id, channel_id, channel_state.model_dump())
+                    await run_db(GameService.update_audio_state, client_id, channel_id, channel_state.model_dump())
             print(f"🎵 Audio play state persisted for {len(tracks)} track(s)")
         except Exception as e:
             print(f"⚠️ Failed to persist audio play state: {e}")
@@ -1020,12 +1045,12 @@ class WebsocketEvent():
             return WebsocketEventResult.error(f"Invalid spotify action: {action}")
 
         # DM-only: the Spotify bed is authoritative for the whole table.
-        if not GameService.is_dm(client_id, user_id):
+        if not await run_db(GameService.is_dm, client_id, user_id):
             return WebsocketEventResult.error("Only the DM can control Spotify playback")
 
         # Normalise through the contract: fills defaults (e.g. channel_level = -12 dB) for
         # any document predating a field, and fails loudly on drift instead of guessing.
-        current = SpotifyState(**(GameService.get_spotify_state(client_id) or {})).model_dump()
+        current = SpotifyState(**(await run_db(GameService.get_spotify_state, client_id) or {})).model_dump()
         now = time.time()
 
         if action == "sync":
@@ -1114,7 +1139,7 @@ class WebsocketEvent():
                 return WebsocketEventResult.error("channel_volume requires a numeric level")
             snapshot = {**current, "channel_level": level, "updated_by": triggered_by}
 
-        GameService.update_spotify_state(client_id, snapshot)
+        await run_db(GameService.update_spotify_state, client_id, snapshot)
         logger.info(f"🎵 Spotify {action} by {triggered_by} in room {client_id}")
 
         return WebsocketEventResult(
@@ -1134,7 +1159,6 @@ class WebsocketEvent():
         print(f"🎛️ Backend received batch audio operations from {triggered_by}: {len(operations)} operations")
         
         # Validate all operations
-        valid_operations = ["play", "stop", "pause", "resume", "volume", "loop", "load", "clear", "effects", "mute", "solo", "master_volume"]
         for i, op in enumerate(operations):
             if not isinstance(op, dict):
                 return WebsocketEventResult.error(f"Invalid batch audio operation {i}: must be an object")
@@ -1145,7 +1169,7 @@ class WebsocketEvent():
             if not track_id or not operation:
                 return WebsocketEventResult.error(f"Invalid batch audio operation {i}: missing trackId or operation")
 
-            if operation not in valid_operations:
+            if operation not in VALID_AUDIO_BATCH_OPS:
                 return WebsocketEventResult.error(f"Invalid batch audio operation {i}: operation '{operation}' not supported")
 
             # Validate operation-specific required parameters
@@ -1206,175 +1230,14 @@ class WebsocketEvent():
         log_message = f"🎛️ {triggered_by} executed batch audio operations: {', '.join(operation_summaries)}"
         print(log_message)
 
-        # Fire-and-forget: persist audio state to MongoDB for late-joiner sync
+        # Fire-and-forget: persist audio state to MongoDB for late-joiner sync.
+        # The whole batch compiles to one update; a contract violation
+        # anywhere persists none of it.
         try:
-            # Always pre-fetch current audio state — multiple operations need it for read-modify-write
-            current_audio_state = GameService.get_audio_state(client_id)
-
-            for op in operations:
-                track_id = op.get("trackId")
-                operation = op.get("operation")
-
-                if operation == "play":
-                    ch = current_audio_state.get(track_id, {})
-                    play_fields = {
-                        "filename": op.get("filename"),
-                        "asset_id": op.get("asset_id"),
-                        "s3_url": op.get("s3_url"),
-                        "volume": op.get("volume", 0.8),
-                        "looping": op.get("looping", True),
-                        "playback_state": "playing",
-                        "started_at": time.time(),
-                        "paused_elapsed": None,
-                    }
-                    if op.get("loop_mode") is not None:
-                        play_fields["loop_mode"] = op.get("loop_mode")
-                    if op.get("loop_start") is not None:
-                        play_fields["loop_start"] = op.get("loop_start")
-                    if op.get("loop_end") is not None:
-                        play_fields["loop_end"] = op.get("loop_end")
-                    channel_state = AudioChannelState(**{**ch, **play_fields})
-                    GameService.update_audio_state(client_id, track_id, channel_state.model_dump())
-
-                elif operation == "stop":
-                    # Stop playback but keep track loaded in channel
-                    ch = current_audio_state.get(track_id, {})
-                    channel_state = AudioChannelState(
-                        **{**ch, "playback_state": "stopped", "started_at": None, "paused_elapsed": None}
-                    )
-                    GameService.update_audio_state(client_id, track_id, channel_state.model_dump())
-
-                elif operation == "pause":
-                    ch = current_audio_state.get(track_id, {})
-                    started_at = ch.get("started_at")
-                    paused_elapsed = (time.time() - started_at) if started_at else 0
-                    channel_state = AudioChannelState(
-                        **{**ch, "playback_state": "paused", "paused_elapsed": paused_elapsed}
-                    )
-                    GameService.update_audio_state(client_id, track_id, channel_state.model_dump())
-
-                elif operation == "resume":
-                    ch = current_audio_state.get(track_id, {})
-                    paused_elapsed = ch.get("paused_elapsed", 0)
-                    channel_state = AudioChannelState(
-                        **{**ch,
-                           "playback_state": "playing",
-                           "started_at": time.time() - paused_elapsed,
-                           "paused_elapsed": None,
-                           }
-                    )
-                    GameService.update_audio_state(client_id, track_id, channel_state.model_dump())
-
-                elif operation == "volume":
-                    ch = current_audio_state.get(track_id, {}) if current_audio_state else {}
-                    channel_state = AudioChannelState(**{**ch, "volume": op.get("volume")})
-                    GameService.update_audio_state(client_id, track_id, channel_state.model_dump())
-
-                elif operation == "loop":
-                    ch = current_audio_state.get(track_id, {}) if current_audio_state else {}
-                    loop_update = {"looping": op.get("looping")}
-                    if op.get("loop_mode") is not None:
-                        loop_update["loop_mode"] = op.get("loop_mode")
-                    channel_state = AudioChannelState(**{**ch, **loop_update})
-                    GameService.update_audio_state(client_id, track_id, channel_state.model_dump())
-
-                elif operation == "load":
-                    # 1. Save outgoing track's full config to audio_track_config
-                    old_ch = current_audio_state.get(track_id, {})
-                    old_asset_id = old_ch.get("asset_id")
-                    if old_asset_id:
-                        track_config = AudioTrackConfig(
-                            volume=old_ch.get("volume"),
-                            looping=old_ch.get("looping"),
-                            effects=AudioEffects(**(old_ch.get("effects") or {})),
-                            paused_elapsed=old_ch.get("paused_elapsed"),
-                        )
-                        GameService.save_track_config(client_id, old_asset_id, track_config.model_dump())
-
-                    # 2. Check for saved config for incoming track
-                    new_asset_id = op.get("asset_id")
-                    saved_config = GameService.get_track_config(client_id, new_asset_id) if new_asset_id else None
-
-                    # 3. Build channel state — restore from saved config or use provided defaults
-                    if saved_config:
-                        channel_state = AudioChannelState(
-                            filename=op.get("filename"),
-                            asset_id=new_asset_id,
-                            s3_url=op.get("s3_url"),
-                            volume=saved_config.get("volume", op.get("volume", 0.8)),
-                            looping=saved_config.get("looping", op.get("looping")),
-                            effects=saved_config.get("effects", {}),
-                            playback_state="stopped",
-                            started_at=None,
-                            paused_elapsed=saved_config.get("paused_elapsed"),
-                        )
-                    else:
-                        channel_state = AudioChannelState(
-                            filename=op.get("filename"),
-                            asset_id=new_asset_id,
-                            s3_url=op.get("s3_url"),
-                            volume=op.get("volume", 0.8),
-                            looping=op.get("looping") if op.get("looping") is not None else True,
-                            effects=op.get("effects", {}),
-                            playback_state="stopped",
-                            started_at=None,
-                            paused_elapsed=None,
-                        )
-
-                    # Preserve channel-level mute/solo (not asset-level — survives track swaps)
-                    channel_state.muted = old_ch.get("muted", False)
-                    channel_state.soloed = old_ch.get("soloed", False)
-
-                    GameService.update_audio_state(client_id, track_id, channel_state.model_dump())
-
-                    # 4. Remove saved config (it's now active in a channel)
-                    if new_asset_id and saved_config:
-                        GameService.remove_track_config(client_id, new_asset_id)
-
-                    # Update op so the broadcast carries the resolved config
-                    op["volume"] = channel_state.volume
-                    op["looping"] = channel_state.looping
-                    op["effects"] = channel_state.effects.model_dump()
-                    op["paused_elapsed"] = channel_state.paused_elapsed
-
-                elif operation == "effects":
-                    ch = current_audio_state.get(track_id, {})
-                    channel_state = AudioChannelState(**{**ch, "effects": op.get("effects", {})})
-                    GameService.update_audio_state(client_id, track_id, channel_state.model_dump())
-
-                elif operation == "mute":
-                    ch = current_audio_state.get(track_id, {})
-                    channel_state = AudioChannelState(**{**ch, "muted": op.get("muted", False)})
-                    GameService.update_audio_state(client_id, track_id, channel_state.model_dump())
-
-                elif operation == "solo":
-                    ch = current_audio_state.get(track_id, {})
-                    channel_state = AudioChannelState(**{**ch, "soloed": op.get("soloed", False)})
-                    GameService.update_audio_state(client_id, track_id, channel_state.model_dump())
-
-                elif operation == "master_volume":
-                    # Store broadcast master volume as a top-level field on audio_state
-                    GameService.update_audio_state(client_id, "__master_volume", op.get("volume", 1.0))
-
-                elif operation == "clear":
-                    # Save outgoing track's full config before clearing
-                    old_ch = current_audio_state.get(track_id, {})
-                    old_asset_id = old_ch.get("asset_id")
-                    if old_asset_id:
-                        track_config = AudioTrackConfig(
-                            volume=old_ch.get("volume"),
-                            looping=old_ch.get("looping"),
-                            effects=AudioEffects(**(old_ch.get("effects") or {})),
-                            paused_elapsed=old_ch.get("paused_elapsed"),
-                        )
-                        GameService.save_track_config(client_id, old_asset_id, track_config.model_dump())
-
-                    channel_state = AudioChannelState(
-                        volume=op.get("volume", 0.8),
-                        looping=False,
-                    )
-                    GameService.update_audio_state(client_id, track_id, channel_state.model_dump())
-
+            current_audio_state, current_track_config = await run_db(GameService.get_audio_batch_state, client_id)
+            audio_batch = compile_audio_batch(current_audio_state, current_track_config, operations, time.time())
+            await run_db(GameService.apply_audio_batch, client_id, audio_batch.update_doc)
+            operations = audio_batch.operations
             print(f"🎵 Audio state persisted to MongoDB for {len(operations)} operations")
         except Exception as e:
             # Fire-and-forget — don't block the broadcast on DB errors
@@ -1421,9 +1284,7 @@ class WebsocketEvent():
             # the DM cycles between maps in a session, in-session edits
             # are preserved per-map — switching to map B and back to map A
             # restores A's painted fog and tweaked grid.
-            existing_map = map_service.collection.find_one(
-                {"room_id": room_id, "map_config.filename": mc_data.get("filename")}
-            ) if map_service.collection is not None else None
+            existing_map = await run_db(map_service.get_room_map, room_id, mc_data.get("filename"))
             existing_mc = existing_map.get("map_config", {}) if existing_map else {}
 
             preserved = _merge_preserved_map_fields(incoming=mc_data, existing=existing_mc)
@@ -1447,11 +1308,11 @@ class WebsocketEvent():
             )
             
             # Save to database
-            success = map_service.set_active_map(room_id, map_settings)
+            success = await run_db(map_service.set_active_map, room_id, map_settings)
             
             if success:
                 # Get the actual saved map from database (includes preserved grid_config)
-                saved_map = map_service.get_active_map(room_id)
+                saved_map = await run_db(map_service.get_active_map, room_id)
                 
                 if saved_map:
                     # Broadcast the actual saved map (with preserved grid_config from MongoDB)
@@ -1496,7 +1357,7 @@ class WebsocketEvent():
         
         try:
             # Clear from database
-            success = map_service.clear_active_map(room_id)
+            success = await run_db(map_service.clear_active_map, room_id)
             
             if success:
                 # Broadcast to all clients
@@ -1521,7 +1382,7 @@ class WebsocketEvent():
     async def map_config_update(websocket, data, event_data, user_id, client_id, manager):
         """Update map configuration (grid settings, etc.)"""
         room_id = client_id  # Use client_id as room_id
-        display_name = WebsocketEvent._display_name(room_id, user_id)
+        display_name = await WebsocketEvent._display_name(room_id, user_id)
         filename = event_data.get("filename")
         grid_config = event_data.get("grid_config")
         map_image_config = event_data.get("map_image_config")
@@ -1534,7 +1395,7 @@ class WebsocketEvent():
             # Capture the pre-update grid + the map's asset_id: token boards
             # are keyed by asset_id and the exact-cell re-snap (decision 20)
             # needs the old lattice to know which cell each token was in.
-            active_map = map_service.get_active_map(room_id)
+            active_map = await run_db(map_service.get_active_map, room_id)
             active_map_config = (active_map or {}).get("map_config", {})
             old_grid_config = None
             map_asset_id = None
@@ -1547,7 +1408,8 @@ class WebsocketEvent():
             print(f"   Grid config: {grid_config}")
             print(f"   Map image config: {map_image_config}")
 
-            success = map_service.update_map_config(
+            success = await run_db(
+                map_service.update_map_config,
                 room_id,
                 filename,
                 grid_config=grid_config,
@@ -1571,7 +1433,7 @@ class WebsocketEvent():
                 # dispatcher broadcasts config_update_message after we
                 # return); both messages are self-contained so the one-tick
                 # ordering gap is cosmetic only.
-                resnap_fragment = grid_resnap_fragment(
+                resnap_fragment = await grid_resnap_fragment(
                     room_id, map_asset_id, user_id, old_grid_config, grid_config
                 )
                 if resnap_fragment:
@@ -1601,8 +1463,13 @@ class WebsocketEvent():
         fog_config=None clears all fog. Per the codebase's atomic state
         rule, the full regions list travels in a single message; players
         replace their canvases in one paint to honour the no-flicker
-        contract. Per-region partial updates (toggle, paint a single
-        region) are dedicated WS events — not yet implemented.
+        contract. Paint strokes go through fog_tile_update instead.
+
+        Regions carry either a freshly painted inline mask or the
+        mask_hash (or mask_tiles) of an unchanged one. Inline masks are
+        stored by hash first, so what's written and broadcast is refs
+        only — receivers fetch just the hashes they don't already show.
+        The broadcast carries the map's new fog revision.
         """
         room_id = client_id
         filename = event_data.get("filename")
@@ -1613,13 +1480,15 @@ class WebsocketEvent():
             return WebsocketEventResult(broadcast_message={"error": "Invalid fog config update"})
 
         try:
-            success = map_service.update_fog_config(room_id, filename, fog_config)
-            if success:
+            fog_config = await run_db(map_service.store_fog_masks, fog_config)
+            revision = await run_db(map_service.update_fog_config, room_id, filename, fog_config)
+            if revision is not None:
                 broadcast = {
                     "event_type": "fog_config_update",
                     "data": {
                         "filename": filename,
                         "fog_config": fog_config,
+                        "revision": revision,
                         "updated_by": user_id,
                     },
                 }
@@ -1632,6 +1501,80 @@ class WebsocketEvent():
             print(f"❌ Error updating fog config for room {room_id}: {e}")
             return WebsocketEventResult(broadcast_message={"error": f"Failed to update fog config: {str(e)}"})
 
+    @staticmethod
+    async def fog_tile_update(websocket, data, event_data, user_id, client_id, manager):
+        """Merge a brush update's dirty fog tiles into the active map.
+
+        Payload shape:
+            { filename: str,
+              regions: [ { ...FogRegion fields (no mask),
+                           tiles: { "col,row": data URL | null },
+                           reset: bool }, ... ] }
+
+        `regions` is the full ordered list, so region metadata rides
+        along; only regions whose strokes touched tiles carry any. null
+        clears a tile to transparent; reset replaces the region's whole
+        tile map (its first tiled save, or a resize). Bandwidth follows
+        the brush area, not the map size.
+
+        The broadcast carries each region's tile diff as hashes, plus the
+        fog revision it produced and the base_revision it applies on top
+        of. A receiver whose revision doesn't match asks for fog_resync.
+        """
+        room_id = client_id
+        filename = event_data.get("filename")
+        regions = event_data.get("regions")
+
+        if not room_id or not filename or not isinstance(regions, list):
+            return WebsocketEventResult.error("Invalid fog tile update: missing filename or regions")
+
+        try:
+            patches = await run_db(map_service.store_fog_tiles, regions)
+            update = await run_db(map_service.apply_fog_tiles, room_id, filename, patches)
+        except ValueError as e:
+            return WebsocketEventResult.error(f"Invalid fog tile update: {e}")
+        except Exception as e:
+            print(f"❌ Error updating fog tiles for room {room_id}: {e}")
+            return WebsocketEventResult.error(f"Failed to update fog tiles: {str(e)}")
+
+        if update is None:
+            print(f"❌ No fog tiles updated for room {room_id} (no active map)")
+            return WebsocketEventResult(broadcast_message={"info": "No fog tiles updated"})
+
+        broadcast = {
+            "event_type": "fog_tile_update",
+            "data": {
+                "filename": filename,
+                "regions": update["regions"],
+                "revision": update["revision"],
+                "base_revision": update["base_revision"],
+                "updated_by": user_id,
+            },
+        }
+        return WebsocketEventResult(broadcast_message=broadcast)
+
+    @staticmethod
+    async def fog_resync(websocket, data, event_data, user_id, client_id, manager):
+        """The active map's whole fog_config, to the sender only — the
+        recovery path when a fog_tile_update's base_revision doesn't match
+        the client's revision (missed or reordered broadcast)."""
+        room_id = client_id
+        active_map = await run_db(map_service.get_active_map, room_id)
+        map_config = (active_map or {}).get("map_config", {})
+        if not active_map or map_config.get("filename") != (event_data or {}).get("filename"):
+            return WebsocketEventResult.error("Invalid fog resync: not the active map")
+
+        await websocket.send_json({
+            "event_type": "fog_config_update",
+            "data": {
+                "filename": map_config["filename"],
+                "fog_config": map_config.get("fog_config"),
+                "revision": active_map.get("fog_revision", 0),
+                "updated_by": None,
+            },
+        })
+        return WebsocketEventResult(broadcast_message=None)
+
     @staticmethod
     def _map_token_display_name(token: Dict[str, Any], player_metadata: Dict[str, Any]) -> str:
         """Name a token for log lines: owner's character name, else its label.
@@ -1642,11 +1585,11 @@ class WebsocketEvent():
         return owner_metadata.get("character_name") or token.get("label") or fallback
 
     @staticmethod
-    def _map_token_place_cell_suffix(room_id: str, asset_id: str, token: Dict[str, Any]) -> str:
+    async def _map_token_place_cell_suffix(room_id: str, asset_id: str, token: Dict[str, Any]) -> str:
         """' at D7' when the placed token lands on the active map's addressable
         grid; empty string otherwise (gridless, untuned, off-grid, or the op
         targets a non-active map's board)."""
-        active_map = map_service.get_active_map(room_id)
+        active_map = await run_db(map_service.get_active_map, room_id)
         map_config = active_map.get("map_config", {}) if active_map else {}
         if map_config.get("asset_id") != asset_id:
             return ""
@@ -1655,13 +1598,13 @@ class WebsocketEvent():
         return f" at {cell_label}" if cell_label else ""
 
     @staticmethod
-    def _write_map_token_log(room_id: str, user_id: str, template_key: str,
-                             subject_token: Dict[str, Any], cell_suffix: str = "") -> str:
+    async def _write_map_token_log(room_id: str, user_id: str, template_key: str,
+                                   subject_token: Dict[str, Any], cell_suffix: str = "") -> str:
         """Resolve names, format one map-token log line, and persist it.
         Called only from branches that actually log — routine ops must not
         pay the metadata fetch (see map_token_update docstring)."""
-        player_metadata = WebsocketEvent._get_player_metadata(room_id)
-        mover_name = WebsocketEvent._display_name(room_id, user_id, player_metadata)
+        player_metadata = await WebsocketEvent._get_player_metadata(room_id)
+        mover_name = await WebsocketEvent._display_name(room_id, user_id, player_metadata)
         token_name = WebsocketEvent._map_token_display_name(subject_token, player_metadata)
         log_message = format_message(
             MESSAGE_TEMPLATES[template_key],
@@ -1681,11 +1624,18 @@ class WebsocketEvent():
 
         Validates shape + invariants (MapToken contract: finite x/y,
         footprint 1–4), applies the op as one atomic Mongo array update via
-        GameService.apply_map_token_op, then broadcasts the map's full token
-        array as the reconciliation fragment (fog's no-flicker philosophy —
-        the array is tiny). Attribution (created_by/updated_by) is stamped
+        GameService.apply_map_token_op, then broadcasts a map_token_delta:
+        the changed token plus the board revision the op produced (full
+        boards only go out on denial, re-snap and map_token_resync).
+        Attribution (created_by/updated_by) is stamped
         from the connection's user_id, never trusted from the wire.
 
+        An op may be conditioned on expected_revision (of the sender's
+        view of the board) and/or expected_updated_at (the target token's
+        version). An op that can't apply is answered to the sender only
+        with op "conflict", a conflict_reason (map_token_ops CONFLICT_*)
+        and the authoritative board, so their optimistic commit rolls back.
+
         Adventure-log rules (inform, don't enforce):
           place  → always ("Matt placed Elara at D7")
           remove → always ("Matt removed Goblin 3")
@@ -1703,6 +1653,14 @@ class WebsocketEvent():
         if op not in VALID_MAP_TOKEN_OPS:
             return WebsocketEventResult.error(f"Invalid map token op: {op}")
 
+        expected_revision = event_data.get("expected_revision")
+        if expected_revision is not None and (
+                not isinstance(expected_revision, int) or isinstance(expected_revision, bool)):
+            return WebsocketEventResult.error("Invalid map token update: bad expected_revision")
+        expected_version = event_data.get("expected_updated_at")
+        if expected_version is not None and (op == "place" or not isinstance(expected_version, str)):
+            return WebsocketEventResult.error("Invalid map token update: bad expected_updated_at")
+
         token_payload = None
         token_id = event_data.get("token_id")
         if op == "remove":
@@ -1718,23 +1676,18 @@ class WebsocketEvent():
             token_id = token.id
             token_payload = token.model_dump()
 
-        # One projection read serves the whole op: DM identity (ACL +
-        # filtering), the pre-op board (target lookup, denial answer), and
-        # the image refs (place/reveal fragments carry them).
-        dm_user_id, pre_op_board, room_token_images = GameService.get_room_token_context(room_id, asset_id)
+        # One read serves the whole op: DM identity (ACL + filtering), the
+        # image refs (place/reveal fragments carry them), the pre-op board
+        # (denial answer) and — for every non-place op — the board's
+        # version of the target, found by id in the board's index. The
+        # ACL/lock checks need it (the wire payload is never trusted for
+        # kind/locked/hidden), and remove's log needs the name of what's
+        # vanishing before it goes.
+        dm_user_id, room_token_images, pre_op_token, pre_op_board = await run_db(
+            GameService.get_room_token_context, room_id, asset_id, None if op == "place" else token_id
+        )
         sender_is_dm = dm_user_id is not None and user_id == dm_user_id
 
-        # Pre-op snapshot for every non-place op: the ACL/lock checks need
-        # the board's version of the target (the wire payload is never
-        # trusted for kind/locked/hidden), and remove's log needs the name
-        # of what's vanishing before it goes.
-        pre_op_token = None
-        if op != "place":
-            for existing_token in pre_op_board:
-                if existing_token.get("id") == token_id:
-                    pre_op_token = existing_token
-                    break
-
         target_kind = token_payload.get("kind") if op == "place" else (pre_op_token or {}).get("kind")
 
         # ACL (decisions 16/18/19). The client UI never offers these ops —
@@ -1764,29 +1717,39 @@ class WebsocketEvent():
                 denial_reason = "pc token ownership is identity"
 
         if denial_reason:
-            sender_tokens = pre_op_board if sender_is_dm else filter_hidden_tokens(pre_op_board)
-            await websocket.send_json({
-                "event_type": "map_token_state_update",
-                "data": {
-                    "asset_id": asset_id,
-                    "tokens": sender_tokens,
-                    "op": "denied",
-                    "token_id": token_id,
-                    "updated_by": user_id,
-                    "log_message": None,
-                    "denied_reason": denial_reason,
-                },
-            })
+            await WebsocketEvent._send_map_token_rejection(
+                websocket, asset_id, token_id, user_id, sender_is_dm, pre_op_board,
+                {"op": "denied", "denied_reason": denial_reason},
+            )
             logger.warning(
                 f"Map token op denied ({denial_reason}): {op} on {token_id} by {user_id} in {room_id}")
             return WebsocketEventResult(broadcast_message=None)
 
         try:
-            tokens = GameService.apply_map_token_op(
-                room_id, asset_id, op, token=token_payload, token_id=token_id
+            op_result = await run_db(
+                GameService.apply_map_token_op,
+                room_id, asset_id, op, token=token_payload, token_id=token_id,
+                expected_revision=expected_revision, expected_version=expected_version,
+                player_view=not sender_is_dm,
+            )
+        except MapTokenConflict as conflict:
+            # The board the op was checked against comes with the conflict;
+            # only a stale server copy needs a fresh read to answer with.
+            board = conflict.board
+            if board is None:
+                _dm_user_id, _token_images, _target_token, board = await run_db(
+                    GameService.get_room_token_context, room_id, asset_id
+                )
+            await WebsocketEvent._send_map_token_rejection(
+                websocket, asset_id, token_id, user_id, sender_is_dm, board,
+                {"op": "conflict", "conflict_reason": conflict.reason},
             )
+            logger.info(f"Map token op conflict ({conflict.reason}): {op} on {token_id} by {user_id} in {room_id}")
+            return WebsocketEventResult(broadcast_message=None)
         except ValueError as op_error:
             return WebsocketEventResult.error(str(op_error))
+        tokens = op_result["tokens"]
+        post_op_target = op_result["token"]
 
         was_hidden = bool(pre_op_token.get("hidden")) if pre_op_token else False
         now_hidden = bool(token_payload.get("hidden")) if token_payload else was_hidden
@@ -1796,20 +1759,16 @@ class WebsocketEvent():
         # the ambush on a plate, decision 17). The reveal is the log moment.
         log_message = None
         if op == "place" and not token_payload.get("hidden"):
-            cell_suffix = WebsocketEvent._map_token_place_cell_suffix(room_id, asset_id, token_payload)
-            log_message = WebsocketEvent._write_map_token_log(
+            cell_suffix = await WebsocketEvent._map_token_place_cell_suffix(room_id, asset_id, token_payload)
+            log_message = await WebsocketEvent._write_map_token_log(
                 room_id, user_id, "map_token_placed", token_payload, cell_suffix
             )
         elif op == "remove" and pre_op_token and not was_hidden:
-            log_message = WebsocketEvent._write_map_token_log(
+            log_message = await WebsocketEvent._write_map_token_log(
                 room_id, user_id, "map_token_removed", pre_op_token
             )
         elif op == "move":
-            moved_token = None
-            for candidate_token in tokens:
-                if candidate_token.get("id") == token_id:
-                    moved_token = candidate_token
-                    break
+            moved_token = post_op_target
             # The social-correction signal: log a pc token — or an assigned
             # companion — moved by someone other than its owner. Routine
             # own-token and plain-npc moves stay unlogged (log-flood
@@ -1821,40 +1780,37 @@ class WebsocketEvent():
                     move_template = ("map_token_moved_by_other"
                                      if moved_token.get("kind") == "pc"
                                      else "map_token_moved_party")
-                    log_message = WebsocketEvent._write_map_token_log(
+                    log_message = await WebsocketEvent._write_map_token_log(
                         room_id, user_id, move_template, moved_token
                     )
         elif op == "configure" and was_hidden and not now_hidden:
-            revealed_token = None
-            for candidate_token in tokens:
-                if candidate_token.get("id") == token_id:
-                    revealed_token = candidate_token
-                    break
+            revealed_token = post_op_target
             if revealed_token:
-                cell_suffix = WebsocketEvent._map_token_place_cell_suffix(room_id, asset_id, revealed_token)
-                log_message = WebsocketEvent._write_map_token_log(
+                cell_suffix = await WebsocketEvent._map_token_place_cell_suffix(room_id, asset_id, revealed_token)
+                log_message = await WebsocketEvent._write_map_token_log(
                     room_id, user_id, "map_token_revealed", revealed_token, cell_suffix
                 )
                 # Reveal mid-hold: stop suppressing its drag relays.
-                _hidden_held_tokens.discard((room_id, asset_id, token_id))
+                await map_token_holds.set_hidden_held(room_id, asset_id, token_id, False)
         elif op == "configure" and not was_hidden and now_hidden:
             # Hide mid-hold: start suppressing its drag relays (the
             # symmetric case of the reveal discard above).
-            if map_token_holds.holder(room_id, asset_id, token_id) is not None:
-                _hidden_held_tokens.add((room_id, asset_id, token_id))
+            if await map_token_holds.holder(room_id, asset_id, token_id) is not None:
+                await map_token_holds.set_hidden_held(room_id, asset_id, token_id, True)
 
-        if op == "place":
-            player_view_changed = not token_payload.get("hidden")
-        elif op in ("move", "remove"):
-            player_view_changed = not was_hidden
-        else:  # configure — visible at either end reaches players
-            player_view_changed = (not was_hidden) or (not now_hidden)
+        player_view_changed = op_result["player_view_changed"]
 
-        fragment_data = {
+        # Delta fragment: the changed token (None = gone) plus the board
+        # revision it produces. Clients apply it when base_revision matches
+        # their local revision and ask for a resync (map_token_resync) on a
+        # gap, so bandwidth per op stays constant however crowded the board.
+        delta_data = {
             "asset_id": asset_id,
-            "tokens": tokens,
             "op": op,
             "token_id": token_id,
+            "token": post_op_target,
+            "revision": op_result["revision"],
+            "base_revision": op_result["revision"] - 1,
             "updated_by": user_id,
             "log_message": log_message,
         }
@@ -1868,38 +1824,95 @@ class WebsocketEvent():
             or (op == "configure" and was_hidden and not now_hidden)
         )
         if token_enters_view:
-            post_op_target = None
-            for candidate_token in tokens:
-                if candidate_token.get("id") == token_id:
-                    post_op_target = candidate_token
-                    break
             target_image_id = (post_op_target or {}).get("image_asset_id")
             if target_image_id and room_token_images.get(target_image_id):
-                fragment_data["token_images"] = {target_image_id: room_token_images[target_image_id]}
-
-        # Per-recipient hidden filtering (decision 17). Fast path: a board
-        # with nothing hidden broadcasts identically to everyone, exactly as
-        # v1 did. Otherwise the DM gets the full board and players get the
-        # filtered one — and an op that lives entirely in the hidden layer
-        # (placing/moving/removing a hidden token) sends players nothing at
-        # all: even op metadata would tip the ambush.
-        board_has_hidden = any(board_token.get("hidden") for board_token in tokens)
-        if not board_has_hidden and not was_hidden:
+                delta_data["token_images"] = {target_image_id: room_token_images[target_image_id]}
+
+        # Per-recipient views (decision 17). Players count revisions of
+        # their hidden-filtered board, so a hide reads as a removal
+        # (token None) and a reveal as an arrival — and an op that lives
+        # entirely in the hidden layer sends players nothing at all: even
+        # op metadata would tip the ambush.
+        player_delta = None
+        if player_view_changed:
+            player_token = post_op_target if post_op_target and not post_op_target.get("hidden") else None
+            player_delta = {
+                **delta_data,
+                "token": player_token,
+                "revision": op_result["player_revision"],
+                "base_revision": op_result["player_revision"] - 1,
+            }
+
+        # Fast path: both views identical → one room broadcast.
+        if player_delta == delta_data:
             return WebsocketEventResult(
-                broadcast_message={"event_type": "map_token_state_update", "data": fragment_data})
-
-        player_tokens = filter_hidden_tokens(tokens)
-        for recipient_user_id in list(manager.room_users.get(room_id, {}).keys()):
-            if recipient_user_id == dm_user_id:
-                recipient_tokens = tokens
-            elif player_view_changed:
-                recipient_tokens = player_tokens
-            else:
-                continue
-            await manager.send_to_player(room_id, recipient_user_id, {
-                "event_type": "map_token_state_update",
-                "data": {**fragment_data, "tokens": recipient_tokens},
-            })
+                broadcast_message={"event_type": "map_token_delta", "data": delta_data})
+
+        # One encode per view (DM / players), not per recipient.
+        await manager.update_room_views(
+            room_id, dm_user_id,
+            {"event_type": "map_token_delta", "data": delta_data},
+            {"event_type": "map_token_delta", "data": player_delta} if player_delta else None,
+        )
+        return WebsocketEventResult(broadcast_message=None)
+
+    @staticmethod
+    async def _send_map_token_rejection(websocket, asset_id, token_id, user_id, sender_is_dm, board, outcome):
+        """Answer an op that didn't apply (denied, conflict) to its sender
+        only: the authoritative board (GameService._board_views) in the
+        sender's view, at that view's revision, plus the outcome fields
+        ({op, *_reason}). An unknown room answers with an empty board."""
+        board = board or {"tokens": [], "visible_tokens": [], "revision": 0, "player_revision": 0}
+        await websocket.send_json({
+            "event_type": "map_token_state_update",
+            "data": {
+                "asset_id": asset_id,
+                "tokens": board["tokens"] if sender_is_dm else board["visible_tokens"],
+                "revision": board["revision"] if sender_is_dm else board["player_revision"],
+                "token_id": token_id,
+                "updated_by": user_id,
+                "log_message": None,
+                **outcome,
+            },
+        })
+
+    @staticmethod
+    async def map_token_resync(websocket, data, event_data, user_id, client_id, manager):
+        """Full board for one map, to the sender only — the recovery path
+        when a client sees a map_token_delta whose base_revision doesn't
+        match its local revision (missed or reordered fragment). Carries
+        the revision of the sender's view so delta application resumes."""
+        room_id = client_id
+        asset_id = (event_data or {}).get("asset_id")
+        if not is_valid_asset_key(asset_id):
+            return WebsocketEventResult.error("Invalid map token resync: bad asset_id")
+
+        dm_user_id, room_token_images, _target_token, board = await run_db(
+            GameService.get_room_token_context, room_id, asset_id
+        )
+        board = board or {"tokens": [], "visible_tokens": [], "revision": 0, "player_revision": 0}
+
+        resync_data = {
+            "asset_id": asset_id,
+            "tokens": board["tokens"],
+            "revision": board["revision"],
+            "op": "resync",
+            "token_id": None,
+            "updated_by": None,
+            "log_message": None,
+        }
+        if dm_user_id is None or user_id != dm_user_id:
+            # Same visible-only image rule as initial_state (decision 17).
+            visible_tokens = board["visible_tokens"]
+            visible_image_ids = {t["image_asset_id"] for t in visible_tokens if t.get("image_asset_id")}
+            resync_data["tokens"] = visible_tokens
+            resync_data["revision"] = board["player_revision"]
+            resync_data["token_images"] = {
+                image_id: image_ref for image_id, image_ref in room_token_images.items()
+                if image_id in visible_image_ids
+            }
+
+        await websocket.send_json({"event_type": "map_token_state_update", "data": resync_data})
         return WebsocketEventResult(broadcast_message=None)
 
     @staticmethod
@@ -1911,8 +1924,11 @@ class WebsocketEvent():
 
         v1 clients send grab/release only. "move" is accepted and relayed
         (holder-validated) so the live-drag fast-follow is a client-side flag
-        flip, not a backend deploy. A denied grab is answered to the requester
-        only (map_token_drag_denied) — their optimistic drag snaps back.
+        flip, not a backend deploy. Move frames are not relayed one by one:
+        the room's DragCoalescer keeps the latest per hold and flushes them
+        as one map_token_drag_batch per tick. A denied grab is answered to
+        the requester only (map_token_drag_denied) — their optimistic drag
+        snaps back.
         """
         room_id = client_id
         event_data = event_data or {}
@@ -1939,14 +1955,11 @@ class WebsocketEvent():
             # ACL before the hold (decisions 16/18): a non-DM grabbing an
             # npc token, or anyone grabbing a locked token, is denied on the
             # same rail as a concurrency loss — the optimistic drag snaps
-            # back. One projection read at human hand frequency serves both
-            # the target lookup and the DM check.
-            grab_dm_user_id, grab_board, _grab_token_images = GameService.get_room_token_context(room_id, asset_id)
-            target_token = None
-            for existing_token in grab_board:
-                if existing_token.get("id") == token_id:
-                    target_token = existing_token
-                    break
+            # back. One read at human hand frequency serves both the target
+            # lookup (by id, in the board's index) and the DM check.
+            grab_dm_user_id, _grab_token_images, target_token, _grab_board = await run_db(
+                GameService.get_room_token_context, room_id, asset_id, token_id
+            )
 
             grab_denied = False
             if target_token and target_token.get("kind") == "npc":
@@ -1958,7 +1971,7 @@ class WebsocketEvent():
 
             blocking_holder = None
             if not grab_denied:
-                blocking_holder = map_token_holds.try_grab(room_id, asset_id, token_id, user_id)
+                blocking_holder = await map_token_holds.try_grab(room_id, asset_id, token_id, user_id)
 
             if grab_denied or blocking_holder is not None:
                 # Answered to the requester only — their optimistic drag snaps
@@ -1979,19 +1992,19 @@ class WebsocketEvent():
             # for a board read, and a hidden token's drag presence must not
             # reach player clients (decision 17).
             if target_token and target_token.get("hidden"):
-                _hidden_held_tokens.add((room_id, asset_id, token_id))
+                await map_token_holds.set_hidden_held(room_id, asset_id, token_id, True)
         elif phase == "move":
-            if map_token_holds.holder(room_id, asset_id, token_id) != user_id:
+            # A live stream is an active hand — refresh the hold so a long
+            # careful drag can't staleness-expire mid-stream. One store
+            # round trip checks and refreshes together.
+            if not await map_token_holds.refresh(room_id, asset_id, token_id, user_id):
                 # Stale frame after an expired/denied hold — drop silently,
                 # no error spam at stream frequency.
                 return WebsocketEventResult(broadcast_message=None)
-            # A live stream is an active hand — refresh the hold so a long
-            # careful drag can't staleness-expire mid-stream (same-user
-            # try_grab resets the clock).
-            map_token_holds.try_grab(room_id, asset_id, token_id, user_id)
         else:
-            released = map_token_holds.release(room_id, asset_id, token_id, user_id)
-            if not released and map_token_holds.holder(room_id, asset_id, token_id) is not None:
+            drag_coalescer.discard(room_id, asset_id, token_id)
+            released = await map_token_holds.release(room_id, asset_id, token_id, user_id)
+            if not released and await map_token_holds.holder(room_id, asset_id, token_id) is not None:
                 # Someone else still holds this token — a spurious release
                 # (denied grab's pointerup, stale client) must not clear the
                 # real holder's lift affordance room-wide. Drop silently.
@@ -2003,23 +2016,28 @@ class WebsocketEvent():
         # have the token; grab/frame/release presence would leak the ambush
         # (token id AND coordinates) to a websocket inspector. The DM is the
         # only client that could render it and filters its own echo anyway.
-        if (room_id, asset_id, token_id) in _hidden_held_tokens:
+        if await map_token_holds.is_hidden_held(room_id, asset_id, token_id):
             if phase == "release":
-                _hidden_held_tokens.discard((room_id, asset_id, token_id))
+                await map_token_holds.set_hidden_held(room_id, asset_id, token_id, False)
             return WebsocketEventResult(broadcast_message=None)
 
-        drag_message = {
-            "event_type": "map_token_drag",
-            "data": {
-                "asset_id": asset_id,
-                "token_id": token_id,
-                "phase": phase,
-                "x": drag_x,
-                "y": drag_y,
-                "holder_user_id": user_id,
-            },
+        drag_data = {
+            "asset_id": asset_id,
+            "token_id": token_id,
+            "phase": phase,
+            "x": drag_x,
+            "y": drag_y,
+            "holder_user_id": user_id,
         }
-        return WebsocketEventResult(broadcast_message=drag_message)
+        if phase == "move":
+            # Superseded within one tick by the next frame — batch, don't relay.
+            drag_coalescer.offer(
+                room_id, drag_data,
+                lambda batch_room_id, message: manager.update_room_data(batch_room_id, message, ephemeral=True),
+            )
+            return WebsocketEventResult(broadcast_message=None)
+
+        return WebsocketEventResult(broadcast_message={"event_type": "map_token_drag", "data": drag_data})
 
     @staticmethod
     async def map_request(websocket, data, event_data, user_id, client_id, manager):
@@ -2032,7 +2050,7 @@ class WebsocketEvent():
         
         try:
             # Get active map from database
-            active_map = map_service.get_active_map(room_id)
+            active_map = await run_db(map_service.get_active_map, room_id)
             
             if active_map:
                 # Send current map to requesting client only
@@ -2069,7 +2087,7 @@ class WebsocketEvent():
     async def image_load(websocket, data, event_data, user_id, client_id, manager):
         """Load/set active image for the room"""
         room_id = client_id
-        display_name = WebsocketEvent._display_name(room_id, user_id)
+        display_name = await WebsocketEvent._display_name(room_id, user_id)
         print(f"🖼️ Image load handler called for room {client_id} by {display_name}")
         image_data = event_data.get("image_data")
 
@@ -2102,16 +2120,16 @@ class WebsocketEvent():
                 image_config=image_config,
             )
 
-            success = image_service.set_active_image(room_id, image_settings)
+            success = await run_db(image_service.set_active_image, room_id, image_settings)
 
             if success:
-                saved_image = image_service.get_active_image(room_id)
+                saved_image = await run_db(image_service.get_active_image, room_id)
 
                 if saved_image:
                     log_message = f"🖼️ {display_name.title()} loaded image: {image_settings.image_config.original_filename}"
                     adventure_log.add_log_entry(room_id, log_message, LogType.SYSTEM, user_id)
 
-                    active_display = image_service.get_active_display(room_id)
+                    active_display = await run_db(image_service.get_active_display, room_id)
 
                     broadcast_message = {
                         "event_type": "image_load",
@@ -2148,20 +2166,20 @@ class WebsocketEvent():
     async def image_clear(websocket, data, event_data, user_id, client_id, manager):
         """Clear the active image for the room"""
         room_id = client_id
-        display_name = WebsocketEvent._display_name(room_id, user_id)
+        display_name = await WebsocketEvent._display_name(room_id, user_id)
 
         if not room_id:
             print(f"❌ Invalid image clear request: missing room_id")
             return WebsocketEventResult(broadcast_message={"error": "Invalid image clear request"})
 
         try:
-            success = image_service.clear_active_image(room_id)
+            success = await run_db(image_service.clear_active_image, room_id)
 
             if success:
                 log_message = f"🖼️ {display_name.title()} cleared the active image"
                 adventure_log.add_log_entry(room_id, log_message, LogType.SYSTEM, user_id)
 
-                active_display = image_service.get_active_display(room_id)
+                active_display = await run_db(image_service.get_active_display, room_id)
 
                 broadcast_message = {
                     "event_type": "image_clear",
@@ -2195,7 +2213,8 @@ class WebsocketEvent():
             return WebsocketEventResult(broadcast_message={"error": "Invalid image config update request"})
 
         try:
-            success = image_service.update_image_config(
+            success = await run_db(
+                image_service.update_image_config,
                 room_id,
                 image_fit=image_fit,
                 display_mode=display_mode,
@@ -2205,7 +2224,7 @@ class WebsocketEvent():
             )
 
             if success:
-                saved_image = image_service.get_active_image(room_id)
+                saved_image = await run_db(image_service.get_active_image, room_id)
                 saved_ic = saved_image.get("image_config", {}) if saved_image else {}
                 broadcast_message = {
                     "event_type": "image_config_update",
@@ -2237,8 +2256,8 @@ class WebsocketEvent():
             return WebsocketEventResult(broadcast_message={"error": "Invalid image request"})
 
         try:
-            active_image = image_service.get_active_image(room_id)
-            active_display = image_service.get_active_display(room_id)
+            active_image = await run_db(image_service.get_active_image, room_id)
+            active_display = await run_db(image_service.get_active_display, room_id)
 
             if active_image:
                 response_message = {
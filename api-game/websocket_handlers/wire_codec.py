@@ -0,0 +1,111 @@
+# Copyright (C) 2025 Matthew Davey
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Opt-in binary wire format for the high-frequency WebSocket events.
+
+A client that offers BINARY_SUBPROTOCOL when opening /ws/{client_id} gets
+the hot events — drag presence, lobby presence, audio transport — as
+MessagePack binary frames instead of JSON text:
+
+    [event_code, data]          # data's known field names → small ints
+
+Everything else (and every frame to a client that didn't negotiate) stays
+JSON text, so a binary client must accept both. Field names outside the
+schema pass through as strings, which keeps encoding lossless for payloads
+that carry free-form keys (legacy audio fields, effects dicts).
+
+The schema is the protocol: codes are positional and APPEND-ONLY — never
+reorder or remove an entry, only add to the end (rollplay/app/game/
+wireCodec.js mirrors both tables). Bump the subprotocol version for
+anything else.
+
+Inbound, a binary client may send schema events as binary frames; they
+decode to the same dict receive_json would have produced.
+"""
+
+from typing import Any, Dict, Iterable, Optional
+
+import msgpack
+
+BINARY_SUBPROTOCOL = "rollplay.msgpack.v1"
+
+# event_type ↔ code (index + 1)
+BINARY_EVENT_TYPES = (
+    "map_token_drag",
+    "map_token_drag_batch",
+    "lobby_update",
+    "player_connected",
+    "player_disconnected",
+    "remote_audio_play",
+    "remote_audio_resume",
+    "remote_audio_batch",
+)
+
+# field name ↔ key (index + 1), shared by every event and nesting level
+FIELD_NAMES = (
+    # map_token_drag / map_token_drag_batch
+    "asset_id", "token_id", "phase", "x", "y", "holder_user_id", "frames",
+    # lobby_update / player_connected / player_disconnected
+    "lobby_users", "name", "user_id", "id", "status",
+    "connected_user_id", "connected_player", "disconnected_user_id", "disconnected_player",
+    # remote_audio_play / remote_audio_resume / remote_audio_batch
+    "tracks", "triggered_by", "track_type", "channelId", "operations", "fade_duration",
+    "trackId", "operation", "volume", "looping", "muted", "soloed", "filename",
+    "s3_url", "effects", "loop_mode", "loop_start", "loop_end",
+)
+
+_EVENT_CODES = {event_type: index + 1 for index, event_type in enumerate(BINARY_EVENT_TYPES)}
+_FIELD_KEYS = {field_name: index + 1 for index, field_name in enumerate(FIELD_NAMES)}
+
+
+def negotiate_subprotocol(requested: Iterable[str]) -> Optional[str]:
+    """The subprotocol to accept the socket with, or None for plain JSON."""
+    return BINARY_SUBPROTOCOL if BINARY_SUBPROTOCOL in (requested or ()) else None
+
+
+def _compact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {_FIELD_KEYS.get(key, key): _compact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_compact(item) for item in value]
+    return value
+
+
+def _expand(value: Any) -> Any:
+    if isinstance(value, dict):
+        expanded = {}
+        for key, item in value.items():
+            if isinstance(key, int):
+                if not 0 < key <= len(FIELD_NAMES):
+                    raise ValueError(f"Unknown wire field key: {key}")
+                key = FIELD_NAMES[key - 1]
+            expanded[key] = _expand(item)
+        return expanded
+    if isinstance(value, list):
+        return [_expand(item) for item in value]
+    return value
+
+
+def encode_binary_frame(message: Dict[str, Any]) -> Optional[bytes]:
+    """MessagePack frame for message, or None when its event isn't in the
+    binary schema (the caller sends JSON text instead)."""
+    event_code = _EVENT_CODES.get(message.get("event_type"))
+    if event_code is None or set(message) - {"event_type", "data"}:
+        return None
+    return msgpack.packb([event_code, _compact(message.get("data"))], use_bin_type=True)
+
+
+def decode_binary_frame(frame: bytes) -> Dict[str, Any]:
+    """Inbound binary frame → {"event_type", "data"}. Raises ValueError on
+    anything that isn't a well-formed schema frame."""
+    try:
+        decoded = msgpack.unpackb(frame, raw=False, strict_map_key=False)
+    except Exception as e:
+        raise ValueError(f"Malformed binary frame: {e}") from e
+
+    if not isinstance(decoded, list) or len(decoded) != 2 or not isinstance(decoded[0], int):
+        raise ValueError("Binary frame must be [event_code, data]")
+    event_code, data = decoded
+    if not 0 < event_code <= len(BINARY_EVENT_TYPES):
+        raise ValueError(f"Unknown wire event code: {event_code}")
+    return {"event_type": BINARY_EVENT_TYPES[event_code - 1], "data": _expand(data)}
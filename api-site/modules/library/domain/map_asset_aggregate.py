@@ -13,6 +13,7 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional, Union
 from uuid import UUID, uuid4
 
+from shared_contracts.grid_math import grid_geometry_changed, resnap_board_positions
 from shared_contracts.map import FOG_REGIONS_MAX, FogConfig, FogRegion, GridColorMode, GridConfig, MapConfig
 from shared_contracts.map_token import MapToken
 
@@ -147,8 +148,11 @@ class MapAsset(MediaAssetAggregate):
         """
         Update grid configuration.
 
-        Only updates provided values; None values keep current.
+        Only updates provided values; None values keep current. A geometry
+        change re-snaps the token baseline so each token keeps its cell.
         """
+        old_lattice = self._lattice_config()
+
         if grid_width is not None:
             if grid_width < 1 or grid_width > 1000:
                 raise ValueError("grid_width must be between 1 and 1000")
@@ -182,8 +186,38 @@ class MapAsset(MediaAssetAggregate):
         if grid_enabled is not None:
             self.grid_enabled = grid_enabled
 
+        self._resnap_token_baseline(old_lattice, self._lattice_config())
         self.updated_at = datetime.utcnow()
 
+    def _lattice_config(self) -> Optional[Dict[str, Any]]:
+        """The grid as shared_contracts.grid_math reads it, or None."""
+        grid_config = self.build_grid_config_for_game()
+        return grid_config.model_dump() if grid_config else None
+
+    def _resnap_token_baseline(self, old_lattice: Optional[Dict[str, Any]],
+                               new_lattice: Optional[Dict[str, Any]]) -> None:
+        """Workshop twin of api-game's runtime re-snap (decision 20): the
+        whole baseline in one resnap_board_positions pass."""
+        tokens = (self.token_config or {}).get("tokens")
+        if not tokens or not grid_geometry_changed(old_lattice, new_lattice):
+            return
+        # Cold data may hold tokens that no longer validate; leave those for
+        # build_token_baseline to salvage rather than failing the grid save.
+        placed = [
+            index for index, token in enumerate(tokens)
+            if isinstance(token.get("x"), (int, float)) and isinstance(token.get("y"), (int, float))
+        ]
+        new_xs, new_ys = resnap_board_positions(
+            [tokens[index]["x"] for index in placed],
+            [tokens[index]["y"] for index in placed],
+            [tokens[index].get("footprint") or 1 for index in placed],
+            old_lattice, new_lattice,
+        )
+        resnapped_tokens = list(tokens)
+        for index, new_x, new_y in zip(placed, new_xs, new_ys):
+            resnapped_tokens[index] = {**tokens[index], "x": new_x, "y": new_y}
+        self.token_config = {**self.token_config, "tokens": resnapped_tokens}
+
     def has_grid_config(self) -> bool:
         """Check if grid configuration has been set."""
         return self.grid_width is not None and self.grid_height is not None
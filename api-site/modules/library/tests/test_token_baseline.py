@@ -114,6 +114,46 @@ class TestUpdateTokenConfigAggregate:
         assert baseline[0]["label"] == "Goblin"
 
 
+class TestBaselineResnapOnGridSave:
+    """A grid geometry save keeps each baseline token in its cell (decision 20)."""
+
+    def make_gridded_asset(self, tokens):
+        asset = make_map_asset()
+        asset.update_grid_config(grid_width=20, grid_height=20, grid_cell_size=50.0,
+                                 grid_offset_x=0, grid_offset_y=0)
+        asset.update_token_config(tokens)
+        return asset
+
+    def test_cell_size_change_keeps_cells(self):
+        # (350, 650) is the center of cell (7, 13); a 2x2 sits on intersection (4, 4)
+        asset = self.make_gridded_asset([
+            make_baseline_token(id="trap"),
+            make_baseline_token(id="ogre", x=200.0, y=200.0, footprint=2),
+        ])
+        asset.update_grid_config(grid_cell_size=40.0)
+        positions = {token["id"]: (token["x"], token["y"]) for token in asset.token_config["tokens"]}
+        assert positions == {"trap": (300.0, 540.0), "ogre": (160.0, 160.0)}
+
+    def test_shrunk_grid_clamps_into_bounds(self):
+        asset = self.make_gridded_asset([make_baseline_token(id="trap")])
+        asset.update_grid_config(grid_width=5, grid_height=5)
+        token = asset.token_config["tokens"][0]
+        assert (token["x"], token["y"]) == (225.0, 225.0)
+
+    def test_cosmetic_change_leaves_baseline_alone(self):
+        asset = self.make_gridded_asset([make_baseline_token(id="trap", x=351.5, y=649.0)])
+        asset.update_grid_config(grid_opacity=0.8, grid_line_color="#000000")
+        token = asset.token_config["tokens"][0]
+        assert (token["x"], token["y"]) == (351.5, 649.0)
+
+    def test_corrupt_token_survives_a_resnap(self):
+        asset = self.make_gridded_asset([make_baseline_token(id="trap")])
+        asset.token_config["tokens"].append({"id": "broken"})
+        asset.update_grid_config(grid_offset_x=10)
+        assert asset.token_config["tokens"][0]["x"] == 385.0
+        assert asset.token_config["tokens"][1] == {"id": "broken"}
+
+
 def make_session(status, boards=None, seeds=None):
     return SimpleNamespace(status=status, map_token_state=boards or {}, map_token_seed=seeds or {})
 
@@ -9,9 +9,15 @@ from .base import ContractModel
 from .character import DungeonMaster, PlayerCharacter, SessionUser
 from .cine import ColorFilterOverlay, FilmGrainOverlay, HandHeldMotion, MotionConfig, VisualOverlay
 from .display import ActiveDisplayType
-from .grid_math import grid_geometry_changed, grid_usable, resnap_token_position, snap_axis_nearest
+from .grid_math import (
+    grid_geometry_changed,
+    grid_usable,
+    resnap_board_positions,
+    resnap_token_position,
+    snap_axis_nearest,
+)
 from .image import FocalArea, ImageConfig
-from .map import FOG_REGIONS_MAX, FogConfig, FogRegion, GridColorMode, GridConfig, MapConfig
+from .map import FOG_REGIONS_MAX, FOG_TILE_PX, FogConfig, FogRegion, GridColorMode, GridConfig, MapConfig
 from .map_token import MapToken, TokenImageRef
 from .session import (
     PlayerState,
@@ -35,12 +41,14 @@ __all__ = [
     "SessionUser",
     "ActiveDisplayType",
     "FOG_REGIONS_MAX",
+    "FOG_TILE_PX",
     "FogConfig",
     "FogRegion",
     "GridColorMode",
     "GridConfig",
     "grid_geometry_changed",
     "grid_usable",
+    "resnap_board_positions",
     "resnap_token_position",
     "snap_axis_nearest",
     "ImageConfig",
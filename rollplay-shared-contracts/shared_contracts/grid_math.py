@@ -17,10 +17,19 @@ that never had an old-grid address (grid absent, disabled, or untuned) snaps
 to the nearest lattice position under the new grid. Tokens sitting on the
 virtual lattice outside the drawn grid keep their virtual index unclamped —
 clamping them would yank deliberate margin placements into the grid.
+
+resnap_board_positions is the whole-board form: one vectorized pass over
+arrays of x, y and footprint when NumPy is installed (the "fast" extra),
+the scalar function per token otherwise. Both give bit-identical floats.
 """
 
 import math
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional: resnap_board_positions falls back to the scalar loop
+    np = None
 
 
 def grid_usable(grid_config: Optional[Dict[str, Any]]) -> bool:
@@ -135,3 +144,76 @@ def resnap_token_position(x: float, y: float, footprint: int,
         new_origin_y, new_cell_size, new_grid_config.get("grid_height") or 0,
     )
     return new_x, new_y
+
+
+def _resnap_axis_array(values, odd,
+                       old_origin: float, old_cell_size: float, old_cell_count: int,
+                       new_origin: float, new_cell_size: float, new_cell_count: int):
+    """_resnap_axis over a NumPy array. Every step is the same IEEE double
+    operation the scalar path performs, in the same order, so results are
+    bit-identical (lattice indices are whole floats, exact below 2**53).
+    old_cell_size None means no old grid: nearest-lattice snap instead."""
+    if old_cell_size is None:
+        scaled = (values - new_origin) / new_cell_size
+        index = np.where(odd, np.floor(scaled), np.floor(scaled + 0.5))
+    else:
+        scaled = (values - old_origin) / old_cell_size
+        index = np.where(odd, np.floor(scaled), np.floor(scaled + 0.5))
+        if old_cell_count > 0 and new_cell_count > 0:
+            old_upper = np.where(odd, old_cell_count - 1, old_cell_count)
+            new_upper = np.where(odd, new_cell_count - 1, new_cell_count)
+            old_in_bounds = (index >= 0) & (index <= old_upper)
+            index = np.where(old_in_bounds, np.minimum(np.maximum(index, 0), new_upper), index)
+    return np.where(odd, new_origin + (index + 0.5) * new_cell_size, new_origin + index * new_cell_size)
+
+
+def resnap_board_positions(xs: Sequence[float], ys: Sequence[float], footprints: Sequence[int],
+                           old_grid_config: Optional[Dict[str, Any]],
+                           new_grid_config: Optional[Dict[str, Any]]) -> Tuple[List[float], List[float]]:
+    """resnap_token_position for a whole board at once: parallel sequences
+    of anchors and footprints in, (new_xs, new_ys) out as lists of floats.
+
+    Vectorized with NumPy when it is installed; otherwise the scalar
+    function per token. Either way new_xs[i], new_ys[i] equals
+    resnap_token_position(xs[i], ys[i], footprints[i], ...) exactly.
+    """
+    if not (len(xs) == len(ys) == len(footprints)):
+        raise ValueError("xs, ys and footprints must be the same length")
+
+    if np is None or not grid_usable(new_grid_config):
+        new_xs, new_ys = [], []
+        for x, y, footprint in zip(xs, ys, footprints):
+            new_x, new_y = resnap_token_position(x, y, footprint, old_grid_config, new_grid_config)
+            new_xs.append(float(new_x))
+            new_ys.append(float(new_y))
+        return new_xs, new_ys
+
+    x_array = np.asarray(xs, dtype=np.float64)
+    y_array = np.asarray(ys, dtype=np.float64)
+    odd = np.asarray(footprints, dtype=np.int64) % 2 == 1
+
+    new_origin_x = new_grid_config.get("offset_x") or 0
+    new_origin_y = new_grid_config.get("offset_y") or 0
+    new_cell_size = new_grid_config["grid_cell_size"]
+
+    if grid_usable(old_grid_config):
+        old_origin_x = old_grid_config.get("offset_x") or 0
+        old_origin_y = old_grid_config.get("offset_y") or 0
+        old_cell_size = old_grid_config["grid_cell_size"]
+        old_width = old_grid_config.get("grid_width") or 0
+        old_height = old_grid_config.get("grid_height") or 0
+    else:
+        old_origin_x = old_origin_y = old_cell_size = None
+        old_width = old_height = 0
+
+    new_x = _resnap_axis_array(
+        x_array, odd,
+        old_origin_x, old_cell_size, old_width,
+        new_origin_x, new_cell_size, new_grid_config.get("grid_width") or 0,
+    )
+    new_y = _resnap_axis_array(
+        y_array, odd,
+        old_origin_y, old_cell_size, old_height,
+        new_origin_y, new_cell_size, new_grid_config.get("grid_height") or 0,
+    )
+    return new_x.tolist(), new_y.tolist()
@@ -15,6 +15,16 @@ from .base import ContractModel
 # and bounded for performance.
 FOG_REGIONS_MAX = 12
 
+# Fog mask tile edge, in mask pixels. A tiled mask is a grid of
+# FOG_TILE_PX squares (the last column/row are cut to the mask bounds);
+# a paint update carries only the tiles its strokes touched.
+FOG_TILE_PX = 256
+
+# Fog mask edge cap, in mask pixels. A mask matches its map image, and
+# composing one allocates width x height RGBA, so the size is bounded
+# like an uploaded map image.
+FOG_MASK_MAX_PX = 8192
+
 
 class GridColorMode(ContractModel):
     """Color configuration for a single grid display mode (edit or display)."""
@@ -56,6 +66,15 @@ class FogRegion(ContractModel):
     fog shapes (holes, disconnected regions, soft edges) are encoded
     entirely in the per-pixel alpha pattern — mask_width/mask_height
     are the bitmap bounds, not a geometric description.
+
+    Inside api-game a mask is stored once, content-addressed: `mask_hash`
+    (sha256 hex of the PNG bytes) replaces the inline `mask`, and clients
+    fetch the bytes by hash — an unchanged region keeps its hash, so it
+    is never re-sent or re-written. During play api-game keeps masks
+    tiled instead: `mask_tiles` maps "col,row" to the hash of that
+    FOG_TILE_PX square, and a missing tile is fully transparent. At the
+    ETL boundary masks travel inline again; exactly one of mask /
+    mask_hash / mask_tiles is set on a painted region.
     """
 
     id: str = Field(..., min_length=1)
@@ -63,8 +82,10 @@ class FogRegion(ContractModel):
     enabled: bool = Field(default=True)
     role: Literal["prepped", "live"] = Field(default="prepped")
     mask: Optional[str] = Field(default=None, min_length=1)  # data URL
-    mask_width: Optional[int] = Field(default=None, ge=1)
-    mask_height: Optional[int] = Field(default=None, ge=1)
+    mask_hash: Optional[str] = Field(default=None, pattern=r"^[0-9a-f]{64}$")  # api-game blob ref
+    mask_tiles: Optional[Dict[str, str]] = None  # api-game tile refs: "col,row" -> tile hash
+    mask_width: Optional[int] = Field(default=None, ge=1, le=FOG_MASK_MAX_PX)
+    mask_height: Optional[int] = Field(default=None, ge=1, le=FOG_MASK_MAX_PX)
 
     # Render params — were FOG_* constants in FogCanvasLayer.js.
     # FOG_HIDE_COLOR stays a file-level constant (consistent fog tone
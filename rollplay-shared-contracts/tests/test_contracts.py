@@ -15,6 +15,7 @@ from shared_contracts.cine import ColorFilterOverlay, FilmGrainOverlay, HandHeld
 from shared_contracts.grid_math import (
     grid_geometry_changed,
     grid_usable,
+    resnap_board_positions,
     resnap_token_position,
     snap_axis_nearest,
 )
@@ -195,6 +196,19 @@ class TestMapRoundTrip:
         with pytest.raises(ValidationError):
             FogRegion(id="r1", mask_height=0)
 
+    def test_fog_region_mask_hash_is_sha256_hex(self):
+        mask_hash = "ab" * 32
+        assert FogRegion(id="r1", mask_hash=mask_hash).model_dump()["mask_hash"] == mask_hash
+        with pytest.raises(ValidationError):
+            FogRegion(id="r1", mask_hash="../../etc/passwd")
+        with pytest.raises(ValidationError):
+            FogRegion(id="r1", mask_hash="AB" * 32)
+
+    def test_fog_region_mask_tiles_default_none(self):
+        assert FogRegion(id="r1").mask_tiles is None
+        tiles = {"0,0": "ab" * 32, "3,1": "cd" * 32}
+        assert FogRegion(id="r1", mask_tiles=tiles).model_dump()["mask_tiles"] == tiles
+
     def test_fog_region_rejects_out_of_range_params(self):
         with pytest.raises(ValidationError):
             FogRegion(id="r1", hide_feather_px=-1)
@@ -1047,3 +1061,12 @@ class TestGridMath:
         # Math.round(2.5) === 3 in JS; Python's round() is banker's — the
         # shared math must match the client's snapTokenCenter.
         assert snap_axis_nearest(250.0, 0, 100.0, 2) == 300.0
+
+    def test_board_resnap_matches_per_token(self):
+        xs, ys, footprints = [350.0, 200.0, 1850.0, 123.4], [650.0, 300.0, 250.0, 567.8], [1, 2, 1, 3]
+        old_grid_config, new_grid_config = self._grid(), self._grid(grid_cell_size=80.0, grid_width=10)
+        new_xs, new_ys = resnap_board_positions(xs, ys, footprints, old_grid_config, new_grid_config)
+        assert list(zip(new_xs, new_ys)) == [
+            resnap_token_position(x, y, footprint, old_grid_config, new_grid_config)
+            for x, y, footprint in zip(xs, ys, footprints)
+        ]
@@ -11,6 +11,24 @@ const MAX_BRUSH_PX = 500;
 
 const FOG_FILL = 'rgba(0, 0, 0, 1)';
 
+// api-game serves stored masks by content hash (FogRegion.mask_hash).
+// Same origin through nginx, so loading one never taints the canvas.
+const fogMaskUrl = (maskHash) => `/api/game/fog-masks/${maskHash}`;
+
+// Mirror of FOG_TILE_PX in rollplay-shared-contracts/shared_contracts/map.py.
+// Fog updates in a game carry only the FOG_TILE_PX squares a stroke
+// touched; the last column/row of tiles are cut to the mask bounds.
+export const FOG_TILE_PX = 256;
+
+const tileKey = (col, row) => `${col},${row}`;
+
+const loadImage = (src) => new Promise((resolve, reject) => {
+  const img = new Image();
+  img.onload = () => resolve(img);
+  img.onerror = reject;
+  img.src = src;
+});
+
 // Brush hardness — inner fraction of the brush radius that's fully
 // opaque; the outer (1 − hardness) is a linear alpha falloff to 0.
 // 1.0 = perfect hard disc; 0.7 = solid core with a 30%-of-radius rim
@@ -35,7 +53,14 @@ const STAMP_SPACING_FRACTION = 0.25;
  *
  * No-flicker contract: loadFromDataUrl decodes into an Image first;
  * only after onload fires does it paint to the canvas. Old fog stays
- * on screen until the new mask is fully decoded.
+ * on screen until the new mask is fully decoded. applyTiles holds to
+ * the same rule: every tile decodes before any is drawn.
+ *
+ * Tiles: every edit records which FOG_TILE_PX tiles it touched, and
+ * takeDirtyTiles() encodes just those. tileHashes is the server's tile
+ * map for what the canvas shows, or null when the server holds this
+ * region some other way (a whole mask, or a size it no longer has) —
+ * the next update must then be a reset that re-sends every painted tile.
  */
 export default class FogEngine extends EventEmitter {
   constructor({ width = DEFAULT_WIDTH, height = DEFAULT_HEIGHT } = {}) {
@@ -56,6 +81,9 @@ export default class FogEngine extends EventEmitter {
     this._stamp = null;            // prebuilt soft-brush canvas, cached per brush size
     this._stampSize = 0;
     this._regionId = null;         // FogRegion.id captured on loadFromRegion(); round-trips on serialize()
+    this._maskHash = null;         // mask_hash the canvas was loaded from; cleared by any edit
+    this._tileHashes = {};         // server tile map the canvas matches (a fresh canvas is empty tiles); null = untiled
+    this._dirtyTiles = new Set();  // tile keys edited since the last takeDirtyTiles()
   }
 
   // Build a radial-gradient brush stamp once per brush-size change. The
@@ -93,6 +121,11 @@ export default class FogEngine extends EventEmitter {
   get brushSize() { return this._brushSize; }
   get mode()  { return this._mode; }
   get isDirty() { return this._isDirty; }
+  /** Stored mask hash while the canvas still shows exactly that mask, else null. */
+  get maskHash() { return this._maskHash; }
+  /** Server tile map ("col,row" → hash) the canvas is based on, or null if untiled. */
+  get tileHashes() { return this._tileHashes; }
+  get hasDirtyTiles() { return this._dirtyTiles.size > 0; }
 
   // ── Settings ──────────────────────────────────────────────────────
 
@@ -125,6 +158,9 @@ export default class FogEngine extends EventEmitter {
     this._canvas.width = width;
     this._canvas.height = height;
     this._ctx.drawImage(scratch, 0, 0, width, height);
+    this._maskHash = null;
+    this._tileHashes = null; // a new size is a new tile grid
+    this._markAllTilesDirty();
     this.emit('change');
   }
 
@@ -136,7 +172,10 @@ export default class FogEngine extends EventEmitter {
   dabAt(x, y) {
     if (!this._ctx) return;
     this._applyDab(x, y, this._mode);
+    const half = this._brushSize / 2;
+    this._markTilesDirty(x - half, y - half, x + half, y + half);
     this._isDirty = true;
+    this._maskHash = null;
     this.emit('change');
   }
 
@@ -162,6 +201,10 @@ export default class FogEngine extends EventEmitter {
 
     ctx.drawImage(stamp, points[0].x - half, points[0].y - half);
 
+    let minX = points[0].x;
+    let minY = points[0].y;
+    let maxX = points[0].x;
+    let maxY = points[0].y;
     for (let i = 1; i < points.length; i++) {
       const a = points[i - 1];
       const b = points[i];
@@ -176,12 +219,47 @@ export default class FogEngine extends EventEmitter {
         }
       }
       ctx.drawImage(stamp, b.x - half, b.y - half);
+      minX = Math.min(minX, b.x);
+      minY = Math.min(minY, b.y);
+      maxX = Math.max(maxX, b.x);
+      maxY = Math.max(maxY, b.y);
     }
     ctx.restore();
+    this._markTilesDirty(minX - half, minY - half, maxX + half, maxY + half);
     this._isDirty = true;
+    this._maskHash = null;
     this.emit('change');
   }
 
+  // Record the tiles a mask-space rect overlaps as edited.
+  _markTilesDirty(x0, y0, x1, y1) {
+    const lastCol = Math.ceil(this.width / FOG_TILE_PX) - 1;
+    const lastRow = Math.ceil(this.height / FOG_TILE_PX) - 1;
+    const c0 = Math.max(0, Math.floor(x0 / FOG_TILE_PX));
+    const r0 = Math.max(0, Math.floor(y0 / FOG_TILE_PX));
+    const c1 = Math.min(lastCol, Math.floor(x1 / FOG_TILE_PX));
+    const r1 = Math.min(lastRow, Math.floor(y1 / FOG_TILE_PX));
+    for (let row = r0; row <= r1; row++) {
+      for (let col = c0; col <= c1; col++) this._dirtyTiles.add(tileKey(col, row));
+    }
+  }
+
+  _markAllTilesDirty() {
+    this._markTilesDirty(0, 0, this.width - 1, this.height - 1);
+  }
+
+  _tileRect(key) {
+    const [col, row] = key.split(',').map(Number);
+    const x = col * FOG_TILE_PX;
+    const y = row * FOG_TILE_PX;
+    return {
+      x,
+      y,
+      w: Math.min(FOG_TILE_PX, this.width - x),
+      h: Math.min(FOG_TILE_PX, this.height - y),
+    };
+  }
+
   _applyDab(x, y, mode) {
     if (!this._stamp) this._rebuildStamp();
     if (!this._stamp) return;
@@ -242,7 +320,9 @@ export default class FogEngine extends EventEmitter {
     ctx.fillStyle = FOG_FILL;
     ctx.fillRect(0, 0, this._canvas.width, this._canvas.height);
     ctx.restore();
+    this._markAllTilesDirty();
     this._isDirty = true;
+    this._maskHash = null;
     this.emit('change');
     this.endStroke();
   }
@@ -252,7 +332,9 @@ export default class FogEngine extends EventEmitter {
     if (!this._ctx) return;
     this.beginStroke('clear');
     this._ctx.clearRect(0, 0, this._canvas.width, this._canvas.height);
+    this._markAllTilesDirty();
     this._isDirty = true;
+    this._maskHash = null;
     this.emit('change');
     this.endStroke();
   }
@@ -273,6 +355,120 @@ export default class FogEngine extends EventEmitter {
     return this._canvas ? this._canvas.toDataURL('image/png') : null;
   }
 
+  /** One tile as a PNG data URL, or null when it's fully transparent. */
+  _encodeTile(key) {
+    const { x, y, w, h } = this._tileRect(key);
+    const alpha = this._ctx.getImageData(x, y, w, h).data;
+    let painted = false;
+    for (let i = 3; i < alpha.length; i += 4) {
+      if (alpha[i]) { painted = true; break; }
+    }
+    if (!painted) return null;
+    const tile = document.createElement('canvas');
+    tile.width = w;
+    tile.height = h;
+    tile.getContext('2d').drawImage(this._canvas, x, y, w, h, 0, 0, w, h);
+    return tile.toDataURL('image/png');
+  }
+
+  /**
+   * Encode the tiles edited since the last call and forget them —
+   * the payload for one fog_tile_update region. Returns
+   * { tiles: { "col,row": dataUrl | null }, reset, width, height }, or
+   * null when nothing was edited. null clears a tile to transparent.
+   *
+   * When the server's copy isn't tiled (tileHashes null) this is a
+   * reset: every painted tile, edited or not, and no transparent ones.
+   */
+  takeDirtyTiles() {
+    if (!this._ctx || this._dirtyTiles.size === 0) return null;
+    const reset = this._tileHashes === null;
+    if (reset) this._markAllTilesDirty();
+    const tiles = {};
+    for (const key of this._dirtyTiles) {
+      const tile = this._encodeTile(key);
+      if (reset && tile === null) continue;
+      tiles[key] = tile;
+    }
+    this._dirtyTiles.clear();
+    return { tiles, reset, width: this.width, height: this.height };
+  }
+
+  /**
+   * Take the server's hashes for tiles this engine itself sent — the
+   * sender's copy of a fog_tile_update broadcast. Nothing is fetched or
+   * drawn; the canvas already shows these pixels.
+   */
+  adoptTiles(tiles, { reset = false } = {}) {
+    const next = reset ? {} : { ...(this._tileHashes || {}) };
+    for (const [key, tileHash] of Object.entries(tiles)) {
+      if (tileHash) next[key] = tileHash;
+      else delete next[key];
+    }
+    this._tileHashes = next;
+    this._maskHash = null;
+  }
+
+  /**
+   * Apply a tile diff from api-game: fetch each changed tile by hash,
+   * then repaint just those tiles (null = transparent). A reset replaces
+   * the whole tile map; on an unchanged grid it is narrowed to the tiles
+   * whose hash differs, so tiles already on screen aren't re-fetched.
+   */
+  async applyTiles(tiles, { reset = false, width = this.width, height = this.height } = {}) {
+    if (!this._ctx) return;
+    const sameGrid = this._tileHashes !== null
+      && width === this._canvas.width && height === this._canvas.height;
+    const incremental = !reset || sameGrid;
+    const current = incremental ? (this._tileHashes || {}) : {};
+
+    let changes = tiles;
+    if (reset && sameGrid) {
+      // Unsent local edits are repainted from the server's copy too
+      changes = {};
+      const keys = [...Object.keys(current), ...Object.keys(tiles), ...this._dirtyTiles];
+      for (const key of new Set(keys)) {
+        changes[key] = tiles[key] || null;
+      }
+    }
+    const pending = Object.entries(changes).filter(
+      ([key, tileHash]) => !incremental || this._dirtyTiles.has(key) || (current[key] || null) !== tileHash
+    );
+
+    // Decode every tile before touching the canvas (no-flicker contract).
+    const images = await Promise.all(
+      pending.map(([, tileHash]) => (tileHash ? loadImage(fogMaskUrl(tileHash)) : null))
+    );
+
+    if (!incremental) {
+      if (width !== this._canvas.width || height !== this._canvas.height) {
+        this._canvas.width = width;
+        this._canvas.height = height;
+      }
+      this._ctx.clearRect(0, 0, this._canvas.width, this._canvas.height);
+    }
+    pending.forEach(([key], i) => {
+      const { x, y, w, h } = this._tileRect(key);
+      if (incremental) this._ctx.clearRect(x, y, w, h);
+      if (images[i]) this._ctx.drawImage(images[i], x, y);
+      this._dirtyTiles.delete(key);
+    });
+
+    const next = { ...current };
+    for (const [key, tileHash] of Object.entries(changes)) {
+      if (tileHash) next[key] = tileHash;
+      else delete next[key];
+    }
+    this._tileHashes = next;
+    this._maskHash = null;
+    if (reset) {
+      this._dirtyTiles.clear();
+      this._isDirty = false; // matches remote state
+      this.emit('load', { width, height });
+    }
+    this.emit('change');
+  }
+
   /**
    * Build a FogRegion dict for the network — matches the
    * shared_contracts.map.FogRegion shape. The engine represents one
@@ -310,6 +506,11 @@ export default class FogEngine extends EventEmitter {
    * Hydrate the engine from a FogRegion (or null to clear). Captures
    * the region id so subsequent serialize() calls round-trip the same
    * id rather than minting a new one.
+   *
+   * A region stored by hash (mask_hash, no inline mask) is fetched from
+   * api-game — unless the canvas already shows that hash untouched, in
+   * which case there is nothing to fetch or decode. A tiled region
+   * (mask_tiles) fetches only the tiles the canvas doesn't already show.
    */
   async loadFromRegion(region) {
     if (!region) {
@@ -318,6 +519,20 @@ export default class FogEngine extends EventEmitter {
       return;
     }
     this._regionId = region.id || null;
+    if (!region.mask && region.mask_tiles) {
+      await this.applyTiles(region.mask_tiles, {
+        reset: true,
+        width: region.mask_width || this.width,
+        height: region.mask_height || this.height,
+      });
+      return;
+    }
+    if (!region.mask && region.mask_hash) {
+      if (region.mask_hash === this._maskHash) return;
+      await this.loadFromDataUrl(fogMaskUrl(region.mask_hash));
+      this._maskHash = region.mask_hash;
+      return;
+    }
     await this.loadFromDataUrl(region.mask || null);
   }
 
@@ -325,12 +540,16 @@ export default class FogEngine extends EventEmitter {
    * Atomically replace the canvas with a remote mask. Decode-then-swap
    * so the old fog stays on screen until the new image is ready.
    *
-   * Pass null/undefined to clear instead.
+   * Pass null/undefined to clear instead. Any image URL works (the
+   * hash path passes a fog-masks URL).
    */
   async loadFromDataUrl(dataUrl) {
     if (!this._ctx) return;
+    this._maskHash = null;
     if (!dataUrl) {
       this.clear();
+      this._tileHashes = {}; // no fog is an empty tile map
+      this._dirtyTiles.clear();
       this._isDirty = false;
       this.emit('load', { cleared: true });
       return;
@@ -345,6 +564,8 @@ export default class FogEngine extends EventEmitter {
         }
         this._ctx.clearRect(0, 0, this._canvas.width, this._canvas.height);
         this._ctx.drawImage(img, 0, 0);
+        this._tileHashes = null; // a whole mask: the next tiled save resets
+        this._dirtyTiles.clear();
         this._isDirty = false; // matches remote state
         this.emit('load', { width: img.naturalWidth, height: img.naturalHeight });
         this.emit('change');
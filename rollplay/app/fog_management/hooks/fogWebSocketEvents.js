@@ -29,7 +29,7 @@ export const handleRemoteFogUpdate = async (data, { loadFromConfig }) => {
   }
   const fogConfig = data?.fog_config ?? null;
   try {
-    await loadFromConfig(fogConfig);
+    await loadFromConfig(fogConfig, data?.revision);
     const regionCount = fogConfig?.regions?.length ?? 0;
     console.log(`☁️ Remote fog applied: ${regionCount} region(s)`);
   } catch (err) {
@@ -37,6 +37,34 @@ export const handleRemoteFogUpdate = async (data, { loadFromConfig }) => {
   }
 };
 
+/**
+ * Apply an incoming fog_tile_update — only the tiles a brush update
+ * touched, as hashes, plus the revision it moves the map to.
+ *
+ * A diff that doesn't sit on this client's revision (a missed or
+ * reordered update) isn't applied; the client asks for the whole fog
+ * config instead via `requestFogResync`. The sender only adopts the
+ * server's tile hashes — its canvases already show the pixels.
+ */
+export const handleRemoteFogTiles = async (data, { applyTileUpdate, requestFogResync, thisUserId }) => {
+  if (!applyTileUpdate) {
+    console.warn('☁️ Received fog_tile_update but no applyTileUpdate available');
+    return;
+  }
+  try {
+    const applied = await applyTileUpdate(data, { adoptOnly: data.updated_by === thisUserId });
+    if (applied) {
+      const tileCount = data.regions.reduce((n, r) => n + Object.keys(r.tiles || {}).length, 0);
+      console.log(`☁️ Remote fog tiles applied: ${tileCount} tile(s) @ r${data.revision}`);
+      return;
+    }
+    console.log(`☁️ Fog tiles @ r${data.base_revision} don't match local revision — resyncing`);
+  } catch (err) {
+    console.error('☁️ Failed to apply remote fog tiles — resyncing:', err);
+  }
+  requestFogResync?.(data.filename);
+};
+
 /**
  * Build send functions for fog operations. Returned object is stable
  * for a given (webSocket, isConnected) — re-create when those change.
@@ -59,18 +87,54 @@ export const createFogSendFunctions = (webSocket, isConnected) => {
     return true;
   };
 
-  return { sendFogUpdate };
+  // regions: the full list from useFogRegions.takeTileUpdate — metadata
+  // for every region, pixels only for the tiles strokes touched.
+  const sendFogTileUpdate = (filename, regions) => {
+    if (!webSocket || !isConnected) {
+      console.warn('☁️ Cannot send fog tiles — WebSocket not connected');
+      return false;
+    }
+    if (!filename) {
+      console.warn('☁️ Cannot send fog tiles — missing filename');
+      return false;
+    }
+    webSocket.send(JSON.stringify({
+      event_type: 'fog_tile_update',
+      data: { filename, regions },
+    }));
+    return true;
+  };
+
+  // Ask for the whole fog config (answered to this client only).
+  const sendFogResync = (filename) => {
+    if (!webSocket || !isConnected || !filename) return false;
+    webSocket.send(JSON.stringify({
+      event_type: 'fog_resync',
+      data: { filename },
+    }));
+    return true;
+  };
+
+  return { sendFogUpdate, sendFogTileUpdate, sendFogResync };
 };
 
 /**
- * Convenience wrapper to register the fog handler with a router-style
+ * Convenience wrapper to register the fog handlers with a router-style
  * registerHandler(eventType, callback) → cleanup function.
  *
  * Returns a single cleanup function to unsubscribe.
  */
-export const registerFogHandlers = ({ registerHandler, loadFromConfig }) => {
+export const registerFogHandlers = ({
+  registerHandler, loadFromConfig, applyTileUpdate, requestFogResync, thisUserId,
+}) => {
   if (!registerHandler) return () => {};
-  return registerHandler('fog_config_update', (data) =>
-    handleRemoteFogUpdate(data, { loadFromConfig })
-  );
+  const cleanups = [
+    registerHandler('fog_config_update', (data) =>
+      handleRemoteFogUpdate(data, { loadFromConfig })
+    ),
+    registerHandler('fog_tile_update', (data) =>
+      handleRemoteFogTiles(data, { applyTileUpdate, requestFogResync, thisUserId })
+    ),
+  ];
+  return () => cleanups.forEach((cleanup) => cleanup?.());
 };
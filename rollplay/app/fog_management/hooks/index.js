@@ -5,6 +5,7 @@ export { useFogEngine } from './useFogEngine';
 export { useFogRegions } from './useFogRegions';
 export {
   handleRemoteFogUpdate,
+  handleRemoteFogTiles,
   createFogSendFunctions,
   registerFogHandlers,
 } from './fogWebSocketEvents';
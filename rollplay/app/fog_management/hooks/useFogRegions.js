@@ -24,8 +24,10 @@ const FOG_REGIONS_MAX = 12;
  * working without changes. Multi-region UI lives in step 4.
  *
  * Storage shape (matches shared_contracts.map.FogRegion):
- *   { id, name, enabled, role, mask, mask_width, mask_height,
- *     hide_feather_px, texture_dilate_px, opacity }
+ *   { id, name, enabled, role, mask, mask_hash, mask_tiles, mask_width,
+ *     mask_height, hide_feather_px, texture_dilate_px, opacity }
+ * In a game, regions arrive as mask_hash / mask_tiles refs and paint is
+ * sent as dirty tiles (takeTileUpdate); the workshop's stay inline.
  *
  * Engines live outside React state in a Map<regionId, FogEngine>; only
  * region metadata + activeId flow through useState. Engines are reused
@@ -38,6 +40,8 @@ const DEFAULT_REGION_DEFAULTS = {
   enabled: true,
   role: 'prepped',
   mask: null,
+  mask_hash: null,
+  mask_tiles: null,
   mask_width: null,
   mask_height: null,
   hide_feather_px: 20,
@@ -86,6 +90,15 @@ export function useFogRegions({ width = 1024, height = 1024, initialConfig = nul
   // when a region is removed.
   const enginesRef = useRef(new Map());
 
+  // Fog revision of the server state the engines reflect (api-game's
+  // active_maps.fog_revision). A tile diff applies only on top of the
+  // revision it was built against; anything else means a missed update.
+  const revisionRef = useRef(0);
+
+  // Tile diffs apply strictly in arrival order — each awaits tile
+  // fetches, and a later diff must not paint before an earlier one.
+  const tileQueueRef = useRef(Promise.resolve());
+
   // Tool state — brush size and mode belong to the user's painting
   // tool, not to any one region. Lives in React state at the hook
   // level; setBrushSize/setMode push to every engine in the pool so
@@ -232,8 +245,12 @@ export function useFogRegions({ width = 1024, height = 1024, initialConfig = nul
    * If the incoming config has no regions, an implicit "Default"
    * region is created so the workshop's first-paint flow has somewhere
    * to put the alpha.
+   *
+   * Pass the config's fog revision when it came from api-game, so tile
+   * diffs built on top of it apply.
    */
-  const loadFromConfig = useCallback(async (fogConfig) => {
+  const loadFromConfig = useCallback(async (fogConfig, revision) => {
+    if (typeof revision === 'number') revisionRef.current = revision;
     const next = regionsFromConfig(fogConfig);
     setRegions(next);
     if (!next.find((r) => r.id === activeId)) {
@@ -251,21 +268,81 @@ export function useFogRegions({ width = 1024, height = 1024, initialConfig = nul
   /**
    * Build the full v2 regions list for save/broadcast. Each entry is
    * the region's metadata from React state merged with the live mask
-   * from its engine (so unsaved strokes round-trip).
+   * from its engine (so unsaved strokes round-trip). A region whose
+   * canvas is untouched since it loaded by hash sends just the hash.
    */
   const serialize = useCallback(() => {
     return regions.map((r) => {
       const eng = enginesRef.current.get(r.id);
-      const mask = eng ? eng.toDataUrl() : r.mask;
+      if (!eng) return { ...r, mask: r.mask || null };
+      if (eng.maskHash) {
+        return { ...r, mask: null, mask_hash: eng.maskHash, mask_tiles: null, mask_width: eng.width, mask_height: eng.height };
+      }
       return {
         ...r,
-        mask: mask || null,
-        mask_width: eng ? eng.width : r.mask_width,
-        mask_height: eng ? eng.height : r.mask_height,
+        mask: eng.toDataUrl() || null,
+        mask_hash: null,
+        mask_tiles: null,
+        mask_width: eng.width,
+        mask_height: eng.height,
       };
     });
   }, [regions]);
 
+  /**
+   * Build the regions list for a fog_tile_update: every region's
+   * metadata, plus the tiles its strokes touched since the last call
+   * (see FogEngine.takeDirtyTiles). Untouched regions send no pixels.
+   */
+  const takeTileUpdate = useCallback(() => {
+    return regions.map((r) => {
+      const { mask, mask_hash, mask_tiles, ...meta } = r; // eslint-disable-line no-unused-vars
+      const dirty = enginesRef.current.get(r.id)?.takeDirtyTiles();
+      if (!dirty) return { ...meta, tiles: {}, reset: false };
+      return {
+        ...meta,
+        mask_width: dirty.width,
+        mask_height: dirty.height,
+        tiles: dirty.tiles,
+        reset: dirty.reset,
+      };
+    });
+  }, [regions]);
+
+  /**
+   * Apply a fog_tile_update broadcast: region metadata replaces the
+   * list, and each region's tile diff is painted into its engine. The
+   * sender passes `adoptOnly` — its canvases already show the pixels, so
+   * it records the server's tile hashes without fetching anything.
+   *
+   * Returns false without applying anything when the diff wasn't built
+   * on this client's revision; the caller then asks for a resync.
+   */
+  const applyTileUpdate = useCallback((update, { adoptOnly = false } = {}) => {
+    if (update.base_revision !== revisionRef.current) return Promise.resolve(false);
+    revisionRef.current = update.revision;
+
+    const next = update.regions.map(({ tiles, reset, ...region }) => region); // eslint-disable-line no-unused-vars
+    regionsRef.current = next;
+    setRegions(next);
+    setActiveId((prev) => (next.some((r) => r.id === prev) ? prev : next[0]?.id ?? null));
+
+    const apply = async () => {
+      for (const { tiles, reset, ...region } of update.regions) {
+        const eng = getOrCreateEngine(region.id);
+        if (!eng) continue;
+        if (adoptOnly) {
+          eng.adoptTiles(tiles, { reset });
+        } else if (reset || Object.keys(tiles).length) {
+          await eng.applyTiles(tiles, { reset, width: region.mask_width, height: region.mask_height });
+        }
+      }
+      return true;
+    };
+    tileQueueRef.current = tileQueueRef.current.then(apply, apply);
+    return tileQueueRef.current;
+  }, [getOrCreateEngine]);
+
   /**
    * Resize ALL engines' canvases to match the map's aspect ratio.
    * Resizing every engine (not just the active one) keeps the shared
@@ -324,6 +401,8 @@ export function useFogRegions({ width = 1024, height = 1024, initialConfig = nul
       enabled: true,
       role: 'prepped',
       mask: null,
+      mask_hash: null,
+      mask_tiles: null,
       mask_width: null,
       mask_height: null,
       hide_feather_px: DEFAULT_REGION_DEFAULTS.hide_feather_px,
@@ -402,6 +481,8 @@ export function useFogRegions({ width = 1024, height = 1024, initialConfig = nul
     // Region helpers
     loadFromConfig,
     serialize,
+    takeTileUpdate,
+    applyTileUpdate,
     updateRegion,
     setRegionEnabled,
     addRegion,
@@ -18,6 +18,7 @@ export {
   useFogEngine,
   useFogRegions,
   handleRemoteFogUpdate,
+  handleRemoteFogTiles,
   createFogSendFunctions,
   registerFogHandlers,
 } from './hooks';
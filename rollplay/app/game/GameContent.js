@@ -1028,8 +1028,8 @@ export default function GameContent() {
   const setTokenImages = useCallback((imageRefs) => {
     mapTokensBridgeRef.current.setTokenImages?.(imageRefs);
   }, []);
-  const setMapTokenState = useCallback((state) => {
-    mapTokensBridgeRef.current.setMapTokenState?.(state);
+  const setMapTokenState = useCallback((state, revisions) => {
+    mapTokensBridgeRef.current.setMapTokenState?.(state, revisions);
   }, []);
   const clearMapTokenHoldsForUser = useCallback((userId) => {
     mapTokensBridgeRef.current.clearHoldsForUser?.(userId);
@@ -1390,16 +1390,22 @@ export default function GameContent() {
   // useFogRegions.loadFromConfig which hydrates each region's engine via
   // decode-then-swap (no flicker), updates region metadata, and disposes
   // engines for regions that are no longer present.
-  useEffect(() => {
-    if (!registerHandler) return;
-    return registerFogHandlers({ registerHandler, loadFromConfig: fog.loadFromConfig });
-  }, [registerHandler, fog.loadFromConfig]);
-
   const fogSenders = useMemo(
     () => createFogSendFunctions(webSocket, isConnected),
     [webSocket, isConnected]
   );
 
+  useEffect(() => {
+    if (!registerHandler) return;
+    return registerFogHandlers({
+      registerHandler,
+      loadFromConfig: fog.loadFromConfig,
+      applyTileUpdate: fog.applyTileUpdate,
+      requestFogResync: fogSenders.sendFogResync,
+      thisUserId,
+    });
+  }, [registerHandler, fog.loadFromConfig, fog.applyTileUpdate, fogSenders, thisUserId]);
+
   // Hydrate ALL regions from the active map's fog config when the map
   // changes (cold→hot via ETL on session start). Mirrors the workshop's
   // hydration pattern — fires ONLY on asset change, never on local
@@ -1413,7 +1419,7 @@ export default function GameContent() {
   // directly with the new payload — that path doesn't go through
   // activeMap state.
   useEffect(() => {
-    fog.loadFromConfig(activeMap?.map_config?.fog_config);
+    fog.loadFromConfig(activeMap?.map_config?.fog_config, activeMap?.fog_revision ?? 0);
   }, [activeMap?.map_config?.asset_id]); // eslint-disable-line react-hooks/exhaustive-deps
 
   // Match the active region's canvas aspect ratio to the map. Without
@@ -1423,25 +1429,27 @@ export default function GameContent() {
   useEffect(() => {
     if (!fog.engine || !mapNaturalDimensions) return;
     const hasPaintedRegion = activeMap?.map_config?.fog_config?.regions?.some(
-      (r) => r.mask
+      (r) => r.mask || r.mask_hash || r.mask_tiles
     );
     if (hasPaintedRegion) return;
     fog.fitToMap(mapNaturalDimensions.naturalWidth, mapNaturalDimensions.naturalHeight);
   }, [mapNaturalDimensions, activeMap?.map_config?.asset_id, fog.fitToMap]); // eslint-disable-line react-hooks/exhaustive-deps
 
-  // DM "Update fog" handler — serialises ALL regions and broadcasts
-  // the full v2 fog_config. Multi-region runtime updates (toggle,
-  // per-region paint) come in step 5+.
+  // DM "Update fog" handler — sends ALL regions' metadata plus only the
+  // fog tiles painted since the last update, so a brush stroke costs
+  // bandwidth in proportion to the brush area, not the map.
   const handleFogUpdate = useCallback(() => {
     const filename = activeMap?.map_config?.filename;
     if (!filename || !fog.engine) return;
-    const regions = fog.serialize();
-    const fogConfig = regions && regions.length
-      ? { version: 2, regions }
-      : null;
-    fogSenders.sendFogUpdate(filename, fogConfig);
+    fogSenders.sendFogTileUpdate(filename, fog.takeTileUpdate());
   }, [activeMap?.map_config?.filename, fog, fogSenders]);
 
+  // Discard unsent strokes: the resync reply is the server's whole fog
+  // config, which loadFromConfig repaints every region from.
+  const handleFogResetToServer = useCallback(() => {
+    fogSenders.sendFogResync(activeMap?.map_config?.filename);
+  }, [activeMap?.map_config?.filename, fogSenders]);
+
   const handleFogClearBroadcast = useCallback(() => {
     const filename = activeMap?.map_config?.filename;
     if (!filename || !fog.engine) return;
@@ -2359,6 +2367,7 @@ export default function GameContent() {
                   setFogPeekThrough={setFogPeekThrough}
                   onFogUpdate={handleFogUpdate}
                   onFogClearBroadcast={handleFogClearBroadcast}
+                  onFogResetToServer={handleFogResetToServer}
                 />
               )}
               {activeRightDrawer === 'image' && isDM && (
@@ -76,6 +76,7 @@ export default function MapControlsPanel({
   setFogPeekThrough = null,
   onFogUpdate = null,
   onFogClearBroadcast = null,
+  onFogResetToServer = null,
 }) {
   const [isDimensionsExpanded, setIsDimensionsExpanded] = useState(false);
   const [isFogExpanded, setIsFogExpanded] = useState(false);
@@ -499,9 +500,13 @@ export default function MapControlsPanel({
                 onFillAll={fog.fillAll}
                 onUpdate={onFogUpdate}
                 onResetToServer={() => {
-                  // Reload all regions from the last-known server state via
-                  // the multi-region hydrator — each engine's mask is
-                  // restored from the asset's saved fog_config.
+                  // Reload all regions from the server's current fog
+                  // (a resync) when the game provides one; otherwise via
+                  // the multi-region hydrator from the last-known config.
+                  if (onFogResetToServer) {
+                    onFogResetToServer();
+                    return;
+                  }
                   fog.loadFromConfig(activeMap?.map_config?.fog_config);
                 }}
               />
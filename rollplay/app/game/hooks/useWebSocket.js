@@ -34,11 +34,25 @@ import {
   handleRemoteAudioBatch
 } from '../../audio_management';
 import { handleSpotifyState } from '../../audio_management/hooks/webSocketSpotifyEvents';
+import { BINARY_SUBPROTOCOL, BINARY_WIRE_PROTOCOL, parseWireMessage } from './wireCodec';
+
+// Server close codes that mean "connect again" (api-game room_affinity.py):
+// the room moved to another worker, or it is mid-move / we were shed as a
+// slow consumer. The reconnect's initial_state rehydrates everything.
+const ROOM_MOVED_CLOSE_CODE = 4011;
+const TRY_AGAIN_CLOSE_CODE = 1013;
+const RECONNECT_DELAY_MS = 250;
+const MAX_RECONNECT_DELAY_MS = 5000;
 
 export const useWebSocket = (roomId, thisUserId, gameContext) => {
   const [webSocket, setWebSocket] = useState(null);
   const [isConnected, setIsConnected] = useState(false);
+  const [connectionAttempt, setConnectionAttempt] = useState(0);
   const eventHandlersRef = useRef(null);
+  // Set when the server handed our room to another worker: the reconnect
+  // tells the new owner we're moving, not arriving.
+  const handoffRef = useRef(null);
+  const reconnectDelayRef = useRef(RECONNECT_DELAY_MS);
 
   // Handler registry for domain hooks (map, image, audio, etc.)
   // Domain hooks register handlers here instead of adding their own message listeners.
@@ -57,18 +71,35 @@ export const useWebSocket = (roomId, thisUserId, gameContext) => {
     console.log(`🔌 Initializing WebSocket connection for room ${roomId}, user ${thisUserId}`);
 
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = `${protocol}//${window.location.host}/ws/${roomId}?user_id=${thisUserId}`;
+    const handoff = handoffRef.current ? `&handoff=${encodeURIComponent(handoffRef.current)}` : '';
+    const wsUrl = `${protocol}//${window.location.host}/ws/${roomId}?user_id=${thisUserId}${handoff}`;
+    let reconnectTimer = null;
 
-    const ws = new WebSocket(wsUrl);
+    // Opt into compact binary frames for the hot events (wireCodec.js);
+    // everything else still arrives as JSON text.
+    const ws = BINARY_WIRE_PROTOCOL ? new WebSocket(wsUrl, [BINARY_SUBPROTOCOL]) : new WebSocket(wsUrl);
+    ws.binaryType = 'arraybuffer';
 
     ws.onopen = () => {
       console.log('✅ WebSocket connected');
+      handoffRef.current = null;
+      reconnectDelayRef.current = RECONNECT_DELAY_MS;
       setIsConnected(true);
     };
 
-    ws.onclose = () => {
+    ws.onclose = (event) => {
       console.log('❌ WebSocket disconnected');
       setIsConnected(false);
+
+      if (event.code === ROOM_MOVED_CLOSE_CODE || event.code === TRY_AGAIN_CLOSE_CODE) {
+        // The close reason is a server-issued handoff token: sent back on
+        // reconnect, it keeps the new owner from announcing a fresh join
+        if (event.code === ROOM_MOVED_CLOSE_CODE) handoffRef.current = event.reason || null;
+        const delay = reconnectDelayRef.current;
+        reconnectDelayRef.current = Math.min(delay * 2, MAX_RECONNECT_DELAY_MS);
+        console.log(`🔁 Reconnecting in ${delay}ms (close code ${event.code})`);
+        reconnectTimer = setTimeout(() => setConnectionAttempt((attempt) => attempt + 1), delay);
+      }
     };
 
     ws.onerror = (error) => {
@@ -77,7 +108,7 @@ export const useWebSocket = (roomId, thisUserId, gameContext) => {
 
     ws.onmessage = (event) => {
       try {
-        const message = JSON.parse(event.data);
+        const message = parseWireMessage(event.data);
         const { event_type, data } = message;
 
         // Check for valid event structure
@@ -194,9 +225,11 @@ export const useWebSocket = (roomId, thisUserId, gameContext) => {
 
     // Cleanup on unmount
     return () => {
+      clearTimeout(reconnectTimer);
+      ws.onclose = null;
       ws.close();
     };
-  }, [roomId, thisUserId]);
+  }, [roomId, thisUserId, connectionAttempt]);
 
   // Update event handlers ref when gameContext changes
   useEffect(() => {
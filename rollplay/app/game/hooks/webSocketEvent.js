@@ -86,9 +86,10 @@ export const handleInitialState = (data, handlers) => {
   }
 
   // Map token boards (asset_id → token list) — late joiners get the full
-  // shared board; no extra fetch (plan §3.2 hydration).
+  // shared board; no extra fetch (plan §3.2 hydration). Revisions are the
+  // base the following map_token_delta fragments apply on top of.
   if (handlers.setMapTokenState) {
-    handlers.setMapTokenState(data.map_token_state || {});
+    handlers.setMapTokenState(data.map_token_state || {}, data.map_token_revisions || {});
   }
 
   // Token image refs (image_asset_id → signed URL + focal area) — fixed
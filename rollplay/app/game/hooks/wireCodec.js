@@ -0,0 +1,139 @@
+/* Copyright (C) 2025 Matthew Davey */
+/* SPDX-License-Identifier: GPL-3.0-or-later */
+
+/**
+ * Opt-in binary wire format — client half of api-game's
+ * websocket_handlers/wire_codec.py.
+ *
+ * Offering BINARY_SUBPROTOCOL on connect makes the server send the hot
+ * events (drag presence, lobby presence, audio transport) as MessagePack
+ * frames `[event_code, data]` with schema field names replaced by small
+ * integer keys. Every other event still arrives as JSON text, so the
+ * router accepts both. Outbound sends stay JSON.
+ *
+ * Both tables are positional and APPEND-ONLY — they must match the
+ * server's BINARY_EVENT_TYPES / FIELD_NAMES exactly.
+ *
+ * The decoder covers the MessagePack subset the server emits (nil, bool,
+ * ints, floats, str, array, map) — no extension types, no bin payloads.
+ */
+
+// Flip off to fall back to plain JSON for every frame.
+export const BINARY_WIRE_PROTOCOL = true;
+
+export const BINARY_SUBPROTOCOL = 'rollplay.msgpack.v1';
+
+const BINARY_EVENT_TYPES = [
+  'map_token_drag',
+  'map_token_drag_batch',
+  'lobby_update',
+  'player_connected',
+  'player_disconnected',
+  'remote_audio_play',
+  'remote_audio_resume',
+  'remote_audio_batch',
+];
+
+const FIELD_NAMES = [
+  // map_token_drag / map_token_drag_batch
+  'asset_id', 'token_id', 'phase', 'x', 'y', 'holder_user_id', 'frames',
+  // lobby_update / player_connected / player_disconnected
+  'lobby_users', 'name', 'user_id', 'id', 'status',
+  'connected_user_id', 'connected_player', 'disconnected_user_id', 'disconnected_player',
+  // remote_audio_play / remote_audio_resume / remote_audio_batch
+  'tracks', 'triggered_by', 'track_type', 'channelId', 'operations', 'fade_duration',
+  'trackId', 'operation', 'volume', 'looping', 'muted', 'soloed', 'filename',
+  's3_url', 'effects', 'loop_mode', 'loop_start', 'loop_end',
+];
+
+const textDecoder = new TextDecoder();
+
+/** Minimal MessagePack reader. Map keys are decoded as-is (ints stay ints). */
+const decodeMessagePack = (buffer) => {
+  const bytes = new Uint8Array(buffer);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let offset = 0;
+
+  const readString = (length) => {
+    const value = textDecoder.decode(bytes.subarray(offset, offset + length));
+    offset += length;
+    return value;
+  };
+  const readArray = (length) => {
+    const items = new Array(length);
+    for (let index = 0; index < length; index += 1) items[index] = read();
+    return items;
+  };
+  const readMap = (length) => {
+    const entries = new Map();
+    for (let index = 0; index < length; index += 1) {
+      const key = read();
+      entries.set(key, read());
+    }
+    return entries;
+  };
+
+  const read = () => {
+    const type = bytes[offset];
+    offset += 1;
+    if (type <= 0x7f) return type;                               // positive fixint
+    if (type >= 0xe0) return type - 0x100;                       // negative fixint
+    if ((type & 0xf0) === 0x80) return readMap(type & 0x0f);     // fixmap
+    if ((type & 0xf0) === 0x90) return readArray(type & 0x0f);   // fixarray
+    if ((type & 0xe0) === 0xa0) return readString(type & 0x1f);  // fixstr
+
+    let value;
+    switch (type) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xca: value = view.getFloat32(offset); offset += 4; return value;
+      case 0xcb: value = view.getFloat64(offset); offset += 8; return value;
+      case 0xcc: value = view.getUint8(offset); offset += 1; return value;
+      case 0xcd: value = view.getUint16(offset); offset += 2; return value;
+      case 0xce: value = view.getUint32(offset); offset += 4; return value;
+      case 0xcf: value = Number(view.getBigUint64(offset)); offset += 8; return value;
+      case 0xd0: value = view.getInt8(offset); offset += 1; return value;
+      case 0xd1: value = view.getInt16(offset); offset += 2; return value;
+      case 0xd2: value = view.getInt32(offset); offset += 4; return value;
+      case 0xd3: value = Number(view.getBigInt64(offset)); offset += 8; return value;
+      case 0xd9: value = view.getUint8(offset); offset += 1; return readString(value);
+      case 0xda: value = view.getUint16(offset); offset += 2; return readString(value);
+      case 0xdb: value = view.getUint32(offset); offset += 4; return readString(value);
+      case 0xdc: value = view.getUint16(offset); offset += 2; return readArray(value);
+      case 0xdd: value = view.getUint32(offset); offset += 4; return readArray(value);
+      case 0xde: value = view.getUint16(offset); offset += 2; return readMap(value);
+      case 0xdf: value = view.getUint32(offset); offset += 4; return readMap(value);
+      default:
+        throw new Error(`Unsupported MessagePack type 0x${type.toString(16)}`);
+    }
+  };
+
+  return read();
+};
+
+/** Restore schema field names (int keys) and turn decoded Maps into objects. */
+const expand = (value) => {
+  if (value instanceof Map) {
+    const expanded = {};
+    value.forEach((item, key) => {
+      const fieldName = typeof key === 'number' ? FIELD_NAMES[key - 1] : key;
+      expanded[fieldName] = expand(item);
+    });
+    return expanded;
+  }
+  if (Array.isArray(value)) return value.map(expand);
+  return value;
+};
+
+/** Binary frame (ArrayBuffer) → { event_type, data }, same shape as JSON. */
+export const decodeBinaryFrame = (buffer) => {
+  const [eventCode, data] = decodeMessagePack(buffer);
+  const eventType = BINARY_EVENT_TYPES[eventCode - 1];
+  if (!eventType) throw new Error(`Unknown wire event code: ${eventCode}`);
+  return { event_type: eventType, data: expand(data) };
+};
+
+/** Parse any inbound frame: JSON text, or a binary frame. */
+export const parseWireMessage = (frame) =>
+  (typeof frame === 'string' ? JSON.parse(frame) : decodeBinaryFrame(frame));
@@ -37,6 +37,13 @@ export const useMapTokens = ({
 }) => {
   // asset_id → [MapToken] — every map in the session keeps its own board.
   const [mapTokenState, setMapTokenState] = useState({});
+  // asset_id → board revision this client's view is at (the server counts
+  // the DM's and the players' hidden-filtered views separately). A ref:
+  // only delta application reads it, nothing renders it.
+  const boardRevisionsRef = useRef({});
+  // asset_ids with a map_token_resync in flight — deltas arriving before
+  // the full board would each trigger another request otherwise.
+  const pendingResyncsRef = useRef(new Set());
   // image_asset_id → { url, token_area } — hydrated from initial_state
   // (server-filtered to this user's visible tokens) and extended by
   // place/reveal fragments (decision 27).
@@ -76,12 +83,51 @@ export const useMapTokens = ({
 
   // ── Incoming WS state ──────────────────────────────────────────────────────
 
-  const applyTokenBoard = useCallback((assetId, tokens) => {
+  const hydrateMapTokenState = useCallback((state, revisions) => {
+    boardRevisionsRef.current = { ...(revisions || {}) };
+    pendingResyncsRef.current.clear();
+    setMapTokenState(state);
+  }, []);
+
+  const applyTokenBoard = useCallback((assetId, tokens, { revision } = {}) => {
+    if (typeof revision === 'number') {
+      boardRevisionsRef.current[assetId] = revision;
+      pendingResyncsRef.current.delete(assetId);
+    }
     setMapTokenState((previousState) => ({ ...previousState, [assetId]: tokens }));
     // A committed op settles any lift affordance for the tokens involved —
     // the release frame usually arrives first, but reconcile regardless.
   }, []);
 
+  /**
+   * Apply one committed-op delta. Returns false when it doesn't follow
+   * this client's revision of the board (missed fragment) — the caller
+   * asks for a resync. A delta at or behind our revision is already
+   * reflected (it raced a resync reply) and is dropped.
+   */
+  const applyTokenDelta = useCallback((assetId, { tokenId, token, revision, baseRevision }) => {
+    const localRevision = boardRevisionsRef.current[assetId] || 0;
+    if (revision <= localRevision) return true;
+    if (baseRevision !== localRevision) return false;
+
+    boardRevisionsRef.current[assetId] = revision;
+    setMapTokenState((previousState) => {
+      const board = previousState[assetId] || [];
+      const remainingTokens = board.filter((boardToken) => boardToken.id !== tokenId);
+      if (!token) {
+        return { ...previousState, [assetId]: remainingTokens };
+      }
+      const existingIndex = board.findIndex((boardToken) => boardToken.id === tokenId);
+      if (existingIndex === -1) {
+        return { ...previousState, [assetId]: [...board, token] };
+      }
+      const nextBoard = [...board];
+      nextBoard[existingIndex] = token;
+      return { ...previousState, [assetId]: nextBoard };
+    });
+    return true;
+  }, []);
+
   const applyRemoteDrag = useCallback(({ tokenId, assetId, phase, holderUserId, x, y }) => {
     if (!assetId) return;
     if (phase === 'grab') {
@@ -231,6 +277,13 @@ export const useMapTokens = ({
     [webSocket, isConnected]
   );
 
+  const requestResync = useCallback((assetId) => {
+    if (pendingResyncsRef.current.has(assetId)) return;
+    if (sendFunctions.sendMapTokenResync(assetId)) {
+      pendingResyncsRef.current.add(assetId);
+    }
+  }, [sendFunctions]);
+
   const clampToImage = useCallback((x, y) => {
     const { naturalWidth, naturalHeight } = layerMetricsRef.current;
     if (!naturalWidth || !naturalHeight) return { x, y };
@@ -479,12 +532,15 @@ export const useMapTokens = ({
       registerHandler,
       thisUserId,
       applyTokenBoard,
+      applyTokenDelta,
+      requestResync,
       applyRemoteDrag,
       applyGrabDenial,
       addToLog,
       mergeTokenImages,
     });
-  }, [registerHandler, thisUserId, applyTokenBoard, applyRemoteDrag, applyGrabDenial, addToLog, mergeTokenImages]);
+  }, [registerHandler, thisUserId, applyTokenBoard, applyTokenDelta, requestResync,
+      applyRemoteDrag, applyGrabDenial, addToLog, mergeTokenImages]);
 
   const tokensForActiveMap = useMemo(
     () => (activeAssetId ? mapTokenState[activeAssetId] || [] : []),
@@ -501,7 +557,7 @@ export const useMapTokens = ({
   return {
     // state
     mapTokenState,
-    setMapTokenState, // initial_state hydration
+    setMapTokenState: hydrateMapTokenState, // initial_state hydration (boards + revisions)
     tokenImages,
     setTokenImages, // initial_state hydration
     tokensForActiveMap,
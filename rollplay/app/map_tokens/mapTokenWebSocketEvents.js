@@ -8,13 +8,19 @@
  * taking dependencies as arguments; useMapTokens wires them.
  *
  * Two lanes (plan §3.2):
- *  - map_token_update / map_token_state_update — committed state. The
- *    server applies the op atomically and broadcasts the map's full token
- *    array; every client (including the sender, via its echo) replaces
- *    that board wholesale. Authoritative reconciliation.
+ *  - map_token_update / map_token_delta — committed state. The server
+ *    applies the op atomically and broadcasts only the changed token plus
+ *    the board's new revision; every client (including the sender, via
+ *    its echo) applies it when base_revision matches its local revision.
+ *    A gap (missed fragment) asks for the full board via map_token_resync.
+ *    map_token_state_update still carries whole boards — resync replies,
+ *    denials, conflicts and grid re-snaps — and always replaces the board
+ *    wholesale, which is also how a refused optimistic commit rolls back.
  *  - map_token_drag / map_token_drag_denied — ephemeral presence: grab /
  *    release lift affordances, plus throttled mid-drag move frames when
- *    LIVE_DRAG_STREAMING is on (v1.1) — relayed, never persisted.
+ *    LIVE_DRAG_STREAMING is on (v1.1) — relayed, never persisted. The
+ *    server coalesces move frames per room and delivers them as one
+ *    map_token_drag_batch per tick (latest position per held token).
  */
 
 /** Committed-state fragment: replace one map's token array wholesale. */
@@ -26,6 +32,7 @@ export const handleMapTokenStateUpdate = (data, { applyTokenBoard, addToLog, mer
     op: data.op,
     tokenId: data.token_id,
     updatedBy: data.updated_by,
+    revision: data.revision,
   });
 
   // A place/reveal fragment can carry image refs for tokens entering the
@@ -42,6 +49,37 @@ export const handleMapTokenStateUpdate = (data, { applyTokenBoard, addToLog, mer
   }
 };
 
+/**
+ * Committed-state delta: one token changed (token null = gone from this
+ * client's view). Applied only on top of the revision it was built from;
+ * otherwise the board is stale and we ask for it whole.
+ */
+export const handleMapTokenDelta = (data, { applyTokenDelta, requestResync, addToLog, mergeTokenImages }) => {
+  const assetId = data?.asset_id;
+  if (!assetId || !applyTokenDelta) return;
+
+  // Image refs first — a revealed token must have its face when it lands.
+  if (data.token_images && mergeTokenImages) {
+    mergeTokenImages(data.token_images);
+  }
+
+  const applied = applyTokenDelta(assetId, {
+    tokenId: data.token_id,
+    token: data.token,
+    revision: data.revision,
+    baseRevision: data.base_revision,
+  });
+  if (!applied && requestResync) {
+    requestResync(assetId);
+  }
+
+  // The log line is independent of board state — mirror it even when the
+  // board itself is being resynced.
+  if (data.log_message && addToLog) {
+    addToLog(data.log_message, 'system');
+  }
+};
+
 /** Presence lane: someone's hand grabbed, moved, or released a token. */
 export const handleMapTokenDrag = (data, { thisUserId, applyRemoteDrag }) => {
   if (!data?.token_id || !applyRemoteDrag) return;
@@ -57,6 +95,12 @@ export const handleMapTokenDrag = (data, { thisUserId, applyRemoteDrag }) => {
   });
 };
 
+/** Coalesced move frames — one per held token, each a map_token_drag move. */
+export const handleMapTokenDragBatch = (data, { thisUserId, applyRemoteDrag }) => {
+  (data?.frames || []).forEach((frame) =>
+    handleMapTokenDrag(frame, { thisUserId, applyRemoteDrag }));
+};
+
 /** Grab denied — first hand already on the mini; our optimistic drag snaps back. */
 export const handleMapTokenDragDenied = (data, { applyGrabDenial }) => {
   if (!data?.token_id || !applyGrabDenial) return;
@@ -79,14 +123,25 @@ export const createMapTokenSendFunctions = (webSocket, isConnected) => {
 
   // Lane 1 — committed ops. place/move/configure carry the full token
   // (contract-validated server-side); remove carries token_id only.
-  const sendMapTokenPlace = (assetId, token) =>
-    send('map_token_update', { asset_id: assetId, op: 'place', token });
-  const sendMapTokenMove = (assetId, token) =>
-    send('map_token_update', { asset_id: assetId, op: 'move', token });
-  const sendMapTokenRemove = (assetId, tokenId) =>
-    send('map_token_update', { asset_id: assetId, op: 'remove', token_id: tokenId });
-  const sendMapTokenConfigure = (assetId, token) =>
-    send('map_token_update', { asset_id: assetId, op: 'configure', token });
+  // Optional `expected` conditions the op: { revision } of this client's
+  // view of the board and/or { updatedAt } of the target as the server
+  // last stamped it. An unmet condition comes back as a map_token_state_update
+  // with op 'conflict' and a conflict_reason instead of applying.
+  const conditions = ({ revision, updatedAt } = {}) => ({
+    ...(typeof revision === 'number' ? { expected_revision: revision } : {}),
+    ...(updatedAt ? { expected_updated_at: updatedAt } : {}),
+  });
+  const sendMapTokenPlace = (assetId, token, expected) =>
+    send('map_token_update', { asset_id: assetId, op: 'place', token, ...conditions({ revision: expected?.revision }) });
+  const sendMapTokenMove = (assetId, token, expected) =>
+    send('map_token_update', { asset_id: assetId, op: 'move', token, ...conditions(expected) });
+  const sendMapTokenRemove = (assetId, tokenId, expected) =>
+    send('map_token_update', { asset_id: assetId, op: 'remove', token_id: tokenId, ...conditions(expected) });
+  const sendMapTokenConfigure = (assetId, token, expected) =>
+    send('map_token_update', { asset_id: assetId, op: 'configure', token, ...conditions(expected) });
+  // Gap recovery — the server answers this client only with the full board.
+  const sendMapTokenResync = (assetId) =>
+    send('map_token_resync', { asset_id: assetId });
 
   // Lane 2 — presence. grab on pointer-capture, throttled move frames while
   // streaming (LIVE_DRAG_STREAMING), release on pointer-up.
@@ -102,6 +157,7 @@ export const createMapTokenSendFunctions = (webSocket, isConnected) => {
     sendMapTokenMove,
     sendMapTokenRemove,
     sendMapTokenConfigure,
+    sendMapTokenResync,
     sendMapTokenGrab,
     sendMapTokenDragFrame,
     sendMapTokenRelease,
@@ -113,7 +169,8 @@ export const createMapTokenSendFunctions = (webSocket, isConnected) => {
  * Returns one cleanup function.
  */
 export const registerMapTokenHandlers = ({ registerHandler, thisUserId,
-                                           applyTokenBoard, applyRemoteDrag,
+                                           applyTokenBoard, applyTokenDelta,
+                                           requestResync, applyRemoteDrag,
                                            applyGrabDenial, addToLog,
                                            mergeTokenImages }) => {
   if (!registerHandler) return () => {};
@@ -121,8 +178,12 @@ export const registerMapTokenHandlers = ({ registerHandler, thisUserId,
   const cleanups = [
     registerHandler('map_token_state_update', (data) =>
       handleMapTokenStateUpdate(data, { applyTokenBoard, addToLog, mergeTokenImages })),
+    registerHandler('map_token_delta', (data) =>
+      handleMapTokenDelta(data, { applyTokenDelta, requestResync, addToLog, mergeTokenImages })),
     registerHandler('map_token_drag', (data) =>
       handleMapTokenDrag(data, { thisUserId, applyRemoteDrag })),
+    registerHandler('map_token_drag_batch', (data) =>
+      handleMapTokenDragBatch(data, { thisUserId, applyRemoteDrag })),
     registerHandler('map_token_drag_denied', (data) =>
       handleMapTokenDragDenied(data, { applyGrabDenial })),
   ];